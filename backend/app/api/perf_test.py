@@ -4,19 +4,49 @@
 """
 
 from flask import request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import get_input_stream
 from flask_jwt_extended import jwt_required
 from urllib.parse import urlparse
 from . import api_bp
 from ..extensions import db, celery
 from ..models.perf_test_scenario import PerfTestScenario
-from ..utils.response import success_response, error_response
+from ..models.perf_test_run import PerfTestRun
+from ..models.api_test_case import ApiTestCollection, ApiTestCase
+from ..utils.response import success_response, error_response, paginate_response
 from ..utils.validators import validate_required, is_valid_url, is_valid_http_method
 from ..utils import get_current_user_id
-from ..tasks import run_perf_test_task
+from ..utils.perf_compare import compare_runs
+from ..utils.load_shapes import validate_load_shape
+from ..utils.perf_thresholds import validate_thresholds
+from ..utils.cpu_affinity import validate_cpu_config
+from ..utils.raw_samples import (
+    DEFAULT_PERCENTILES, analyze, load_samples, run_samples_dir, sample_files
+)
+from ..utils.har_import import HarImporter, HarError, iter_har_entries
+from ..utils.data_feeder import (
+    FEEDER_FORMATS, POLICIES, FeederError, FeederFile, build_feeder, placeholder_names
+)
+from ..utils.locust_script import (
+    build_request_task, render_locust_script, unresolved_variables, split_task_url, case_weight,
+    validate_user_class, check_script_compat
+)
+from ..utils.env_variables import (
+    replace_variables, replace_variables_in_dict, get_environment_variables, merge_headers_with_env
+)
+from ..utils.log_capture import read_stream, log_dir_for
+from ..tasks import run_perf_test_task, worker_stats_task
 import json
+import os
+import re
+import shutil
 from datetime import datetime
 
 
+# 可选的压测引擎：locust（默认）/ asyncio（轻量级单接口引擎）
+PERF_ENGINES = ('locust', 'asyncio')
+
+
 # ==================== URL 解析工具 ====================
 
 def _parse_target_url(url: str) -> tuple:
@@ -52,6 +82,8 @@ def _get_perf_limits() -> dict:
         'max_spawn_rate': limits.get('max_spawn_rate', 50),
         'min_duration': limits.get('min_duration', 10),
         'max_duration': limits.get('max_duration', 3600),
+        'max_processes': limits.get('max_processes', 4),
+        'max_rps': limits.get('max_rps', 20000),
     }
 
 
@@ -85,8 +117,110 @@ def _validate_perf_numbers(user_count, spawn_rate, duration):
     return (user_count, spawn_rate, duration), None
 
 
+def _validate_scenario_config(config):
+    """校验场景扩展配置（scenario.config）"""
+    if config is None:
+        return None
+    if not isinstance(config, dict):
+        return 'config must be an object'
+    limits = _get_perf_limits()
+
+    engine = config.get('engine', 'locust')
+    if engine not in PERF_ENGINES:
+        return f'config.engine must be one of {", ".join(PERF_ENGINES)}'
+
+    if 'processes' in config:
+        processes, error = _parse_int(config['processes'], 'config.processes')
+        if error:
+            return error
+        if not 1 <= processes <= limits['max_processes']:
+            return f'config.processes must be between 1 and {limits["max_processes"]}'
+
+    if config.get('target_rps') is not None:
+        try:
+            target_rps = float(config['target_rps'])
+        except (TypeError, ValueError):
+            return 'config.target_rps must be a number'
+        if not 0 < target_rps <= limits['max_rps']:
+            return f'config.target_rps must be between 0 and {limits["max_rps"]}'
+
+    arrival_stages = config.get('arrival_stages')
+    if arrival_stages is not None:
+        if not isinstance(arrival_stages, list) or not arrival_stages:
+            return 'config.arrival_stages must be a non-empty list'
+        if config.get('load_shape'):
+            return 'config.arrival_stages and config.load_shape cannot be used together'
+        total = 0
+        for index, item in enumerate(arrival_stages):
+            field = f'config.arrival_stages[{index}]'
+            if not isinstance(item, dict):
+                return f'{field} must be an object'
+            duration, error = _parse_int(item.get('duration'), f'{field}.duration')
+            if error:
+                return error
+            if duration <= 0:
+                return f'{field}.duration must be greater than 0'
+            try:
+                rps = float(item.get('rps'))
+            except (TypeError, ValueError):
+                return f'{field}.rps must be a number'
+            if not 0 < rps <= limits['max_rps']:
+                return f'{field}.rps must be between 0 and {limits["max_rps"]}'
+            total += duration
+        if total > limits['max_duration']:
+            return f'config.arrival_stages total duration must not exceed {limits["max_duration"]} seconds'
+    elif config.get('target_rps') and config.get('load_shape'):
+        return 'config.target_rps and config.load_shape cannot be used together'
+
+    error = validate_user_class(config)
+    if error:
+        return error
+
+    error = validate_thresholds(config.get('thresholds'), limits['max_duration'])
+    if error:
+        return error
+
+    error = validate_cpu_config(config.get('cpu'), os.cpu_count() or 1)
+    if error:
+        return error
+
+    if 'raw_samples' in config and not isinstance(config['raw_samples'], bool):
+        return 'config.raw_samples must be a boolean'
+
+    return validate_load_shape(config.get('load_shape'), limits)
+
+
+def _parse_load_settings(data: dict):
+    """
+    解析负载模型相关字段
+
+    Returns:
+        (fields, error): fields 为需要写入场景的字段字典
+    """
+    fields = {}
+    for field in ('ramp_up', 'step_users', 'step_duration'):
+        if field in data:
+            value, error = _parse_int(data[field], field)
+            if error:
+                return None, error
+            if value < 0 or (field != 'ramp_up' and value == 0):
+                return None, f'{field} must be a positive integer'
+            fields[field] = value
+
+    if 'step_load_enabled' in data:
+        fields['step_load_enabled'] = bool(data['step_load_enabled'])
+
+    if 'config' in data:
+        error = _validate_scenario_config(data['config'])
+        if error:
+            return None, error
+        fields['config'] = data['config'] or {}
+
+    return fields, None
+
+
 def _generate_locust_script(method: str, endpoint_path: str,
-                            headers: dict = None, body: dict = None) -> str:
+                            headers: dict = None, body: dict = None, config: dict = None) -> str:
     """
     根据请求方法生成 Locust 脚本
 
@@ -95,68 +229,80 @@ def _generate_locust_script(method: str, endpoint_path: str,
         endpoint_path: 接口路径
         headers: 请求头
         body: 请求体
+        config: 场景扩展配置（user_class / fasthttp）
 
     Returns:
         str: 生成的 Locust 脚本内容
     """
-    method = method.upper()
+    method = (method or 'GET').upper()
     endpoint_path = endpoint_path or "/"
+    # 与旧版生成逻辑一致：仅 POST/PUT 携带 JSON 请求体
+    body = (body if body is not None else {}) if method in ('POST', 'PUT') else None
+
+    config = config or {}
+    return render_locust_script(
+        [build_request_task(endpoint_path, method, endpoint_path, headers=headers, body=body)],
+        user_class=config.get('user_class', 'http'),
+        user_options=config.get('fasthttp'),
+    )
 
-    # 生成 headers 代码
-    headers_code = ""
-    if headers:
-        headers_items = [f'            "{k}": "{v}"' for k, v in headers.items()]
-        headers_joined = ",\n".join(headers_items)
-        headers_code = f"""
-
-        # 请求头
-        headers = {{
-{headers_joined}
-        }}
-"""
 
-    # 生成请求代码
-    if method == "GET":
-        request_code = f'self.client.get("{endpoint_path}"'
-        if headers:
-            request_code += ', headers=headers'
-        request_code += ")"
-    elif method == "POST":
-        body_str = json.dumps(body, ensure_ascii=False) if body else "{}"
-        request_code = f'self.client.post("{endpoint_path}", json={body_str}'
-        if headers:
-            request_code += ', headers=headers'
-        request_code += ")"
-    elif method == "PUT":
-        body_str = json.dumps(body, ensure_ascii=False) if body else "{}"
-        request_code = f'self.client.put("{endpoint_path}", json={body_str}'
-        if headers:
-            request_code += ', headers=headers'
-        request_code += ")"
-    elif method == "DELETE":
-        request_code = f'self.client.delete("{endpoint_path}"'
-        if headers:
-            request_code += ', headers=headers'
-        request_code += ")"
-    else:
-        request_code = f'self.client.get("{endpoint_path}")'
+def _generated_script_for(scenario) -> str:
+    """按场景当前的请求配置生成脚本，用于判断现有脚本是否为自动生成"""
+    _, endpoint_path = _parse_target_url(scenario.target_url)
+    return _generate_locust_script(scenario.method or 'GET', endpoint_path, scenario.headers,
+                                   scenario.body, scenario.config)
 
-    # 组装完整脚本
-    script = f'''"""
-Locust 性能测试脚本（自动生成）
-"""
-from locust import HttpUser, task, between
 
-class TestUser(HttpUser):
-    wait_time = between(1, 2)
-{headers_code}
-    @task
-    def test_endpoint(self):
-        """测试接口"""
-        {request_code}
-'''
-    return script
+def _build_collection_tasks(cases, env_id=None, weights=None):
+    """
+    将集合中的用例转换为压测任务（生成时替换环境变量并合并环境请求头）
 
+    Returns:
+        (tasks, case_info, warnings)
+    """
+    env_cache = {}
+
+    def _env_variables(environment_id):
+        if environment_id not in env_cache:
+            env_cache[environment_id] = get_environment_variables(environment_id, db) or {}
+        return env_cache[environment_id]
+
+    tasks, case_info, warnings = [], [], []
+    seen_names = set()
+    for case in cases:
+        effective_env_id = env_id if env_id is not None else case.environment_id
+        env_vars = _env_variables(effective_env_id) if effective_env_id else {}
+
+        url = replace_variables(case.url, env_vars)
+        headers = replace_variables_in_dict(case.headers or {}, env_vars)
+        params = replace_variables_in_dict(case.params or {}, env_vars)
+        body = case.body
+        if isinstance(body, dict):
+            body = replace_variables_in_dict(body, env_vars)
+        elif isinstance(body, str):
+            body = replace_variables(body, env_vars)
+        if effective_env_id:
+            headers = merge_headers_with_env(headers, effective_env_id, db)
+
+        name = case.name if case.name not in seen_names else f'{case.name} #{case.id}'
+        seen_names.add(name)
+        weight = case_weight(case, weights)
+        tasks.append(build_request_task(name, case.method, url, headers=headers, params=params,
+                                        body=body, body_type=case.body_type, weight=weight,
+                                        timeout=case.timeout))
+        case_info.append({'case_id': case.id, 'name': name, 'method': case.method.upper(),
+                          'url': url, 'weight': weight})
+
+        if case.body_type == 'binary' and case.body:
+            warnings.append(f'用例 {case.name}: binary 请求体不支持压测，已忽略请求体')
+        if (case.pre_script or '').strip() or (case.post_script or '').strip():
+            warnings.append(f'用例 {case.name}: 前置脚本/后置断言不会在压测中执行')
+        missing = unresolved_variables(tasks[-1])
+        if missing:
+            warnings.append(f'用例 {case.name}: 未解析的变量 {", ".join(missing)}（如需参数化可上传包含同名列的数据文件）')
+
+    return tasks, case_info, warnings
 
 
 @api_bp.route('/perf-test/health', methods=['GET'])
@@ -216,11 +362,17 @@ def create_scenario():
         return error_response(400, error)
     user_count, spawn_rate, duration = numbers
 
+    load_settings, error = _parse_load_settings(data)
+    if error:
+        return error_response(400, error)
+
     # Generate script when no custom script is provided.
     script_content = data.get('script_content')
+    scenario_config = load_settings.get('config') or {}
+    warnings = check_script_compat(script_content, scenario_config.get('user_class', 'http'))
     if not script_content:
         _, endpoint_path = _parse_target_url(target_url)
-        script_content = _generate_locust_script(method, endpoint_path, headers, body)
+        script_content = _generate_locust_script(method, endpoint_path, headers, body, scenario_config)
 
     scenario = PerfTestScenario(
         name=data['name'],
@@ -234,13 +386,204 @@ def create_scenario():
         duration=duration,
         project_id=data.get('project_id'),
         user_id=user_id,
-        script_content=script_content
+        script_content=script_content,
+        **load_settings
     )
 
     db.session.add(scenario)
     db.session.commit()
 
-    return success_response(data=scenario.to_dict(), message='Created')
+    return success_response(data=dict(scenario.to_dict(), warnings=warnings), message='Created')
+
+
+@api_bp.route('/perf-test/scenarios/from-collection', methods=['POST'])
+@jwt_required()
+def create_scenario_from_collection():
+    """从接口测试集合创建多接口混合压测场景（每个启用的用例对应一个带权重的任务）"""
+    user_id = get_current_user_id()
+    data = request.get_json() or {}
+
+    error = validate_required(data, ['collection_id'])
+    if error:
+        return error_response(400, error)
+
+    collection = ApiTestCollection.query.filter_by(id=data['collection_id'], user_id=user_id).first()
+    if not collection:
+        return error_response(404, '集合不存在')
+
+    cases = ApiTestCase.query.filter_by(collection_id=collection.id, is_enabled=True) \
+        .order_by(ApiTestCase.sort_order, ApiTestCase.id).all()
+    if not cases:
+        return error_response(400, '集合中没有启用的用例')
+
+    weights = data.get('weights') or {}
+    if not isinstance(weights, dict):
+        return error_response(400, 'weights must be an object')
+    for case_id, weight in weights.items():
+        weight, error = _parse_int(weight, f'weights.{case_id}')
+        if error:
+            return error_response(400, error)
+        if weight <= 0:
+            return error_response(400, f'weights.{case_id} must be greater than 0')
+
+    numbers, error = _validate_perf_numbers(data.get('user_count', 10), data.get('spawn_rate', 1),
+                                            data.get('duration', 60))
+    if error:
+        return error_response(400, error)
+    user_count, spawn_rate, duration = numbers
+
+    load_settings, error = _parse_load_settings(data)
+    if error:
+        return error_response(400, error)
+
+    tasks, case_info, warnings = _build_collection_tasks(cases, data.get('env_id'), weights)
+
+    # 第一个完整 URL 作为 Locust --host，同源的任务改写为路径
+    target_url = next((t['url'] for t in tasks if is_valid_url(t['url'])), None)
+    if not target_url:
+        return error_response(400, '用例中没有可用的完整 URL（请检查环境变量）')
+    base_host, _ = _parse_target_url(target_url)
+    for task, info in zip(tasks, case_info):
+        task['url'] = info['url'] = split_task_url(task['url'], base_host)
+
+    scenario_config = load_settings.get('config') or {}
+    script_content = render_locust_script(
+        tasks,
+        title=f'Locust 性能测试脚本（由接口集合「{collection.name}」生成）',
+        user_class=scenario_config.get('user_class', 'http'),
+        user_options=scenario_config.get('fasthttp'),
+    )
+
+    scenario = PerfTestScenario(
+        name=data.get('name') or f'{collection.name} - 混合场景',
+        description=data.get('description', ''),
+        target_url=target_url,
+        method=tasks[0]['method'],
+        user_count=user_count,
+        spawn_rate=spawn_rate,
+        duration=duration,
+        project_id=data.get('project_id') or collection.project_id,
+        user_id=user_id,
+        script_content=script_content,
+        **load_settings
+    )
+
+    db.session.add(scenario)
+    db.session.commit()
+
+    result = scenario.to_dict()
+    result['generation'] = {
+        'collection_id': collection.id,
+        'tasks': case_info,
+        'warnings': warnings,
+    }
+    return success_response(data=result, message='Created')
+
+
+@api_bp.route('/perf-test/scenarios/from-har', methods=['POST'])
+@jwt_required()
+def create_scenario_from_har():
+    """
+    从 HAR 录制文件创建压测场景
+
+    文件可以作为 multipart/form-data 的 file 字段上传（受 MAX_CONTENT_LENGTH 限制），
+    大文件直接作为请求体发送（Content-Type: application/json），选项放在查询参数中，
+    请求体按块流式解析，不受 MAX_CONTENT_LENGTH 限制（上限 PERF_HAR_MAX_SIZE）。
+    """
+    user_id = get_current_user_id()
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if not upload:
+            return error_response(400, 'file is required')
+        stream, filename, options = upload.stream, upload.filename, request.form
+    else:
+        stream = get_input_stream(request.environ, safe_fallback=False,
+                                  max_content_length=current_app.config['PERF_HAR_MAX_SIZE'])
+        filename, options = request.args.get('filename') or 'recording.har', request.args
+
+    data = {key: options[key] for key in ('user_count', 'spawn_rate', 'duration',
+                                          'ramp_up', 'step_users', 'step_duration') if options.get(key)}
+    if options.get('step_load_enabled'):
+        data['step_load_enabled'] = options['step_load_enabled'].lower() in ('1', 'true')
+    if options.get('config'):
+        try:
+            data['config'] = json.loads(options['config'])
+        except ValueError:
+            return error_response(400, 'config must be a JSON object')
+
+    numbers, error = _validate_perf_numbers(data.get('user_count', 10), data.get('spawn_rate', 1),
+                                            data.get('duration', 60))
+    if error:
+        return error_response(400, error)
+    user_count, spawn_rate, duration = numbers
+
+    load_settings, error = _parse_load_settings(data)
+    if error:
+        return error_response(400, error)
+
+    try:
+        importer = HarImporter(
+            hosts=[h.strip() for h in (options.get('hosts') or '').split(',')],
+            include_static=(options.get('include_static') or '').lower() in ('1', 'true'),
+            exclude=options.get('exclude'),
+        )
+    except re.error:
+        return error_response(400, 'exclude must be a valid regular expression')
+    try:
+        for entry in iter_har_entries(stream):
+            importer.add(entry)
+        result = importer.result()
+    except HarError as e:
+        return error_response(400, str(e))
+    except RequestEntityTooLarge:
+        return error_response(413, f'HAR 文件超过 {current_app.config["PERF_HAR_MAX_SIZE"] // 1024 // 1024}MB')
+
+    scenario_config = load_settings.get('config') or {}
+    wait_time = result['wait_time'] or (1, 2)
+    title = ' '.join(os.path.basename(filename).split())
+    script_content = render_locust_script(
+        result['tasks'],
+        wait_time=wait_time,
+        title=f'Locust 性能测试脚本（由 HAR 录制「{title}」生成）',
+        user_class=scenario_config.get('user_class', 'http'),
+        user_options=scenario_config.get('fasthttp'),
+    )
+
+    first = next((t for t in result['tasks'] if t['url'].startswith('/')), result['tasks'][0])
+    target_url = result['base_host'] + first['url'] if first['url'].startswith('/') else first['url']
+    scenario = PerfTestScenario(
+        name=options.get('name') or f'{title} - HAR 导入',
+        description=options.get('description', ''),
+        target_url=target_url,
+        method=first['method'],
+        user_count=user_count,
+        spawn_rate=spawn_rate,
+        duration=duration,
+        project_id=options.get('project_id', type=int),
+        user_id=user_id,
+        script_content=script_content,
+        **load_settings
+    )
+    db.session.add(scenario)
+    db.session.commit()
+
+    warnings = []
+    if not result['wait_time']:
+        warnings.append('HAR 中没有可用的请求时间信息，思考时间使用默认的 1-2 秒')
+    if any('{' in e['name'] for e in result['endpoints']):
+        warnings.append('模板化的接口使用录制时的实际 ID 请求，如需参数化可上传数据文件并在脚本中使用 {{column}}')
+
+    data = scenario.to_dict()
+    data['generation'] = {
+        'source': 'har',
+        'filename': filename,
+        'base_host': result['base_host'],
+        'wait_time': list(wait_time),
+        'tasks': result['endpoints'],
+        'stats': result['stats'],
+        'warnings': warnings,
+    }
+    return success_response(data=data, message='Created')
 
 
 @api_bp.route('/perf-test/scenarios/<int:scenario_id>', methods=['GET'])
@@ -268,6 +611,9 @@ def update_scenario(scenario_id):
 
     data = request.get_json()
 
+    # 自动生成的脚本在请求配置或 user_class 变化后重新生成，自定义脚本保持不变
+    script_generated = scenario.script_content == _generated_script_for(scenario)
+
     if 'target_url' in data:
         if not is_valid_url(data['target_url']):
             return error_response(400, 'target_url must be a valid http/https URL')
@@ -320,9 +666,21 @@ def update_scenario(scenario_id):
             return error_response(400, f'duration must be between {limits["min_duration"]} and {limits["max_duration"]} seconds')
         scenario.duration = duration
 
+    load_settings, error = _parse_load_settings(data)
+    if error:
+        return error_response(400, error)
+    for field, value in load_settings.items():
+        setattr(scenario, field, value)
+
+    warnings = []
+    if 'script_content' in data:
+        warnings = check_script_compat(data['script_content'], (scenario.config or {}).get('user_class', 'http'))
+    elif script_generated:
+        scenario.script_content = _generated_script_for(scenario)
+
     db.session.commit()
 
-    return success_response(data=scenario.to_dict(), message='Updated')
+    return success_response(data=dict(scenario.to_dict(), warnings=warnings), message='Updated')
 
 
 @api_bp.route('/perf-test/scenarios/<int:scenario_id>', methods=['DELETE'])
@@ -343,12 +701,179 @@ def delete_scenario(scenario_id):
         except:
             pass
     
+    run_ids = [run.id for run in scenario.runs]
     db.session.delete(scenario)
     db.session.commit()
+
+    shutil.rmtree(os.path.join(current_app.config['UPLOAD_FOLDER'], _feeder_dir(scenario_id)), ignore_errors=True)
+    for run_id in run_ids:
+        shutil.rmtree(run_samples_dir(current_app.config['REPORT_FOLDER'], run_id), ignore_errors=True)
+        shutil.rmtree(log_dir_for(current_app.config['LOG_CAPTURE'], f'perf_run_{run_id}'), ignore_errors=True)
     
     return success_response(message='删除成功')
 
 
+@api_bp.route('/perf-test/workers/stats', methods=['GET'])
+@jwt_required()
+def get_worker_stats():
+    """获取 Celery Worker 进程的应用启动耗时与数据库连接池状态"""
+    timeout = min(max(request.args.get('timeout', 5, type=float), 1), 30)
+    try:
+        result = worker_stats_task.apply_async()
+        return success_response(data=result.get(timeout=timeout))
+    except Exception as e:
+        return error_response(503, f'Worker 未响应: {str(e)}')
+
+
+# ==================== 数据文件 ====================
+
+FEEDER_NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_\-]{0,63}$')
+FEEDER_EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+def _feeder_dir(scenario_id):
+    """场景数据文件目录（相对 UPLOAD_FOLDER）"""
+    return os.path.join('perf_feeders', str(scenario_id))
+
+
+def _feeder_warnings(scenario):
+    """检查脚本中的 {{column}} 占位符是否都能由数据文件提供"""
+    columns = set()
+    for item in scenario.data_feeders or []:
+        columns.update(item['columns'])
+        columns.update(f'{item["name"]}.{c}' for c in item['columns'])
+    missing = [name for name in placeholder_names(scenario.script_content) if name not in columns]
+    if missing and scenario.data_feeders:
+        return [f'脚本中的占位符 {", ".join(missing)} 没有对应的数据文件列，将按原样发送']
+    return []
+
+
+def _preview_feeder(path, limit=3):
+    feeder_file = FeederFile(path)
+    try:
+        return [feeder_file.row(i) for i in range(min(limit, feeder_file.rows))]
+    finally:
+        feeder_file.close()
+
+
+@api_bp.route('/perf-test/scenarios/<int:scenario_id>/feeders', methods=['GET'])
+@jwt_required()
+def get_feeders(scenario_id):
+    """获取场景的数据文件列表"""
+    user_id = get_current_user_id()
+    scenario = PerfTestScenario.query.filter_by(id=scenario_id, user_id=user_id).first()
+    if not scenario:
+        return error_response(404, '场景不存在')
+    return success_response(data={'feeders': scenario.data_feeders or [], 'warnings': _feeder_warnings(scenario)})
+
+
+@api_bp.route('/perf-test/scenarios/<int:scenario_id>/feeders', methods=['POST'])
+@jwt_required()
+def upload_feeder(scenario_id):
+    """
+    上传数据文件（multipart/form-data）
+
+    字段：file（CSV 带表头 / JSONL）、name（占位符前缀，默认取文件名）、policy（sequential/random/unique）
+    同名数据文件会被替换。
+    """
+    user_id = get_current_user_id()
+    scenario = PerfTestScenario.query.filter_by(id=scenario_id, user_id=user_id).first()
+    if not scenario:
+        return error_response(404, '场景不存在')
+    if scenario.status == 'running':
+        return error_response(400, '场景正在运行，不能修改数据文件')
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return error_response(400, 'file is required')
+    stem, ext = os.path.splitext(upload.filename)
+    fmt = request.form.get('format') or FEEDER_EXTENSIONS.get(ext.lower())
+    if fmt not in FEEDER_FORMATS:
+        return error_response(400, f'format must be one of {", ".join(FEEDER_FORMATS)}')
+    name = request.form.get('name') or re.sub(r'\W+', '_', stem).strip('_') or 'data'
+    if not FEEDER_NAME_PATTERN.match(name):
+        return error_response(400, 'name must start with a letter or underscore and contain only letters, digits, _ or -')
+    policy = request.form.get('policy', 'sequential')
+    if policy not in POLICIES:
+        return error_response(400, f'policy must be one of {", ".join(POLICIES)}')
+
+    relative = os.path.join(_feeder_dir(scenario.id), f'{name}.feed')
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        info = build_feeder(upload.stream, f'{path}.tmp', fmt)
+        os.replace(f'{path}.tmp', path)
+    except FeederError as e:
+        return error_response(400, f'数据文件格式错误: {e}')
+    finally:
+        if os.path.exists(f'{path}.tmp'):
+            os.remove(f'{path}.tmp')
+
+    item = {
+        'name': name,
+        'filename': upload.filename,
+        'format': fmt,
+        'policy': policy,
+        'columns': info['columns'],
+        'rows': info['rows'],
+        'size': info['size'],
+        'file': relative,
+        'uploaded_at': datetime.utcnow().isoformat() + 'Z',
+    }
+    scenario.data_feeders = [f for f in (scenario.data_feeders or []) if f['name'] != name] + [item]
+    db.session.commit()
+
+    return success_response(
+        data=dict(item, preview=_preview_feeder(path), warnings=_feeder_warnings(scenario)),
+        message='上传成功'
+    )
+
+
+@api_bp.route('/perf-test/scenarios/<int:scenario_id>/feeders/<name>', methods=['PUT'])
+@jwt_required()
+def update_feeder(scenario_id, name):
+    """修改数据文件的取数策略"""
+    user_id = get_current_user_id()
+    scenario = PerfTestScenario.query.filter_by(id=scenario_id, user_id=user_id).first()
+    if not scenario:
+        return error_response(404, '场景不存在')
+
+    policy = (request.get_json() or {}).get('policy')
+    if policy not in POLICIES:
+        return error_response(400, f'policy must be one of {", ".join(POLICIES)}')
+    feeders = [dict(f) for f in (scenario.data_feeders or [])]
+    item = next((f for f in feeders if f['name'] == name), None)
+    if not item:
+        return error_response(404, '数据文件不存在')
+    item['policy'] = policy
+    scenario.data_feeders = feeders
+    db.session.commit()
+    return success_response(data=item, message='Updated')
+
+
+@api_bp.route('/perf-test/scenarios/<int:scenario_id>/feeders/<name>', methods=['DELETE'])
+@jwt_required()
+def delete_feeder(scenario_id, name):
+    """删除数据文件"""
+    user_id = get_current_user_id()
+    scenario = PerfTestScenario.query.filter_by(id=scenario_id, user_id=user_id).first()
+    if not scenario:
+        return error_response(404, '场景不存在')
+    if scenario.status == 'running':
+        return error_response(400, '场景正在运行，不能修改数据文件')
+
+    item = next((f for f in (scenario.data_feeders or []) if f['name'] == name), None)
+    if not item:
+        return error_response(404, '数据文件不存在')
+    scenario.data_feeders = [f for f in scenario.data_feeders if f['name'] != name]
+    db.session.commit()
+
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], item['file'])
+    if os.path.exists(path):
+        os.remove(path)
+    return success_response(message='删除成功')
+
+
 # ==================== 执行测试 ====================
 
 @api_bp.route('/perf-test/scenarios/<int:scenario_id>/run', methods=['POST'])
@@ -413,12 +938,15 @@ def stop_scenario(scenario_id):
         return error_response(400, '测试未在运行')
     
     try:
-        # 尝试撤销 Celery 任务
+        # 撤销尚未开始的任务；执行中的任务检测到 stopped 状态后结束压测进程并写入结果
         task_id = f'perf_test_{scenario_id}_{user_id}'
-        celery.control.revoke(task_id, terminate=True)
+        celery.control.revoke(task_id)
         
-        # 更新状态
+        # 只更新状态：最终结果与报告由任务退出时写入（任务保留 stopped 状态）
         scenario.status = 'stopped'
+        for perf_run in scenario.runs.filter_by(status='running').all():
+            perf_run.status = 'stopped'
+            perf_run.error_message = '用户手动停止'
         db.session.commit()
         
         return success_response(message='已停止')
@@ -427,6 +955,39 @@ def stop_scenario(scenario_id):
 
 
 
+@api_bp.route('/perf-test/scenarios/<int:scenario_id>/logs', methods=['GET'])
+@jwt_required()
+def get_scenario_logs(scenario_id):
+    """
+    实时查看压测进程输出
+
+    查询参数:
+        run_id: 执行记录 ID，默认最近一次执行
+        stream: stdout / stderr，默认 stdout
+        offset: 起始字节偏移（上次返回的 next_offset），不传时返回末尾部分
+        limit: 最多返回的字节数，默认 65536
+    """
+    user_id = get_current_user_id()
+    scenario = PerfTestScenario.query.filter_by(id=scenario_id, user_id=user_id).first()
+    if not scenario:
+        return error_response(404, '场景不存在')
+
+    run_id = request.args.get('run_id', type=int)
+    query = scenario.runs
+    perf_run = query.filter_by(id=run_id).first() if run_id else query.order_by(PerfTestRun.id.desc()).first()
+    if not perf_run:
+        return error_response(404, '执行记录不存在')
+
+    try:
+        data = read_stream(log_dir_for(current_app.config['LOG_CAPTURE'], f'perf_run_{perf_run.id}'),
+                           request.args.get('stream', 'stdout'),
+                           request.args.get('offset'), request.args.get('limit'))
+    except ValueError as e:
+        return error_response(400, str(e))
+    data.update(run_id=perf_run.id, running=perf_run.status == 'running')
+    return success_response(data=data)
+
+
 @api_bp.route('/perf-test/scenarios/<int:scenario_id>/status', methods=['GET'])
 @jwt_required()
 def get_scenario_status(scenario_id):
@@ -439,6 +1000,7 @@ def get_scenario_status(scenario_id):
 
     # 从 last_result 中获取实时数据，如果没有则使用数据库中的值
     result_data = scenario.last_result or {}
+    final_results = result_data.get('results') or {}
     return success_response(data={
         'status': scenario.status,
         'last_run_at': scenario.last_run_at.isoformat() + 'Z' if scenario.last_run_at else None,
@@ -448,9 +1010,165 @@ def get_scenario_status(scenario_id):
         'min_response_time': scenario.min_response_time,
         'throughput': scenario.throughput,
         'error_rate': scenario.error_rate,
+        'endpoints': final_results.get('endpoint_stats', []),
+        'failures': final_results.get('failures', []),
+        'exceptions': final_results.get('exceptions', []),
     })
 
 
+# ==================== 执行记录与回归对比 ====================
+
+@api_bp.route('/perf-test/scenarios/<int:scenario_id>/runs', methods=['GET'])
+@jwt_required()
+def get_scenario_runs(scenario_id):
+    """获取场景的执行记录列表"""
+    user_id = get_current_user_id()
+    scenario = PerfTestScenario.query.filter_by(id=scenario_id, user_id=user_id).first()
+
+    if not scenario:
+        return error_response(404, '场景不存在')
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+
+    pagination = scenario.runs.order_by(PerfTestRun.created_at.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    return paginate_response(
+        items=[r.to_dict() for r in pagination.items],
+        total=pagination.total,
+        page=page,
+        per_page=per_page
+    )
+
+
+@api_bp.route('/perf-test/runs/<int:run_id>', methods=['GET'])
+@jwt_required()
+def get_perf_run(run_id):
+    """获取执行记录详情"""
+    user_id = get_current_user_id()
+    perf_run = PerfTestRun.query.filter_by(id=run_id, user_id=user_id).first()
+
+    if not perf_run:
+        return error_response(404, '执行记录不存在')
+
+    return success_response(data=perf_run.to_dict(include_details=True))
+
+
+@api_bp.route('/perf-test/runs/<int:run_id>/samples/analysis', methods=['GET'])
+@jwt_required()
+def analyze_perf_samples(run_id):
+    """
+    基于原始样本按窗口和过滤条件重新统计（需要场景开启 config.raw_samples）
+
+    查询参数：start / end（相对压测开始的秒数）、endpoint / method（可重复）、status（逗号分隔）、
+    failed（true/false）、percentiles（逗号分隔，默认 50,90,95,99）、interval（时间序列分桶秒数）
+    """
+    user_id = get_current_user_id()
+    perf_run = PerfTestRun.query.filter_by(id=run_id, user_id=user_id).first()
+    if not perf_run:
+        return error_response(404, '执行记录不存在')
+
+    paths = sample_files(run_samples_dir(current_app.config['REPORT_FOLDER'], perf_run.id))
+    if not paths:
+        return error_response(404, '该执行记录没有原始样本（场景需开启 config.raw_samples）')
+
+    try:
+        start = request.args.get('start', type=float)
+        end = request.args.get('end', type=float)
+        interval = request.args.get('interval', type=float)
+        status = [int(v) for v in request.args.get('status', '').split(',') if v.strip()]
+        percentiles = [float(v) for v in request.args.get('percentiles', '').split(',') if v.strip()] \
+            or list(DEFAULT_PERCENTILES)
+    except ValueError:
+        return error_response(400, 'status / percentiles must be comma separated numbers')
+    if any(not 0 <= p <= 100 for p in percentiles):
+        return error_response(400, 'percentiles must be between 0 and 100')
+    if start is not None and end is not None and end <= start:
+        return error_response(400, 'end must be greater than start')
+    if interval is not None and interval <= 0:
+        return error_response(400, 'interval must be greater than 0')
+    failed = request.args.get('failed')
+    failed = None if failed is None else failed.lower() in ('1', 'true')
+
+    try:
+        columns, endpoints = load_samples(paths)
+    except ImportError:
+        return error_response(501, '原始样本分析需要安装 numpy')
+    except (OSError, ValueError) as e:
+        return error_response(500, f'读取原始样本失败: {e}')
+
+    result = analyze(columns, endpoints, start=start, end=end,
+                     endpoint_names=request.args.getlist('endpoint'), methods=request.args.getlist('method'),
+                     status=status, failed=failed, percentiles=percentiles, interval=interval)
+    result['samples'] = (perf_run.result or {}).get('raw_samples')
+    return success_response(data=result)
+
+
+@api_bp.route('/perf-test/runs/<int:run_id>/baseline', methods=['POST'])
+@jwt_required()
+def pin_perf_baseline(run_id):
+    """将执行记录设为所属场景的对比基线"""
+    user_id = get_current_user_id()
+    perf_run = PerfTestRun.query.filter_by(id=run_id, user_id=user_id).first()
+
+    if not perf_run:
+        return error_response(404, '执行记录不存在')
+
+    if perf_run.status != 'completed':
+        return error_response(400, '只能将已完成的执行记录设为基线')
+
+    PerfTestRun.query.filter_by(scenario_id=perf_run.scenario_id, is_baseline=True).update(
+        {'is_baseline': False}, synchronize_session=False
+    )
+    perf_run.is_baseline = True
+    db.session.commit()
+
+    return success_response(data=perf_run.to_dict(), message='已设为基线')
+
+
+@api_bp.route('/perf-test/runs/<int:run_id>/compare', methods=['GET'])
+@jwt_required()
+def compare_perf_run(run_id):
+    """
+    对比两次执行
+
+    查询参数:
+        baseline_run_id: 对比的执行记录 ID（不传则使用场景已设置的基线）
+        p95_pct: P95 允许上升的百分比
+        rps_pct: 吞吐量允许下降的百分比
+        error_rate_abs: 错误率允许上升的百分点
+    """
+    user_id = get_current_user_id()
+    perf_run = PerfTestRun.query.filter_by(id=run_id, user_id=user_id).first()
+
+    if not perf_run:
+        return error_response(404, '执行记录不存在')
+
+    baseline_run_id = request.args.get('baseline_run_id', type=int)
+    if baseline_run_id:
+        baseline = db.session.get(PerfTestRun, baseline_run_id)
+        if not baseline:
+            return error_response(404, '基线执行记录不存在')
+        if baseline.user_id != user_id or baseline.scenario_id != perf_run.scenario_id:
+            return error_response(400, '基线执行记录必须属于同一场景')
+    else:
+        baseline = PerfTestRun.query.filter_by(
+            scenario_id=perf_run.scenario_id, is_baseline=True
+        ).first()
+        if not baseline:
+            return error_response(400, '场景未设置基线，请指定 baseline_run_id')
+
+    tolerances = dict(current_app.config.get('PERF_REGRESSION_TOLERANCES', {}))
+    for key in ('p95_pct', 'rps_pct', 'error_rate_abs'):
+        if key in request.args:
+            tolerances[key] = request.args.get(key)
+
+    comparison = compare_runs(perf_run.to_dict(), baseline.to_dict(), tolerances)
+    return success_response(data=comparison)
+
+
 # ==================== 快速测试 ====================
 
 @api_bp.route('/perf-test/running', methods=['GET'])
@@ -5,6 +5,7 @@
 """
 
 from flask import request, send_file
+from markupsafe import escape
 from flask_jwt_extended import jwt_required
 from datetime import datetime, timedelta
 from sqlalchemy import func
@@ -645,6 +646,11 @@ def get_test_report_html(report_id):
                 </tr>
                 ''' for result in results])
 
+        perf_sections = _render_perf_sections(report.report_data or {}) \
+            if report.test_type == 'performance' else ''
+        if report.test_type == 'web':
+            perf_sections = _render_web_perf_section(report.report_data or {})
+
         # 简单的 HTML 报告模板
         html = f"""
 <!DOCTYPE html>
@@ -710,6 +716,7 @@ def get_test_report_html(report_id):
                 {results_rows}
             </tbody>
         </table>
+        {perf_sections}
         <div style="margin-top: 30px; padding: 20px; background: #f5f5f5; border-radius: 5px;">
             <p style="margin: 0; color: #666;">生成时间: {report.created_at.strftime('%Y-%m-%d %H:%M:%S')}</p>
         </div>
@@ -722,6 +729,103 @@ def get_test_report_html(report_id):
     return report.report_html, 200, {'Content-Type': 'text/html; charset=utf-8'}
 
 
+def _render_perf_sections(report_data):
+    """渲染性能测试报告的接口统计与失败明细"""
+    def _fmt(value):
+        return f'{value:.2f}' if isinstance(value, float) else escape(value if value is not None else '-')
+
+    endpoint_rows = ''.join(f'''
+                <tr>
+                    <td>{escape(stat.get('method', ''))}</td>
+                    <td>{escape(stat.get('name', ''))}</td>
+                    <td>{stat.get('request_count', 0)}</td>
+                    <td class="{'failed' if stat.get('failure_count') else ''}">{stat.get('failure_count', 0)}</td>
+                    <td>{_fmt(stat.get('p50_response_time'))}</td>
+                    <td>{_fmt(stat.get('p90_response_time'))}</td>
+                    <td>{_fmt(stat.get('p95_response_time'))}</td>
+                    <td>{_fmt(stat.get('p99_response_time'))}</td>
+                    <td>{_fmt(stat.get('max_response_time'))}</td>
+                    <td>{_fmt(stat.get('throughput'))}</td>
+                </tr>''' for stat in report_data.get('endpoint_stats') or [])
+
+    failure_rows = ''.join(f'''
+                <tr>
+                    <td><pre style="white-space: pre-wrap;">{escape(failure.get('error', ''))}</pre></td>
+                    <td>{failure.get('occurrences', 0)}</td>
+                    <td>{'<br>'.join(f"{escape(e['method'])} {escape(e['name'])} ({e['occurrences']})"
+                                     for e in failure.get('endpoints', []))}</td>
+                </tr>''' for failure in report_data.get('failures') or [])
+
+    exception_rows = ''.join(f'''
+                <tr>
+                    <td><pre style="white-space: pre-wrap;">{escape(item.get('message', ''))}</pre></td>
+                    <td>{item.get('count', 0)}</td>
+                    <td><pre style="white-space: pre-wrap;">{escape(item.get('traceback', ''))}</pre></td>
+                </tr>''' for item in report_data.get('exceptions') or [])
+
+    warnings = ''.join(f'<li>{escape(w)}</li>' for w in report_data.get('warnings') or [])
+
+    return f'''
+        {f'<div class="failed"><ul>{warnings}</ul></div>' if warnings else ''}
+        <h2>接口统计</h2>
+        <table>
+            <thead>
+                <tr>
+                    <th>方法</th><th>接口</th><th>请求数</th><th>失败数</th>
+                    <th>P50(ms)</th><th>P90(ms)</th><th>P95(ms)</th><th>P99(ms)</th><th>最大(ms)</th><th>RPS</th>
+                </tr>
+            </thead>
+            <tbody>{endpoint_rows or '<tr><td colspan="10">-</td></tr>'}</tbody>
+        </table>
+        <h2>失败明细</h2>
+        <table>
+            <thead><tr><th>错误信息</th><th>次数</th><th>涉及接口</th></tr></thead>
+            <tbody>{failure_rows or '<tr><td colspan="3">无失败请求</td></tr>'}</tbody>
+        </table>
+        {f'<h2>脚本异常</h2><table><thead><tr><th>异常信息</th><th>次数</th><th>堆栈</th></tr></thead>'
+         f'<tbody>{exception_rows}</tbody></table>' if exception_rows else ''}'''
+
+
+def _render_web_perf_section(report_data):
+    """渲染 Web 测试报告的前端性能指标与趋势（最近一次相对之前各次中位数的变化）"""
+    columns = [('ttfb', 'TTFB(ms)'), ('fcp', 'FCP(ms)'), ('lcp', 'LCP(ms)'), ('cls', 'CLS'),
+               ('load', 'Load(ms)'), ('transfer_bytes', '传输(KB)'), ('long_tasks', '长任务')]
+
+    def _cell(item, metric):
+        value = (item.get('summary') or {}).get(metric)
+        if value is None:
+            return '<td>-</td>'
+        text = f'{value / 1024:.1f}' if metric == 'transfer_bytes' else f'{value:g}'
+        change = ((item.get('trend') or {}).get(metric) or {}).get('change_pct')
+        if change is not None:
+            text += f' <span class="{"failed" if change > 0 else "passed"}">({change:+.1f}%)</span>'
+        over = any(v['metric'] == metric for v in item.get('violations') or [])
+        return f'<td class="{"failed" if over else ""}">{text}</td>'
+
+    rows = ''.join(f'''
+                <tr>
+                    <td>{escape(item.get('name', ''))}</td>
+                    <td>{(item.get('summary') or {}).get('pages', 0)}</td>
+                    {''.join(_cell(item, metric) for metric, _ in columns)}
+                    <td>{'<br>'.join(escape(f"{v['metric']} {v['value']:g} > {v['budget']:g} ({v['url']})")
+                                     for v in item.get('violations') or []) or '-'}</td>
+                </tr>''' for item in report_data.get('performance') or [])
+    if not rows:
+        return ''
+
+    return f'''
+        <h2>前端性能</h2>
+        <p style="color: #666;">各指标为所有页面中的最差值，括号内为相对最近多次执行中位数的变化</p>
+        <table>
+            <thead>
+                <tr>
+                    <th>脚本</th><th>页面数</th>{''.join(f'<th>{title}</th>' for _, title in columns)}<th>超出预算</th>
+                </tr>
+            </thead>
+            <tbody>{rows}</tbody>
+        </table>'''
+
+
 @api_bp.route('/test-reports/<int:report_id>', methods=['DELETE'])
 @jwt_required()
 def delete_test_report(report_id):
@@ -3,20 +3,38 @@ Web 自动化测试模块 - API
 实现基于 Playwright 的 Web 自动化测试功能
 """
 
-from flask import request
+from flask import request, current_app
+from werkzeug.wsgi import wrap_file
 from flask_jwt_extended import jwt_required
 from . import api_bp
 from ..extensions import db, celery
 from ..models.web_test_script import WebTestScript
-from ..utils.response import success_response, error_response
+from ..models.web_test_run import WebTestRun
+from ..models.project import Project
+from ..models.test_run import TestRun
+from ..utils.response import success_response, error_response, paginate_response
 from ..utils.validators import validate_required
+from ..utils.artifact_store import get_artifact_store
+from ..utils.log_capture import read_stream, log_dir_for
+from ..utils.network_profile import validate_network_config
+from ..utils.web_vitals import validate_performance_config
+from ..utils.visual_diff import VISUAL_DIR, validate_visual_config
+from ..utils.visual_baseline import BaselineStore
+from ..utils.web_matrix import validate_matrix_config, resolve_matrix, build_cells
+from ..utils.web_retry import validate_retry_config
 from ..utils import get_current_user_id
-from ..tasks import run_web_test_task
+from ..tasks import run_web_test_task, run_web_matrix_task, dispatch_web_suite, web_performance_trend
+import os
+import re
+import shutil
 import subprocess
 import sys
 from datetime import datetime
 
 
+# 矩阵执行的组合名（浏览器-宽x高）
+CELL_PATTERN = re.compile(r'^[a-z]+-\d+x\d+$')
+
 # 存储录制进程（录制功能仍使用进程方式）
 recording_processes = {}
 
@@ -29,6 +47,19 @@ def web_test_health():
 
 # ==================== 脚本管理 ====================
 
+def _validate_script_config(config):
+    """校验脚本扩展配置（script.config）"""
+    if config is None:
+        return None
+    if not isinstance(config, dict):
+        return 'config must be an object'
+    matrix_settings = current_app.config['WEB_MATRIX']
+    return (validate_network_config(config.get('network')) or validate_performance_config(config.get('performance'))
+            or validate_visual_config(config.get('visual'))
+            or validate_matrix_config(config.get('matrix'), matrix_settings['max_cells'], matrix_settings['max_slots'])
+            or validate_retry_config(config.get('retry'), current_app.config['WEB_RETRY']['max_retries']))
+
+
 @api_bp.route('/web-test/scripts', methods=['GET'])
 @jwt_required()
 def get_scripts():
@@ -54,7 +85,10 @@ def create_script():
     
     error = validate_required(data, ['name'])
     if error:
-        return error_response(message=error)
+        return error_response(message=error, code=400)
+    error = _validate_script_config(data.get('config'))
+    if error:
+        return error_response(message=error, code=400)
     
     # 默认的 Playwright 脚本模板
     default_code = '''"""
@@ -75,7 +109,7 @@ def run():
         title = page.title()
         print(f"页面标题: {title}")
         
-        # 截图
+        # 截图（保存在本次执行的工作目录中，执行结束后作为产物收集）
         page.screenshot(path="screenshot.png")
         
         # 关闭浏览器
@@ -96,6 +130,8 @@ if __name__ == "__main__":
         browser=data.get('browser', 'chromium'),
         headless=data.get('headless', True),
         timeout=data.get('timeout', 30000),
+        tags=data.get('tags', []),
+        config=data.get('config') or {},
         project_id=data.get('project_id'),
         user_id=user_id
     )
@@ -130,8 +166,14 @@ def update_script(script_id):
         return error_response(message='脚本不存在', code=404)
     
     data = request.get_json()
+    if 'config' in data:
+        error = _validate_script_config(data['config'])
+        if error:
+            return error_response(message=error, code=400)
+        data['config'] = data['config'] or {}
     
-    for field in ['name', 'description', 'script_content', 'target_url', 'browser', 'headless', 'timeout']:
+    for field in ['name', 'description', 'script_content', 'target_url', 'browser', 'headless', 'timeout',
+                  'tags', 'is_enabled', 'config']:
         if field in data:
             setattr(script, field, data[field])
     
@@ -152,6 +194,10 @@ def delete_script(script_id):
     
     db.session.delete(script)
     db.session.commit()
+
+    # 删除脚本的产物清单，对象由保留策略清理
+    get_artifact_store(current_app.config['WEB_ARTIFACTS']).remove_refs(f'script_{script_id}_')
+    shutil.rmtree(log_dir_for(current_app.config['LOG_CAPTURE'], f'web_script_{script_id}'), ignore_errors=True)
     
     return success_response(message='删除成功')
 
@@ -189,6 +235,403 @@ def run_script(script_id):
         return error_response(message=f'提交失败: {str(e)}')
 
 
+@api_bp.route('/web-test/scripts/<int:script_id>/matrix/run', methods=['POST'])
+@jwt_required()
+def run_script_matrix(script_id):
+    """
+    按「浏览器 × 视口」矩阵并行运行 Web 测试脚本（异步），全部组合汇总为一条执行记录
+
+    请求体（均可选，缺省取脚本 config.matrix，再缺省取脚本的 browser 与视口）:
+        browsers: 浏览器列表
+        viewports: 视口列表 [{width, height}]
+        slots: 并发执行的组合数
+    """
+    user_id = get_current_user_id()
+    script = WebTestScript.query.filter_by(id=script_id, user_id=user_id).first()
+    if not script:
+        return error_response(message='脚本不存在', code=404)
+    if script.status == 'running':
+        return error_response(message='脚本正在运行中', code=400)
+
+    data = request.get_json(silent=True) or {}
+    settings = current_app.config['WEB_MATRIX']
+    matrix = dict((script.config or {}).get('matrix') or {})
+    matrix.update({k: data[k] for k in ('browsers', 'viewports', 'slots') if data.get(k) is not None})
+    error = validate_matrix_config(matrix, settings['max_cells'], settings['max_slots'])
+    if error:
+        return error_response(message=error, code=400)
+    matrix = resolve_matrix(matrix, script.browser or 'chromium', script.viewport_width or 1280,
+                            script.viewport_height or 720, settings['default_slots'])
+    cells = [c['cell'] for c in build_cells(matrix)]
+    if len(cells) > settings['max_cells']:
+        return error_response(message=f'matrix must not exceed {settings["max_cells"]} browser/viewport combinations',
+                              code=400)
+
+    try:
+        task = run_web_matrix_task.apply_async(
+            args=[script_id, user_id, matrix],
+            task_id=f'web_matrix_{script_id}_{user_id}'
+        )
+    except Exception as e:
+        return error_response(message=f'提交失败: {str(e)}', code=500)
+
+    return success_response(data={
+        'message': '矩阵执行已提交，正在后台执行',
+        'task_id': task.id,
+        'script_id': script_id,
+        'matrix': matrix,
+        'cells': cells,
+    })
+
+
+@api_bp.route('/web-test/scripts/<int:script_id>/logs', methods=['GET'])
+@jwt_required()
+def get_script_logs(script_id):
+    """
+    实时查看脚本最近一次执行的输出
+
+    查询参数:
+        stream: stdout / stderr，默认 stdout
+        offset: 起始字节偏移（上次返回的 next_offset），不传时返回末尾部分
+        limit: 最多返回的字节数，默认 65536
+        cell: 矩阵执行的组合名（如 chromium-1280x720），查看该组合的输出
+    """
+    user_id = get_current_user_id()
+    script = WebTestScript.query.filter_by(id=script_id, user_id=user_id).first()
+    if not script:
+        return error_response(message='脚本不存在', code=404)
+
+    name = f'web_script_{script_id}'
+    cell = request.args.get('cell')
+    if cell:
+        if not CELL_PATTERN.match(cell):
+            return error_response(message='cell 不合法', code=400)
+        name = f'{name}/{cell}'
+    try:
+        data = read_stream(log_dir_for(current_app.config['LOG_CAPTURE'], name),
+                           request.args.get('stream', 'stdout'),
+                           request.args.get('offset'), request.args.get('limit'))
+    except ValueError as e:
+        return error_response(message=str(e), code=400)
+    data['running'] = script.status == 'running'
+    return success_response(data=data)
+
+
+# ==================== 执行记录与性能趋势 ====================
+
+@api_bp.route('/web-test/scripts/<int:script_id>/runs', methods=['GET'])
+@jwt_required()
+def get_script_runs(script_id):
+    """获取脚本的执行记录列表"""
+    user_id = get_current_user_id()
+    script = WebTestScript.query.filter_by(id=script_id, user_id=user_id).first()
+    if not script:
+        return error_response(message='脚本不存在', code=404)
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+
+    pagination = script.runs.order_by(WebTestRun.id.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    return paginate_response(
+        items=[r.to_dict() for r in pagination.items],
+        total=pagination.total,
+        page=page,
+        per_page=per_page
+    )
+
+
+@api_bp.route('/web-test/runs/<int:run_id>', methods=['GET'])
+@jwt_required()
+def get_web_run(run_id):
+    """获取执行记录详情（含各页面性能数据与预算超出项）"""
+    user_id = get_current_user_id()
+    web_run = WebTestRun.query.filter_by(id=run_id, user_id=user_id).first()
+    if not web_run:
+        return error_response(message='执行记录不存在', code=404)
+
+    return success_response(data=web_run.to_dict(include_details=True))
+
+
+@api_bp.route('/web-test/scripts/<int:script_id>/performance/trend', methods=['GET'])
+@jwt_required()
+def get_script_performance_trend(script_id):
+    """
+    获取脚本最近多次执行的前端性能趋势
+
+    查询参数:
+        limit: 最近执行次数，默认 WEB_VITALS_TREND_LIMIT，最大 200
+        browser: 浏览器，默认脚本配置的浏览器
+        viewport: 视口（宽x高），默认脚本配置的视口
+        include_matrix: 是否包含矩阵执行中对应组合的结果，默认 false
+    """
+    user_id = get_current_user_id()
+    script = WebTestScript.query.filter_by(id=script_id, user_id=user_id).first()
+    if not script:
+        return error_response(message='脚本不存在', code=404)
+
+    limit = request.args.get('limit', current_app.config['WEB_VITALS']['trend_limit'], type=int)
+    include_matrix = request.args.get('include_matrix', '').lower() in ('1', 'true')
+    trend = web_performance_trend(script_id, max(1, min(limit, 200)), request.args.get('browser') or None,
+                                  request.args.get('viewport') or None, include_matrix)
+    trend['budgets'] = ((script.config or {}).get('performance') or {}).get('budgets') or {}
+    return success_response(data=trend)
+
+
+# ==================== 执行产物 ====================
+
+@api_bp.route('/web-test/artifacts/<run_key>', methods=['GET'])
+@jwt_required()
+def list_artifacts(run_key):
+    """获取一次执行的产物清单"""
+    user_id = get_current_user_id()
+    try:
+        ref = get_artifact_store(current_app.config['WEB_ARTIFACTS']).load_ref(run_key)
+    except ValueError:
+        ref = None
+    if not ref or ref.get('user_id') != user_id:
+        return error_response(message='产物不存在', code=404)
+    return success_response(data=ref)
+
+
+@api_bp.route('/web-test/artifacts/<run_key>/<path:name>', methods=['GET'])
+@jwt_required()
+def download_artifact(run_key, name):
+    """
+    下载执行产物（流式传输，支持 Range 请求，视频可拖动播放）
+
+    查询参数:
+        download: 为 1 时以附件形式下载
+    """
+    user_id = get_current_user_id()
+    store = get_artifact_store(current_app.config['WEB_ARTIFACTS'])
+    try:
+        ref = store.load_ref(run_key)
+    except ValueError:
+        ref = None
+    artifact = None
+    if ref and ref.get('user_id') == user_id:
+        artifact = next((a for a in ref.get('artifacts', []) if a['name'] == name), None)
+    if not artifact:
+        return error_response(message='产物不存在', code=404)
+
+    try:
+        f = store.open(artifact)
+    except FileNotFoundError:
+        return error_response(message='产物已被清理', code=404)
+
+    response = current_app.response_class(
+        wrap_file(request.environ, f), mimetype=artifact['content_type'], direct_passthrough=True
+    )
+    response.content_length = artifact['size']
+    response.set_etag(artifact['sha256'])
+    response.cache_control.private = True
+    response.cache_control.max_age = 3600
+    if request.args.get('download') == '1':
+        response.headers.set('Content-Disposition', 'attachment', filename=os.path.basename(name))
+    return response.make_conditional(request.environ, accept_ranges=True, complete_length=artifact['size'])
+
+
+# ==================== 视觉回归基线 ====================
+
+def _baseline_store(script):
+    return BaselineStore(get_artifact_store(current_app.config['WEB_ARTIFACTS']), script.id, script.user_id)
+
+
+@api_bp.route('/web-test/scripts/<int:script_id>/visual/baselines', methods=['GET'])
+@jwt_required()
+def get_visual_baselines(script_id):
+    """获取脚本各步骤的视觉回归基线（基线图通过 /web-test/artifacts/<run_key>/<步骤名> 下载）"""
+    user_id = get_current_user_id()
+    script = WebTestScript.query.filter_by(id=script_id, user_id=user_id).first()
+    if not script:
+        return error_response(message='脚本不存在', code=404)
+
+    baselines = _baseline_store(script)
+    entries = baselines.load()
+    return success_response(data={
+        'run_key': baselines.run_key,
+        'baselines': [entries[step] for step in sorted(entries)],
+    })
+
+
+@api_bp.route('/web-test/scripts/<int:script_id>/visual/baselines', methods=['POST'])
+@jwt_required()
+def approve_visual_baselines(script_id):
+    """
+    把一次执行的截图设为新基线（直接引用已保存的产物，不复制文件）
+
+    请求体:
+        run_key: 执行记录的 artifact_run
+        steps: 要更新的步骤名列表，不传时更新该次执行的全部截图
+    """
+    user_id = get_current_user_id()
+    script = WebTestScript.query.filter_by(id=script_id, user_id=user_id).first()
+    if not script:
+        return error_response(message='脚本不存在', code=404)
+
+    data = request.get_json() or {}
+    error = validate_required(data, ['run_key'])
+    if error:
+        return error_response(message=error, code=400)
+    steps = data.get('steps')
+    if steps is not None and (not isinstance(steps, list) or not all(isinstance(s, str) for s in steps)):
+        return error_response(message='steps must be a list of step names', code=400)
+
+    baselines = _baseline_store(script)
+    try:
+        ref = baselines.store.load_ref(data['run_key'])
+    except ValueError:
+        ref = None
+    if not ref or ref.get('user_id') != user_id or ref.get('script_id') != script_id:
+        return error_response(message='执行产物不存在', code=404)
+
+    # 矩阵执行的截图按组合区分基线（步骤名以组合名为前缀）
+    prefix = f'{VISUAL_DIR}/'
+    step_prefix = f'{ref["cell"]}/' if ref.get('cell') else ''
+    screenshots = {step_prefix + a['name'][len(prefix):-len('.png')]: a for a in ref.get('artifacts', [])
+                   if a['name'].startswith(prefix) and a['name'].endswith('.png')}
+    missing = [s for s in (steps or []) if s not in screenshots]
+    if missing:
+        return error_response(message=f'该次执行没有步骤截图: {", ".join(missing)}', code=400)
+    if not screenshots:
+        return error_response(message='该次执行没有保存视觉对比截图', code=400)
+
+    # 尺寸与感知哈希取自执行记录中的对比结果（没有时对比时重新计算）
+    web_run = WebTestRun.query.filter_by(script_id=script_id, artifact_run=data['run_key']).first()
+    checked = {s['step']: s for s in ((web_run.visual or {}).get('steps', []) if web_run else [])}
+    changes = {}
+    for step in steps or sorted(screenshots):
+        artifact = screenshots[step]
+        result = checked.get(step, {})
+        changes[step] = {
+            **{k: artifact[k] for k in ('sha256', 'size', 'stored_size', 'compressed')},
+            'width': result.get('width'),
+            'height': result.get('height'),
+            'phash': result.get('phash'),
+            'source_run': data['run_key'],
+        }
+    entries = baselines.update(changes)
+    return success_response(data={
+        'run_key': baselines.run_key,
+        'updated': sorted(changes),
+        'baselines': [entries[step] for step in sorted(entries)],
+    }, message='基线已更新')
+
+
+@api_bp.route('/web-test/scripts/<int:script_id>/visual/baselines/<path:step>', methods=['DELETE'])
+@jwt_required()
+def delete_visual_baseline(script_id, step):
+    """删除步骤的基线（下次执行时以新截图作为基线）"""
+    user_id = get_current_user_id()
+    script = WebTestScript.query.filter_by(id=script_id, user_id=user_id).first()
+    if not script:
+        return error_response(message='脚本不存在', code=404)
+
+    baselines = _baseline_store(script)
+    if step not in baselines.load():
+        return error_response(message='基线不存在', code=404)
+    baselines.update({step: None})
+    return success_response(message='删除成功')
+
+
+# ==================== 测试套件 ====================
+
+def _int_in_range(value, default, maximum, field):
+    """解析 1..maximum 之间的整数参数，返回 (值, 错误信息)"""
+    if value is None:
+        return default, None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None, f'{field} 必须是整数'
+    if not 1 <= value <= maximum:
+        return None, f'{field} 必须在 1 到 {maximum} 之间'
+    return value, None
+
+
+@api_bp.route('/web-test/suites/run', methods=['POST'])
+@jwt_required()
+def run_suite():
+    """
+    并行执行项目下的一组 Web 测试脚本，生成一条 TestRun 与 TestReport
+
+    请求体:
+        project_id: 项目 ID（必填）
+        tags: 只执行包含任一标签的脚本
+        script_ids: 只执行这些脚本
+        slots: 每个分片内并发的浏览器槽位数
+        shards: 分片数（每个分片一个 Celery 任务，可分布到多个 Worker）
+        name: 套件名称
+    """
+    user_id = get_current_user_id()
+    data = request.get_json(silent=True) or {}
+
+    error = validate_required(data, ['project_id'])
+    if error:
+        return error_response(400, error)
+    project = Project.query.filter_by(id=data['project_id'], owner_id=user_id).first()
+    if not project:
+        return error_response(message='项目不存在', code=404)
+
+    settings = current_app.config['WEB_SUITE']
+    slots, error = _int_in_range(data.get('slots'), settings['default_slots'], settings['max_slots'], 'slots')
+    if error:
+        return error_response(400, error)
+    shards, error = _int_in_range(data.get('shards'), settings['default_shards'], settings['max_shards'], 'shards')
+    if error:
+        return error_response(400, error)
+
+    tags = data.get('tags') or []
+    script_ids = data.get('script_ids') or []
+    if not isinstance(tags, list) or not isinstance(script_ids, list):
+        return error_response(400, 'tags 和 script_ids 必须是数组')
+
+    query = WebTestScript.query.filter_by(user_id=user_id, project_id=project.id, is_enabled=True)
+    if script_ids:
+        query = query.filter(WebTestScript.id.in_(script_ids))
+    scripts = query.order_by(WebTestScript.sort_order, WebTestScript.id).all()
+    if tags:
+        scripts = [s for s in scripts if set(s.tags or []) & set(tags)]
+    if not scripts:
+        return error_response(400, '没有符合条件的脚本')
+
+    name = data.get('name') or (f'{project.name} [{", ".join(tags)}]' if tags else project.name)
+    suite = {'name': name, 'tags': tags, 'slots': slots, 'shards': min(shards, len(scripts)),
+             'script_ids': [s.id for s in scripts]}
+    test_run = TestRun(
+        project_id=project.id,
+        test_type='web',
+        test_object_name=name,
+        status='running',
+        total_cases=len(scripts),
+        started_at=datetime.utcnow(),
+        triggered_by='manual',
+        triggered_user_id=user_id,
+        results=[]
+    )
+    db.session.add(test_run)
+    db.session.commit()
+
+    try:
+        task = dispatch_web_suite(test_run.id, suite['script_ids'], slots, shards, suite)
+    except Exception as e:
+        test_run.status = 'failed'
+        test_run.finished_at = datetime.utcnow()
+        test_run.error_message = f'提交失败: {str(e)}'
+        db.session.commit()
+        return error_response(500, f'提交失败: {str(e)}')
+
+    return success_response(data={
+        'message': '套件已提交，正在后台执行',
+        'task_id': task.id,
+        'test_run_id': test_run.id,
+        'suite': suite
+    })
+
+
 @api_bp.route('/web-test/record/start', methods=['POST'])
 @jwt_required()
 def start_recording():
@@ -1,10 +1,18 @@
 """
 Celery 应用配置
 
-初始化 Celery 应用，配置任务队列
+初始化 Celery 应用，配置任务队列；
+init_celery() 集成的 Flask 应用即 Worker 进程共享的应用实例（及其数据库连接池），
+prefork 子进程启动时丢弃从父进程继承的连接
 """
 
+import os
+import threading
+import time
+from datetime import datetime
+
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.config import config
 
 
@@ -58,6 +66,8 @@ def init_celery(celery_app, app):
         enable_utc=True,
     )
 
+    _register_worker_app(app)
+
     class ContextTask(celery_app.Task):
         """带有 Flask 应用上下文的任务基类"""
         def __call__(self, *args, **kwargs):
@@ -66,3 +76,120 @@ def init_celery(celery_app, app):
 
     celery_app.Task = ContextTask
     return celery_app
+
+
+# ==================== Worker 进程共享的 Flask 应用 ====================
+
+# 可重入：get_worker_app() 中的 create_app() 会调用 init_celery() 登记应用
+_worker_lock = threading.RLock()
+_worker_state = {
+    'app': None,
+    'pid': None,
+    'created_at': None,
+    'startup_ms': None,
+    'forks': 0,
+    'requests': 0,
+}
+
+
+def _engines(app):
+    from app.extensions import db
+    with app.app_context():
+        return list(db.engines.values())
+
+
+def _dispose_inherited_engines(app):
+    """fork 后丢弃从父进程继承的连接（close=False：不关闭父进程仍在使用的 socket）"""
+    for engine in _engines(app):
+        engine.dispose(close=False)
+
+
+def _register_worker_app(app, startup_ms=None):
+    """登记 Worker 进程共享的 Flask 应用（任务基类 ContextTask 使用的同一个应用）"""
+    with _worker_lock:
+        _worker_state.update(app=app, pid=os.getpid(), created_at=datetime.utcnow(), startup_ms=startup_ms)
+
+
+def get_worker_app():
+    """
+    获取当前 Worker 进程共享的 Flask 应用
+
+    即 init_celery() 集成的应用，任务、ContextTask 与监控线程复用同一个应用与连接池；
+    尚未集成时（如 Celery 未启用）执行一次 create_app()。
+    检测到进程号变化（fork 出的子进程）时，复用应用对象但丢弃继承的连接池。
+
+    Returns:
+        Flask: 应用实例
+    """
+    pid = os.getpid()
+    with _worker_lock:
+        _worker_state['requests'] += 1
+        app = _worker_state['app']
+        if app is not None and _worker_state['pid'] != pid:
+            _dispose_inherited_engines(app)
+            _worker_state['pid'] = pid
+            _worker_state['forks'] += 1
+        if app is None:
+            from app import create_app
+            started = time.perf_counter()
+            app = create_app()
+            _register_worker_app(app, round((time.perf_counter() - started) * 1000, 2))
+        return app
+
+
+def worker_stats():
+    """当前进程的共享应用、连接池、浏览器池与预加载执行器状态"""
+    from app.utils.browser_pool import browser_pool_stats
+    from app.utils.fork_runner import fork_runner_stats
+
+    app = _worker_state['app']
+    stats = {
+        'pid': os.getpid(),
+        'initialized': app is not None,
+        'created_at': _worker_state['created_at'].isoformat() + 'Z' if _worker_state['created_at'] else None,
+        'startup_ms': _worker_state['startup_ms'],
+        'forks': _worker_state['forks'],
+        'app_requests': _worker_state['requests'],
+        'pools': [],
+        'browser_pool': browser_pool_stats(),
+        'fork_runner': fork_runner_stats(),
+    }
+    if app is None or _worker_state['pid'] != os.getpid():
+        return stats
+
+    for engine in _engines(app):
+        pool = engine.pool
+        stats['pools'].append({
+            'url': engine.url.render_as_string(hide_password=True),
+            'pool_class': type(pool).__name__,
+            'size': pool.size() if hasattr(pool, 'size') else None,
+            'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+            'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+            'status': pool.status(),
+        })
+    return stats
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**kwargs):
+    """prefork 子进程启动时丢弃继承的连接池，确保每个进程使用独立的连接；按配置预热浏览器池与预加载执行器"""
+    app = get_worker_app()
+    settings = app.config.get('WEB_BROWSER_POOL') or {}
+    if settings.get('enabled') and settings.get('prewarm'):
+        from app.utils.browser_pool import get_browser_pool
+        for error in get_browser_pool(settings).prewarm(settings['prewarm']):
+            app.logger.warning(f'浏览器池预热失败: {error}')
+    settings = app.config.get('FORK_RUNNER') or {}
+    if settings.get('enabled') and settings.get('prewarm'):
+        from app.utils.fork_runner import get_fork_runner
+        for error in get_fork_runner(settings).prewarm(settings['prewarm']):
+            app.logger.warning(f'预加载执行器预热失败: {error}')
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(**kwargs):
+    """Worker 子进程退出时关闭其常驻的浏览器服务与预加载服务"""
+    from app.utils.browser_pool import shutdown_browser_pool
+    from app.utils.fork_runner import shutdown_fork_runner
+    shutdown_browser_pool()
+    shutdown_fork_runner()
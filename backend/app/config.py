@@ -5,6 +5,7 @@
 """
 
 import os
+import tempfile
 from datetime import timedelta
 
 
@@ -25,6 +26,7 @@ class BaseConfig:
 
     # 文件上传配置
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    PERF_HAR_MAX_SIZE = int(os.environ.get('PERF_HAR_MAX_SIZE', 512 * 1024 * 1024))  # HAR 导入（流式请求体）
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
 
     # 报告存储路径
@@ -38,6 +40,131 @@ class BaseConfig:
         'max_spawn_rate': int(os.environ.get('PERF_TEST_MAX_SPAWN_RATE', '50')),
         'min_duration': int(os.environ.get('PERF_TEST_MIN_DURATION', '10')),
         'max_duration': int(os.environ.get('PERF_TEST_MAX_DURATION', '3600')),
+        'max_processes': int(os.environ.get('PERF_TEST_MAX_PROCESSES', '4')),
+        'max_rps': int(os.environ.get('PERF_TEST_MAX_RPS', '20000')),
+    }
+
+    # 性能回归对比默认容差（P95/吞吐量为相对变化 %，错误率为绝对百分点）
+    PERF_REGRESSION_TOLERANCES = {
+        'p95_pct': float(os.environ.get('PERF_REGRESSION_P95_PCT', '10')),
+        'rps_pct': float(os.environ.get('PERF_REGRESSION_RPS_PCT', '10')),
+        'error_rate_abs': float(os.environ.get('PERF_REGRESSION_ERROR_RATE_ABS', '1')),
+    }
+
+    # 压测机资源监控：压测进程 CPU 连续 cpu_warn_samples 个采样点达到 cpu_warn_pct 时结果标记为不可信
+    PERF_GENERATOR_MONITOR = {
+        'interval': float(os.environ.get('PERF_GENERATOR_SAMPLE_INTERVAL', '1')),
+        'cpu_warn_pct': float(os.environ.get('PERF_GENERATOR_CPU_WARN_PCT', '90')),
+        'cpu_warn_samples': int(os.environ.get('PERF_GENERATOR_CPU_WARN_SAMPLES', '3')),
+    }
+
+    # 压测进程 CPU 隔离：enabled 时所有压测默认绑核，否则仅对配置了 config.cpu 的场景生效
+    # reserved_cores 为留给 Flask / Celery Worker 的核（如 "0" 或 "0-1"），不参与分配
+    PERF_CPU_ISOLATION = {
+        'enabled': os.environ.get('PERF_CPU_PINNING', 'false').lower() == 'true',
+        'reserved_cores': os.environ.get('PERF_RESERVED_CORES', '0'),
+        'state_file': os.environ.get('PERF_CPU_STATE_FILE',
+                                     os.path.join(tempfile.gettempdir(), 'easytest_cpu_reservations.json')),
+        'cgroup_parent': os.environ.get('PERF_CGROUP_PARENT', 'easytest'),
+    }
+
+    # Web 测试浏览器池：每个 Worker 进程常驻 Playwright 浏览器服务，脚本连接已启动的浏览器而不是每次冷启动
+    # 浏览器服务累计创建 max_contexts 个上下文后回收重启；prewarm 为 Worker 进程启动时预热的浏览器（如 "chromium"）
+    WEB_BROWSER_POOL = {
+        'enabled': os.environ.get('WEB_BROWSER_POOL', 'true').lower() == 'true',
+        'servers_per_browser': int(os.environ.get('WEB_BROWSER_POOL_SIZE', '1')),
+        'max_contexts': int(os.environ.get('WEB_BROWSER_MAX_CONTEXTS', '50')),
+        'launch_timeout': float(os.environ.get('WEB_BROWSER_LAUNCH_TIMEOUT', '30')),
+        'connect_timeout': float(os.environ.get('WEB_BROWSER_CONNECT_TIMEOUT', '10')),
+        'prewarm': [b.strip() for b in os.environ.get('WEB_BROWSER_PREWARM', '').split(',') if b.strip()],
+    }
+
+    # 脚本预加载执行：每个 Worker 进程常驻预加载了 Playwright / Locust 的 Python 进程，执行时 fork 子进程运行脚本，
+    # 省去启动解释器与导入模块的时间；不可用时回退为直接启动子进程
+    # rlimits 为脚本进程的资源限制（nofile 文件描述符数、as 地址空间字节数、core 转储大小）；prewarm 如 "web,locust"
+    FORK_RUNNER = {
+        'enabled': os.environ.get('FORK_RUNNER', 'true').lower() == 'true',
+        'profiles': {
+            'web': ['playwright.sync_api', 'playwright.async_api'],
+            'locust': ['locust', 'locust.main'],
+            'asyncio': ['asyncio', 'ssl', 'multiprocessing', 'concurrent.futures'],
+        },
+        'start_timeout': float(os.environ.get('FORK_RUNNER_START_TIMEOUT', '60')),
+        'rlimits': {k: int(v) for k, v in {
+            'core': os.environ.get('FORK_RUNNER_MAX_CORE_SIZE', '0'),
+            'nofile': os.environ.get('FORK_RUNNER_MAX_OPEN_FILES'),
+            'as': os.environ.get('FORK_RUNNER_MAX_MEMORY'),
+        }.items() if v},
+        'prewarm': [p.strip() for p in os.environ.get('FORK_RUNNER_PREWARM', '').split(',') if p.strip()],
+    }
+
+    # 子进程输出捕获：执行结果只保存开头 head_bytes 与末尾 tail_bytes，完整输出写入日志文件（供实时查看）
+    LOG_CAPTURE = {
+        'folder': os.environ.get('LOG_CAPTURE_FOLDER', os.path.join(REPORT_FOLDER, 'logs')),
+        'head_bytes': int(os.environ.get('LOG_CAPTURE_HEAD_BYTES', 16 * 1024)),
+        'tail_bytes': int(os.environ.get('LOG_CAPTURE_TAIL_BYTES', 64 * 1024)),
+        'spill_max_bytes': int(os.environ.get('LOG_CAPTURE_MAX_FILE_SIZE', 50 * 1024 * 1024)),
+        'retention_days': float(os.environ.get('LOG_CAPTURE_RETENTION_DAYS', '14')),
+    }
+
+    # Web 测试产物（截图、Trace、视频、HAR）：按内容寻址存储，文本类产物 gzip 压缩，超过 retention_days 天由清理任务删除
+    WEB_ARTIFACTS = {
+        'folder': os.environ.get('WEB_ARTIFACT_FOLDER', os.path.join(REPORT_FOLDER, 'artifacts')),
+        'compress': os.environ.get('WEB_ARTIFACT_COMPRESS', 'true').lower() == 'true',
+        'retention_days': float(os.environ.get('WEB_ARTIFACT_RETENTION_DAYS', '14')),
+        'max_file_size': int(os.environ.get('WEB_ARTIFACT_MAX_FILE_SIZE', 200 * 1024 * 1024)),
+        'max_files': int(os.environ.get('WEB_ARTIFACT_MAX_FILES', '200')),
+    }
+
+    # Web 测试网络缓存：脚本 config.network 中 cache_urls / cache_resource_types 命中的响应保存在本机，
+    # 后续执行直接从缓存应答；超过 retention_days 天未使用的缓存由清理任务删除
+    WEB_NETWORK_CACHE = {
+        'folder': os.environ.get('WEB_NETWORK_CACHE_FOLDER', os.path.join(REPORT_FOLDER, 'network_cache')),
+        'max_entry_bytes': int(os.environ.get('WEB_NETWORK_CACHE_MAX_ENTRY_SIZE', 10 * 1024 * 1024)),
+        'retention_days': float(os.environ.get('WEB_NETWORK_CACHE_RETENTION_DAYS', '7')),
+    }
+
+    # Web 测试前端性能采集：记录每个页面导航的 Navigation Timing 与 Web Vitals（脚本可通过 config.performance.enabled 覆盖）
+    # max_pages 为单次执行最多记录的页面数，trend_limit 为报告中计算趋势使用的最近执行次数
+    WEB_VITALS = {
+        'enabled': os.environ.get('WEB_VITALS', 'true').lower() == 'true',
+        'max_pages': int(os.environ.get('WEB_VITALS_MAX_PAGES', '50')),
+        'trend_limit': int(os.environ.get('WEB_VITALS_TREND_LIMIT', '20')),
+    }
+
+    # Web 测试视觉回归：脚本保存到 visual/ 下的截图与基线逐像素对比（阈值等在脚本 config.visual 中配置）
+    # max_pixels 为单张截图的像素上限，max_steps 为单次执行最多对比的截图数
+    WEB_VISUAL = {
+        'enabled': os.environ.get('WEB_VISUAL', 'true').lower() == 'true',
+        'max_pixels': int(os.environ.get('WEB_VISUAL_MAX_PIXELS', 25_000_000)),
+        'max_steps': int(os.environ.get('WEB_VISUAL_MAX_STEPS', '50')),
+    }
+
+    # Web 测试失败重试：脚本执行失败或超时时最多重试 retries 次（脚本可通过 config.retry 覆盖，不超过 max_retries），
+    # 首次执行不开启诊断，重试时开启 Playwright Trace（trace）与录屏（video）；
+    # 开启诊断的执行超时时先发送 SIGTERM，等待 terminate_grace 秒保存 Trace 与录屏后再强制结束
+    WEB_RETRY = {
+        'retries': int(os.environ.get('WEB_RETRY_COUNT', '1')),
+        'max_retries': int(os.environ.get('WEB_RETRY_MAX', '3')),
+        'trace': os.environ.get('WEB_RETRY_TRACE', 'true').lower() == 'true',
+        'video': os.environ.get('WEB_RETRY_VIDEO', 'true').lower() == 'true',
+        'terminate_grace': float(os.environ.get('WEB_RETRY_TERMINATE_GRACE', '10')),
+    }
+
+    # Web 测试矩阵执行：一个脚本按「浏览器 × 视口」组合并行执行，max_cells 为组合数上限，slots 为并发执行的组合数
+    WEB_MATRIX = {
+        'max_cells': int(os.environ.get('WEB_MATRIX_MAX_CELLS', '12')),
+        'default_slots': int(os.environ.get('WEB_MATRIX_SLOTS', '3')),
+        'max_slots': int(os.environ.get('WEB_MATRIX_MAX_SLOTS', '8')),
+    }
+
+    # Web 测试套件：slots 为每个分片（Celery 任务）内并发执行的浏览器槽位数，shards 为分片数
+    WEB_SUITE = {
+        'default_slots': int(os.environ.get('WEB_SUITE_SLOTS', '2')),
+        'max_slots': int(os.environ.get('WEB_SUITE_MAX_SLOTS', '8')),
+        'default_shards': int(os.environ.get('WEB_SUITE_SHARDS', '1')),
+        'max_shards': int(os.environ.get('WEB_SUITE_MAX_SHARDS', '8')),
+        'output_limit': int(os.environ.get('WEB_SUITE_OUTPUT_LIMIT', '4000')),  # 报告中保留的输出末尾字符数
     }
 
     # Celery 配置（可选，如果Redis不可用则不使用异步任务）
@@ -7,7 +7,9 @@ from .project import Project
 from .environment import Environment
 from .api_test_case import ApiTestCase, ApiTestCollection
 from .web_test_script import WebTestScript
+from .web_test_run import WebTestRun
 from .perf_test_scenario import PerfTestScenario
+from .perf_test_run import PerfTestRun
 from .test_run import TestRun
 from .test_document import TestDocument
 from .test_report import TestReport
@@ -19,7 +21,9 @@ __all__ = [
     'ApiTestCase',
     'ApiTestCollection',
     'WebTestScript',
+    'WebTestRun',
     'PerfTestScenario',
+    'PerfTestRun',
     'TestRun',
     'TestDocument',
     'TestReport'
@@ -0,0 +1,94 @@
+"""
+性能测试执行记录模型
+
+每次执行性能测试场景都会生成一条记录，保存配置、汇总指标和各接口统计
+"""
+
+from datetime import datetime
+from ..extensions import db
+
+
+class PerfTestRun(db.Model):
+    """性能测试执行记录表"""
+
+    __tablename__ = 'perf_test_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scenario_id = db.Column(db.Integer, db.ForeignKey('perf_test_scenarios.id'), nullable=False, comment='场景 ID')
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True, comment='项目 ID')
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, comment='用户 ID')
+    test_run_id = db.Column(db.Integer, db.ForeignKey('test_runs.id'), nullable=True, comment='关联的测试执行记录 ID')
+
+    # 执行状态
+    status = db.Column(db.String(20), default='running', comment='状态: running/completed/failed/stopped')
+    config = db.Column(db.JSON, default=dict, comment='执行配置（用户数、生成速率、持续时间等）')
+
+    # 汇总指标
+    request_count = db.Column(db.Integer, default=0, comment='总请求数')
+    failure_count = db.Column(db.Integer, default=0, comment='失败请求数')
+    error_rate = db.Column(db.Float, comment='错误率 (%)')
+    avg_response_time = db.Column(db.Float, comment='平均响应时间 (ms)')
+    min_response_time = db.Column(db.Float, comment='最小响应时间 (ms)')
+    max_response_time = db.Column(db.Float, comment='最大响应时间 (ms)')
+    p50_response_time = db.Column(db.Float, comment='P50 响应时间 (ms)')
+    p90_response_time = db.Column(db.Float, comment='P90 响应时间 (ms)')
+    p95_response_time = db.Column(db.Float, comment='P95 响应时间 (ms)')
+    p99_response_time = db.Column(db.Float, comment='P99 响应时间 (ms)')
+    throughput = db.Column(db.Float, comment='吞吐量 (req/s)')
+
+    # 详细数据
+    endpoint_stats = db.Column(db.JSON, default=list, comment='各接口统计')
+    result = db.Column(db.JSON, comment='执行结果详情（历史曲线、输出等）')
+    error_message = db.Column(db.Text, comment='错误信息')
+
+    # 基线标记
+    is_baseline = db.Column(db.Boolean, default=False, comment='是否为对比基线')
+
+    # 执行时间
+    started_at = db.Column(db.DateTime, comment='开始时间')
+    finished_at = db.Column(db.DateTime, comment='结束时间')
+    duration = db.Column(db.Float, comment='执行耗时(秒)')
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+
+    def metrics_dict(self):
+        """汇总指标（用于回归对比）"""
+        return {
+            'request_count': self.request_count or 0,
+            'failure_count': self.failure_count or 0,
+            'error_rate': self.error_rate or 0,
+            'avg_response_time': self.avg_response_time or 0,
+            'min_response_time': self.min_response_time or 0,
+            'max_response_time': self.max_response_time or 0,
+            'p50_response_time': self.p50_response_time or 0,
+            'p90_response_time': self.p90_response_time or 0,
+            'p95_response_time': self.p95_response_time or 0,
+            'p99_response_time': self.p99_response_time or 0,
+            'throughput': self.throughput or 0,
+        }
+
+    def to_dict(self, include_details=False):
+        """转换为字典"""
+        data = {
+            'id': self.id,
+            'scenario_id': self.scenario_id,
+            'project_id': self.project_id,
+            'user_id': self.user_id,
+            'test_run_id': self.test_run_id,
+            'status': self.status,
+            'config': self.config,
+            'metrics': self.metrics_dict(),
+            'endpoint_stats': self.endpoint_stats,
+            'error_message': self.error_message,
+            'is_baseline': self.is_baseline,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration': self.duration,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+        if include_details:
+            data['result'] = self.result
+        return data
+
+    def __repr__(self):
+        return f'<PerfTestRun {self.id} scenario={self.scenario_id} {self.status}>'
@@ -37,6 +37,10 @@ class PerfTestScenario(db.Model):
     step_users = db.Column(db.Integer, default=10, comment='每步增加用户数')
     step_duration = db.Column(db.Integer, default=30, comment='每步持续时间')
     
+    # 扩展配置（负载模型等）
+    config = db.Column(db.JSON, default=dict, comment='其他配置')
+    data_feeders = db.Column(db.JSON, default=list, comment='压测数据文件')
+    
     # 状态信息
     status = db.Column(db.String(20), default='pending', comment='当前状态: pending/running/completed/failed/stopped')
     last_run_at = db.Column(db.DateTime, comment='最后运行时间')
@@ -55,6 +59,9 @@ class PerfTestScenario(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    # 执行记录关联
+    runs = db.relationship('PerfTestRun', backref='scenario', lazy='dynamic', cascade='all, delete-orphan')
     
     def to_dict(self):
         """转换为字典"""
@@ -76,6 +83,8 @@ class PerfTestScenario(db.Model):
             'step_load_enabled': self.step_load_enabled,
             'step_users': self.step_users,
             'step_duration': self.step_duration,
+            'config': self.config,
+            'data_feeders': self.data_feeders or [],
             'status': self.status,
             'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
             'last_result': self.last_result,
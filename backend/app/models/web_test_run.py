@@ -0,0 +1,76 @@
+"""
+Web 测试执行记录模型
+
+每次执行 Web 测试脚本（单独执行或作为套件的一部分）都会生成一条记录，
+保存执行状态、前端性能指标与视觉回归结果（矩阵执行的各组合汇总为一条记录），用于查看同一脚本多次执行的性能趋势
+"""
+
+from datetime import datetime
+from ..extensions import db
+
+
+class WebTestRun(db.Model):
+    """Web 测试执行记录表"""
+
+    __tablename__ = 'web_test_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    script_id = db.Column(db.Integer, db.ForeignKey('web_test_scripts.id'), nullable=False, comment='脚本 ID')
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True, comment='项目 ID')
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, comment='用户 ID')
+    test_run_id = db.Column(db.Integer, db.ForeignKey('test_runs.id'), nullable=True, comment='所属套件的测试执行记录 ID')
+
+    # 执行状态
+    status = db.Column(db.String(20), comment='状态: success/flaky（重试后通过）/failed/timeout/error')
+    browser = db.Column(db.String(20), comment='浏览器')
+    viewport = db.Column(db.String(20), comment='视口（宽x高）')
+    duration = db.Column(db.Float, comment='执行耗时(秒)')
+    error_message = db.Column(db.Text, comment='错误信息')
+
+    # 前端性能
+    metrics = db.Column(db.JSON, comment='各性能指标在所有页面中的最差值')
+    performance = db.Column(db.JSON, comment='各页面性能数据、预算与超出项')
+    artifact_run = db.Column(db.String(100), comment='产物标识')
+
+    # 视觉回归
+    visual = db.Column(db.JSON, comment='视觉回归各步骤的对比结果')
+
+    # 失败重试
+    retry = db.Column(db.JSON, comment='失败重试的各次执行与重试耗时')
+
+    # 矩阵执行（浏览器 × 视口）
+    matrix = db.Column(db.JSON, comment='矩阵执行的浏览器、视口与各组合结果')
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
+
+    def to_dict(self, include_details=False):
+        """转换为字典"""
+        data = {
+            'id': self.id,
+            'script_id': self.script_id,
+            'project_id': self.project_id,
+            'user_id': self.user_id,
+            'test_run_id': self.test_run_id,
+            'status': self.status,
+            'browser': self.browser,
+            'viewport': self.viewport,
+            'duration': self.duration,
+            'error_message': self.error_message,
+            'metrics': self.metrics,
+            'budget_violations': len((self.performance or {}).get('violations') or []),
+            'visual_failures': (self.visual or {}).get('failed', 0) + (self.visual or {}).get('errors', 0),
+            'artifact_run': self.artifact_run,
+            'matrix_cells': len((self.matrix or {}).get('cells') or []),
+            'attempts': (self.retry or {}).get('attempts', 1),
+            'retry_time': (self.retry or {}).get('retry_time', 0),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+        if include_details:
+            data['performance'] = self.performance
+            data['visual'] = self.visual
+            data['matrix'] = self.matrix
+            data['retry'] = self.retry
+        return data
+
+    def __repr__(self):
+        return f'<WebTestRun {self.id} script={self.script_id} {self.status}>'
@@ -47,6 +47,9 @@ class WebTestScript(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow, comment='创建时间')
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    # 执行记录关联
+    runs = db.relationship('WebTestRun', backref='script', lazy='dynamic', cascade='all, delete-orphan')
     
     def to_dict(self):
         """转换为字典"""
@@ -4,9 +4,28 @@ Celery 异步任务模块
 包含 Web 测试、性能测试等异步任务
 """
 
+from flask import current_app
 from app.extensions import celery, db
 from app.models.web_test_script import WebTestScript
+from app.models.web_test_run import WebTestRun
 from app.models.perf_test_scenario import PerfTestScenario
+from app.models.perf_test_run import PerfTestRun
+from app.models.test_run import TestRun
+from app.models.test_report import TestReport
+from app.utils.latency_histogram import LatencyHistogram, WindowedHistogram
+from app.utils.load_shapes import (
+    resolve_load_shape, build_stages, render_shape_class, active_stage, summarize_stages
+)
+from app.utils.open_workload import summarize as summarize_open_workload
+from app.utils.perf_thresholds import ThresholdMonitor, ABORTED_STATUS
+from app.utils.host_monitor import HostMonitor
+from app.utils.cpu_affinity import prepare_isolation
+from app.utils.fork_runner import get_fork_runner
+from app.utils.raw_samples import run_samples_dir, describe_samples
+from app.utils.log_capture import OutputCapture, log_dir_for
+from app.utils.network_profile import cache_folder, resolve_network_config
+from app.utils.web_vitals import build_performance, describe_violations, trend_stats
+from app.utils.web_retry import DIAGNOSTICS_DIR, resolve_retry_policy, should_retry, summarize_attempts
 import subprocess
 import tempfile
 import sys
@@ -15,35 +34,67 @@ import os
 import json
 import threading
 import queue
+import shutil
+import csv
+import glob
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 def _get_flask_app():
-    """延迟获取 Flask 应用实例，避免循环导入"""
-    from app import create_app
-    return create_app()
+    """获取当前 Worker 进程共享的 Flask 应用实例（延迟导入，避免循环导入）"""
+    from app.celery_app import get_worker_app
+    return get_worker_app()
 
 
 class RealtimeStatsCollector:
-    """实时统计数据收集器"""
+    """
+    实时统计数据收集器
+
+    基于对数分桶直方图，记录为 O(1)、内存固定；
+    同时提供累计视图和最近 window_seconds 秒的窗口视图。
+    """
 
-    def __init__(self):
+    def __init__(self, window_seconds=10):
         self.request_count = 0
         self.failure_count = 0
-        self.response_times = []
+        self.histogram = LatencyHistogram()
+        self.window = WindowedHistogram(window_seconds=window_seconds)
         self.lock = threading.Lock()
-        self.last_update = time.time()
+        self.start_time = time.time()
 
     def record_request(self, response_time, success=True):
-        """记录请求数据"""
+        """记录请求数据（响应时间单位：ms）"""
         with self.lock:
             self.request_count += 1
             if not success:
                 self.failure_count += 1
-            self.response_times.append(response_time)
+            self.histogram.record(response_time)
+            self.window.record(response_time, success)
+
+    def merge_serialized(self, data):
+        """合并其他进程上报的序列化数据（to_serialized 的结构）"""
+        if not data:
+            return
+        with self.lock:
+            self.request_count += int(data.get('request_count') or 0)
+            self.failure_count += int(data.get('failure_count') or 0)
+            if data.get('histogram'):
+                self.histogram.merge(LatencyHistogram.from_dict(data['histogram']))
+
+    def to_serialized(self):
+        """导出可合并的序列化数据"""
+        with self.lock:
+            return {
+                'request_count': self.request_count,
+                'failure_count': self.failure_count,
+                'histogram': self.histogram.to_dict(),
+            }
 
     def get_stats(self):
-        """获取当前统计数据"""
+        """获取当前统计数据（累计视图 + 窗口视图）"""
         with self.lock:
             if self.request_count == 0:
                 return {
@@ -53,28 +104,365 @@ class RealtimeStatsCollector:
                     'avg_response_time': 0,
                     'min_response_time': 0,
                     'max_response_time': 0,
-                    'throughput': 0
+                    'throughput': 0,
+                    'percentiles': self.histogram.percentiles(),
+                    'window': None
                 }
 
-            avg_response_time = sum(self.response_times) / len(self.response_times)
-            min_response_time = min(self.response_times)
-            max_response_time = max(self.response_times)
             error_rate = (self.failure_count / self.request_count) * 100
 
             # 计算吞吐量（请求/秒）
-            elapsed = time.time() - self.last_update
+            elapsed = time.time() - self.start_time
             throughput = self.request_count / elapsed if elapsed > 0 else 0
 
+            window_hist, window_failures = self.window.snapshot()
+            window_seconds = min(self.window.window_seconds, max(elapsed, 1))
+
             return {
                 'request_count': self.request_count,
                 'failure_count': self.failure_count,
                 'error_rate': error_rate,
-                'avg_response_time': avg_response_time,
-                'min_response_time': min_response_time,
-                'max_response_time': max_response_time,
-                'throughput': throughput
+                'avg_response_time': self.histogram.mean,
+                'min_response_time': self.histogram.min,
+                'max_response_time': self.histogram.max,
+                'throughput': throughput,
+                'percentiles': self.histogram.percentiles(),
+                'window': {
+                    'seconds': self.window.window_seconds,
+                    'request_count': window_hist.count,
+                    'failure_count': window_failures,
+                    'error_rate': (window_failures / window_hist.count * 100) if window_hist.count else 0,
+                    'throughput': window_hist.count / window_seconds,
+                    **window_hist.summary()
+                }
+            }
+
+
+def _web_script_spec(script):
+    """提取执行脚本所需的字段（执行线程中不访问数据库会话）"""
+    return {
+        'id': script.id,
+        'user_id': script.user_id,
+        'name': script.name,
+        'script_content': script.script_content,
+        'browser': script.browser or 'chromium',
+        'headless': script.headless if script.headless is not None else True,
+        'timeout': script.timeout or 30000,
+        'viewport_width': script.viewport_width or 1280,
+        'viewport_height': script.viewport_height or 720,
+        'network': resolve_network_config((script.config or {}).get('network')),
+        'performance': (script.config or {}).get('performance') or {},
+        'visual': (script.config or {}).get('visual') or {},
+        'retry': resolve_retry_policy((script.config or {}).get('retry'), current_app.config['WEB_RETRY']),
+    }
+
+
+def _web_run_settings():
+    """执行 Web 脚本所需的配置（执行线程中没有应用上下文）"""
+    return {
+        'pool': current_app.config['WEB_BROWSER_POOL'],
+        'artifacts': current_app.config['WEB_ARTIFACTS'],
+        'logs': current_app.config['LOG_CAPTURE'],
+        'network_cache': current_app.config['WEB_NETWORK_CACHE'],
+        'vitals': current_app.config['WEB_VITALS'],
+        'visual': current_app.config['WEB_VISUAL'],
+        'fork': current_app.config['FORK_RUNNER'],
+        'retry': current_app.config['WEB_RETRY'],
+    }
+
+
+def _web_log_name(spec):
+    """输出日志目录名：矩阵执行的各组合写入脚本日志目录下的子目录"""
+    name = f'web_script_{spec["id"]}'
+    return f'{name}/{spec["cell"]}' if spec.get('cell') else name
+
+
+def _collect_web_artifacts(work_dir, spec, artifact_settings):
+    """收集工作目录中的产物，返回 (run_key, artifacts, warnings)"""
+    from app.utils.artifact_store import get_artifact_store, new_run_key
+
+    run_key = new_run_key(spec['id'])
+    meta = {'user_id': spec['user_id'], 'script_id': spec['id']}
+    if spec.get('cell'):
+        meta['cell'] = spec['cell']
+    try:
+        artifacts, warnings = get_artifact_store(artifact_settings).collect(work_dir, run_key, meta)
+    except OSError as e:
+        return None, [], [f'产物保存失败: {e}']
+    return (run_key if artifacts else None), artifacts, warnings
+
+
+def _execute_web_script(spec, settings):
+    """
+    执行一个 Web 测试脚本（不访问数据库，可在线程中并发调用）
+
+    脚本在独立的运行目录中通过 web_runtime 启动，启用浏览器池时连接已启动的浏览器；
+    脚本的工作目录（截图、Trace、视频等相对路径的输出位置）每次执行独立，结束后收集到产物存储。
+
+    Returns:
+        dict: 执行结果，status 为 success / failed / timeout / error
+    """
+    pool_settings = settings['pool']
+    run_dir = tempfile.mkdtemp(prefix=f'web_run_{spec["id"]}_')
+    work_dir = os.path.join(run_dir, 'work')
+    os.makedirs(work_dir)
+    lease, pool_info = None, {'enabled': bool(pool_settings.get('enabled')), 'used': False}
+    diagnostics = spec.get('diagnostics')
+    vitals_requested = spec['performance'].get('enabled', settings['vitals']['enabled'])
+    # 重试时开启的 Trace 与录屏会拖慢页面，性能数据失真：不采集，结果中注明未检查性能预算
+    vitals_enabled = vitals_requested and not diagnostics
+    proc = capture = runner_info = None
+    stats_file = os.path.join(run_dir, 'runtime_stats.json')
+    start_time = time.time()
+    try:
+        try:
+            script_file = os.path.join(run_dir, 'script.py')
+            with open(script_file, 'w', encoding='utf-8') as f:
+                f.write(spec['script_content'])
+            _stage_support_modules(run_dir, ['web_runtime', 'network_profile', 'web_vitals'])
+
+            lease, pool_info = _acquire_browser(spec, pool_settings)
+            runtime_config = os.path.join(run_dir, 'runtime.json')
+            with open(runtime_config, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'browser': spec['browser'],
+                    'headless': spec['headless'],
+                    'ws_endpoint': lease.ws_endpoint if lease else None,
+                    'viewport': {'width': spec['viewport_width'], 'height': spec['viewport_height']},
+                    'cell': spec.get('cell'),
+                    'connect_timeout': pool_settings.get('connect_timeout', 10),
+                    'network': spec['network'],
+                    'network_cache': {'folder': cache_folder(settings['network_cache']['folder'],
+                                                             spec['user_id'], spec['id']),
+                                      'max_entry_bytes': settings['network_cache']['max_entry_bytes']},
+                    'performance': {'enabled': vitals_enabled, 'max_pages': settings['vitals']['max_pages']},
+                    'diagnostics': diagnostics,
+                    'stats_file': stats_file,
+                }, f)
+
+            # 由预加载了 Playwright 的常驻进程 fork 执行，不可用时直接启动子进程
+            proc, runner_info = get_fork_runner(settings['fork']).popen(
+                [sys.executable, os.path.join(run_dir, 'web_runtime.py'), runtime_config, script_file],
+                'web',
+                cwd=work_dir,
+                env=dict(os.environ, PYTHONUNBUFFERED='1'),
+                timeout=spec['timeout'] / 1000,
+            )
+            # 读取线程持续消费输出：完整输出写入日志文件（实时查看），结果中只保存开头与末尾
+            capture = OutputCapture(proc, log_dir_for(settings['logs'], _web_log_name(spec)), settings['logs'])
+            proc.wait(timeout=spec['timeout'] / 1000)  # 转换为秒
+            capture.join()
+            success = proc.returncode == 0
+            outcome = {
+                'status': 'success' if success else 'failed',
+                'success': success,
+                'duration': time.time() - start_time,
+                'stdout': capture.excerpt('stdout'),
+                'stderr': capture.excerpt('stderr'),
+                'return_code': proc.returncode,
             }
 
+        except subprocess.TimeoutExpired:
+            _stop_timed_out(proc, settings['retry']['terminate_grace'] if diagnostics else 0)
+            capture.join()
+            outcome = {'status': 'timeout', 'success': False, 'error': '执行超时',
+                       'duration': time.time() - start_time,
+                       'stdout': capture.excerpt('stdout'), 'stderr': capture.excerpt('stderr')}
+
+        except Exception as e:
+            if proc and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            outcome = {'status': 'error', 'success': False, 'error': str(e)}
+
+        if capture:
+            outcome['logs'] = capture.to_dict()
+        if runner_info:
+            outcome['runner'] = runner_info
+        outcome['browser_pool'] = _release_browser(lease, pool_info, stats_file)
+        stats = _read_runtime_stats(stats_file)  # 脚本被强制结束时没有统计
+        if spec['network']:
+            outcome['network'] = stats.get('network')
+        if spec.get('cell'):
+            _apply_cell_check(outcome, spec, stats.get('matrix'))
+        if vitals_enabled and (stats.get('performance') or {}).get('pages'):
+            _apply_performance(outcome, stats['performance'], spec['performance'].get('budgets'))
+        elif vitals_requested and diagnostics:
+            outcome['performance_unchecked'] = True
+            outcome['warnings'] = outcome.get('warnings', []) + ['重试时开启了 Trace / 录屏，未采集前端性能，未检查性能预算']
+        if diagnostics:
+            outcome['diagnostics'] = dict(diagnostics, **(stats.get('diagnostics') or {'traces': [], 'errors': []}))
+        if settings['visual']['enabled'] and outcome['status'] == 'success':
+            _apply_visual(outcome, _run_visual_checks(work_dir, spec, settings, outcome))
+        run_key, artifacts, warnings = _collect_web_artifacts(work_dir, spec, settings['artifacts'])
+        outcome.update(artifact_run=run_key, artifacts=artifacts, timestamp=datetime.utcnow().isoformat())
+        warnings = outcome.pop('warnings', []) + ((outcome.get('visual') or {}).get('warnings') or []) + warnings
+        if warnings:
+            outcome['warnings'] = warnings
+        return outcome
+
+    finally:
+        # 异常退出时同样归还浏览器（无法统计上下文数，按 1 个计）
+        _release_browser(lease, pool_info, stats_file)
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def _stop_timed_out(proc, grace):
+    """结束超时的脚本：grace > 0 时先发送 SIGTERM，等待脚本关闭上下文、保存 Trace 与录屏，超过 grace 秒再强制结束"""
+    if grace > 0:
+        proc.terminate()
+        try:
+            proc.wait(timeout=grace)
+            return
+        except subprocess.TimeoutExpired:
+            pass
+    proc.kill()
+    proc.wait()
+
+
+def _execute_web_with_retry(spec, settings):
+    """
+    按重试策略执行 Web 测试脚本：首次不开启诊断，脚本失败或超时时重试，重试时开启 Trace 与录屏
+
+    Returns:
+        dict: 最后一次执行的结果；有重试时 duration 为各次执行耗时之和，retry 中为各次执行，
+              重试后通过时 status 为 flaky
+    """
+    policy = spec['retry']
+    attempts = [_execute_web_script(spec, settings)]
+    diagnostics = ({'trace': policy['trace'], 'video': policy['video'], 'dir': DIAGNOSTICS_DIR}
+                   if policy['trace'] or policy['video'] else None)
+    while len(attempts) <= policy['retries'] and should_retry(attempts[-1]):
+        attempts.append(_execute_web_script(dict(spec, diagnostics=diagnostics), settings))
+    if len(attempts) == 1:
+        return attempts[0]
+
+    outcome = dict(attempts[-1])
+    retry = summarize_attempts(attempts, policy)
+    outcome['retry'] = retry
+    outcome['duration'] = retry['first_attempt_time'] + retry['retry_time']
+    if retry['result'] == 'flaky':
+        outcome['status'] = 'flaky'
+    return outcome
+
+
+def _apply_performance(outcome, collected, budgets):
+    """把脚本端采集的页面性能数据写入执行结果，超出预算时执行结果为失败"""
+    performance = build_performance(collected.get('pages'), budgets)
+    performance['dropped'] = collected.get('dropped', 0)
+    outcome['performance'] = performance
+    if performance['violations'] and outcome['status'] == 'success':
+        outcome.update(status='failed', success=False, error=describe_violations(performance['violations']))
+
+
+def _apply_cell_check(outcome, spec, matrix_stats):
+    """矩阵组合：脚本写死的浏览器被替换时给出警告，视口与组合不一致时执行结果为失败"""
+    matrix_stats = matrix_stats or {}
+    redirected = matrix_stats.get('redirected') or []
+    if redirected:
+        outcome['warnings'] = outcome.get('warnings', []) + [
+            f'脚本使用的 {", ".join(redirected)} 已按组合替换为 {spec["browser"]}']
+    mismatches = matrix_stats.get('mismatches') or []
+    if not mismatches:
+        return
+    outcome['mismatches'] = mismatches
+    if outcome['status'] == 'success':
+        outcome.update(status='failed', success=False, error=f'组合 {spec["cell"]} 未按配置执行: ' + '; '.join(mismatches))
+
+
+def _run_visual_checks(work_dir, spec, settings, outcome):
+    """对比脚本保存的截图与基线（差异图写入工作目录，随产物一起收集）；基线读写失败时只记录警告"""
+    from app.utils.artifact_store import get_artifact_store
+    from app.utils.visual_baseline import BaselineStore, run_visual_checks
+
+    baselines = BaselineStore(get_artifact_store(settings['artifacts']), spec['id'], spec['user_id'])
+    try:
+        return run_visual_checks(work_dir, baselines, spec['visual'], settings['visual'], spec.get('cell'))
+    except OSError as e:
+        outcome['warnings'] = outcome.get('warnings', []) + [f'视觉对比失败: {e}']
+        return None
+
+
+def _apply_visual(outcome, visual):
+    """写入视觉对比结果，有步骤超出阈值或对比出错时执行结果为失败"""
+    from app.utils.visual_diff import describe_failures
+
+    if not visual:
+        return
+    outcome['visual'] = visual
+    if (visual['failed'] or visual['errors']) and outcome['status'] == 'success':
+        outcome.update(status='failed', success=False, error=describe_failures(visual['steps']))
+
+
+def _apply_web_outcome(script, outcome, test_run_id=None):
+    """把执行结果写回脚本并生成执行记录（不提交事务）"""
+    script.status = 'failed' if outcome['status'] == 'error' else outcome['status']
+    script.last_status = script.status
+    script.last_run_duration = outcome.get('duration')
+    script.last_result = {k: v for k, v in outcome.items() if k != 'status'}
+
+    performance = outcome.get('performance')
+    matrix = outcome.get('matrix')
+    if matrix:
+        browser, viewport = 'matrix', (matrix['viewports'][0] if len(matrix['viewports']) == 1 else None)
+    else:
+        browser, viewport = _single_run_target(script)
+    db.session.add(WebTestRun(
+        script_id=script.id,
+        project_id=script.project_id,
+        user_id=script.user_id,
+        test_run_id=test_run_id,
+        status=outcome['status'],
+        browser=browser,
+        viewport=viewport,
+        duration=outcome.get('duration'),
+        error_message=outcome.get('error'),
+        metrics=performance['summary'] if performance else None,
+        performance=performance,
+        artifact_run=outcome.get('artifact_run'),
+        visual=outcome.get('visual'),
+        matrix=matrix,
+        retry=outcome.get('retry'),
+    ))
+
+
+def _single_run_target(script):
+    """脚本单次执行使用的浏览器与视口（宽x高）"""
+    return script.browser or 'chromium', f'{script.viewport_width or 1280}x{script.viewport_height or 720}'
+
+
+def web_performance_trend(script_id, limit, browser=None, viewport=None, include_matrix=False):
+    """
+    脚本最近 limit 次执行的前端性能趋势
+
+    只比较同一浏览器、同一视口下的执行，默认取脚本单次执行的配置；
+    include_matrix 为真时同时取矩阵执行中对应组合的结果。
+
+    Returns:
+        {'points': [...]（旧 -> 新）, 'browser': ..., 'viewport': ..., 'stats': {metric: {...}}}
+    """
+    if browser is None or viewport is None:
+        script = db.session.get(WebTestScript, script_id)
+        default_browser, default_viewport = _single_run_target(script)
+        browser, viewport = browser or default_browser, viewport or default_viewport
+
+    single = (WebTestRun.browser == browser) & (WebTestRun.viewport == viewport)
+    query = WebTestRun.query.filter(WebTestRun.script_id == script_id,
+                                    single | (WebTestRun.browser == 'matrix') if include_matrix else single)
+    points = []
+    for r in reversed(query.order_by(WebTestRun.id.desc()).limit(limit).all()):
+        created_at = r.created_at.isoformat() if r.created_at else None
+        if r.browser != 'matrix':
+            if r.metrics:
+                points.append(dict(r.metrics, run_id=r.id, status=r.status, browser=r.browser,
+                                   viewport=r.viewport, created_at=created_at))
+            continue
+        for cell in (r.matrix or {}).get('cells') or []:
+            if (cell['browser'], cell['viewport']) == (browser, viewport) and cell.get('performance'):
+                points.append(dict(cell['performance']['summary'], run_id=r.id, status=cell['status'],
+                                   browser=browser, viewport=viewport, cell=cell['cell'], created_at=created_at))
+    return {'points': points, 'browser': browser, 'viewport': viewport, 'stats': trend_stats(points)}
+
 
 @celery.task(bind=True, name='tasks.run_web_test')
 def run_web_test_task(self, script_id, user_id):
@@ -108,84 +496,407 @@ def run_web_test_task(self, script_id, user_id):
             # 更新任务进度
             self.update_state(state='PROGRESS', meta={'status': '正在执行脚本...'})
 
-            # 创建临时文件运行脚本
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
-                f.write(script.script_content)
-                temp_file = f.name
-
-            try:
-                # 运行脚本
-                start_time = time.time()
-
-                result = subprocess.run(
-                    [sys.executable, temp_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=script.timeout / 1000,  # 转换为秒
-                    cwd=tempfile.gettempdir()
-                )
-
-                end_time = time.time()
-                duration = end_time - start_time
+            outcome = _execute_web_with_retry(_web_script_spec(script), _web_run_settings())
+            _apply_web_outcome(script, outcome)
+            db.session.commit()
 
-                # 判断执行结果
-                success = result.returncode == 0
+            if outcome['status'] in ('timeout', 'error'):
+                return {
+                    'success': False,
+                    'error': outcome['error']
+                }
+            return {
+                'success': outcome['success'],
+                'script_id': script_id,
+                'duration': outcome['duration'],
+                'stdout': outcome['stdout'],
+                'stderr': outcome['stderr'],
+                'return_code': outcome['return_code'],
+                'browser_pool': outcome['browser_pool'],
+                'runner': outcome.get('runner'),
+                'network': outcome.get('network'),
+                'performance': outcome.get('performance'),
+                'visual': outcome.get('visual'),
+                'retry': outcome.get('retry'),
+                'error': outcome.get('error'),
+                'artifact_run': outcome['artifact_run'],
+                'artifacts': outcome['artifacts']
+            }
 
-                # 更新脚本状态
-                script.status = 'success' if success else 'failed'
+        except Exception as e:
+            db.session.rollback()
+            script = db.session.get(WebTestScript, script_id)
+            if script:
+                script.status = 'failed'
                 script.last_result = {
-                    'success': success,
-                    'duration': duration,
-                    'stdout': result.stdout,
-                    'stderr': result.stderr,
-                    'return_code': result.returncode,
+                    'success': False,
+                    'error': str(e),
                     'timestamp': datetime.utcnow().isoformat()
                 }
                 db.session.commit()
 
-                return {
-                    'success': success,
-                    'script_id': script_id,
-                    'duration': duration,
-                    'stdout': result.stdout,
-                    'stderr': result.stderr,
-                    'return_code': result.returncode
-                }
-
-            finally:
-                # 清理临时文件
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
-
-        except subprocess.TimeoutExpired:
-            script.status = 'timeout'
-            script.last_result = {
-                'success': False,
-                'error': '执行超时',
-                'timestamp': datetime.utcnow().isoformat()
-            }
-            db.session.commit()
-
             return {
                 'success': False,
-                'error': '执行超时'
+                'error': str(e)
             }
 
-        except Exception as e:
-            script.status = 'failed'
-            script.last_result = {
-                'success': False,
-                'error': str(e),
-                'timestamp': datetime.utcnow().isoformat()
-            }
+
+# ==================== Web 测试矩阵执行 ====================
+
+def _matrix_cell_result(cell, outcome, started_at, output_limit):
+    """矩阵中单个组合的结果"""
+    duration = outcome.get('duration')
+    error = outcome.get('error')
+    if not error and outcome['status'] == 'failed':
+        error = _tail(outcome.get('stderr'), 500) or None
+    pool = outcome.get('browser_pool') or {}
+    performance = outcome.get('performance')
+    visual = outcome.get('visual')
+    return {
+        'cell': cell['cell'],
+        'browser': cell['browser'],
+        'viewport': f'{cell["viewport_width"]}x{cell["viewport_height"]}',
+        'status': outcome['status'],
+        'started_at': round(started_at, 3),
+        'duration': round(duration, 3) if duration is not None else None,
+        'return_code': outcome.get('return_code'),
+        'error': error,
+        'stdout': _tail(outcome.get('stdout'), output_limit),
+        'stderr': _tail(outcome.get('stderr'), output_limit),
+        'browser_pool': {k: pool.get(k) for k in ('used', 'warm', 'server_pid', 'fallback')},
+        'runner': (outcome.get('runner') or {}).get('mode'),
+        'network': outcome.get('network'),
+        'mismatches': outcome.get('mismatches') or [],
+        'performance': {k: performance[k] for k in ('summary', 'violations')} if performance else None,
+        'visual': {k: visual[k] for k in ('passed', 'failed', 'new', 'errors')} if visual else None,
+        'retry': outcome.get('retry'),
+        'artifact_run': outcome.get('artifact_run'),
+        'artifacts': outcome.get('artifacts') or [],
+        'warnings': outcome.get('warnings') or [],
+    }
+
+
+def _execute_web_matrix(spec, matrix, settings, output_limit, progress=None):
+    """
+    按「浏览器 × 视口」并行执行一个脚本（不访问数据库），汇总为一个执行结果
+
+    各组合在 matrix['slots'] 个槽位中并发执行，启用浏览器池时同一浏览器的组合共用同一个浏览器服务。
+
+    Args:
+        matrix: resolve_matrix() 补全后的矩阵配置
+        progress: 每完成一个组合调用 progress(completed, total)
+
+    Returns:
+        dict: 执行结果，matrix 中为各组合的结果
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from app.utils.web_matrix import build_cells, summarize_cells
+
+    cells = build_cells(matrix)
+    start_time = time.time()
+
+    def _run(cell):
+        started_at = time.time() - start_time
+        outcome = _execute_web_with_retry(dict(spec, **cell), settings)
+        return _matrix_cell_result(cell, outcome, started_at, output_limit), outcome.get('visual')
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(int(matrix['slots']), len(cells)))) as executor:
+        futures = {executor.submit(_run, cell): cell['cell'] for cell in cells}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if progress:
+                progress(len(results), len(cells))
+
+    cell_results = [results[cell['cell']][0] for cell in cells]
+    visuals = [results[cell['cell']][1] for cell in cells if results[cell['cell']][1]]
+    wall_time = time.time() - start_time
+    cell_time = sum(c['duration'] or 0 for c in cell_results)
+    summary = summarize_cells(cell_results)
+    outcome = {
+        'status': summary['status'],
+        'success': summary['status'] in ('success', 'flaky'),
+        'duration': wall_time,
+        'error': summary['error'],
+        'matrix': {
+            'browsers': matrix['browsers'],
+            'viewports': [f'{v["width"]}x{v["height"]}' for v in matrix['viewports']],
+            'slots': matrix['slots'],
+            'passed': summary['passed'],
+            'failed': summary['failed'],
+            'flaky': summary['flaky'],
+            'cell_time': round(cell_time, 3),
+            'retry_time': round(sum(c['retry']['retry_time'] for c in cell_results if c['retry']), 3),
+            'parallel_speedup': round(cell_time / wall_time, 2) if wall_time > 0 else None,
+            # 实际使用的浏览器服务数（同一浏览器的组合共用浏览器服务时小于组合数）
+            'browser_servers': len({(c['browser'], c['browser_pool']['server_pid']) for c in cell_results
+                                    if c['browser_pool'].get('used')}),
+            'cells': cell_results,
+        },
+        'timestamp': datetime.utcnow().isoformat(),
+    }
+    if visuals:
+        outcome['visual'] = {
+            'steps': [step for visual in visuals for step in visual['steps']],
+            'warnings': [w for visual in visuals for w in visual.get('warnings') or []],
+            **{k: sum(visual[k] for visual in visuals) for k in ('passed', 'failed', 'new', 'errors')},
+        }
+    return outcome
+
+
+@celery.task(bind=True, name='tasks.run_web_matrix')
+def run_web_matrix_task(self, script_id, user_id, matrix):
+    """
+    异步执行 Web 测试脚本的浏览器 × 视口矩阵，生成一条执行记录
+
+    Args:
+        matrix: resolve_matrix() 补全后的矩阵配置
+
+    Returns:
+        dict: 执行结果
+    """
+    with _get_flask_app().app_context():
+        script = WebTestScript.query.filter_by(id=script_id, user_id=user_id).first()
+        if not script:
+            return {'success': False, 'error': '脚本不存在'}
+
+        script.status = 'running'
+        script.last_run_at = datetime.utcnow()
+        db.session.commit()
+
+        def _progress(completed, total):
+            self.update_state(state='PROGRESS', meta={'script_id': script_id, 'completed': completed, 'total': total})
+
+        try:
+            outcome = _execute_web_matrix(_web_script_spec(script), matrix, _web_run_settings(),
+                                          current_app.config['WEB_SUITE']['output_limit'], _progress)
+            _apply_web_outcome(script, outcome)
             db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            script = db.session.get(WebTestScript, script_id)
+            if script:
+                script.status = 'failed'
+                script.last_result = {'success': False, 'error': str(e), 'timestamp': datetime.utcnow().isoformat()}
+                db.session.commit()
+            return {'success': False, 'error': str(e)}
 
-            return {
-                'success': False,
-                'error': str(e)
-            }
+        return {
+            'success': outcome['success'],
+            'script_id': script_id,
+            'duration': outcome['duration'],
+            'error': outcome['error'],
+            'matrix': outcome['matrix'],
+            'visual': outcome.get('visual'),
+        }
+
+
+# ==================== Web 测试套件 ====================
+
+def _tail(text, limit):
+    text = text or ''
+    return text if len(text) <= limit else '...' + text[-limit:]
+
+
+def _suite_case_result(spec, outcome, shard, output_limit):
+    """套件中单个脚本的结果（字段兼容测试报告 HTML 的用例表格）"""
+    duration = outcome.get('duration')
+    error = outcome.get('error')
+    if not error and outcome['status'] == 'failed':
+        error = _tail(outcome.get('stderr'), 500) or None
+    output = '\n'.join(part for part in (outcome.get('stdout'), outcome.get('stderr')) if part)
+    performance = outcome.get('performance')
+    return {
+        'script_id': spec['id'],
+        'name': spec['name'],
+        'browser': spec['browser'],
+        'status': outcome['status'],
+        'passed': outcome['status'] in ('success', 'flaky'),
+        'duration': round(duration, 3) if duration is not None else None,
+        'return_code': outcome.get('return_code'),
+        'status_code': outcome.get('return_code'),
+        'response_time': round(duration * 1000, 2) if duration is not None else None,
+        'response_body': _tail(output, output_limit) or None,
+        'stdout': _tail(outcome.get('stdout'), output_limit),
+        'stderr': _tail(outcome.get('stderr'), output_limit),
+        'error': error,
+        'browser_pool': outcome.get('browser_pool'),
+        'runner': outcome.get('runner'),
+        'network': outcome.get('network'),
+        'performance': {k: performance[k] for k in ('summary', 'budgets', 'violations')} if performance else None,
+        'visual': outcome.get('visual'),
+        'retry': outcome.get('retry'),
+        'artifact_run': outcome.get('artifact_run'),
+        'artifacts': outcome.get('artifacts') or [],
+        'shard': shard,
+    }
+
+
+def split_shards(script_ids, shards):
+    """按轮询方式把脚本分配到各个分片"""
+    shards = max(1, min(int(shards), len(script_ids)))
+    return [script_ids[i::shards] for i in range(shards)]
+
+
+def dispatch_web_suite(test_run_id, script_ids, slots, shards, suite=None):
+    """
+    派发 Web 测试套件：每个分片一个 Celery 任务（可分布到多个 Worker），
+    分片内按 slots 个浏览器槽位并发执行，全部完成后由回调任务汇总
+
+    Returns:
+        AsyncResult: 汇总任务
+    """
+    from celery import chord
+
+    header = [run_web_suite_shard_task.s(test_run_id, ids, slots, index)
+              for index, ids in enumerate(split_shards(script_ids, shards))]
+    callback = finish_web_suite_task.s(test_run_id, suite).on_error(fail_web_suite_task.si(test_run_id))
+    return chord(header)(callback)
+
+
+@celery.task(bind=True, name='tasks.run_web_suite_shard')
+def run_web_suite_shard_task(self, test_run_id, script_ids, slots, shard=0):
+    """
+    执行 Web 测试套件的一个分片
+
+    Returns:
+        list: 各脚本的执行结果
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with _get_flask_app().app_context():
+        scripts = {s.id: s for s in WebTestScript.query.filter(WebTestScript.id.in_(script_ids)).all()}
+        ordered = [scripts[i] for i in script_ids if i in scripts]
+        specs = [_web_script_spec(s) for s in ordered]
+        now = datetime.utcnow()
+        for script in ordered:
+            script.status = 'running'
+            script.last_run_at = now
+        db.session.commit()
+
+        settings = _web_run_settings()
+        output_limit = current_app.config['WEB_SUITE']['output_limit']
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=max(1, int(slots))) as executor:
+            futures = {executor.submit(_execute_web_with_retry, spec, settings): spec for spec in specs}
+            for future in as_completed(futures):
+                spec = futures[future]
+                outcomes[spec['id']] = future.result()
+                self.update_state(state='PROGRESS', meta={
+                    'test_run_id': test_run_id, 'shard': shard,
+                    'completed': len(outcomes), 'total': len(specs),
+                })
+
+        results = []
+        for script, spec in zip(ordered, specs):
+            _apply_web_outcome(script, outcomes[spec['id']], test_run_id)
+            results.append(_suite_case_result(spec, outcomes[spec['id']], shard, output_limit))
+        missing = [i for i in script_ids if i not in scripts]
+        for script_id in missing:
+            results.append({'script_id': script_id, 'name': f'脚本 #{script_id}', 'status': 'error',
+                            'passed': False, 'error': '脚本不存在', 'shard': shard})
+        db.session.commit()
+        return results
+
+
+def _finish_web_suite(test_run, results, suite=None):
+    """汇总套件结果，写入 TestRun 并生成 TestReport（不提交事务）"""
+    finished_at = datetime.utcnow()
+    total = len(results)
+    passed = sum(1 for r in results if r['passed'])
+    errors = sum(1 for r in results if r['status'] in ('timeout', 'error'))
+    durations = [r['duration'] for r in results if r.get('duration') is not None]
+    wall_time = (finished_at - test_run.started_at).total_seconds() if test_run.started_at else sum(durations)
+    script_time = sum(durations)
+
+    test_run.status = 'success' if total and passed == total else 'failed'
+    test_run.total_cases = total
+    test_run.passed = passed
+    test_run.failed = total - passed - errors
+    test_run.error = errors
+    test_run.duration = wall_time
+    test_run.finished_at = finished_at
+    test_run.results = results
+
+    summary = {
+        'total': total,
+        'passed': passed,
+        'failed': test_run.failed,
+        'error': errors,
+        'success_rate': round(passed / total * 100, 2) if total else 0,
+        'duration': round(wall_time, 2),
+        'script_time': round(script_time, 2),
+        'avg_duration': round(script_time / len(durations), 3) if durations else None,
+        'max_duration': round(max(durations), 3) if durations else None,
+        'parallel_speedup': round(script_time / wall_time, 2) if wall_time > 0 else None,
+    }
+    retried = [r['retry'] for r in results if r.get('retry')]
+    summary['flaky'] = sum(1 for r in results if r['status'] == 'flaky')
+    summary['retried'] = len(retried)
+    summary['retry_time'] = round(sum(r['retry_time'] for r in retried), 2)
+    network = [r['network'] for r in results if r.get('network')]
+    if network:
+        summary['network'] = {key: sum(n.get(key, 0) for n in network)
+                              for key in ('requests', 'blocked', 'cache_hits', 'bytes_from_cache')}
+    report = TestReport(
+        test_run_id=test_run.id,
+        project_id=test_run.project_id,
+        test_type='web',
+        title=f'{test_run.test_object_name or "Web 测试套件"} - Web 测试报告',
+        summary=summary,
+        report_data={
+            'suite': suite or {},
+            'results': results,
+            'performance': _suite_performance(results),
+        },
+        status='generated'
+    )
+    db.session.add(report)
+    return report
+
+
+def _suite_performance(results):
+    """套件报告中各脚本的前端性能指标及其在最近多次执行中的趋势"""
+    limit = current_app.config['WEB_VITALS']['trend_limit']
+    section = []
+    for result in results:
+        performance = result.get('performance')
+        if not performance:
+            continue
+        section.append({
+            'script_id': result['script_id'],
+            'name': result['name'],
+            'summary': performance['summary'],
+            'violations': performance['violations'],
+            'trend': web_performance_trend(result['script_id'], limit)['stats'],
+        })
+    return section
+
+
+@celery.task(name='tasks.finish_web_suite')
+def finish_web_suite_task(shard_results, test_run_id, suite=None):
+    """汇总 Web 测试套件各分片的结果"""
+    with _get_flask_app().app_context():
+        test_run = db.session.get(TestRun, test_run_id)
+        if not test_run:
+            return {'success': False, 'error': '执行记录不存在'}
+        results = [result for shard in shard_results for result in shard]
+        _finish_web_suite(test_run, results, suite)
+        db.session.commit()
+        return {'success': True, 'test_run_id': test_run_id, 'passed': test_run.passed,
+                'failed': test_run.failed, 'error': test_run.error}
+
+
+@celery.task(name='tasks.fail_web_suite')
+def fail_web_suite_task(test_run_id):
+    """分片任务异常（如 Worker 进程退出）时结束套件执行记录"""
+    with _get_flask_app().app_context():
+        test_run = db.session.get(TestRun, test_run_id)
+        if test_run and test_run.status == 'running':
+            test_run.status = 'failed'
+            test_run.finished_at = datetime.utcnow()
+            test_run.error_message = '套件分片执行异常，部分脚本未返回结果'
+            db.session.commit()
 
 
 @celery.task(bind=True, name='tasks.run_perf_test')
@@ -195,10 +906,32 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
         from app.api.perf_test import _parse_target_url
 
         scenario = None
+        perf_run = None
         temp_dir = None
         monitor_thread = None
+        host_monitor = None
+        isolation = None
+        proc = None
+        capture = None
         stop_monitor = threading.Event()
 
+        def _stop_generator():
+            """结束仍在运行的压测进程，停止监控线程并读完输出（可重复调用）"""
+            stop_monitor.set()
+            if proc is not None and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+            if monitor_thread:
+                monitor_thread.join(timeout=3)
+            if host_monitor:
+                host_monitor.stop()
+            if capture:
+                capture.join()
+
         def _safe_float(val, default=0.0):
             try:
                 return float(val)
@@ -206,26 +939,26 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
                 return default
 
         def _read_latest_stats(csv_prefix):
-            """读取 stats_history 最新一行，提取实时指标（单位：ms/req/s/%）"""
+            """读取 stats_history 最新的 Aggregated 行，提取实时指标（单位：ms/req/s/%）"""
             history_file = f"{csv_prefix}_stats_history.csv"
             if not os.path.exists(history_file):
                 return None
             try:
-                with open(history_file, 'r', encoding='utf-8') as f:
-                    lines = [ln.strip() for ln in f.readlines() if ln.strip()]
-                if len(lines) < 2:
+                with open(history_file, 'r', encoding='utf-8', newline='') as f:
+                    rows = [r for r in csv.DictReader(f) if r.get('Name') in (None, '', 'Aggregated')]
+                if not rows:
                     return None
-                headers = lines[0].split(',')
-                last = lines[-1].split(',')
-                row = dict(zip(headers, last))
+                row = rows[-1]
 
-                total_req = _safe_float(row.get('Total Requests') or row.get('Requests') or 0)
-                total_fail = _safe_float(row.get('Total Failures') or row.get('Failures') or row.get('Fails') or 0)
+                total_req = _safe_float(row.get('Total Request Count') or row.get('Total Requests') or 0)
+                total_fail = _safe_float(row.get('Total Failure Count') or row.get('Total Failures') or 0)
                 throughput = _safe_float(row.get('Requests/s') or row.get('RPS') or 0)
-                avg_ms = _safe_float(row.get('Avg') or row.get('Average Response Time') or 0)
-                p95_ms = _safe_float(row.get('95%') or row.get('95%ile') or row.get('95') or 0)
-                min_ms = _safe_float(row.get('Min') or 0)
-                max_ms = _safe_float(row.get('Max') or 0)
+                failures_per_sec = _safe_float(row.get('Failures/s') or 0)
+                avg_ms = _safe_float(row.get('Total Average Response Time') or row.get('Avg') or 0)
+                p95_ms = _safe_float(row.get('95%') or 0)
+                p99_ms = _safe_float(row.get('99%') or 0)
+                min_ms = _safe_float(row.get('Total Min Response Time') or row.get('Min') or 0)
+                max_ms = _safe_float(row.get('Total Max Response Time') or row.get('Max') or 0)
                 error_rate = (total_fail / total_req * 100) if total_req else 0
 
                 return {
@@ -233,10 +966,13 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
                     'failure_count': int(total_fail),
                     'avg_response_time_ms': avg_ms,
                     'p95_response_time_ms': p95_ms,
+                    'p99_response_time_ms': p99_ms,
                     'min_response_time_ms': min_ms,
                     'max_response_time_ms': max_ms,
                     'throughput': throughput,
                     'error_rate': error_rate,
+                    # 当前窗口（Locust 约 10 秒）的错误率，用于 SLO 阈值检查
+                    'window_error_rate': (failures_per_sec / throughput * 100) if throughput else 0,
                 }
             except Exception:
                 return None
@@ -251,20 +987,169 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
 
             scenario.status = 'running'
             scenario.last_run_at = datetime.utcnow()
+
+            # 每次执行生成一条执行记录，关联项目时同时生成通用 TestRun
+            test_run = None
+            if scenario.project_id:
+                test_run = TestRun(
+                    project_id=scenario.project_id,
+                    test_type='performance',
+                    test_object_id=scenario.id,
+                    test_object_name=scenario.name,
+                    status='running',
+                    total_cases=1,
+                    started_at=scenario.last_run_at,
+                    triggered_by='manual',
+                    triggered_user_id=scenario.user_id
+                )
+                db.session.add(test_run)
+                db.session.flush()
+
+            perf_run = PerfTestRun(
+                scenario_id=scenario.id,
+                project_id=scenario.project_id,
+                user_id=scenario.user_id,
+                test_run_id=test_run.id if test_run else None,
+                status='running',
+                config={
+                    'users': user_count,
+                    'spawn_rate': spawn_rate,
+                    'run_time': run_time,
+                    'target_url': scenario.target_url,
+                    'method': scenario.method,
+                },
+                started_at=scenario.last_run_at
+            )
+            db.session.add(perf_run)
             db.session.commit()
 
             # 解析 URL 获取 base_host 和 endpoint_path
             base_host, endpoint_path = _parse_target_url(scenario.target_url)
 
             temp_dir = tempfile.mkdtemp()
-            locustfile = os.path.join(temp_dir, 'locustfile.py')
             csv_prefix = os.path.join(temp_dir, 'rt')
+            scenario_config = scenario.config or {}
+            engine = scenario_config.get('engine') or 'locust'
+            stages = None
+            # 开环负载：配置目标到达速率时按计划时间发送请求，并统计修正协调遗漏后的延迟
+            arrival_stages = scenario_config.get('arrival_stages')
+            open_workload = bool(scenario_config.get('target_rps') or arrival_stages)
+            run_warnings = []
+
+            if engine == 'asyncio':
+                if scenario.data_feeders:
+                    run_warnings.append('asyncio 引擎不支持数据文件，{{column}} 占位符将按原样发送')
+                # 轻量级 asyncio 引擎：直接使用场景的请求配置，输出与 Locust 相同格式的 CSV
+                engine_config_file = os.path.join(temp_dir, 'engine.json')
+                with open(engine_config_file, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'url': scenario.target_url,
+                        'method': scenario.method or 'GET',
+                        'headers': scenario.headers or {},
+                        'body': scenario.body,
+                        'duration': run_time,
+                        'concurrency': user_count,
+                        'processes': scenario_config.get('processes') or 1,
+                        'target_rps': scenario_config.get('target_rps'),
+                        'arrival_stages': arrival_stages,
+                        'timeout': scenario_config.get('request_timeout') or 30,
+                        'csv_prefix': csv_prefix,
+                        'raw_samples': bool(scenario_config.get('raw_samples')),
+                    }, f, ensure_ascii=False)
+                _stage_support_modules(temp_dir, ['latency_histogram', 'open_workload', 'raw_samples',
+                                                  'async_load_engine'])
+                cmd = [sys.executable, os.path.join(temp_dir, 'async_load_engine.py'), engine_config_file]
+            else:
+                locustfile = os.path.join(temp_dir, 'locustfile.py')
+
+                # 替换脚本中的占位符
+                script_content = scenario.script_content.replace('{{endpoint_path}}', endpoint_path)
+
+                # 数据文件：各进程 mmap 同一份 .feed 文件，游标文件放在运行目录
+                feeders = [
+                    {'name': item['name'], 'policy': item.get('policy', 'sequential'),
+                     'path': os.path.join(current_app.config['UPLOAD_FOLDER'], item['file'])}
+                    for item in (scenario.data_feeders or [])
+                ]
+                raw_samples = bool(scenario_config.get('raw_samples'))
+                if open_workload or feeders or raw_samples:
+                    runtime_config_file = os.path.join(temp_dir, 'easytest_runtime.json')
+                    with open(runtime_config_file, 'w', encoding='utf-8') as f:
+                        json.dump({
+                            'csv_prefix': csv_prefix,
+                            'target_rps': scenario_config.get('target_rps'),
+                            'arrival_stages': arrival_stages,
+                            'feeders': feeders,
+                            'cursor_dir': temp_dir,
+                            'raw_samples': raw_samples,
+                        }, f, ensure_ascii=False)
+                    _stage_support_modules(temp_dir, ['latency_histogram', 'open_workload', 'data_feeder',
+                                                      'raw_samples', 'locust_runtime'])
+                    script_content += _render_runtime_footer(runtime_config_file)
+
+                if not open_workload:
+                    # 负载模型：根据场景字段生成 LoadTestShape（脚本自带 LoadTestShape 时以脚本为准）
+                    # 开环负载由到达速率驱动，用户数只决定最大并发，不再生成负载模型
+                    stages = build_stages(resolve_load_shape(scenario.to_dict()), user_count, spawn_rate, run_time)
+                    if stages and 'LoadTestShape' in script_content:
+                        stages = None
+                    if stages:
+                        script_content += render_shape_class(stages)
+
+                with open(locustfile, 'w', encoding='utf-8') as f:
+                    f.write(script_content)
+
+                # 启动 Locust 子进程（隔离 gevent）
+                cmd = [
+                    sys.executable, '-m', 'locust',
+                    '-f', locustfile,
+                    '--host', base_host,
+                    '--users', str(user_count),
+                    '--spawn-rate', str(spawn_rate),
+                    '--run-time', f'{run_time}s',
+                    '--headless',
+                    '--csv', csv_prefix,
+                    '--loglevel', 'WARNING',
+                    '--only-summary',
+                    '--csv-full-history'
+                ]
+
+            # CPU 隔离：为压测进程预留独占核（并发压测之间互不重叠），可选 cgroup 限制
+            isolation = prepare_isolation(
+                scenario_config.get('cpu'),
+                owner=f'perf_run_{perf_run.id}',
+                settings=current_app.config.get('PERF_CPU_ISOLATION', {}),
+                default_cores=(scenario_config.get('processes') or 1) if engine == 'asyncio' else 1,
+            )
 
-            # 替换脚本中的占位符
-            script_content = scenario.script_content.replace('{{endpoint_path}}', endpoint_path)
+            perf_run.config = dict(perf_run.config or {}, engine=engine, load_stages=stages)
+            if open_workload:
+                perf_run.config.update(target_rps=scenario_config.get('target_rps'), arrival_stages=arrival_stages)
+            if isolation.cores or isolation.cgroup or isolation.warnings:
+                perf_run.config['cpu'] = isolation.to_dict()
+            db.session.commit()
+
+            # SLO 阈值：持续违规时提前终止压测
+            thresholds = scenario_config.get('thresholds')
+            threshold_monitor = ThresholdMonitor(thresholds) if thresholds else None
+            slo_violation = {}
+
+            # 由预加载了 Locust / asyncio 的常驻进程 fork 执行，不可用时直接启动子进程
+            proc, runner_info = get_fork_runner(current_app.config['FORK_RUNNER']).popen(
+                cmd,
+                'asyncio' if engine == 'asyncio' else 'locust',
+                cwd=temp_dir,
+                timeout=run_time + 60,
+                isolation=isolation,
+            )
+            run_started = time.time()
+            # 读取线程持续消费 Locust 输出，避免管道写满导致压测进程阻塞
+            log_settings = current_app.config['LOG_CAPTURE']
+            capture = OutputCapture(proc, log_dir_for(log_settings, f'perf_run_{perf_run.id}'), log_settings)
 
-            with open(locustfile, 'w', encoding='utf-8') as f:
-                f.write(script_content)
+            # 压测机资源采样：与 stats_history 同一时间轴，用于判断压测机本身是否饱和
+            host_monitor = HostMonitor(proc.pid, **current_app.config.get('PERF_GENERATOR_MONITOR', {}))
+            host_monitor.start()
 
             # 监控线程：每2秒读取 CSV 并写库
             def monitor_realtime():
@@ -274,9 +1159,29 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
                     stats = _read_latest_stats(csv_prefix)
                     if not stats:
                         continue
+                    elapsed = time.time() - run_started
+                    stage = active_stage(stages, elapsed)
+                    if stage:
+                        stats['stage'] = {'name': stage['name'], 'users': stage['users']}
+                    stats['host'] = host_monitor.latest()
+                    if threshold_monitor and not slo_violation:
+                        violation = threshold_monitor.check({
+                            'error_rate': stats['window_error_rate'],
+                            'p95_response_time': stats['p95_response_time_ms'],
+                            'p99_response_time': stats['p99_response_time_ms'],
+                            'throughput': stats['throughput'],
+                        }, elapsed)
+                        if violation:
+                            # SIGTERM 让 Locust / asyncio 引擎正常退出并写出最终 CSV
+                            slo_violation.update(violation)
+                            stats['slo_violation'] = violation
+                            proc.terminate()
                     try:
                         with app.app_context():
                             s = PerfTestScenario.query.get(scenario_id)
+                            if s and s.status == 'stopped' and proc.poll() is None:
+                                # 用户手动停止：SIGTERM 让压测进程写出最终 CSV，由任务写入结果
+                                proc.terminate()
                             if s and s.status == 'running':
                                 s.avg_response_time = stats['avg_response_time_ms']
                                 s.min_response_time = stats['min_response_time_ms']
@@ -290,35 +1195,12 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
                                     'stats': stats,
                                 }
                                 db.session.commit()
-                    except Exception as e:
-                        print(f"更新实时数据失败: {e}")
+                    except Exception:
+                        logger.warning('更新实时数据失败', exc_info=True)
 
             monitor_thread = threading.Thread(target=monitor_realtime, daemon=True)
             monitor_thread.start()
 
-            # 启动 Locust 子进程（隔离 gevent）
-            cmd = [
-                sys.executable, '-m', 'locust',
-                '-f', locustfile,
-                '--host', base_host,
-                '--users', str(user_count),
-                '--spawn-rate', str(spawn_rate),
-                '--run-time', f'{run_time}s',
-                '--headless',
-                '--csv', csv_prefix,
-                '--loglevel', 'WARNING',
-                '--only-summary',
-                '--csv-full-history'
-            ]
-
-            proc = subprocess.Popen(
-                cmd,
-                cwd=temp_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-
             self.update_state(state='PROGRESS', meta={'status': '正在执行性能测试...'})
 
             try:
@@ -329,22 +1211,54 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
                 stop_monitor.set()
                 if monitor_thread:
                     monitor_thread.join(timeout=3)
+                host_monitor.stop()
 
-            stdout, stderr = proc.communicate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            capture.join()
+            stdout, stderr = capture.excerpt('stdout'), capture.excerpt('stderr')
 
             # 解析最终结果
             results = _parse_locust_results(csv_prefix)
-            agg = results.get('aggregated') or {}
-
-            total_req = _safe_float(agg.get('Requests') or agg.get('Request Count') or 0)
-            total_fail = _safe_float(agg.get('Fails') or agg.get('Failure Count') or 0)
-            avg_ms = _safe_float(agg.get('Average Response Time') or agg.get('Average') or agg.get('Avg') or 0)
-            min_ms = _safe_float(agg.get('Min Response Time') or agg.get('Min') or 0)
-            max_ms = _safe_float(agg.get('Max Response Time') or agg.get('Max') or 0)
-            throughput = _safe_float(agg.get('Requests/s') or agg.get('RPS') or 0)
-            error_rate = (total_fail / total_req * 100) if total_req else 0
-
-            scenario.status = 'completed' if proc.returncode == 0 else 'failed'
+            if stages:
+                results['stages'] = summarize_stages(stages, results.get('history', []), run_started)
+            if open_workload:
+                results['open_workload'] = _read_open_workload(csv_prefix, run_time)
+            results['host'] = host_monitor.summary()
+            results['warnings'] = run_warnings + list(isolation.warnings) + list(results['host']['warnings'])
+            if results.get('open_workload') and not results['open_workload']['keep_up']:
+                results['warnings'].append('压测机未能保持目标到达速率，落后区间的数据不可信')
+            if scenario_config.get('raw_samples'):
+                results['raw_samples'] = _store_raw_samples(csv_prefix, perf_run.id)
+            results['trustworthy'] = results['host']['trustworthy'] and \
+                (results.get('open_workload') or {}).get('keep_up', True)
+            summary = _summarize_stats_row(results.get('aggregated') or {})
+
+            total_req = summary['request_count']
+            total_fail = summary['failure_count']
+            avg_ms = summary['avg_response_time']
+            min_ms = summary['min_response_time']
+            max_ms = summary['max_response_time']
+            throughput = summary['throughput']
+            error_rate = summary['error_rate']
+
+            results['logs'] = capture.to_dict()
+            results['runner'] = runner_info
+            db.session.refresh(perf_run)
+            if perf_run.status == 'stopped':
+                scenario.status = 'stopped'
+            elif slo_violation:
+                scenario.status = ABORTED_STATUS
+                results['slo_violation'] = dict(slo_violation)
+            else:
+                scenario.status = 'completed' if proc.returncode == 0 else 'failed'
+            if scenario.status == 'stopped':
+                error_message = perf_run.error_message
+            else:
+                error_message = slo_violation.get('message') or (stderr if proc.returncode else None)
             scenario.avg_response_time = avg_ms
             scenario.min_response_time = min_ms
             scenario.max_response_time = max_ms
@@ -352,28 +1266,53 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
             scenario.error_rate = error_rate
 
             scenario.last_result = {
-                'success': proc.returncode == 0,
-                'error': stderr if proc.returncode else None,
+                'success': scenario.status == 'completed',
+                'error': error_message,
                 'stdout': stdout,
                 'error_rate': error_rate,
                 'request_count': int(total_req),
                 'failure_count': int(total_fail),
                 'results': results,
+                'run_id': perf_run.id,
                 'timestamp': datetime.utcnow().isoformat() + 'Z'
             }
+
+            endpoint_stats = results.get('endpoint_stats', [])
+            _finish_perf_run(
+                perf_run,
+                status=scenario.status,
+                summary=summary,
+                endpoint_stats=endpoint_stats,
+                result={
+                    'history': results.get('history', []),
+                    'stages': results.get('stages', []),
+                    'open_workload': results.get('open_workload'),
+                    'slo_violation': results.get('slo_violation'),
+                    'failures': results.get('failures', []),
+                    'exceptions': results.get('exceptions', []),
+                    'host': results['host'],
+                    'raw_samples': results.get('raw_samples'),
+                    'trustworthy': results['trustworthy'],
+                    'warnings': results['warnings'],
+                    'logs': results['logs'],
+                    'runner': results['runner'],
+                    'stdout': stdout
+                },
+                error_message=error_message
+            )
             db.session.commit()
 
             return {
-                'success': proc.returncode == 0,
+                'success': scenario.status == 'completed',
                 'scenario_id': scenario_id,
+                'run_id': perf_run.id,
                 'error_rate': error_rate,
                 'results': results
             }
 
         except Exception as e:
-            stop_monitor.set()
-            if monitor_thread:
-                monitor_thread.join(timeout=3)
+            # 启动压测进程后出错：先结束压测进程并回收读取线程，避免压测进程在后台继续运行
+            _stop_generator()
 
             if scenario:
                 scenario.status = 'failed'
@@ -382,57 +1321,303 @@ def run_perf_test_task(self, scenario_id, user_count, spawn_rate, run_time):
                     'error': str(e),
                     'timestamp': datetime.utcnow().isoformat() + 'Z'
                 }
+                if perf_run:
+                    _finish_perf_run(perf_run, status='failed', error_message=str(e))
                 db.session.commit()
 
             return {'success': False, 'error': str(e)}
 
         finally:
+            _stop_generator()
+            if isolation:
+                isolation.release()
             if temp_dir and os.path.exists(temp_dir):
                 try:
-                    import shutil
                     shutil.rmtree(temp_dir)
                 except Exception:
                     pass
 
 
+def _acquire_browser(spec, settings):
+    """
+    从当前 Worker 的浏览器池获取脚本所需的浏览器服务
+
+    Returns:
+        (lease, pool_info)：未启用浏览器池或启动失败时 lease 为 None，脚本回退为本地启动浏览器
+    """
+    from app.utils.browser_pool import get_browser_pool, BrowserPoolError
+
+    pool_info = {'enabled': bool(settings.get('enabled')), 'used': False}
+    if not settings.get('enabled'):
+        return None, pool_info
+    try:
+        lease = get_browser_pool(settings).acquire(spec['browser'], spec['headless'])
+    except (BrowserPoolError, OSError) as e:
+        pool_info['error'] = str(e)
+        return None, pool_info
+    pool_info.update(lease.to_dict())
+    return lease, pool_info
+
+
+def _read_runtime_stats(stats_file):
+    """读取 web_runtime 退出时写入的统计，脚本被强制结束时返回空字典"""
+    try:
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _release_browser(lease, pool_info, stats_file):
+    """归还浏览器服务，并把脚本端统计（上下文数、连接耗时、回退原因）合并到 pool_info"""
+    if lease is None or lease.released:
+        return pool_info
+    stats = _read_runtime_stats(stats_file)
+    contexts = stats.get('contexts', 1)
+    lease.release(contexts=contexts, crashed=bool(stats.get('connect_error')) or not lease.server.alive())
+    pool_info = dict(pool_info, used=bool(stats.get('connected')), contexts=contexts,
+                     connect_ms=stats.get('connect_ms') or [],
+                     fallback=stats.get('fallback'), connect_error=stats.get('connect_error'))
+    return pool_info
+
+
+def _stage_support_modules(target_dir, module_names):
+    """将压测子进程依赖的工具模块（仅依赖标准库）复制到运行目录"""
+    utils_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils')
+    for name in module_names:
+        shutil.copyfile(os.path.join(utils_dir, f'{name}.py'), os.path.join(target_dir, f'{name}.py'))
+
+
+def _render_runtime_footer(runtime_config_file):
+    """渲染 locustfile 末尾注入的运行时扩展代码（locust_runtime.py）"""
+    return f'''
+
+# ==================== EasyTest 运行时扩展（自动生成） ====================
+import locust_runtime as _easytest_runtime
+_easytest_runtime.install(globals(), {runtime_config_file!r})
+'''
+
+
+def _store_raw_samples(csv_prefix, run_id):
+    """将压测进程写出的原始样本文件移动到报告目录，随执行记录保存"""
+    paths = sorted(glob.glob(f'{csv_prefix}_samples_*.bin'))
+    if not paths:
+        return None
+    target = run_samples_dir(current_app.config['REPORT_FOLDER'], run_id)
+    os.makedirs(target, exist_ok=True)
+    stored = []
+    for path in paths:
+        dest = os.path.join(target, os.path.basename(path)[len(os.path.basename(csv_prefix)) + 1:])
+        shutil.move(path, dest)
+        stored.append(dest)
+    return describe_samples(stored)
+
+
+def _read_open_workload(csv_prefix, run_time):
+    """读取并汇总开环负载统计（Locust 为单个对象，asyncio 引擎为 {'processes': [...]}）"""
+    path = f'{csv_prefix}_open_workload.json'
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    items = data.get('processes') if 'processes' in data else [data]
+    return summarize_open_workload(items, run_time)
+
+
+# Locust stats.csv 的分位数列（50% ~ 100%）
+STATS_PERCENTILE_COLUMNS = ('50%', '66%', '75%', '80%', '90%', '95%', '98%', '99%', '99.9%', '99.99%', '100%')
+
+
+def _summarize_stats_row(row):
+    """将 Locust stats.csv 的一行转换为数值化的统计字典"""
+    def _num(*keys):
+        for key in keys:
+            value = row.get(key)
+            if value not in (None, '', 'N/A'):
+                try:
+                    return float(value)
+                except (TypeError, ValueError):
+                    continue
+        return 0.0
+
+    request_count = _num('Request Count', 'Requests')
+    failure_count = _num('Failure Count', 'Fails', 'Failures')
+    percentiles = {key: _num(key) for key in STATS_PERCENTILE_COLUMNS if row.get(key) not in (None, '')}
+    return {
+        'method': row.get('Type') or '',
+        'name': row.get('Name') or '',
+        'request_count': int(request_count),
+        'failure_count': int(failure_count),
+        'error_rate': (failure_count / request_count * 100) if request_count else 0,
+        'avg_response_time': _num('Average Response Time', 'Average', 'Avg'),
+        'min_response_time': _num('Min Response Time', 'Min'),
+        'max_response_time': _num('Max Response Time', 'Max'),
+        'p50_response_time': _num('50%', 'Median Response Time'),
+        'p90_response_time': _num('90%'),
+        'p95_response_time': _num('95%'),
+        'p99_response_time': _num('99%'),
+        'throughput': _num('Requests/s', 'RPS'),
+        'failures_per_second': _num('Failures/s'),
+        'avg_content_size': _num('Average Content Size'),
+        'percentiles': percentiles,
+    }
+
+
+def _finish_perf_run(perf_run, status, summary=None, endpoint_stats=None, result=None, error_message=None):
+    """
+    写入执行记录的最终结果，并同步关联的 TestRun / TestReport（不提交事务）
+
+    可重复调用：已手动停止的执行保留 stopped 状态与停止原因，已生成的报告原地更新
+    """
+    if perf_run.status == 'stopped':
+        status, error_message = 'stopped', perf_run.error_message
+    finished_at = datetime.utcnow()
+    perf_run.status = status
+    perf_run.finished_at = finished_at
+    if perf_run.started_at:
+        perf_run.duration = (finished_at - perf_run.started_at).total_seconds()
+    perf_run.error_message = error_message
+
+    if summary:
+        for field in ('request_count', 'failure_count', 'error_rate', 'avg_response_time',
+                      'min_response_time', 'max_response_time', 'p50_response_time',
+                      'p90_response_time', 'p95_response_time', 'p99_response_time', 'throughput'):
+            setattr(perf_run, field, summary.get(field))
+    if endpoint_stats is not None:
+        perf_run.endpoint_stats = endpoint_stats
+    if result is not None:
+        perf_run.result = result
+
+    if not perf_run.test_run_id:
+        return
+
+    test_run = db.session.get(TestRun, perf_run.test_run_id)
+    if not test_run:
+        return
+
+    passed = status == 'completed'
+    test_run.status = 'success' if passed else 'failed'
+    test_run.passed = 1 if passed else 0
+    test_run.failed = 0 if passed else 1
+    test_run.duration = perf_run.duration
+    test_run.finished_at = finished_at
+    test_run.error_message = error_message
+    test_run.results = [dict(stat, perf_run_id=perf_run.id) for stat in (perf_run.endpoint_stats or [])]
+
+    scenario_name = test_run.test_object_name or f'场景 #{perf_run.scenario_id}'
+    report = TestReport.query.filter_by(test_run_id=test_run.id, test_type='performance').first()
+    if not report:
+        report = TestReport(test_run_id=test_run.id, project_id=test_run.project_id, test_type='performance')
+        db.session.add(report)
+    report.title = f'{scenario_name} - 性能测试报告'
+    report.status = 'generated'
+    report.summary = {
+        'total': 1,
+        'passed': test_run.passed,
+        'failed': test_run.failed,
+        'success_rate': 100 if passed else 0,
+        'duration': round(perf_run.duration or 0, 2),
+        'perf_run_id': perf_run.id,
+        'metrics': perf_run.metrics_dict(),
+    }
+    report.report_data = {
+        'scenario': {'id': perf_run.scenario_id, 'name': scenario_name},
+        'config': perf_run.config,
+        'metrics': perf_run.metrics_dict(),
+        'endpoint_stats': perf_run.endpoint_stats or [],
+        'failures': (perf_run.result or {}).get('failures', []),
+        'exceptions': (perf_run.result or {}).get('exceptions', []),
+        'trustworthy': (perf_run.result or {}).get('trustworthy', True),
+        'warnings': (perf_run.result or {}).get('warnings', []),
+        'error': error_message,
+    }
+
+
+def _read_csv_rows(path):
+    """使用 csv 模块读取 Locust 输出（名称中可能包含逗号和引号）"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def _group_failures(rows):
+    """按错误信息分组 _failures.csv，统计次数及涉及的接口"""
+    groups = {}
+    for row in rows or []:
+        error = row.get('Error') or ''
+        try:
+            occurrences = int(float(row.get('Occurrences') or 0))
+        except (TypeError, ValueError):
+            occurrences = 0
+        group = groups.setdefault(error, {'error': error, 'occurrences': 0, 'endpoints': []})
+        group['occurrences'] += occurrences
+        group['endpoints'].append({
+            'method': row.get('Method') or '',
+            'name': row.get('Name') or '',
+            'occurrences': occurrences,
+        })
+    for group in groups.values():
+        group['endpoints'].sort(key=lambda e: e['occurrences'], reverse=True)
+    return sorted(groups.values(), key=lambda g: g['occurrences'], reverse=True)
+
+
+def _parse_exceptions(rows):
+    """解析 _exceptions.csv（脚本内抛出的异常）"""
+    exceptions = []
+    for row in rows or []:
+        try:
+            count = int(float(row.get('Count') or 0))
+        except (TypeError, ValueError):
+            count = 0
+        exceptions.append({
+            'message': row.get('Message') or '',
+            'count': count,
+            'traceback': row.get('Traceback') or '',
+        })
+    return sorted(exceptions, key=lambda e: e['count'], reverse=True)
+
+
 def _parse_locust_results(csv_prefix):
-    """解析 Locust CSV 结果"""
+    """解析 Locust CSV 结果（stats / stats_history / failures / exceptions）"""
     results = {}
-    
+
     try:
-        # 读取统计数据
-        stats_file = f'{csv_prefix}_stats.csv'
-        if os.path.exists(stats_file):
-            with open(stats_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                if len(lines) > 1:
-                    headers = lines[0].strip().split(',')
-                    for line in lines[1:]:
-                        values = line.strip().split(',')
-                        if len(values) == len(headers):
-                            row = dict(zip(headers, values))
-                            if row.get('Name') == 'Aggregated':
-                                results['aggregated'] = row
-        
+        # 读取统计数据：Aggregated 行保留原始数据，接口行转换为数值化统计
+        endpoint_stats = []
+        for row in _read_csv_rows(f'{csv_prefix}_stats.csv') or []:
+            if row.get('Name') == 'Aggregated':
+                results['aggregated'] = row
+            else:
+                endpoint_stats.append(_summarize_stats_row(row))
+        results['endpoint_stats'] = endpoint_stats
+
         # 读取历史数据
-        history_file = f'{csv_prefix}_stats_history.csv'
-        if os.path.exists(history_file):
-            results['history'] = []
-            with open(history_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                if len(lines) > 1:
-                    headers = lines[0].strip().split(',')
-                    for line in lines[1:]:
-                        values = line.strip().split(',')
-                        if len(values) == len(headers):
-                            results['history'].append(dict(zip(headers, values)))
-        
+        history = _read_csv_rows(f'{csv_prefix}_stats_history.csv')
+        if history is not None:
+            results['history'] = history
+
+        # 失败与异常明细
+        results['failures'] = _group_failures(_read_csv_rows(f'{csv_prefix}_failures.csv'))
+        results['exceptions'] = _parse_exceptions(_read_csv_rows(f'{csv_prefix}_exceptions.csv'))
+
     except Exception as e:
         results['parse_error'] = str(e)
-    
+
     return results
 
 
+@celery.task(name='tasks.worker_stats')
+def worker_stats_task():
+    """返回执行该任务的 Worker 进程的共享应用启动耗时与连接池状态"""
+    from app.celery_app import worker_stats
+    _get_flask_app()
+    return worker_stats()
+
+
 @celery.task(name='tasks.cleanup_old_results')
 def cleanup_old_results_task():
     """
@@ -464,10 +1649,26 @@ def cleanup_old_results_task():
 
             db.session.commit()
 
+            # 清理过期的 Web 测试产物
+            from app.utils.artifact_store import get_artifact_store
+            artifact_settings = current_app.config['WEB_ARTIFACTS']
+            artifacts = get_artifact_store(artifact_settings).apply_retention(artifact_settings['retention_days'])
+
+            # 清理过期的子进程日志
+            from app.utils.log_capture import cleanup_logs
+            logs = cleanup_logs(current_app.config['LOG_CAPTURE'])
+
+            # 清理长期未使用的 Web 测试网络缓存
+            from app.utils.network_profile import prune_cache
+            network_cache = prune_cache(current_app.config['WEB_NETWORK_CACHE'])
+
             return {
                 'success': True,
                 'cleaned_scripts': len(old_scripts),
-                'cleaned_scenarios': len(old_scenarios)
+                'cleaned_scenarios': len(old_scenarios),
+                'cleaned_artifacts': artifacts,
+                'cleaned_logs': logs,
+                'cleaned_network_cache': network_cache
             }
 
         except Exception as e:
@@ -0,0 +1,266 @@
+"""
+Web 测试产物存储
+
+每次执行 Web 脚本时脚本在独立的工作目录中运行，执行结束后收集其中的产物（截图、Playwright Trace、
+录屏视频、HAR 等），按内容寻址存储到 REPORT_FOLDER/artifacts：
+
+    objects/<sha256 前 2 位>/<sha256 其余部分>[.gz]   产物内容，相同内容只保存一份
+    refs/<run_key>.json                              一次执行产生的产物清单（所属用户、脚本、文件名）
+    refs/script_<id>_baselines.json                  脚本的视觉回归基线（pinned，见 visual_baseline.py）
+
+- HAR、JSON、日志等文本类产物使用 gzip 压缩保存（压缩收益不足 10% 时保存原文件）；
+  图片、视频、Trace（zip）本身已压缩，直接保存
+- 保留策略按清单的创建时间删除过期清单，再清理不再被任何清单引用的对象（标记-清除）
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+RUN_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+$')
+COMPRESSIBLE = {'.har', '.json', '.txt', '.log', '.html', '.htm', '.svg', '.xml', '.csv', '.md'}
+KINDS = {
+    '.png': 'screenshot', '.jpg': 'screenshot', '.jpeg': 'screenshot', '.webp': 'screenshot',
+    '.webm': 'video', '.mp4': 'video',
+    '.zip': 'trace',
+    '.har': 'har',
+}
+# 清理时不删除最近写入的对象：写入对象与写入清单之间存在时间差
+GC_GRACE_SECONDS = 3600
+
+
+def artifact_kind(name: str) -> str:
+    return KINDS.get(os.path.splitext(name)[1].lower(), 'other')
+
+
+def new_run_key(script_id) -> str:
+    """一次执行的产物标识，以脚本 ID 开头便于删除脚本时清理"""
+    return f'script_{script_id}_{time.strftime("%Y%m%d%H%M%S")}_{uuid.uuid4().hex[:8]}'
+
+
+class ArtifactStore:
+    """
+    内容寻址的产物存储
+
+    Example:
+        store = ArtifactStore('/path/reports/artifacts')
+        artifacts, warnings = store.collect(work_dir, run_key, {'user_id': 1, 'script_id': 3})
+        ref = store.load_ref(run_key)
+        with store.open(ref['artifacts'][0]) as f:
+            ...
+    """
+
+    def __init__(self, root: str, compress: bool = True, max_file_size: Optional[int] = None,
+                 max_files: Optional[int] = None):
+        self.root = root
+        self.compress = compress
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.objects_dir = os.path.join(root, 'objects')
+        self.refs_dir = os.path.join(root, 'refs')
+
+    # ---------- 对象 ----------
+
+    def _object_path(self, sha256: str, compressed: bool) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256[2:] + ('.gz' if compressed else ''))
+
+    def _existing(self, sha256: str) -> Optional[Tuple[str, bool]]:
+        for compressed in (False, True):
+            path = self._object_path(sha256, compressed)
+            if os.path.exists(path):
+                return path, compressed
+        return None
+
+    def put(self, path: str) -> Dict[str, Any]:
+        """
+        保存一个文件，内容已存在时只更新其修改时间
+
+        Returns:
+            {'sha256', 'size', 'stored_size', 'compressed', 'deduplicated'}
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+
+        existing = self._existing(sha256)
+        if existing:
+            os.utime(existing[0])
+            return {'sha256': sha256, 'size': size, 'stored_size': os.path.getsize(existing[0]),
+                    'compressed': existing[1], 'deduplicated': True}
+
+        os.makedirs(os.path.dirname(self._object_path(sha256, False)), exist_ok=True)
+        tmp = self._object_path(sha256, False) + f'.{uuid.uuid4().hex}.tmp'
+        compressed = self.compress and os.path.splitext(path)[1].lower() in COMPRESSIBLE and size > 0
+        try:
+            if compressed:
+                with open(path, 'rb') as src, gzip.open(tmp, 'wb', compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                if os.path.getsize(tmp) > size * 0.9:
+                    compressed = False
+            if not compressed:
+                shutil.copyfile(path, tmp)
+            final = self._object_path(sha256, compressed)
+            os.replace(tmp, final)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return {'sha256': sha256, 'size': size, 'stored_size': os.path.getsize(final),
+                'compressed': compressed, 'deduplicated': False}
+
+    def open(self, artifact: Dict[str, Any]):
+        """以只读二进制方式打开产物（压缩对象透明解压，支持向后 seek）"""
+        existing = self._existing(artifact['sha256'])
+        if not existing:
+            raise FileNotFoundError(artifact['sha256'])
+        path, compressed = existing
+        return gzip.open(path, 'rb') if compressed else open(path, 'rb')
+
+    # ---------- 清单 ----------
+
+    def _ref_path(self, run_key: str) -> str:
+        if not RUN_KEY_PATTERN.match(run_key or ''):
+            raise ValueError(f'非法的产物标识: {run_key}')
+        return os.path.join(self.refs_dir, f'{run_key}.json')
+
+    def collect(self, work_dir: str, run_key: str, owner: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        收集工作目录中的全部文件并写入清单
+
+        Args:
+            work_dir: 脚本的工作目录
+            run_key: 本次执行的产物标识
+            owner: 写入清单的归属信息（user_id、script_id 等）
+
+        Returns:
+            (artifacts, warnings)
+        """
+        artifacts, warnings = [], []
+        if not os.path.isdir(work_dir):
+            return artifacts, warnings
+        files = []
+        for dirpath, dirnames, filenames in os.walk(work_dir):
+            dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                if os.path.isfile(path) and not os.path.islink(path):
+                    files.append(path)
+
+        for path in files:
+            name = os.path.relpath(path, work_dir).replace(os.sep, '/')
+            if self.max_files is not None and len(artifacts) >= self.max_files:
+                warnings.append(f'产物数量超过 {self.max_files} 个，其余 {len(files) - len(artifacts)} 个未保存')
+                break
+            size = os.path.getsize(path)
+            if self.max_file_size is not None and size > self.max_file_size:
+                warnings.append(f'{name} 大小 {size} 字节超过上限 {self.max_file_size}，未保存')
+                continue
+            info = self.put(path)
+            artifacts.append(dict(
+                info,
+                name=name,
+                kind=artifact_kind(name),
+                content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+            ))
+
+        if artifacts:
+            self.save_ref(dict(owner, run_key=run_key, created_at=time.time(), artifacts=artifacts))
+        return artifacts, warnings
+
+    def save_ref(self, ref: Dict[str, Any]):
+        """写入清单（原子替换）；pinned 为 true 的清单不受保留天数影响"""
+        os.makedirs(self.refs_dir, exist_ok=True)
+        path = self._ref_path(ref['run_key'])
+        tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(ref, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def load_ref(self, run_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._ref_path(run_key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _iter_refs(self):
+        if not os.path.isdir(self.refs_dir):
+            return
+        for filename in os.listdir(self.refs_dir):
+            if filename.endswith('.json'):
+                yield os.path.join(self.refs_dir, filename)
+
+    def remove_refs(self, prefix: str) -> int:
+        """删除以 prefix 开头的清单（如删除脚本时），对象由 gc() 清理"""
+        removed = 0
+        for path in list(self._iter_refs()):
+            if os.path.basename(path).startswith(prefix):
+                os.remove(path)
+                removed += 1
+        return removed
+
+    # ---------- 保留策略 ----------
+
+    def gc(self, grace_seconds: float = GC_GRACE_SECONDS) -> Dict[str, int]:
+        """删除不再被任何清单引用的对象"""
+        referenced = set()
+        for path in self._iter_refs():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    referenced.update(a['sha256'] for a in json.load(f).get('artifacts', []))
+            except (OSError, ValueError, KeyError):
+                # 无法解析的清单：保守起见本次不清理任何对象
+                return {'objects_removed': 0, 'bytes_freed': 0}
+
+        removed = freed = 0
+        now = time.time()
+        if not os.path.isdir(self.objects_dir):
+            return {'objects_removed': 0, 'bytes_freed': 0}
+        for prefix in os.listdir(self.objects_dir):
+            directory = os.path.join(self.objects_dir, prefix)
+            for filename in os.listdir(directory):
+                path = os.path.join(directory, filename)
+                sha256 = prefix + filename.split('.', 1)[0]
+                if sha256 in referenced or now - os.path.getmtime(path) < grace_seconds:
+                    continue
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+            if not os.listdir(directory):
+                os.rmdir(directory)
+        return {'objects_removed': removed, 'bytes_freed': freed}
+
+    def apply_retention(self, retention_days: float, grace_seconds: float = GC_GRACE_SECONDS) -> Dict[str, int]:
+        """删除超过 retention_days 天的清单（pinned 清单除外）并清理无引用的对象"""
+        cutoff = time.time() - retention_days * 86400
+        refs_removed = 0
+        for path in list(self._iter_refs()):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    ref = json.load(f)
+                if ref.get('pinned'):
+                    continue
+                created_at = ref.get('created_at', 0)
+            except (OSError, ValueError):
+                created_at = os.path.getmtime(path)
+            if created_at < cutoff:
+                os.remove(path)
+                refs_removed += 1
+        return dict(self.gc(grace_seconds), refs_removed=refs_removed)
+
+
+def get_artifact_store(settings: Dict[str, Any]) -> ArtifactStore:
+    """按 WEB_ARTIFACTS 配置创建产物存储"""
+    return ArtifactStore(settings['folder'], compress=settings.get('compress', True),
+                         max_file_size=settings.get('max_file_size'), max_files=settings.get('max_files'))
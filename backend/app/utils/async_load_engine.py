@@ -0,0 +1,533 @@
+"""
+轻量级 asyncio 压测引擎
+
+面向单接口场景的压测引擎，作为 Locust 的替代方案在子进程中运行：
+- 基于 asyncio 原生连接（HTTP/1.1 keep-alive），不依赖 gevent / requests
+- 配置 target_rps / arrival_stages 时为开环模型（按计划到达时间发送请求，并统计修正协调遗漏后的延迟），
+  否则为闭环模型（user_count 个并发循环）
+- 支持多进程（进程数不超过并发数，并发数按进程均分，余数分给前几个进程），各进程的直方图在主进程中精确合并
+- 收到 SIGTERM（SLO 中止、用户停止）时通知各进程停止，取消在途请求后上报最终数据，再写出结果
+- 输出与 Locust 相同格式的 _stats.csv / _stats_history.csv / _failures.csv，
+  实时监控和结果解析逻辑与 Locust 路径共用
+
+用法：python async_load_engine.py <config.json>
+
+本模块只依赖标准库，运行时与 latency_histogram.py / open_workload.py / raw_samples.py 一起复制到压测运行目录。
+"""
+
+import asyncio
+import csv
+import json
+import multiprocessing
+import queue
+import signal
+import ssl
+import sys
+import time
+from urllib.parse import urlsplit
+
+try:
+    from .latency_histogram import LatencyHistogram, WindowedHistogram, merge_serialized
+    from .open_workload import ArrivalSchedule, OpenWorkloadStats
+    from .raw_samples import SampleWriter
+except ImportError:  # 作为独立脚本运行时
+    from latency_histogram import LatencyHistogram, WindowedHistogram, merge_serialized
+    from open_workload import ArrivalSchedule, OpenWorkloadStats
+    from raw_samples import SampleWriter
+
+
+REPORT_INTERVAL = 1.0
+WINDOW_SECONDS = 10
+
+# 开环模式下等待连接的请求上限（相对连接数的倍数），超出的到达记为丢弃
+MAX_PENDING_FACTOR = 10
+# 各进程检查停止信号的间隔（秒）
+STOP_POLL_INTERVAL = 0.1
+# 通知停止后等待各进程上报最终数据的秒数
+STOP_GRACE = 5
+
+STATS_PERCENTILES = (50, 66, 75, 80, 90, 95, 98, 99, 99.9, 99.99, 100)
+
+STATS_HEADERS = [
+    'Type', 'Name', 'Request Count', 'Failure Count', 'Median Response Time',
+    'Average Response Time', 'Min Response Time', 'Max Response Time',
+    'Average Content Size', 'Requests/s', 'Failures/s',
+    '50%', '66%', '75%', '80%', '90%', '95%', '98%', '99%', '99.9%', '99.99%', '100%',
+]
+
+HISTORY_HEADERS = [
+    'Timestamp', 'User Count', 'Type', 'Name', 'Requests/s', 'Failures/s',
+    '50%', '66%', '75%', '80%', '90%', '95%', '98%', '99%', '99.9%', '99.99%', '100%',
+    'Total Request Count', 'Total Failure Count', 'Total Median Response Time',
+    'Total Average Response Time', 'Total Min Response Time', 'Total Max Response Time',
+    'Total Average Content Size',
+]
+
+
+# ==================== HTTP 客户端 ====================
+
+class _RequestTemplate:
+    """预先构建好的请求报文"""
+
+    def __init__(self, url, method='GET', headers=None, body=None):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or (443 if self.scheme == 'https' else 80)
+        self.method = method.upper()
+        self.path = parts.path or '/'
+        target = self.path + (f'?{parts.query}' if parts.query else '')
+
+        payload = b''
+        headers = {str(k): str(v) for k, v in (headers or {}).items()}
+        lower_keys = {k.lower() for k in headers}
+        if body is not None and self.method not in ('GET', 'HEAD'):
+            if isinstance(body, (dict, list)):
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                if 'content-type' not in lower_keys:
+                    headers['Content-Type'] = 'application/json'
+            else:
+                payload = str(body).encode('utf-8')
+        if 'host' not in lower_keys:
+            default_port = 443 if self.scheme == 'https' else 80
+            headers['Host'] = self.host if self.port == default_port else f'{self.host}:{self.port}'
+        if payload or self.method in ('POST', 'PUT', 'PATCH'):
+            headers['Content-Length'] = str(len(payload))
+        headers.setdefault('User-Agent', 'easytest-async-engine')
+        headers.setdefault('Connection', 'keep-alive')
+
+        head = f'{self.method} {target} HTTP/1.1\r\n' + ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+        self.raw = (head + '\r\n').encode('latin-1') + payload
+
+
+async def _read_response(reader, method):
+    """读取一个 HTTP/1.1 响应，返回 (状态码, 响应体大小, 是否保持连接)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('连接已被服务端关闭')
+    status = int(status_line.split(None, 2)[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.partition(b':')
+        headers[key.strip().lower()] = value.strip()
+
+    connection = headers.get(b'connection', b'').lower()
+    if status_line.startswith(b'HTTP/1.0'):
+        keep_alive = connection == b'keep-alive'
+    else:
+        keep_alive = connection != b'close'
+    size = 0
+    if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+        pass
+    elif b'content-length' in headers:
+        size = int(headers[b'content-length'])
+        await reader.readexactly(size)
+    elif headers.get(b'transfer-encoding', b'').lower() == b'chunked':
+        while True:
+            chunk_size = int((await reader.readline()).split(b';')[0], 16)
+            if chunk_size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            await reader.readexactly(chunk_size + 2)
+            size += chunk_size
+    else:
+        size = len(await reader.read())
+        keep_alive = False
+    return status, size, keep_alive
+
+
+class _ConnectionPool:
+    """简单的 keep-alive 连接池"""
+
+    def __init__(self, template, max_connections, timeout):
+        self.template = template
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.idle = asyncio.LifoQueue()
+        self.opened = 0
+        self.ssl_context = ssl.create_default_context() if template.scheme == 'https' else None
+
+    async def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        if self.opened < self.max_connections:
+            self.opened += 1
+            try:
+                return await asyncio.wait_for(asyncio.open_connection(
+                    self.template.host, self.template.port, ssl=self.ssl_context
+                ), self.timeout)
+            except BaseException:
+                self.opened -= 1
+                raise
+        return await self.idle.get()
+
+    def release(self, conn, reusable):
+        if reusable:
+            self.idle.put_nowait(conn)
+        else:
+            self.opened -= 1
+            try:
+                conn[1].close()
+            except Exception:
+                pass
+
+    async def request(self):
+        """发送一次请求，返回 (状态码, 响应体大小, 实际发送时间 time.monotonic())"""
+        conn = await self.acquire()
+        sent_at = time.monotonic()
+        try:
+            reader, writer = conn
+            writer.write(self.template.raw)
+            status, size, keep_alive = await asyncio.wait_for(
+                _read_response(reader, self.template.method), self.timeout
+            )
+        except BaseException:
+            self.release(conn, False)
+            raise
+        self.release(conn, keep_alive)
+        return status, size, sent_at
+
+
+# ==================== 压测进程 ====================
+
+class _WorkerStats:
+    """单个压测进程的统计数据"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.window = WindowedHistogram(window_seconds=WINDOW_SECONDS)
+        self.requests = 0
+        self.failures = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.errors = {}
+        self.open_workload = None
+
+    def record(self, latency_ms, size, error=None):
+        self.requests += 1
+        self.bytes += size
+        self.histogram.record(latency_ms)
+        self.window.record(latency_ms, error is None)
+        if error is not None:
+            self.failures += 1
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def report(self, index, done=False):
+        window_hist, window_failures = self.window.snapshot()
+        return {
+            'index': index,
+            'done': done,
+            'requests': self.requests,
+            'failures': self.failures,
+            'bytes': self.bytes,
+            'dropped': self.dropped,
+            'errors': dict(self.errors),
+            'histogram': self.histogram.to_dict(),
+            'window': window_hist.to_dict(),
+            'window_failures': window_failures,
+            'open_workload': self.open_workload.to_dict() if self.open_workload else None,
+        }
+
+
+def worker_users(concurrency, processes, index):
+    """第 index 个进程的并发数：按进程均分，前 concurrency % processes 个进程各多 1 个"""
+    return concurrency // processes + (1 if index < concurrency % processes else 0)
+
+
+async def _run_worker(index, config, report_queue, stop):
+    template = _RequestTemplate(config['url'], config.get('method', 'GET'),
+                                config.get('headers'), config.get('body'))
+    processes = max(1, int(config.get('processes') or 1))
+    concurrency = worker_users(max(1, int(config.get('concurrency') or 1)), processes, index)
+    timeout = float(config.get('timeout') or 30)
+    pool = _ConnectionPool(template, concurrency, timeout)
+    stats = _WorkerStats()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + float(config['duration'])
+
+    # 原始样本：每个进程写一个文件，时间戳由单调时钟换算为 Unix 时间
+    samples = None
+    if config.get('raw_samples'):
+        samples = SampleWriter(f"{config['csv_prefix']}_samples_{index}.bin", source='asyncio')
+        wall_offset = time.time() - time.monotonic()
+
+    async def one_request(intended=None):
+        start = time.monotonic()
+        sent_at = None
+        status = 0
+        try:
+            status, size, sent_at = await pool.request()
+            error = f'HTTP {status}' if status >= 400 else None
+        except asyncio.TimeoutError:
+            size, error = 0, 'TimeoutError: 请求超时'
+        except Exception as e:
+            size, error = 0, f'{type(e).__name__}: {e}'
+        end = time.monotonic()
+        sent_at = sent_at or start
+        stats.record((end - sent_at) * 1000, size, error)
+        if samples:
+            samples.record(wall_offset + sent_at, template.method, template.path, (end - sent_at) * 1000,
+                           status, size, error is not None)
+        if intended is not None:
+            # 等待连接的时间也计入调度滞后：corrected = 从计划发送时间到响应完成
+            stats.open_workload.record_started(intended, sent_at)
+            stats.open_workload.record_response((end - sent_at) * 1000, (sent_at - intended) * 1000)
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            report_queue.put(stats.report(index))
+            if samples:
+                samples.flush()
+
+    async def stopped():
+        while not stop.is_set():
+            await asyncio.sleep(STOP_POLL_INTERVAL)
+
+    reporter_task = asyncio.create_task(reporter())
+    pending = set()
+
+    target_rps = config.get('target_rps')
+    arrival_stages = config.get('arrival_stages')
+    if target_rps or arrival_stages:
+        # 开环模型：按计划到达时间发送，不等待前一个请求完成
+        start = loop.time()
+        schedule = ArrivalSchedule(start, target_rps, arrival_stages, share=1.0 / processes)
+        stats.open_workload = OpenWorkloadStats(start, target_rps, arrival_stages)
+        max_pending = concurrency * MAX_PENDING_FACTOR
+
+        async def generate():
+            while schedule.next_at < deadline:
+                now = loop.time()
+                while schedule.next_at <= now and schedule.next_at < deadline:
+                    intended = schedule.claim()
+                    stats.open_workload.record_scheduled(intended)
+                    if len(pending) >= max_pending:
+                        stats.dropped += 1
+                        stats.open_workload.record_dropped(intended)
+                    else:
+                        task = asyncio.create_task(one_request(intended))
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
+                await asyncio.sleep(max(0.0, schedule.next_at - loop.time()))
+            if pending:
+                await asyncio.wait(pending, timeout=timeout)
+    else:
+        # 闭环模型：concurrency 个并发循环
+        async def user_loop():
+            while loop.time() < deadline:
+                await one_request()
+
+        async def generate():
+            await asyncio.gather(*(user_loop() for _ in range(concurrency)))
+
+    # 收到停止信号时取消发送与在途请求（未完成的请求不计入统计），随后上报已完成的请求
+    work, watcher = asyncio.create_task(generate()), asyncio.create_task(stopped())
+    await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    for task in (work, watcher, *pending):
+        task.cancel()
+    await asyncio.gather(work, watcher, *pending, return_exceptions=True)
+    reporter_task.cancel()
+    if samples:
+        samples.close()
+    report_queue.put(stats.report(index, done=True))
+
+
+def _worker_main(index, config, report_queue, stop):
+    # 停止由主进程统一协调：SIGTERM 只设置停止标志，Ctrl+C 由主进程处理
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_run_worker(index, config, report_queue, stop))
+
+
+# ==================== 主进程：汇总与输出 ====================
+
+def _fmt(value):
+    return f'{value:.6f}' if isinstance(value, float) else value
+
+
+def _percentile_cells(hist):
+    if not hist.count:
+        return ['N/A'] * len(STATS_PERCENTILES)
+    return [round(hist.percentile(p)) for p in STATS_PERCENTILES]
+
+
+class _Aggregator:
+    """合并各进程上报的数据并写出 Locust 格式的 CSV"""
+
+    def __init__(self, config):
+        self.config = config
+        self.method = config.get('method', 'GET').upper()
+        self.name = urlsplit(config['url']).path or '/'
+        self.reports = {}
+        self.started = time.time()
+        self.users = int(config.get('concurrency') or 1)
+
+    def update(self, report):
+        self.reports[report['index']] = report
+
+    def totals(self):
+        reports = list(self.reports.values())
+        hist = merge_serialized(r['histogram'] for r in reports)
+        window = merge_serialized(r['window'] for r in reports)
+        errors = {}
+        for r in reports:
+            for msg, count in r['errors'].items():
+                errors[msg] = errors.get(msg, 0) + count
+        return {
+            'histogram': hist,
+            'window': window,
+            'requests': sum(r['requests'] for r in reports),
+            'failures': sum(r['failures'] for r in reports),
+            'bytes': sum(r['bytes'] for r in reports),
+            'dropped': sum(r['dropped'] for r in reports),
+            'window_failures': sum(r['window_failures'] for r in reports),
+            'errors': errors,
+        }
+
+    def _history_rows(self, totals):
+        elapsed = max(time.time() - self.started, 1e-6)
+        window_seconds = min(WINDOW_SECONDS, max(elapsed, 1.0))
+        hist = totals['histogram']
+        avg_size = totals['bytes'] / totals['requests'] if totals['requests'] else 0
+        row = [
+            int(time.time()), self.users, '', 'Aggregated',
+            _fmt(totals['window'].count / window_seconds),
+            _fmt(totals['window_failures'] / window_seconds),
+            *_percentile_cells(totals['window']),
+            totals['requests'], totals['failures'],
+            round(hist.percentile(50)) if hist.count else 0,
+            hist.mean, hist.min, hist.max, avg_size,
+        ]
+        endpoint_row = list(row)
+        endpoint_row[2], endpoint_row[3] = self.method, self.name
+        return [endpoint_row, row]
+
+    def write_history(self, prefix, header=False):
+        totals = self.totals()
+        with open(f'{prefix}_stats_history.csv', 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if header:
+                writer.writerow(HISTORY_HEADERS)
+            writer.writerows(self._history_rows(totals))
+
+    def write_final(self, prefix):
+        totals = self.totals()
+        hist = totals['histogram']
+        elapsed = max(time.time() - self.started, 1e-6)
+        avg_size = totals['bytes'] / totals['requests'] if totals['requests'] else 0
+        row = [
+            self.method, self.name, totals['requests'], totals['failures'],
+            round(hist.percentile(50)) if hist.count else 0,
+            hist.mean, hist.min, hist.max, avg_size,
+            _fmt(totals['requests'] / elapsed), _fmt(totals['failures'] / elapsed),
+            *_percentile_cells(hist),
+        ]
+        with open(f'{prefix}_stats.csv', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(STATS_HEADERS)
+            writer.writerow(row)
+            writer.writerow(['', 'Aggregated'] + row[2:])
+
+        with open(f'{prefix}_failures.csv', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Method', 'Name', 'Error', 'Occurrences'])
+            for error, count in sorted(totals['errors'].items(), key=lambda x: -x[1]):
+                writer.writerow([self.method, self.name, error, count])
+
+        open_workload = [r['open_workload'] for r in self.reports.values() if r.get('open_workload')]
+        if open_workload:
+            with open(f'{prefix}_open_workload.json', 'w', encoding='utf-8') as f:
+                json.dump({'processes': open_workload}, f)
+
+        with open(f'{prefix}_engine.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'engine': 'asyncio',
+                'processes': len(self.reports),
+                'dropped': totals['dropped'],
+                'histogram': hist.to_dict(),
+            }, f)
+        return totals
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+
+def _receive(report_queue, aggregator, finished, workers):
+    """读取一条上报，返回 False 表示没有待读取的上报且各进程都已退出"""
+    try:
+        report = report_queue.get(timeout=0.2)
+    except queue.Empty:
+        return any(w.is_alive() for w in workers)
+    aggregator.update(report)
+    if report['done']:
+        finished.add(report['index'])
+    return True
+
+
+def run(config):
+    """运行压测，返回进程退出码（存在失败请求时返回 1，与 Locust 保持一致）"""
+    # 收到 SIGTERM 时提前结束，但仍写出已收集的统计数据
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    prefix = config['csv_prefix']
+    concurrency = max(1, int(config.get('concurrency') or 1))
+    processes = min(max(1, int(config.get('processes') or 1)), concurrency)
+    config = dict(config, processes=processes)
+    timeout = float(config.get('timeout') or 30)
+    report_queue = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    workers = [
+        multiprocessing.Process(target=_worker_main, args=(i, config, report_queue, stop), daemon=True)
+        for i in range(processes)
+    ]
+    aggregator = _Aggregator(config)
+    for worker in workers:
+        worker.start()
+
+    finished = set()
+    deadline = time.time() + float(config['duration']) + timeout + 10
+    next_flush = time.time() + REPORT_INTERVAL
+    first_flush = True
+    try:
+        while len(finished) < processes and time.time() < deadline:
+            if not _receive(report_queue, aggregator, finished, workers):
+                break
+            if time.time() >= next_flush and aggregator.reports:
+                aggregator.write_history(prefix, header=first_flush)
+                first_flush = False
+                next_flush += REPORT_INTERVAL
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # 通知各进程停止，读取它们的最终上报后再结束（重复的 SIGTERM 不再打断）
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        stop.set()
+        drain_deadline = time.time() + STOP_GRACE
+        while len(finished) < processes and time.time() < drain_deadline:
+            if not _receive(report_queue, aggregator, finished, workers):
+                break
+        for worker in workers:
+            worker.join(timeout=2)
+            if worker.is_alive():
+                worker.terminate()
+
+    if aggregator.reports:
+        aggregator.write_history(prefix, header=first_flush)
+    totals = aggregator.write_final(prefix)
+    print(f"[async-engine] requests={totals['requests']} failures={totals['failures']} "
+          f"dropped={totals['dropped']} processes={processes}")
+    return 1 if totals['failures'] else 0
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        engine_config = json.load(f)
+    sys.exit(run(engine_config))
@@ -0,0 +1,352 @@
+"""
+Web 测试浏览器池
+
+每个 Worker 进程常驻若干 Playwright 浏览器服务（playwright launch-server），按浏览器类型与是否无头分组；
+脚本子进程通过 WebSocket 地址 connect() 到已启动的浏览器，只需新建上下文，省去每次冷启动浏览器的开销：
+- 每个浏览器服务累计创建 max_contexts 个上下文后回收重启，避免长时间运行的浏览器内存膨胀
+- 浏览器服务进程退出或脚本连接失败时视为崩溃，立即替换
+- Worker 进程退出时关闭全部浏览器服务（fork 出的子进程不会接管父进程的浏览器）
+- 启动浏览器服务在锁外进行，慢启动不阻塞其他执行获取或归还已启动的服务
+
+脚本端的连接逻辑见 web_runtime.py。
+"""
+
+import atexit
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+BROWSERS = ('chromium', 'firefox', 'webkit')
+
+
+class BrowserPoolError(Exception):
+    """浏览器服务启动失败"""
+
+
+class BrowserServer:
+    """一个常驻的 Playwright 浏览器服务进程"""
+
+    def __init__(self, browser: str, headless: bool = True, launch_timeout: float = 30):
+        self.browser = browser
+        self.headless = headless
+        self.launch_timeout = launch_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.ws_endpoint: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.launch_ms: Optional[float] = None
+        self.contexts = 0
+        self.runs = 0
+        self.active = 0
+        self.retiring = False
+        self._log_path: Optional[str] = None
+        self._config_path: Optional[str] = None
+
+    def _command(self) -> List[str]:
+        return [sys.executable, '-m', 'playwright', 'launch-server',
+                '--browser', self.browser, '--config', self._config_path]
+
+    def start(self):
+        """启动浏览器服务，等待其输出 WebSocket 地址"""
+        fd, self._config_path = tempfile.mkstemp(prefix=f'easytest_{self.browser}_', suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'headless': bool(self.headless)}, f)
+        fd, self._log_path = tempfile.mkstemp(prefix=f'easytest_{self.browser}_', suffix='.log')
+        os.close(fd)
+
+        started = time.perf_counter()
+        with open(self._log_path, 'wb') as log:
+            kwargs = {'start_new_session': True} if os.name != 'nt' else {}
+            self.process = subprocess.Popen(self._command(), stdin=subprocess.DEVNULL,
+                                            stdout=log, stderr=subprocess.STDOUT, **kwargs)
+
+        deadline = time.monotonic() + self.launch_timeout
+        while time.monotonic() < deadline:
+            endpoint = self._read_endpoint()
+            if endpoint:
+                self.ws_endpoint = endpoint
+                self.started_at = time.time()
+                self.launch_ms = round((time.perf_counter() - started) * 1000, 2)
+                return self
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.05)
+
+        exited = self.process.poll() is not None
+        output = self._read_log()[-2000:].strip()
+        self.stop()
+        if exited:
+            raise BrowserPoolError(f'{self.browser} 浏览器服务启动失败: {output}')
+        raise BrowserPoolError(f'{self.browser} 浏览器服务 {self.launch_timeout:g} 秒内未就绪: {output}')
+
+    def _read_log(self) -> str:
+        try:
+            with open(self._log_path, 'rb') as f:
+                return f.read().decode('utf-8', errors='replace')
+        except (OSError, TypeError):
+            return ''
+
+    def _read_endpoint(self) -> Optional[str]:
+        for line in self._read_log().splitlines():
+            line = line.strip()
+            if line.startswith(('ws://', 'wss://')):
+                return line
+        return None
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        """关闭浏览器服务及其派生的浏览器进程"""
+        process = self.process
+        if process is not None and process.poll() is None:
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(process.pid, signal.SIGTERM)
+                else:
+                    process.terminate()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                try:
+                    if hasattr(os, 'killpg'):
+                        os.killpg(process.pid, signal.SIGKILL)
+                    else:
+                        process.kill()
+                    process.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+        for path in (self._config_path, self._log_path):
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'browser': self.browser,
+            'headless': self.headless,
+            'pid': self.process.pid if self.process else None,
+            'alive': self.alive(),
+            'started_at': self.started_at,
+            'launch_ms': self.launch_ms,
+            'contexts': self.contexts,
+            'runs': self.runs,
+            'active': self.active,
+            'retiring': self.retiring,
+        }
+
+
+class Lease:
+    """一次脚本执行对浏览器服务的占用"""
+
+    def __init__(self, pool: 'BrowserPool', server: BrowserServer, warm: bool):
+        self.pool = pool
+        self.server = server
+        self.warm = warm
+        self.ws_endpoint = server.ws_endpoint
+        self.released = False
+
+    def release(self, contexts: int = 1, crashed: bool = False):
+        if not self.released:
+            self.released = True
+            self.pool.release(self, contexts=contexts, crashed=crashed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'browser': self.server.browser,
+            'warm': self.warm,
+            'server_pid': self.server.process.pid if self.server.process else None,
+            'server_runs': self.server.runs,
+            'server_contexts': self.server.contexts,
+            'launch_ms': None if self.warm else self.server.launch_ms,
+        }
+
+
+class BrowserPool:
+    """
+    按 (浏览器, 是否无头) 分组的浏览器服务池
+
+    Example:
+        pool = BrowserPool({'max_contexts': 50})
+        lease = pool.acquire('chromium', headless=True)
+        ...  # 脚本子进程连接 lease.ws_endpoint
+        lease.release(contexts=2)
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.max_contexts = max(1, int(settings.get('max_contexts') or 50))
+        self.servers_per_browser = max(1, int(settings.get('servers_per_browser') or 1))
+        self.launch_timeout = float(settings.get('launch_timeout') or 30)
+        self._servers: Dict[tuple, List[BrowserServer]] = {}
+        # 正在启动的浏览器服务数：启动耗时可达 launch_timeout，在锁外进行，先在锁内预留名额
+        self._launching: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        self._launched = threading.Condition(self._lock)
+        self._closed = False
+        self.counters = {'launches': 0, 'reuses': 0, 'recycles': 0, 'crashes': 0}
+
+    def _unreserve(self, key: tuple):
+        """释放预留的启动名额（调用方持有锁）"""
+        self._launching[key] -= 1
+        self._launched.notify_all()
+
+    def _launch(self, key: tuple) -> BrowserServer:
+        """在锁外启动已预留名额的浏览器服务，失败时释放名额"""
+        try:
+            return BrowserServer(key[0], key[1], self.launch_timeout).start()
+        except BaseException:
+            with self._lock:
+                self._unreserve(key)
+            raise
+
+    def _publish(self, key: tuple, server: BrowserServer):
+        """把启动完成的浏览器服务加入池中（调用方持有锁）"""
+        self._unreserve(key)
+        if self._closed:
+            server.stop()
+            raise BrowserPoolError('浏览器池已关闭')
+        self._servers.setdefault(key, []).append(server)
+        self.counters['launches'] += 1
+
+    def _prune(self, servers: List[BrowserServer]):
+        for server in list(servers):
+            if not server.alive():
+                servers.remove(server)
+                server.stop()
+                self.counters['crashes'] += 1
+            elif server.retiring and server.active == 0:
+                servers.remove(server)
+                server.stop()
+                self.counters['recycles'] += 1
+
+    def _lease(self, server: BrowserServer) -> Lease:
+        warm = server.runs > 0
+        if warm:
+            self.counters['reuses'] += 1
+        server.runs += 1
+        server.active += 1
+        return Lease(self, server, warm)
+
+    def acquire(self, browser: str, headless: bool = True) -> Lease:
+        """
+        获取一个可用的浏览器服务（没有空闲服务时启动新的）
+
+        Raises:
+            BrowserPoolError: 浏览器服务启动失败
+        """
+        if browser not in BROWSERS:
+            raise BrowserPoolError(f'不支持的浏览器: {browser}')
+        key = (browser, bool(headless))
+        with self._lock:
+            while True:
+                servers = self._servers.setdefault(key, [])
+                self._prune(servers)
+                candidates = [s for s in servers if not s.retiring]
+                launching = self._launching.get(key, 0)
+                if len(candidates) + launching < self.servers_per_browser and all(s.active for s in candidates):
+                    self._launching[key] = launching + 1
+                    break
+                if candidates:
+                    return self._lease(min(candidates, key=lambda s: (s.active, s.contexts)))
+                # 名额已满且都在启动中：等待启动完成（或失败后释放名额）
+                self._launched.wait()
+
+        server = self._launch(key)
+        with self._lock:
+            self._publish(key, server)
+            return self._lease(server)
+
+    def release(self, lease: Lease, contexts: int = 1, crashed: bool = False):
+        """归还浏览器服务；达到上下文上限的服务在空闲后回收，崩溃的服务立即替换"""
+        server = lease.server
+        with self._lock:
+            server.active = max(0, server.active - 1)
+            server.contexts += max(0, int(contexts or 0))
+            servers = self._servers.get((server.browser, server.headless), [])
+            if crashed and server.alive():
+                # 进程仍在但脚本连接失败：浏览器已不可用
+                server.stop()
+            if server.contexts >= self.max_contexts:
+                server.retiring = True
+            self._prune(servers)
+
+    def prewarm(self, browsers, headless: bool = True) -> List[str]:
+        """预先启动浏览器服务，返回启动失败的信息"""
+        errors = []
+        for browser in browsers:
+            key = (browser, bool(headless))
+            with self._lock:
+                servers = self._servers.setdefault(key, [])
+                self._prune(servers)
+                if self._launching.get(key, 0) or any(not s.retiring for s in servers):
+                    continue
+                self._launching[key] = 1
+            try:
+                server = self._launch(key)
+                with self._lock:
+                    self._publish(key, server)
+            except BrowserPoolError as e:
+                errors.append(str(e))
+        return errors
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_contexts': self.max_contexts,
+                'servers_per_browser': self.servers_per_browser,
+                'counters': dict(self.counters),
+                'launching': sum(self._launching.values()),
+                'servers': [s.to_dict() for servers in self._servers.values() for s in servers],
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            for servers in self._servers.values():
+                for server in servers:
+                    server.stop()
+            self._servers.clear()
+
+
+# ==================== Worker 进程内的浏览器池 ====================
+
+_pool_lock = threading.Lock()
+_pool_state = {'pool': None, 'pid': None}
+
+
+def get_browser_pool(settings: Optional[Dict[str, Any]] = None) -> BrowserPool:
+    """
+    获取当前进程的浏览器池
+
+    fork 出的子进程不复用父进程的浏览器服务（进程与锁状态不属于子进程），首次调用时新建。
+    """
+    pid = os.getpid()
+    with _pool_lock:
+        if _pool_state['pool'] is None or _pool_state['pid'] != pid:
+            if _pool_state['pid'] is None:
+                atexit.register(shutdown_browser_pool)
+            _pool_state.update(pool=BrowserPool(settings), pid=pid)
+        return _pool_state['pool']
+
+
+def browser_pool_stats() -> Optional[Dict[str, Any]]:
+    """当前进程浏览器池状态，未创建时返回 None"""
+    if _pool_state['pool'] is None or _pool_state['pid'] != os.getpid():
+        return None
+    return _pool_state['pool'].stats()
+
+
+def shutdown_browser_pool():
+    """关闭当前进程启动的全部浏览器服务"""
+    with _pool_lock:
+        pool, pid = _pool_state['pool'], _pool_state['pid']
+        _pool_state.update(pool=None, pid=None)
+    if pool is not None and pid == os.getpid():
+        pool.shutdown()
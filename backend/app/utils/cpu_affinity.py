@@ -0,0 +1,272 @@
+"""
+压测进程 CPU 隔离工具
+
+为每次压测分配独占的 CPU 核，并通过 sched_setaffinity 将压测进程（及其派生的 worker 进程）
+绑定到这些核上，避免与 Celery Worker、Flask 应用和监控线程争抢 CPU：
+- 核预留记录保存在共享状态文件中，通过文件锁保证并发压测分配到互不重叠的核
+- 预留记录带有 Worker 进程号，进程已退出的记录会被自动清理
+- 可选的 cgroup v2 CPU 配额（cpu.max）与内存上限（memory.max），当前环境不支持时仅给出警告
+
+仅 Linux 支持绑核；其他平台返回警告并按原方式运行。
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+CGROUP_PERIOD_US = 100000
+
+
+def supported() -> bool:
+    """当前平台是否支持绑核"""
+    return hasattr(os, 'sched_setaffinity') and fcntl is not None
+
+
+def parse_core_list(value) -> List[int]:
+    """解析核列表，支持 "0,2-3" 或 [0, 2, 3]"""
+    if value is None or value == '':
+        return []
+    if isinstance(value, (list, tuple)):
+        return sorted({int(v) for v in value})
+    cores = set()
+    for part in str(value).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            cores.update(range(int(start), int(end) + 1))
+        else:
+            cores.add(int(part))
+    return sorted(cores)
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CoreRegistry:
+    """基于文件锁的核预留登记表"""
+
+    def __init__(self, state_file: str, reserved_cores=None):
+        self.state_file = state_file
+        self.reserved_cores = set(parse_core_list(reserved_cores))
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        with open(self.state_file, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read().strip()
+                try:
+                    state = json.loads(content) if content else {}
+                except ValueError:
+                    state = {}
+                reservations = {k: v for k, v in state.get('reservations', {}).items()
+                                if _pid_alive(v.get('pid', 0))}
+                yield reservations
+                f.seek(0)
+                f.truncate()
+                json.dump({'reservations': reservations}, f)
+                f.flush()
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def available_cores(self) -> List[int]:
+        return sorted(set(os.sched_getaffinity(0)) - self.reserved_cores)
+
+    def reserve(self, owner: str, count: int) -> Optional[List[int]]:
+        """
+        为 owner 预留 count 个空闲核
+
+        Returns:
+            核列表；空闲核不足时返回 None
+        """
+        with self._locked() as reservations:
+            used = {core for item in reservations.values() for core in item['cores']}
+            free = [core for core in self.available_cores() if core not in used]
+            if len(free) < count:
+                return None
+            cores = free[:count]
+            reservations[owner] = {'cores': cores, 'pid': os.getpid(), 'created_at': time.time()}
+            return cores
+
+    def release(self, owner: str):
+        with self._locked() as reservations:
+            reservations.pop(owner, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._locked() as reservations:
+            return dict(reservations)
+
+
+class Isolation:
+    """
+    一次压测的 CPU 隔离设置
+
+    Example:
+        isolation = prepare_isolation({'cores': 2}, owner='perf_run_1', settings=...)
+        proc, runner = get_fork_runner(settings).popen(cmd, 'locust', isolation=isolation)
+        ...
+        isolation.release()
+    """
+
+    def __init__(self, owner: str, registry: Optional[CoreRegistry] = None):
+        self.owner = owner
+        self.registry = registry
+        self.cores: List[int] = []
+        self.cgroup: Optional[str] = None
+        self.limits: Dict[str, Any] = {}
+        self.warnings: List[str] = []
+
+    def limits_request(self):
+        """
+        子进程需要的隔离设置 {'affinity', 'cgroup'}（由 fork_server 在子进程中应用），无需隔离时返回 {}
+
+        亲和性与 cgroup 会被压测进程派生的子进程继承
+        """
+        limits = {}
+        if self.cores:
+            limits['affinity'] = list(self.cores)
+        if self.cgroup:
+            limits['cgroup'] = self.cgroup
+        return limits
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'cores': self.cores,
+            'cgroup': self.cgroup,
+            'limits': self.limits,
+            'warnings': self.warnings,
+        }
+
+    def release(self):
+        """释放核预留并删除 cgroup（压测进程退出后调用）"""
+        if self.registry and self.cores:
+            try:
+                self.registry.release(self.owner)
+            except OSError:
+                pass
+        if self.cgroup:
+            for _ in range(10):
+                try:
+                    os.rmdir(self.cgroup)
+                    break
+                except FileNotFoundError:
+                    break
+                except OSError:
+                    time.sleep(0.2)  # 进程尚未完全退出
+
+
+def _write(path: str, value: str):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _create_cgroup(parent: str, owner: str, cpu_limit: Optional[float],
+                   memory_limit_mb: Optional[int]) -> str:
+    if not os.path.exists(os.path.join(CGROUP_ROOT, 'cgroup.controllers')):
+        raise OSError('未检测到 cgroup v2')
+    parent = parent if os.path.isabs(parent) else os.path.join(CGROUP_ROOT, parent)
+    os.makedirs(parent, exist_ok=True)
+
+    controllers = []
+    if cpu_limit:
+        controllers.append('+cpu')
+    if memory_limit_mb:
+        controllers.append('+memory')
+    if controllers:
+        _write(os.path.join(parent, 'cgroup.subtree_control'), ' '.join(controllers))
+
+    path = os.path.join(parent, owner)
+    os.makedirs(path, exist_ok=True)
+    if cpu_limit:
+        _write(os.path.join(path, 'cpu.max'), f'{int(cpu_limit * CGROUP_PERIOD_US)} {CGROUP_PERIOD_US}')
+    if memory_limit_mb:
+        _write(os.path.join(path, 'memory.max'), str(int(memory_limit_mb) * 1024 * 1024))
+    return path
+
+
+def prepare_isolation(cpu_config: Optional[Dict[str, Any]], owner: str, settings: Dict[str, Any],
+                      default_cores: int = 1) -> Isolation:
+    """
+    为一次压测准备 CPU 隔离
+
+    Args:
+        cpu_config: 场景配置 config.cpu（cores / cpu_limit / memory_limit_mb），None 时按全局配置决定
+        owner: 预留标识（如 perf_run_12）
+        settings: PERF_CPU_ISOLATION 全局配置
+        default_cores: 未指定 cores 时预留的核数（通常为压测进程数）
+
+    Returns:
+        Isolation；无法隔离时 cores/cgroup 为空并带有警告
+    """
+    isolation = Isolation(owner)
+    if cpu_config is None and not settings.get('enabled'):
+        return isolation
+    cpu_config = cpu_config or {}
+
+    if not supported():
+        isolation.warnings.append('当前平台不支持 CPU 绑核，压测进程未隔离')
+        return isolation
+
+    registry = CoreRegistry(settings.get('state_file'), settings.get('reserved_cores'))
+    isolation.registry = registry
+    count = int(cpu_config.get('cores') or default_cores)
+    cores = registry.reserve(owner, count)
+    if cores is None:
+        isolation.warnings.append(
+            f'空闲 CPU 核不足（需要 {count} 个，可用 {len(registry.available_cores())} 个且部分已被其他压测占用），'
+            f'压测进程未绑核'
+        )
+    else:
+        isolation.cores = cores
+
+    cpu_limit = cpu_config.get('cpu_limit')
+    memory_limit_mb = cpu_config.get('memory_limit_mb')
+    if cpu_limit or memory_limit_mb:
+        try:
+            isolation.cgroup = _create_cgroup(settings.get('cgroup_parent') or 'easytest',
+                                              owner, cpu_limit, memory_limit_mb)
+            isolation.limits = {'cpu_limit': cpu_limit, 'memory_limit_mb': memory_limit_mb}
+        except OSError as e:
+            isolation.warnings.append(f'cgroup 限制未生效: {e}')
+    return isolation
+
+
+def validate_cpu_config(cpu_config, max_cores: int) -> Optional[str]:
+    """校验 config.cpu"""
+    if cpu_config is None:
+        return None
+    if not isinstance(cpu_config, dict):
+        return 'config.cpu must be an object'
+    unknown = set(cpu_config) - {'cores', 'cpu_limit', 'memory_limit_mb'}
+    if unknown:
+        return f'config.cpu has unknown keys: {", ".join(sorted(unknown))}'
+    try:
+        if cpu_config.get('cores') is not None and not 1 <= int(cpu_config['cores']) <= max_cores:
+            return f'config.cpu.cores must be between 1 and {max_cores}'
+        if cpu_config.get('cpu_limit') is not None and float(cpu_config['cpu_limit']) <= 0:
+            return 'config.cpu.cpu_limit must be greater than 0'
+        if cpu_config.get('memory_limit_mb') is not None and int(cpu_config['memory_limit_mb']) < 64:
+            return 'config.cpu.memory_limit_mb must be at least 64'
+    except (TypeError, ValueError):
+        return 'config.cpu values must be numbers'
+    return None
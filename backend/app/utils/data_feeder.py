@@ -0,0 +1,294 @@
+"""
+压测数据文件（Data Feeder）工具
+
+上传的 CSV / JSONL 数据文件预处理为带行索引的紧凑二进制格式（.feed），压测时各进程通过 mmap
+只读映射同一文件：数据页由操作系统页缓存共享，按索引 O(1) 定位任意一行，只解码实际用到的行。
+
+.feed 文件格式（在同一台机器上生成和读取，偏移量使用本机字节序）：
+    MAGIC(8) | header_len(uint32) | header(JSON: columns, rows) | 填充到 8 字节对齐
+    | offsets(uint64 × (rows + 1)，相对数据区起点) | 数据区（每行一个 JSON 数组，按列顺序）
+
+取数策略：
+- sequential: 按顺序取下一行，读完后从头循环
+- random: 每次随机取一行
+- unique: 每个虚拟用户独占一行（整个压测期间不变），行数用完后新用户停止
+
+sequential / unique 的游标保存在运行目录的计数文件中，各进程通过文件锁按块领取行号，
+多个 Locust 进程之间不会重复取到同一行。
+
+本模块只依赖标准库，压测时会被复制到运行目录中使用。
+"""
+
+import csv
+import io
+import json
+import mmap
+import os
+import random
+import re
+import struct
+from array import array
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+MAGIC = b'ETFEED01'
+POLICIES = ('sequential', 'random', 'unique')
+FEEDER_FORMATS = ('csv', 'jsonl')
+CURSOR_BLOCK = 64
+
+# {{column}} / {{feeder.column}}，以及 URL 编码后的 %7B%7Bcolumn%7D%7D
+PLACEHOLDER_PATTERN = re.compile(r'\{\{\s*([\w.\-]+)\s*\}\}|%7B%7B([\w.\-]+)%7D%7D', re.IGNORECASE)
+
+
+class FeederError(ValueError):
+    """数据文件格式错误"""
+
+
+class FeederExhausted(Exception):
+    """unique 策略下数据行已用完"""
+
+
+def _iter_csv(f):
+    reader = csv.reader(io.TextIOWrapper(f, encoding='utf-8-sig', newline=''))
+    try:
+        columns = [c.strip() for c in next(reader)]
+    except StopIteration:
+        raise FeederError('CSV 文件为空')
+    if not all(columns) or len(set(columns)) != len(columns):
+        raise FeederError('CSV 表头列名不能为空或重复')
+    yield columns
+    for line_no, row in enumerate(reader, start=2):
+        if not row:
+            continue
+        if len(row) != len(columns):
+            raise FeederError(f'第 {line_no} 行列数 {len(row)} 与表头 {len(columns)} 不一致')
+        yield row
+
+
+def _iter_jsonl(f):
+    columns = None
+    for line_no, line in enumerate(io.TextIOWrapper(f, encoding='utf-8-sig'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            raise FeederError(f'第 {line_no} 行不是合法的 JSON')
+        if not isinstance(item, dict):
+            raise FeederError(f'第 {line_no} 行必须是 JSON 对象')
+        if columns is None:
+            columns = list(item)
+            if not columns:
+                raise FeederError('JSONL 第一行不能为空对象')
+            yield columns
+        yield [item.get(c) for c in columns]
+    if columns is None:
+        raise FeederError('JSONL 文件为空')
+
+
+def build_feeder(source, output_path, fmt='csv'):
+    """
+    将 CSV / JSONL 数据文件预处理为 .feed 索引文件
+
+    Args:
+        source: 二进制文件对象或文件路径
+        output_path: .feed 输出路径
+        fmt: csv / jsonl
+
+    Returns:
+        {'columns': [...], 'rows': n, 'size': 字节数}
+    """
+    if fmt not in FEEDER_FORMATS:
+        raise FeederError(f'不支持的数据文件格式: {fmt}')
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return build_feeder(f, output_path, fmt)
+
+    rows_iter = _iter_csv(source) if fmt == 'csv' else _iter_jsonl(source)
+    columns = next(rows_iter)
+    offsets = array('Q', [0])
+    data_path = f'{output_path}.data'
+    try:
+        with open(data_path, 'wb') as data:
+            position = 0
+            for row in rows_iter:
+                encoded = json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                data.write(encoded)
+                position += len(encoded)
+                offsets.append(position)
+        if len(offsets) == 1:
+            raise FeederError('数据文件没有数据行')
+
+        header = json.dumps({'columns': columns, 'rows': len(offsets) - 1},
+                            ensure_ascii=False).encode('utf-8')
+        prefix = MAGIC + struct.pack('<I', len(header)) + header
+        prefix += b'\0' * (-len(prefix) % 8)
+        with open(output_path, 'wb') as out, open(data_path, 'rb') as data:
+            out.write(prefix)
+            offsets.tofile(out)
+            while True:
+                chunk = data.read(1024 * 1024)
+                if not chunk:
+                    break
+                out.write(chunk)
+    finally:
+        if os.path.exists(data_path):
+            os.remove(data_path)
+    return {'columns': columns, 'rows': len(offsets) - 1, 'size': os.path.getsize(output_path)}
+
+
+class FeederFile:
+    """.feed 文件的只读 mmap 视图"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise FeederError(f'{path} 不是数据文件索引')
+        (header_len,) = struct.unpack_from('<I', self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._mm[start:start + header_len].decode('utf-8'))
+        self.columns = header['columns']
+        self.rows = header['rows']
+        index_start = start + header_len
+        index_start += -index_start % 8
+        self._offsets = memoryview(self._mm)[index_start:index_start + (self.rows + 1) * 8].cast('Q')
+        self._data_start = index_start + (self.rows + 1) * 8
+
+    def __len__(self):
+        return self.rows
+
+    def row(self, index):
+        """按行号读取一行，返回 {列名: 值}"""
+        start = self._data_start + self._offsets[index]
+        end = self._data_start + self._offsets[index + 1]
+        return dict(zip(self.columns, json.loads(self._mm[start:end])))
+
+    def close(self):
+        if getattr(self, '_offsets', None) is not None:
+            self._offsets.release()
+            self._offsets = None
+        self._mm.close()
+        self._file.close()
+
+
+class SharedCursor:
+    """多进程共享的行号计数器：每次加锁领取 CURSOR_BLOCK 个行号，减少锁竞争"""
+
+    def __init__(self, path, block=CURSOR_BLOCK):
+        self.path = path
+        self.block = block
+        self._next = 0
+        self._end = 0
+
+    def _claim_block(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 8, 0) if hasattr(os, 'pread') else os.read(fd, 8)
+            start = struct.unpack('<Q', raw)[0] if len(raw) == 8 else 0
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, struct.pack('<Q', start + self.block))
+        finally:
+            os.close(fd)
+        self._next, self._end = start, start + self.block
+
+    def next(self):
+        if self._next >= self._end:
+            self._claim_block()
+        value = self._next
+        self._next += 1
+        return value
+
+
+class Feeder:
+    """
+    按策略取数的数据源
+
+    Example:
+        feeder = Feeder('users', '/path/users.feed', 'unique', cursor_dir='/tmp/run')
+        row = feeder.next(user_state)
+    """
+
+    def __init__(self, name, path, policy='sequential', cursor_dir=None):
+        if policy not in POLICIES:
+            raise FeederError(f'不支持的取数策略: {policy}')
+        self.name = name
+        self.policy = policy
+        self.file = FeederFile(path)
+        self.columns = self.file.columns
+        self.cursor = None
+        if policy != 'random':
+            # unique 每个用户只领取一次，逐行领取避免多进程预领的行号被浪费
+            self.cursor = SharedCursor(os.path.join(cursor_dir or os.path.dirname(path), f'{name}.cursor'),
+                                       block=1 if policy == 'unique' else CURSOR_BLOCK)
+
+    def next(self, state=None):
+        """
+        取下一行
+
+        Args:
+            state: 调用方（虚拟用户）持有的状态字典，unique 策略下同一 state 始终返回同一行
+
+        Raises:
+            FeederExhausted: unique 策略下数据行已用完
+        """
+        if self.policy == 'random':
+            return self.file.row(random.randrange(self.file.rows))
+        if self.policy == 'sequential':
+            return self.file.row(self.cursor.next() % self.file.rows)
+
+        state = {} if state is None else state
+        if self.name not in state:
+            index = self.cursor.next()
+            if index >= self.file.rows:
+                raise FeederExhausted(f'数据文件 {self.name} 的 {self.file.rows} 行已全部分配')
+            state[self.name] = self.file.row(index)
+        return state[self.name]
+
+    def close(self):
+        self.file.close()
+
+
+def fill_placeholders(value, lookup):
+    """
+    替换 value 中的 {{column}} 占位符（递归处理 dict / list / str / bytes）
+
+    Args:
+        lookup: 占位符名称 -> 值 的取值函数，找不到时返回 None（保留原样）
+    """
+    if isinstance(value, str):
+        if '{' not in value and '%' not in value:
+            return value
+
+        def _replace(match):
+            encoded = match.group(2) is not None
+            found = lookup(match.group(1) or match.group(2))
+            if found is None:
+                return match.group(0)
+            text = found if isinstance(found, str) else json.dumps(found, ensure_ascii=False)
+            return quote(text, safe='') if encoded else text
+        return PLACEHOLDER_PATTERN.sub(_replace, value)
+    if isinstance(value, bytes):
+        try:
+            return fill_placeholders(value.decode('utf-8'), lookup).encode('utf-8')
+        except UnicodeDecodeError:
+            return value
+    if isinstance(value, dict):
+        return {k: fill_placeholders(v, lookup) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(fill_placeholders(v, lookup) for v in value)
+    return value
+
+
+def placeholder_names(text):
+    """提取文本中的占位符名称"""
+    return sorted({(a or b) for a, b in PLACEHOLDER_PATTERN.findall(text or '')})
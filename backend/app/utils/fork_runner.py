@@ -0,0 +1,416 @@
+"""
+预加载脚本执行器
+
+每个 Worker 进程按配置常驻若干预加载服务（fork_server.py），每种执行方式一个：
+    web      预加载 Playwright，执行 Web 测试脚本
+    locust   预加载 Locust（含 gevent 补丁），执行 python -m locust
+    asyncio  预加载 asyncio / ssl 等，执行异步压测引擎
+执行脚本时由预加载服务 fork 子进程，省去启动解释器与导入模块的时间（Locust 导入约 0.7s）。
+子进程使用独立的工作目录、环境变量与输出管道，资源限制、CPU 绑定与 cgroup 与直接启动子进程时一致。
+
+预加载服务不可用（未启用、非 POSIX 平台、启动失败、执行中崩溃等）时回退为 subprocess.Popen，
+返回的进程对象与 Popen 接口一致（pid / stdout / stderr / poll / wait / terminate / kill / returncode）。
+
+Example:
+    proc, runner = get_fork_runner(settings).popen([sys.executable, 'script.py'], 'web', cwd=work_dir)
+    capture = OutputCapture(proc, ...)
+    proc.wait(timeout=60)
+"""
+
+import atexit
+import json
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from .fork_server import MAX_MESSAGE
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fork_server.py')
+# 调用方自身负责执行超时，预加载服务在其后再等待 grace 秒强制结束子进程
+KILL_GRACE = 30
+
+
+class ForkServerError(Exception):
+    """预加载服务启动或执行失败"""
+
+
+def supported() -> bool:
+    return os.name == 'posix' and hasattr(socket, 'send_fds') and hasattr(os, 'fork')
+
+
+def parse_command(cmd: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    解析 [sys.executable, script, *args] 或 [sys.executable, '-m', module, *args]
+
+    Returns:
+        {'script' | 'module', 'argv'}，不是当前解释器执行脚本的命令返回 None
+    """
+    if len(cmd) < 2 or cmd[0] != sys.executable:
+        return None
+    if cmd[1] == '-m':
+        return {'module': cmd[2], 'argv': list(cmd[3:])} if len(cmd) > 2 else None
+    if cmd[1].startswith('-'):
+        return None
+    return {'script': cmd[1], 'argv': list(cmd[2:])}
+
+
+class ForkedProcess:
+    """预加载服务 fork 出的子进程，接口与 subprocess.Popen 一致"""
+
+    def __init__(self, args, conn: socket.socket, pid: int, stdout_fd: int, stderr_fd: int):
+        self.args = args
+        self.pid = pid
+        self.stdin = None
+        self.stdout = open(stdout_fd, 'rb')
+        self.stderr = open(stderr_fd, 'rb')
+        self.returncode: Optional[int] = None
+        self.timed_out = False
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def _receive(self, timeout: Optional[float]) -> bool:
+        with self._lock:
+            if self.returncode is not None:
+                return True
+            ready, _, _ = select.select([self._conn], [], [], timeout)
+            if not ready:
+                return False
+            try:
+                data = self._conn.recv(MAX_MESSAGE)
+            except OSError:
+                data = b''
+            if data:
+                message = json.loads(data.decode('utf-8'))
+                self.returncode = message['returncode']
+                self.timed_out = bool(message.get('timed_out'))
+            else:
+                # 预加载服务异常退出，无法得知退出码：结束子进程并按被强制结束处理
+                self._signal(signal.SIGKILL)
+                self.returncode = -signal.SIGKILL
+            self._conn.close()
+            return True
+
+    def poll(self) -> Optional[int]:
+        self._receive(0)
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if not self._receive(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def _signal(self, sig):
+        try:
+            os.kill(self.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def send_signal(self, sig):
+        if self.returncode is None:
+            self._signal(sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkServer:
+    """一个常驻的预加载服务进程"""
+
+    def __init__(self, profile: str, preload: List[str], start_timeout: float = 60):
+        self.profile = profile
+        self.preload = list(preload)
+        self.start_timeout = start_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.socket_path: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.start_ms: Optional[float] = None
+        self.preloaded: List[Dict[str, Any]] = []
+        self.runs = 0
+        self._dir: Optional[str] = None
+
+    def start(self):
+        """启动预加载服务，等待模块导入完成"""
+        self._dir = tempfile.mkdtemp(prefix=f'easytest_fork_{self.profile}_')
+        self.socket_path = os.path.join(self._dir, 'server.sock')
+        log_path = os.path.join(self._dir, 'server.log')
+        started = time.perf_counter()
+        with open(log_path, 'wb') as log:
+            # stdin 保持打开：Worker 进程退出后管道关闭，预加载服务随之结束全部子进程并退出
+            self.process = subprocess.Popen(
+                [sys.executable, SERVER_SCRIPT, self.socket_path, json.dumps(self.preload)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=log, start_new_session=True)
+
+        ready = None
+        deadline = time.monotonic() + self.start_timeout
+        while ready is None and time.monotonic() < deadline:
+            readable, _, _ = select.select([self.process.stdout], [], [], max(deadline - time.monotonic(), 0))
+            if not readable:
+                break
+            line = self.process.stdout.readline()
+            if not line:
+                break
+            try:
+                ready = json.loads(line.decode('utf-8'))
+            except ValueError:
+                continue
+
+        if not ready or not ready.get('ready'):
+            with open(log_path, 'rb') as f:
+                output = f.read().decode('utf-8', errors='replace')[-2000:].strip()
+            exited = self.process.poll() is not None
+            self.stop()
+            if exited:
+                raise ForkServerError(f'{self.profile} 预加载服务启动失败: {output}')
+            raise ForkServerError(f'{self.profile} 预加载服务 {self.start_timeout:g} 秒内未就绪: {output}')
+
+        self.process.stdout.close()
+        self.preloaded = ready.get('preload') or []
+        self.started_at = time.time()
+        self.start_ms = round((time.perf_counter() - started) * 1000, 2)
+        return self
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def spawn(self, target: Dict[str, Any], args, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+              timeout: Optional[float] = None, rlimits: Optional[Dict[str, int]] = None,
+              affinity: Optional[List[int]] = None, cgroup: Optional[str] = None) -> ForkedProcess:
+        """fork 子进程执行 parse_command 解析出的脚本或模块"""
+        request = dict(target, cwd=os.path.abspath(cwd or os.getcwd()),
+                       env=dict(os.environ if env is None else env), timeout=timeout,
+                       rlimits=rlimits or {}, affinity=list(affinity or []), cgroup=cgroup)
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        stdin = os.open(os.devnull, os.O_RDONLY)
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            conn.settimeout(10)
+            conn.connect(self.socket_path)
+            socket.send_fds(conn, [json.dumps(request).encode('utf-8')], [stdin, stdout_w, stderr_w])
+            data = conn.recv(MAX_MESSAGE)
+            reply = json.loads(data.decode('utf-8')) if data else {'error': '预加载服务已退出'}
+        except (OSError, ValueError) as e:
+            reply = {'error': f'{type(e).__name__}: {e}'}
+        finally:
+            for fd in (stdin, stdout_w, stderr_w):
+                os.close(fd)
+
+        if 'pid' not in reply:
+            conn.close()
+            os.close(stdout_r)
+            os.close(stderr_r)
+            raise ForkServerError(f'{self.profile} 预加载服务执行失败: {reply.get("error")}')
+        conn.settimeout(None)
+        self.runs += 1
+        return ForkedProcess(args, conn, reply['pid'], stdout_r, stderr_r)
+
+    def stop(self):
+        """关闭预加载服务及其 fork 出的子进程"""
+        process = self.process
+        if process is not None and process.poll() is None:
+            try:
+                process.stdin.close()  # 预加载服务读到 EOF 后结束子进程并退出
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'profile': self.profile,
+            'pid': self.process.pid if self.process else None,
+            'alive': self.alive(),
+            'started_at': self.started_at,
+            'start_ms': self.start_ms,
+            'preload': self.preloaded,
+            'runs': self.runs,
+        }
+
+
+def limited_command(cmd: List[str], rlimits: Optional[Dict[str, int]] = None, isolation=None) -> List[str]:
+    """
+    需要资源限制、CPU 绑定或 cgroup 时，通过 fork_server.py --exec 包装命令
+
+    不使用 preexec_fn：在 threads / gevent 池的 Worker 中 fork 后执行 Python 代码可能死锁，
+    包装进程在 exec 之后设置限制，再 exec 目标命令（进程号不变，限制随 exec 保留）
+    """
+    limits = dict(isolation.limits_request() if isolation else {}, rlimits=rlimits or {})
+    if not (limits['rlimits'] or limits.get('affinity') or limits.get('cgroup')):
+        return list(cmd)
+    return [sys.executable, SERVER_SCRIPT, '--exec', json.dumps(limits)] + list(cmd)
+
+
+class ForkRunner:
+    """
+    Worker 进程内按执行方式管理预加载服务
+
+    settings 对应配置 FORK_RUNNER：enabled / profiles / start_timeout / rlimits / prewarm
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = settings or {}
+        self.profiles: Dict[str, List[str]] = self.settings.get('profiles') or {}
+        self.rlimits: Dict[str, int] = self.settings.get('rlimits') or {}
+        self._servers: Dict[str, ForkServer] = {}
+        self._lock = threading.Lock()
+        self.forked = 0
+        self.fallbacks = 0
+        self.last_error: Optional[str] = None
+
+    def enabled(self) -> bool:
+        return bool(self.settings.get('enabled')) and supported()
+
+    def _server(self, profile: str) -> Tuple[ForkServer, bool]:
+        """返回 (预加载服务, 是否本次新启动)，已退出的服务重新启动"""
+        with self._lock:
+            server = self._servers.get(profile)
+            if server is not None and server.alive():
+                return server, False
+            if server is not None:
+                server.stop()
+            self._servers.pop(profile, None)
+            server = ForkServer(profile, self.profiles[profile], self.settings.get('start_timeout', 60)).start()
+            self._servers[profile] = server
+            return server, True
+
+    def _discard(self, profile: str):
+        with self._lock:
+            server = self._servers.pop(profile, None)
+        if server is not None:
+            server.stop()
+
+    def popen(self, cmd: List[str], profile: str, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+              timeout: Optional[float] = None, isolation=None):
+        """
+        启动脚本进程（stdout / stderr 为管道）
+
+        Args:
+            timeout: 调用方的执行超时（秒），预加载服务在其后 KILL_GRACE 秒强制结束子进程
+            isolation: cpu_affinity.Isolation，子进程绑定的 CPU 核与 cgroup
+
+        Returns:
+            (进程对象, 执行方式 {'mode': fork / subprocess, 'profile', 'spawn_ms', 'cold_start', 'fallback'})
+        """
+        started = time.perf_counter()
+        info = {'mode': 'subprocess', 'profile': profile, 'spawn_ms': None, 'cold_start': False, 'fallback': None}
+        target = parse_command(cmd)
+        if self.enabled():
+            if profile not in self.profiles:
+                info['fallback'] = f'未配置 {profile} 预加载服务'
+            elif target is None:
+                info['fallback'] = '命令不是由当前解释器执行的 Python 脚本'
+            else:
+                try:
+                    server, info['cold_start'] = self._server(profile)
+                    proc = server.spawn(
+                        target, cmd, cwd=cwd, env=env,
+                        timeout=timeout + KILL_GRACE if timeout else None,
+                        rlimits=self.rlimits,
+                        affinity=isolation.cores if isolation else None,
+                        cgroup=isolation.cgroup if isolation else None,
+                    )
+                    self.forked += 1
+                    info.update(mode='fork', spawn_ms=round((time.perf_counter() - started) * 1000, 2))
+                    return proc, info
+                except (ForkServerError, OSError) as e:
+                    self._discard(profile)
+                    self.last_error = info['fallback'] = str(e)
+            self.fallbacks += 1
+
+        proc = subprocess.Popen(
+            limited_command(cmd, self.rlimits if supported() else None, isolation),
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=os.name == 'posix',
+        )
+        info['spawn_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return proc, info
+
+    def prewarm(self, profiles: List[str]) -> List[str]:
+        """提前启动预加载服务，返回启动失败的错误信息"""
+        errors = []
+        if not self.enabled():
+            return errors
+        for profile in profiles:
+            if profile not in self.profiles:
+                errors.append(f'未配置 {profile} 预加载服务')
+                continue
+            try:
+                self._server(profile)
+            except (ForkServerError, OSError) as e:
+                errors.append(str(e))
+        return errors
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            servers = [server.to_dict() for server in self._servers.values()]
+        return {
+            'enabled': self.enabled(),
+            'forked': self.forked,
+            'fallbacks': self.fallbacks,
+            'last_error': self.last_error,
+            'servers': servers,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            servers = list(self._servers.values())
+            self._servers.clear()
+        for server in servers:
+            server.stop()
+
+
+# ==================== Worker 进程内的预加载执行器 ====================
+
+_runner_lock = threading.Lock()
+_runner_state = {'runner': None, 'pid': None}
+
+
+def get_fork_runner(settings: Optional[Dict[str, Any]] = None) -> ForkRunner:
+    """
+    获取当前进程的预加载执行器
+
+    fork 出的子进程不复用父进程的预加载服务，首次调用时新建。
+    """
+    pid = os.getpid()
+    with _runner_lock:
+        if _runner_state['runner'] is None or _runner_state['pid'] != pid:
+            if _runner_state['pid'] is None:
+                atexit.register(shutdown_fork_runner)
+            _runner_state.update(runner=ForkRunner(settings), pid=pid)
+        return _runner_state['runner']
+
+
+def fork_runner_stats() -> Optional[Dict[str, Any]]:
+    """当前进程预加载执行器状态，未创建时返回 None"""
+    if _runner_state['runner'] is None or _runner_state['pid'] != os.getpid():
+        return None
+    return _runner_state['runner'].stats()
+
+
+def shutdown_fork_runner():
+    """关闭当前进程启动的全部预加载服务"""
+    with _runner_lock:
+        runner, pid = _runner_state['runner'], _runner_state['pid']
+        _runner_state.update(runner=None, pid=None)
+    if runner is not None and pid == os.getpid():
+        runner.shutdown()
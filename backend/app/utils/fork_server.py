@@ -0,0 +1,355 @@
+"""
+预加载脚本执行服务（zygote）
+
+由 fork_runner.ForkServer 启动：python fork_server.py <socket_path> <preload.json>
+
+也用作直接启动子进程时的限制包装：python fork_server.py --exec <limits.json> <cmd...>，
+设置资源限制、CPU 绑定与 cgroup 后 exec 目标命令（代替 preexec_fn，在多线程的 Worker 中也是安全的）。
+
+启动时导入一次较重的模块（Playwright、Locust/gevent 等），之后每收到一个执行请求就 fork 一个子进程，
+子进程在预加载好的解释器中运行脚本（与 python script.py / python -m module 的行为一致），
+省去每次启动解释器和导入模块的时间。
+
+通信使用 Unix SOCK_SEQPACKET 套接字，每次执行一个连接：
+    客户端 -> 服务: 请求 JSON，并通过 SCM_RIGHTS 传递 stdin / stdout / stderr 文件描述符
+    服务 -> 客户端: {"pid": N} 或 {"error": "..."}，子进程退出后 {"returncode": N, "timed_out": bool}
+客户端断开连接时服务结束对应的子进程；启动服务的进程退出（stdin 关闭）时服务结束全部子进程并退出。
+
+请求字段：
+    script / module: 执行的脚本路径或模块名（二选一）
+    argv: 脚本参数（不含脚本本身）
+    cwd / env: 子进程的工作目录与完整环境变量
+    timeout: 超过秒数后强制结束子进程（调用方自身的超时处理之外的兜底）
+    rlimits: 资源限制，如 {"nofile": 4096, "as": 2147483648, "core": 0}
+    affinity / cgroup: 绑定的 CPU 核与加入的 cgroup 目录
+
+本模块只依赖标准库。
+"""
+
+import importlib
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # 非 POSIX 平台不会启动本服务
+    resource = None
+
+# 预加载的模块（如 locust）会对 socket / selectors / os 打 gevent 补丁（如 os.close 推迟到事件循环中关闭），
+# 服务循环只使用预加载前取得的原始对象
+_fork = os.fork
+_close = os.close
+_waitpid = os.waitpid
+_kill = os.kill
+_read = os.read
+_Socket = socket.socket
+_Selector = selectors.DefaultSelector
+_monotonic = time.monotonic
+
+MAX_MESSAGE = 1024 * 1024
+RLIMITS = {
+    'cpu': 'RLIMIT_CPU',
+    'as': 'RLIMIT_AS',
+    'nofile': 'RLIMIT_NOFILE',
+    'fsize': 'RLIMIT_FSIZE',
+    'core': 'RLIMIT_CORE',
+    'nproc': 'RLIMIT_NPROC',
+}
+
+
+class _Job:
+    """在子进程中执行的请求"""
+
+    def __init__(self, request, fds):
+        self.request = request
+        self.fds = fds
+
+
+def _send(conn, message):
+    try:
+        conn.send(json.dumps(message).encode('utf-8'))
+    except OSError:
+        pass
+
+
+class Server:
+    def __init__(self, path):
+        self.path = path
+        self.listener = _Socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.listener.bind(path)
+        os.chmod(path, 0o600)
+        self.listener.listen(64)
+        self.selector = _Selector()
+        self.selector.register(self.listener, selectors.EVENT_READ, 'accept')
+        self.selector.register(0, selectors.EVENT_READ, 'parent')
+        self.children = {}
+        self.connections = {}
+
+    def serve(self):
+        """处理请求；在 fork 出的子进程中返回要执行的 _Job，服务退出时返回 None"""
+        while True:
+            timeout = 0.05 if self.children else 1.0
+            for key, _ in self.selector.select(timeout):
+                if key.data == 'accept':
+                    self._accept()
+                elif key.data == 'parent':
+                    if not _read(0, 4096):
+                        self.shutdown()
+                        return None
+                else:
+                    job = self._readable(key.fileobj)
+                    if job is not None:
+                        return job
+            self._reap()
+            self._enforce_timeouts()
+
+    def _accept(self):
+        try:
+            fd, _ = self.listener._accept()
+        except OSError:
+            return
+        conn = _Socket(socket.AF_UNIX, socket.SOCK_SEQPACKET, fileno=fd)
+        self.connections[conn] = None
+        self.selector.register(conn, selectors.EVENT_READ, 'conn')
+
+    def _drop(self, conn):
+        self.connections.pop(conn, None)
+        try:
+            self.selector.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+        conn.close()
+
+    def _readable(self, conn):
+        pid = self.connections.get(conn)
+        if pid is not None:
+            # 子进程运行中客户端断开（调用方进程退出）：结束子进程
+            try:
+                conn.recv(1)
+            except OSError:
+                pass
+            self._signal(pid, signal.SIGKILL)
+            self.children[pid]['conn'] = None
+            self._drop(conn)
+            return None
+
+        try:
+            data, fds, _, _ = socket.recv_fds(conn, MAX_MESSAGE, 3)
+        except OSError:
+            self._drop(conn)
+            return None
+        if not data:
+            self._drop(conn)
+            return None
+        try:
+            request = json.loads(data.decode('utf-8'))
+            if len(fds) != 3:
+                raise ValueError('需要传递 stdin / stdout / stderr 三个文件描述符')
+            if not request.get('script') and not request.get('module'):
+                raise ValueError('请求缺少 script 或 module')
+        except ValueError as e:
+            for fd in fds:
+                _close(fd)
+            _send(conn, {'error': str(e)})
+            self._drop(conn)
+            return None
+        return self._start(conn, request, fds)
+
+    def _start(self, conn, request, fds):
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        try:
+            pid = _fork()
+        except OSError as e:
+            for fd in fds:
+                _close(fd)
+            _send(conn, {'error': f'fork 失败: {e}'})
+            self._drop(conn)
+            return None
+
+        if pid == 0:
+            self._detach()
+            return _Job(request, fds)
+
+        for fd in fds:
+            _close(fd)
+        timeout = request.get('timeout')
+        self.children[pid] = {
+            'conn': conn,
+            'deadline': _monotonic() + float(timeout) if timeout else None,
+            'timed_out': False,
+        }
+        self.connections[conn] = pid
+        _send(conn, {'pid': pid})
+        return None
+
+    def _detach(self):
+        """子进程中释放服务端的套接字（不删除套接字文件）"""
+        self.selector.close()
+        for conn in list(self.connections):
+            conn.close()
+        self.listener.close()
+        self.children.clear()
+        self.connections.clear()
+
+    @staticmethod
+    def _signal(pid, sig):
+        try:
+            _kill(pid, sig)
+        except OSError:
+            pass
+
+    def _reap(self):
+        while self.children:
+            try:
+                pid, status = _waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            child = self.children.pop(pid, None)
+            if child is None:
+                continue
+            conn = child['conn']
+            if conn is not None:
+                _send(conn, {'returncode': os.waitstatus_to_exitcode(status), 'timed_out': child['timed_out']})
+                self._drop(conn)
+
+    def _enforce_timeouts(self):
+        now = _monotonic()
+        for pid, child in self.children.items():
+            if child['deadline'] is not None and now > child['deadline'] and not child['timed_out']:
+                child['timed_out'] = True
+                self._signal(pid, signal.SIGKILL)
+
+    def shutdown(self):
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGKILL)
+        deadline = _monotonic() + 5
+        while self.children and _monotonic() < deadline:
+            self._reap()
+            time.sleep(0.01)
+        self._detach()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _preload(modules):
+    results = []
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            results.append({'module': name, 'ok': True, 'ms': round((time.perf_counter() - started) * 1000, 2)})
+        except Exception as e:  # 预加载失败不影响服务，脚本导入时会报出原始错误
+            results.append({'module': name, 'ok': False, 'error': f'{type(e).__name__}: {e}'})
+    return results
+
+
+def apply_rlimits(rlimits):
+    """设置当前进程的资源软限制（不超过硬限制）"""
+    for name, value in (rlimits or {}).items():
+        limit = getattr(resource, RLIMITS[name])
+        _, hard = resource.getrlimit(limit)
+        value = int(value)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        resource.setrlimit(limit, (value, hard))
+
+
+def _apply_limits(request):
+    cgroup = request.get('cgroup')
+    if cgroup:
+        fd = os.open(os.path.join(cgroup, 'cgroup.procs'), os.O_WRONLY)
+        try:
+            os.write(fd, b'0')
+        finally:
+            _close(fd)
+    if request.get('affinity'):
+        os.sched_setaffinity(0, request['affinity'])
+    apply_rlimits(request.get('rlimits'))
+
+
+def exec_with_limits(argv):
+    """--exec 模式：在当前进程设置限制后 exec 目标命令（限制随 exec 保留）"""
+    limits, cmd = json.loads(argv[0]), argv[1:]
+    try:
+        _apply_limits(limits)
+    except Exception as e:
+        sys.stderr.write(f'设置进程限制失败: {type(e).__name__}: {e}\n')
+        sys.stderr.flush()
+        os._exit(126)
+    os.execv(cmd[0], cmd)
+
+
+def _run_job(job):
+    """在 fork 出的子进程中执行脚本，行为与 python script.py / python -m module 一致"""
+    request = job.request
+    for target, fd in enumerate(job.fds):
+        os.dup2(fd, target)
+        if fd > 2:
+            _close(fd)
+    try:
+        _apply_limits(request)
+        os.chdir(request.get('cwd') or os.getcwd())
+        if request.get('env') is not None:
+            os.environ.clear()
+            os.environ.update(request['env'])
+    except Exception:
+        traceback.print_exc()
+        sys.stderr.flush()
+        os._exit(1)
+
+    if os.environ.get('PYTHONUNBUFFERED'):
+        sys.stdout.reconfigure(write_through=True)
+        sys.stderr.reconfigure(write_through=True)
+    if 'gevent' in sys.modules:
+        # 预加载了 gevent 时，fork 后需要重建事件循环
+        sys.modules['gevent'].reinit()
+
+    import runpy
+
+    argv = list(request.get('argv') or [])
+    if request.get('module'):
+        sys.argv = [request['module']] + argv
+        sys.path.insert(0, os.getcwd())
+        runpy.run_module(request['module'], run_name='__main__', alter_sys=True)
+    else:
+        script = os.path.abspath(request['script'])
+        sys.argv = [script] + argv
+        sys.path.insert(0, os.path.dirname(script))
+        runpy.run_path(script, run_name='__main__')
+
+
+def main(argv=None):
+    argv = argv or sys.argv[1:]
+    if argv[0] == '--exec':
+        exec_with_limits(argv[1:])
+    path, preload = argv[:2]
+    # 本文件所在目录不应出现在脚本的模块搜索路径中
+    if sys.path and os.path.abspath(sys.path[0] or '.') == os.path.dirname(os.path.abspath(__file__)):
+        sys.path.pop(0)
+    server = Server(path)
+    preloaded = _preload(json.loads(preload))
+    sys.stdout.write(json.dumps({'ready': True, 'pid': os.getpid(), 'preload': preloaded}) + '\n')
+    sys.stdout.flush()
+    # 启动方只读取就绪信息，之后的输出丢弃（子进程使用各自请求传入的 stdout）
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    _close(devnull)
+
+    job = server.serve()
+    if job is not None:
+        _run_job(job)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+"""
+HAR 录制文件导入工具
+
+将浏览器 / Playwright 录制的 HAR 文件转换为压测任务：
+- 流式解析：逐个解码 log.entries 中的请求，不把整个文件读入内存（HAR 常因响应体达到数百 MB）
+- 过滤静态资源（图片、样式、脚本、字体等）和非 HTTP 请求
+- 路径中的 ID 段模板化（数字 -> {id}、UUID -> {uuid}、长十六进制 -> {hash}），同一接口的请求归为一组
+- 按出现次数计算任务权重，按相邻请求之间的空闲时间估算思考时间（wait_time）
+"""
+
+import json
+import re
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator
+from urllib.parse import urlsplit, parse_qsl
+
+from .locust_script import build_request_task
+
+
+READ_CHUNK = 1024 * 1024
+
+STATIC_RESOURCE_TYPES = {'image', 'stylesheet', 'script', 'font', 'media', 'manifest', 'texttrack', 'ping'}
+STATIC_EXTENSIONS = {
+    '.js', '.mjs', '.css', '.map', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.avif', '.bmp',
+    '.woff', '.woff2', '.ttf', '.otf', '.eot', '.mp4', '.webm', '.mp3', '.wav', '.pdf',
+}
+STATIC_MIME_PREFIXES = ('image/', 'font/', 'audio/', 'video/', 'text/css', 'text/javascript',
+                        'application/javascript', 'application/x-javascript', 'application/font')
+
+# 不写入脚本的请求头：由 HTTP 客户端生成、浏览器专有或与录制会话绑定
+DROPPED_HEADERS = {
+    'host', 'content-length', 'connection', 'accept-encoding', 'cookie', 'user-agent', 'referer', 'origin',
+    'pragma', 'cache-control', 'upgrade-insecure-requests', 'te', 'priority', 'if-none-match',
+    'if-modified-since', 'keep-alive', 'transfer-encoding', 'dnt',
+}
+
+SEGMENT_PATTERNS = (
+    (re.compile(r'^\d+$'), '{id}'),
+    (re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I), '{uuid}'),
+    (re.compile(r'^[0-9a-f]{16,}$', re.I), '{hash}'),
+    (re.compile(r'^(?=.*\d)(?=.*[A-Za-z])[A-Za-z0-9_\-]{20,}$'), '{token}'),
+)
+
+MAX_WEIGHT = 100
+MAX_THINK_TIME = 30.0
+
+
+class HarError(ValueError):
+    """HAR 文件格式错误"""
+
+
+class _StreamReader:
+    """基于 JSONDecoder.raw_decode 的增量解析器：缓冲区不足以解码完整值时继续读取"""
+
+    def __init__(self, stream, chunk_size=READ_CHUNK):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self._pending = b''
+
+    def _read_more(self, size):
+        if self.eof:
+            return False
+        data = self.stream.read(size)
+        if not data:
+            self.eof = True
+            return False
+        if isinstance(data, bytes):
+            data = self._pending + data
+            # 保留被截断的 UTF-8 多字节字符
+            try:
+                text = data.decode('utf-8')
+                self._pending = b''
+            except UnicodeDecodeError as e:
+                if e.start < len(data) - 3:
+                    raise HarError('HAR 文件不是 UTF-8 编码')
+                text = data[:e.start].decode('utf-8')
+                self._pending = data[e.start:]
+        else:
+            text = data
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        if self.buffer.startswith('\ufeff'):
+            self.buffer = self.buffer[1:]
+        return True
+
+    def skip_ws(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._read_more(self.chunk_size):
+                return
+
+    def peek(self):
+        self.skip_ws()
+        return self.buffer[self.pos] if self.pos < len(self.buffer) else ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise HarError(f'HAR 文件格式错误：期望 {char!r}')
+        self.pos += 1
+
+    def value(self):
+        """解码下一个完整的 JSON 值；解码失败时按指数增长读取更多数据，避免大对象反复重解析"""
+        self.skip_ws()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._read_more(size):
+                    raise HarError('HAR 文件不完整或不是合法的 JSON')
+                size *= 2
+                continue
+            # 数字可能被缓冲区截断（如 12|34），末尾恰好是缓冲区边界时读取更多再确认
+            if end == len(self.buffer) and isinstance(value, (int, float)) and self._read_more(size):
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_object(reader):
+    """逐个返回对象的键，调用方负责读取对应的值"""
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.pos += 1
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        yield key
+        char = reader.peek()
+        reader.pos += 1
+        if char == '}':
+            return
+        if char != ',':
+            raise HarError('HAR 文件格式错误：对象成员之间缺少逗号')
+
+
+def iter_har_entries(stream, chunk_size=READ_CHUNK) -> Iterator[Dict[str, Any]]:
+    """
+    流式读取 HAR 的 log.entries
+
+    Args:
+        stream: 二进制或文本文件对象
+
+    Yields:
+        单个 entry（已解码的字典）
+    """
+    reader = _StreamReader(stream, chunk_size)
+    found = False
+    for key in _iter_object(reader):
+        if key != 'log':
+            reader.value()
+            continue
+        for log_key in _iter_object(reader):
+            if log_key != 'entries':
+                reader.value()
+                continue
+            found = True
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.pos += 1
+                continue
+            while True:
+                yield reader.value()
+                char = reader.peek()
+                reader.pos += 1
+                if char == ']':
+                    break
+                if char != ',':
+                    raise HarError('HAR 文件格式错误：entries 元素之间缺少逗号')
+    if not found:
+        raise HarError('HAR 文件中没有 log.entries')
+
+
+def template_path(path: str) -> str:
+    """将路径中的 ID 段替换为模板，如 /orders/123/items -> /orders/{id}/items"""
+    segments = []
+    for segment in path.split('/'):
+        for pattern, placeholder in SEGMENT_PATTERNS:
+            if segment and pattern.match(segment):
+                segment = placeholder
+                break
+        segments.append(segment)
+    return '/'.join(segments) or '/'
+
+
+def is_static(entry: Dict[str, Any]) -> bool:
+    """是否为静态资源请求"""
+    if entry.get('_resourceType') in STATIC_RESOURCE_TYPES:
+        return True
+    path = urlsplit(entry['request']['url']).path.lower()
+    if '.' in path.rsplit('/', 1)[-1] and path[path.rfind('.'):] in STATIC_EXTENSIONS:
+        return True
+    mime = ((entry.get('response') or {}).get('content') or {}).get('mimeType') or ''
+    return mime.lower().startswith(STATIC_MIME_PREFIXES)
+
+
+def _parse_time(value: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _request_body(request: Dict[str, Any]):
+    """解析 postData，返回 (body, body_type)"""
+    post = request.get('postData') or {}
+    mime = (post.get('mimeType') or '').split(';')[0].strip().lower()
+    text = post.get('text')
+    if text is None and post.get('params'):
+        return {p['name']: p.get('value', '') for p in post['params']}, 'form'
+    if text is None:
+        return None, 'json'
+    if mime.endswith('json'):
+        try:
+            return json.loads(text), 'json'
+        except ValueError:
+            return text, 'raw'
+    if mime == 'application/x-www-form-urlencoded':
+        return dict(parse_qsl(text, keep_blank_values=True)), 'form'
+    return text, 'raw'
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class HarImporter:
+    """
+    HAR 导入器
+
+    Example:
+        importer = HarImporter(hosts=['api.example.com'])
+        for entry in iter_har_entries(stream):
+            importer.add(entry)
+        result = importer.result()
+    """
+
+    def __init__(self, hosts: Optional[List[str]] = None, include_static: bool = False,
+                 exclude: Optional[str] = None):
+        self.hosts = {h.lower() for h in hosts or [] if h}
+        self.include_static = include_static
+        self.exclude = re.compile(exclude) if exclude else None
+        self.endpoints: Dict[tuple, Dict[str, Any]] = {}
+        self.timeline: List[tuple] = []
+        self.total = 0
+        self.skipped = {'static': 0, 'host': 0, 'excluded': 0, 'unsupported': 0}
+
+    def add(self, entry: Dict[str, Any]):
+        self.total += 1
+        request = entry.get('request') or {}
+        url = request.get('url') or ''
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            self.skipped['unsupported'] += 1
+            return
+        if self.hosts and parts.hostname not in self.hosts and parts.netloc.lower() not in self.hosts:
+            self.skipped['host'] += 1
+            return
+        if not self.include_static and is_static(entry):
+            self.skipped['static'] += 1
+            return
+        if self.exclude and self.exclude.search(url):
+            self.skipped['excluded'] += 1
+            return
+
+        method = (request.get('method') or 'GET').upper()
+        origin = f'{parts.scheme}://{parts.netloc}'
+        path = template_path(parts.path or '/')
+        key = (method, origin, path)
+        duration = float(entry.get('time') or 0)
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            body, body_type = _request_body(request)
+            headers = {h['name']: h.get('value', '') for h in request.get('headers') or []
+                       if not h['name'].startswith(':') and h['name'].lower() not in DROPPED_HEADERS}
+            endpoint = self.endpoints[key] = {
+                'method': method,
+                'origin': origin,
+                'path': path,
+                'sample_url': url.split('#', 1)[0],
+                'headers': headers,
+                'body': body,
+                'body_type': body_type,
+                'count': 0,
+                'total_time': 0.0,
+                'statuses': {},
+            }
+        endpoint['count'] += 1
+        endpoint['total_time'] += duration
+        status = str((entry.get('response') or {}).get('status', ''))
+        endpoint['statuses'][status] = endpoint['statuses'].get(status, 0) + 1
+
+        started = _parse_time(entry.get('startedDateTime'))
+        if started is not None:
+            self.timeline.append((started, started + duration / 1000))
+
+    def think_time(self):
+        """
+        估算思考时间：按开始时间排序后，取每个请求开始时距上一批请求全部结束的空闲时间，
+        并发请求（空闲时间 <= 0）不计入；返回空闲时间的 P25 / P75 作为 wait_time 范围
+        """
+        gaps = []
+        busy_until = None
+        for start, end in sorted(self.timeline):
+            if busy_until is not None and start > busy_until:
+                gaps.append(min(start - busy_until, MAX_THINK_TIME))
+            busy_until = end if busy_until is None else max(busy_until, end)
+        if not gaps:
+            return None
+        return round(_percentile(gaps, 25), 2), round(_percentile(gaps, 75), 2)
+
+    def result(self, base_host: Optional[str] = None) -> Dict[str, Any]:
+        """
+        生成压测任务
+
+        Returns:
+            {'base_host', 'tasks', 'endpoints', 'wait_time', 'stats'}
+        """
+        if not self.endpoints:
+            raise HarError('HAR 文件中没有可压测的接口请求（静态资源已过滤）')
+
+        origins = {}
+        for endpoint in self.endpoints.values():
+            origins[endpoint['origin']] = origins.get(endpoint['origin'], 0) + endpoint['count']
+        base_host = base_host or max(origins, key=origins.get)
+
+        endpoints = sorted(self.endpoints.values(), key=lambda e: -e['count'])
+        max_count = endpoints[0]['count']
+        scale = 1 if max_count <= MAX_WEIGHT else MAX_WEIGHT / max_count
+
+        tasks, summary = [], []
+        for endpoint in endpoints:
+            prefix = '' if endpoint['origin'] == base_host else endpoint['origin']
+            name = f"{endpoint['method']} {prefix}{endpoint['path']}"
+            url = endpoint['sample_url']
+            if endpoint['origin'] == base_host:
+                url = url[len(base_host):] or '/'
+            weight = max(1, int(round(endpoint['count'] * scale)))
+            tasks.append(build_request_task(name, endpoint['method'], url, headers=endpoint['headers'],
+                                            body=endpoint['body'], body_type=endpoint['body_type'],
+                                            weight=weight))
+            summary.append({
+                'name': name,
+                'method': endpoint['method'],
+                'url': url,
+                'count': endpoint['count'],
+                'weight': weight,
+                'recorded_avg_ms': round(endpoint['total_time'] / endpoint['count'], 2),
+                'statuses': endpoint['statuses'],
+            })
+
+        return {
+            'base_host': base_host,
+            'tasks': tasks,
+            'endpoints': summary,
+            'wait_time': self.think_time(),
+            'stats': {
+                'entries': self.total,
+                'requests': sum(e['count'] for e in endpoints),
+                'endpoints': len(tasks),
+                'skipped': dict(self.skipped),
+            },
+        }
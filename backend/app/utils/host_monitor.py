@@ -0,0 +1,347 @@
+"""
+压测机资源监控工具
+
+压测期间按固定间隔采样压测进程（含子进程）与整机的资源占用：
+- 进程：CPU%（按单核计，100% 即占满一个核）、RSS 内存、打开的 socket 数
+- 整机：CPU%、内存%、网络收发速率
+
+采样时间戳与 Locust stats_history 的 Timestamp 一致（Unix 秒），可在同一时间轴上对照。
+Locust 每个进程只能使用一个 CPU 核，压测进程 CPU 接近 100% 时吞吐量会被压测机本身限制，
+此时结果不能反映被测系统的真实容量。
+
+优先使用 psutil（Locust 的依赖），不可用时在 Linux 上回退到读取 /proc。
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil 随 Locust 安装，通常可用
+    psutil = None
+
+
+class _PsutilSampler:
+    """基于 psutil 的采样"""
+
+    def __init__(self, pid):
+        self.root = psutil.Process(pid)
+        self.procs = {}
+        self.last_net = None
+        psutil.cpu_percent(None)
+
+    def _processes(self):
+        try:
+            current = [self.root] + self.root.children(recursive=True)
+        except psutil.Error:
+            return []
+        alive = []
+        for proc in current:
+            cached = self.procs.setdefault(proc.pid, proc)
+            alive.append(cached)
+        self.procs = {p.pid: p for p in alive}
+        return alive
+
+    def sample(self, now):
+        processes = []
+        for proc in self._processes():
+            try:
+                with proc.oneshot():
+                    processes.append({
+                        'pid': proc.pid,
+                        'cpu': proc.cpu_percent(None),
+                        'rss_mb': proc.memory_info().rss / 1024 / 1024,
+                        'sockets': _count_sockets(proc.pid, proc),
+                    })
+            except psutil.Error:
+                continue
+
+        net = psutil.net_io_counters()
+        host = {
+            'cpu': psutil.cpu_percent(None),
+            'memory': psutil.virtual_memory().percent,
+        }
+        host.update(_net_rates(self, now, net.bytes_sent, net.bytes_recv))
+        return processes, host
+
+
+class _ProcSampler:
+    """基于 /proc 的采样（仅 Linux）"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf('SC_CLK_TCK')
+        self.page_kb = os.sysconf('SC_PAGE_SIZE') / 1024
+        self.last_proc = {}
+        self.last_host = None
+        self.last_net = None
+        self.last_time = None
+
+    def _children(self, pid):
+        pids = [pid]
+        try:
+            for tid in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{tid}/children') as f:
+                    for child in f.read().split():
+                        pids.extend(self._children(int(child)))
+        except OSError:
+            pass
+        return pids
+
+    def _proc_times(self, pid):
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        # utime/stime 为第 14/15 列，rss 为第 24 列（去掉 pid 与 comm 后下标 11/12/21）
+        return (int(fields[11]) + int(fields[12])) / self.ticks, int(fields[21]) * self.page_kb / 1024
+
+    @staticmethod
+    def _host_times():
+        with open('/proc/stat') as f:
+            values = [int(v) for v in f.readline().split()[1:]]
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return sum(values), idle
+
+    @staticmethod
+    def _memory_percent():
+        info = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                info[key] = int(value.split()[0])
+        total = info.get('MemTotal') or 1
+        available = info.get('MemAvailable', info.get('MemFree', 0))
+        return (total - available) / total * 100
+
+    @staticmethod
+    def _net_bytes():
+        sent = recv = 0
+        with open('/proc/net/dev') as f:
+            for line in f.readlines()[2:]:
+                name, data = line.split(':', 1)
+                if name.strip() == 'lo':
+                    continue
+                values = data.split()
+                recv += int(values[0])
+                sent += int(values[8])
+        return sent, recv
+
+    def sample(self, now):
+        elapsed = (now - self.last_time) if self.last_time else None
+        processes = []
+        current = {}
+        for pid in self._children(self.pid):
+            try:
+                cpu_time, rss_mb = self._proc_times(pid)
+            except (OSError, IndexError, ValueError):
+                continue
+            current[pid] = cpu_time
+            prev = self.last_proc.get(pid)
+            cpu = (cpu_time - prev) / elapsed * 100 if elapsed and prev is not None else 0.0
+            processes.append({'pid': pid, 'cpu': cpu, 'rss_mb': rss_mb, 'sockets': _count_sockets(pid)})
+        self.last_proc = current
+
+        total, idle = self._host_times()
+        host_cpu = 0.0
+        if self.last_host:
+            d_total, d_idle = total - self.last_host[0], idle - self.last_host[1]
+            host_cpu = (1 - d_idle / d_total) * 100 if d_total else 0.0
+        self.last_host = (total, idle)
+        self.last_time = now
+
+        host = {'cpu': host_cpu, 'memory': self._memory_percent()}
+        host.update(_net_rates(self, now, *self._net_bytes()))
+        return processes, host
+
+
+def _count_sockets(pid, proc=None):
+    """统计进程打开的 socket 数"""
+    fd_dir = f'/proc/{pid}/fd'
+    if os.path.isdir(fd_dir):
+        count = 0
+        try:
+            for fd in os.listdir(fd_dir):
+                try:
+                    if os.readlink(os.path.join(fd_dir, fd)).startswith('socket:'):
+                        count += 1
+                except OSError:
+                    continue
+        except OSError:
+            return None
+        return count
+    if proc is not None:
+        try:
+            return len(proc.net_connections(kind='inet'))
+        except (AttributeError, psutil.Error):
+            return None
+    return None
+
+
+def _net_rates(sampler, now, sent, recv):
+    rates = {'net_sent_kbps': 0.0, 'net_recv_kbps': 0.0}
+    if sampler.last_net:
+        last_time, last_sent, last_recv = sampler.last_net
+        elapsed = now - last_time
+        if elapsed > 0:
+            rates = {
+                'net_sent_kbps': (sent - last_sent) / elapsed / 1024,
+                'net_recv_kbps': (recv - last_recv) / elapsed / 1024,
+            }
+    sampler.last_net = (now, sent, recv)
+    return rates
+
+
+class HostMonitor:
+    """
+    压测机资源采样线程
+
+    Example:
+        monitor = HostMonitor(proc.pid, interval=1.0, cpu_warn_pct=90)
+        monitor.start()
+        ...
+        monitor.stop()
+        result = monitor.summary()
+    """
+
+    def __init__(self, pid: int, interval: float = 1.0, cpu_warn_pct: float = 90.0,
+                 cpu_warn_samples: int = 3, max_samples: int = 3600):
+        self.pid = pid
+        self.interval = interval
+        self.cpu_warn_pct = cpu_warn_pct
+        self.cpu_warn_samples = cpu_warn_samples
+        self.max_samples = max_samples
+        self.samples: List[Dict[str, Any]] = []
+        self.error = None
+        # 连续饱和计数在采样时累计（样本抽稀后无法再从时间线恢复连续性）
+        self.saturated_samples = 0
+        self.saturated_streak = 0
+        self.longest_streak = 0
+        self.overloaded_since = None
+        self._streak_started = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._sampler = None
+
+    @property
+    def available(self) -> bool:
+        return psutil is not None or os.path.exists('/proc/stat')
+
+    def start(self):
+        if not self.available:
+            self.error = '当前平台无法采集资源数据（psutil 不可用且没有 /proc）'
+            return
+        try:
+            self._sampler = _PsutilSampler(self.pid) if psutil is not None else _ProcSampler(self.pid)
+            self._sampler.sample(time.time())  # 建立 CPU / 网络计数基线
+        except Exception as e:
+            self.error = str(e)
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval * 2 + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._record(time.time())
+            except Exception as e:
+                self.error = str(e)
+                return
+
+    def _record(self, now):
+        processes, host = self._sampler.sample(now)
+        if not processes:
+            return
+        busiest = max(processes, key=lambda p: p['cpu'])
+        sample = {
+            'timestamp': round(now, 3),
+            'process_count': len(processes),
+            'process_cpu': round(sum(p['cpu'] for p in processes), 1),
+            'max_process_cpu': round(busiest['cpu'], 1),
+            'process_rss_mb': round(sum(p['rss_mb'] for p in processes), 1),
+            'sockets': sum(p['sockets'] or 0 for p in processes),
+            'host_cpu': round(host['cpu'], 1),
+            'host_memory': round(host['memory'], 1),
+            'net_sent_kbps': round(host['net_sent_kbps'], 1),
+            'net_recv_kbps': round(host['net_recv_kbps'], 1),
+        }
+        if sample['max_process_cpu'] >= self.cpu_warn_pct:
+            self.saturated_samples += 1
+            self.saturated_streak += 1
+            if self.saturated_streak == 1:
+                self._streak_started = sample['timestamp']
+            self.longest_streak = max(self.longest_streak, self.saturated_streak)
+            if self.saturated_streak >= self.cpu_warn_samples and self.overloaded_since is None:
+                self.overloaded_since = self._streak_started
+        else:
+            self.saturated_streak = 0
+        sample['saturated_streak'] = self.saturated_streak
+        self.samples.append(sample)
+        if len(self.samples) > self.max_samples:
+            # 超出上限时隔点抽稀，保留完整时间范围
+            self.samples = self.samples[::2]
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """最新采样；压测机已持续饱和时附带 warning，压测过程中即可提示"""
+        if not self.samples:
+            return None
+        sample = dict(self.samples[-1])
+        warning = self.overload_warning()
+        if warning:
+            sample['warning'] = warning
+        return sample
+
+    @property
+    def overloaded(self) -> bool:
+        """是否出现过连续 cpu_warn_samples 个采样点的 CPU 饱和"""
+        return self.longest_streak >= self.cpu_warn_samples
+
+    def overload_warning(self) -> Optional[str]:
+        if not self.overloaded:
+            return None
+        peak = max((s['max_process_cpu'] for s in self.samples), default=0)
+        return (
+            f'压测进程 CPU 连续 {self.longest_streak} 个采样点达到 {self.cpu_warn_pct:g}% 以上'
+            f'（峰值 {peak:.0f}%），吞吐量可能受压测机限制，结果不可信；可增加压测进程数或改用更轻量的引擎'
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        汇总采样结果
+
+        Returns:
+            采样时间线、峰值以及压测机饱和告警；
+            连续 cpu_warn_samples 个采样点 CPU 饱和时 trustworthy=False，表示结果受压测机资源限制
+        """
+        samples = list(self.samples)
+        warnings = []
+        warning = self.overload_warning()
+        if warning:
+            warnings.append(warning)
+        if self.error:
+            warnings.append(f'资源采集异常: {self.error}')
+
+        def _peak(key):
+            return max((s[key] for s in samples), default=0)
+
+        return {
+            'source': 'psutil' if psutil is not None else 'proc',
+            'interval': self.interval,
+            'cpu_warn_pct': self.cpu_warn_pct,
+            'peak_process_cpu': _peak('max_process_cpu'),
+            'peak_host_cpu': _peak('host_cpu'),
+            'peak_host_memory': _peak('host_memory'),
+            'peak_process_rss_mb': _peak('process_rss_mb'),
+            'peak_sockets': _peak('sockets'),
+            'saturated_samples': self.saturated_samples,
+            'longest_saturated_streak': self.longest_streak,
+            'overloaded_since': self.overloaded_since,
+            'trustworthy': not self.overloaded,
+            'warnings': warnings,
+            'samples': samples,
+        }
@@ -0,0 +1,250 @@
+"""
+延迟直方图工具
+
+基于对数分桶（HDR 风格）的响应时间直方图：
+- 记录 O(1)，内存占用固定，与请求数无关
+- 支持 P50/P90/P95/P99/P99.9 等分位数
+- 支持序列化与精确合并，便于汇总多个压测进程的数据
+
+本模块只依赖标准库，可直接复制到压测子进程的运行目录中使用。
+"""
+
+import time
+from typing import Dict, Any, Optional, Iterable
+
+
+# 默认输出的分位数
+DEFAULT_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+SERIAL_VERSION = 1
+
+
+class LatencyHistogram:
+    """
+    对数分桶直方图
+
+    数值以微秒整数存储。每个 2 的幂区间划分为 2^(sub_bucket_bits-1) 个子桶，
+    默认 sub_bucket_bits=7 时相对误差不超过 1/64（约 1.6%）。
+    超过 max_value_us 的数值计入最后一个桶，但 max 仍保留真实值。
+    """
+
+    def __init__(self, sub_bucket_bits: int = 7, max_value_us: int = 3600 * 1000 * 1000):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value_us = max_value_us
+        self._half = 1 << (sub_bucket_bits - 1)
+        self.counts = [0] * (self._index_of(max_value_us) + 1)
+        self.count = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = None
+
+    # ==================== 分桶计算 ====================
+
+    def _index_of(self, value_us: int) -> int:
+        shift = value_us.bit_length() - self.sub_bucket_bits
+        if shift < 0:
+            shift = 0
+        return shift * self._half + (value_us >> shift)
+
+    def _bucket_bounds(self, index: int) -> tuple:
+        if index < 2 * self._half:
+            return index, index
+        shift = index // self._half - 1
+        lower = (index - shift * self._half) << shift
+        return lower, lower + (1 << shift) - 1
+
+    # ==================== 记录与查询 ====================
+
+    def record(self, value_ms: float, count: int = 1):
+        """记录一个响应时间（毫秒）"""
+        value_us = int(value_ms * 1000) if value_ms > 0 else 0
+        index = self._index_of(min(value_us, self.max_value_us))
+        self.counts[index] += count
+        self.count += count
+        self.sum_us += value_us * count
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if self.max_us is None or value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, pct: float) -> float:
+        """获取分位数（毫秒），取所在桶的中间值并限制在 [min, max] 内"""
+        if self.count == 0:
+            return 0.0
+        target = max(1, int(self.count * pct / 100.0 + 0.5))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            if seen >= target:
+                lower, upper = self._bucket_bounds(index)
+                value_us = (lower + upper) / 2.0
+                value_us = min(max(value_us, self.min_us), self.max_us)
+                return value_us / 1000.0
+        return self.max_us / 1000.0
+
+    def percentiles(self, pcts: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        """一次遍历获取多个分位数，键名如 p50 / p99.9"""
+        pcts = sorted(pcts)
+        result = {_pct_key(p): 0.0 for p in pcts}
+        if self.count == 0:
+            return result
+
+        targets = [(p, max(1, int(self.count * p / 100.0 + 0.5))) for p in pcts]
+        seen = 0
+        pos = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            while pos < len(targets) and seen >= targets[pos][1]:
+                lower, upper = self._bucket_bounds(index)
+                value_us = min(max((lower + upper) / 2.0, self.min_us), self.max_us)
+                result[_pct_key(targets[pos][0])] = value_us / 1000.0
+                pos += 1
+            if pos == len(targets):
+                break
+        return result
+
+    @property
+    def mean(self) -> float:
+        """平均值（毫秒）"""
+        return self.sum_us / self.count / 1000.0 if self.count else 0.0
+
+    @property
+    def min(self) -> float:
+        return self.min_us / 1000.0 if self.min_us is not None else 0.0
+
+    @property
+    def max(self) -> float:
+        return self.max_us / 1000.0 if self.max_us is not None else 0.0
+
+    def reset(self):
+        """清空数据"""
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = None
+
+    # ==================== 合并与序列化 ====================
+
+    def merge(self, other: 'LatencyHistogram'):
+        """合并另一个直方图（分桶参数必须一致）"""
+        if other.sub_bucket_bits != self.sub_bucket_bits or other.max_value_us != self.max_value_us:
+            raise ValueError('直方图分桶参数不一致，无法合并')
+        if not other.count:
+            return
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+        self.count += other.count
+        self.sum_us += other.sum_us
+        if self.min_us is None or other.min_us < self.min_us:
+            self.min_us = other.min_us
+        if self.max_us is None or other.max_us > self.max_us:
+            self.max_us = other.max_us
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为 JSON 友好的稀疏结构"""
+        return {
+            'version': SERIAL_VERSION,
+            'sub_bucket_bits': self.sub_bucket_bits,
+            'max_value_us': self.max_value_us,
+            'count': self.count,
+            'sum_us': self.sum_us,
+            'min_us': self.min_us,
+            'max_us': self.max_us,
+            'buckets': {str(i): c for i, c in enumerate(self.counts) if c},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        """从序列化结构还原"""
+        if data.get('version', SERIAL_VERSION) != SERIAL_VERSION:
+            raise ValueError(f"不支持的直方图版本: {data.get('version')}")
+        hist = cls(
+            sub_bucket_bits=data.get('sub_bucket_bits', 7),
+            max_value_us=data.get('max_value_us', 3600 * 1000 * 1000)
+        )
+        for index, bucket_count in (data.get('buckets') or {}).items():
+            hist.counts[int(index)] += int(bucket_count)
+        hist.count = int(data.get('count') or 0)
+        hist.sum_us = int(data.get('sum_us') or 0)
+        hist.min_us = data.get('min_us')
+        hist.max_us = data.get('max_us')
+        return hist
+
+    def summary(self, pcts: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """汇总统计（毫秒）"""
+        data = {
+            'count': self.count,
+            'avg': round(self.mean, 3),
+            'min': round(self.min, 3),
+            'max': round(self.max, 3),
+        }
+        data.update({k: round(v, 3) for k, v in self.percentiles(pcts).items()})
+        return data
+
+
+class WindowedHistogram:
+    """
+    滑动窗口直方图
+
+    按秒分片的环形缓冲区，窗口视图合并最近 window_seconds 个分片；
+    内存占用为固定的 window_seconds 个直方图。
+    """
+
+    def __init__(self, window_seconds: int = 10, clock=time.time, **hist_kwargs):
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._hist_kwargs = hist_kwargs
+        self._slots = [LatencyHistogram(**hist_kwargs) for _ in range(window_seconds)]
+        self._slot_seconds = [None] * window_seconds
+        self.failures = [0] * window_seconds
+
+    def _slot_for(self, second: int) -> int:
+        pos = second % self.window_seconds
+        if self._slot_seconds[pos] != second:
+            self._slots[pos].reset()
+            self.failures[pos] = 0
+            self._slot_seconds[pos] = second
+        return pos
+
+    def record(self, value_ms: float, success: bool = True):
+        pos = self._slot_for(int(self._clock()))
+        self._slots[pos].record(value_ms)
+        if not success:
+            self.failures[pos] += 1
+
+    def snapshot(self) -> tuple:
+        """返回 (窗口内合并后的直方图, 窗口内失败数)"""
+        now = int(self._clock())
+        merged = LatencyHistogram(**self._hist_kwargs)
+        failures = 0
+        for pos, second in enumerate(self._slot_seconds):
+            if second is not None and now - second < self.window_seconds:
+                merged.merge(self._slots[pos])
+                failures += self.failures[pos]
+        return merged, failures
+
+
+def merge_serialized(items: Iterable[Optional[Dict[str, Any]]]) -> LatencyHistogram:
+    """合并多个序列化的直方图（例如多个压测进程上报的数据）"""
+    merged = None
+    for item in items:
+        if not item:
+            continue
+        hist = LatencyHistogram.from_dict(item)
+        if merged is None:
+            merged = hist
+        else:
+            merged.merge(hist)
+    return merged if merged is not None else LatencyHistogram()
+
+
+def _pct_key(pct: float) -> str:
+    return f"p{pct:g}"
+
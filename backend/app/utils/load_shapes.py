@@ -0,0 +1,273 @@
+"""
+负载模型工具
+
+根据性能测试场景的配置生成负载阶段，并渲染为 Locust LoadTestShape 代码。
+
+支持的负载模型（scenario.config['load_shape']['type']）：
+- step:   阶梯加压，每 step_duration 秒增加 step_users 个用户，直到 user_count
+- ramp:   在 ramp_up 秒内线性加压到 user_count，之后保持
+- spike:  基础负载 -> 突增 -> 恢复
+- custom: 自定义阶段列表 [{"duration": 30, "users": 10, "spawn_rate": 5}, ...]
+
+未配置 load_shape 时，step_load_enabled / ramp_up 字段分别对应 step / ramp 模型。
+"""
+
+import json
+from typing import Dict, Any, List, Optional
+
+
+SHAPE_TYPES = ('step', 'ramp', 'spike', 'custom')
+
+
+def _stage(name, start, end, users, spawn_rate):
+    return {
+        'name': name,
+        'start': round(start, 3),
+        'end': round(end, 3),
+        'users': int(users),
+        'spawn_rate': round(float(spawn_rate), 3),
+    }
+
+
+def resolve_load_shape(scenario: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    从场景字段解析负载模型配置
+
+    Args:
+        scenario: 场景字典（PerfTestScenario.to_dict() 的结构）
+
+    Returns:
+        负载模型配置，未启用时返回 None
+    """
+    shape = (scenario.get('config') or {}).get('load_shape')
+    if shape and shape.get('type'):
+        return shape
+    if scenario.get('step_load_enabled'):
+        return {
+            'type': 'step',
+            'step_users': scenario.get('step_users') or 10,
+            'step_duration': scenario.get('step_duration') or 30,
+        }
+    if scenario.get('ramp_up'):
+        return {'type': 'ramp', 'ramp_up': scenario.get('ramp_up')}
+    return None
+
+
+def build_stages(shape: Optional[Dict[str, Any]], user_count: int,
+                 spawn_rate: float, run_time: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    生成负载阶段列表
+
+    Args:
+        shape: 负载模型配置（resolve_load_shape 的返回值）
+        user_count: 目标用户数
+        spawn_rate: 用户生成速率
+        run_time: 总时长（秒），阶段超出部分会被截断
+
+    Returns:
+        阶段列表，每个阶段包含 name/start/end/users/spawn_rate（start/end 为相对秒数）
+    """
+    if not shape:
+        return None
+
+    shape_type = shape.get('type')
+    stages = []
+
+    if shape_type == 'step':
+        step_users = max(1, int(shape.get('step_users') or 10))
+        step_duration = max(1, int(shape.get('step_duration') or 30))
+        start, users, index = 0, 0, 1
+        while start < run_time:
+            users = min(users + step_users, user_count)
+            end = run_time if users >= user_count else min(start + step_duration, run_time)
+            stages.append(_stage(f'step-{index}', start, end, users, shape.get('spawn_rate') or spawn_rate))
+            start, index = end, index + 1
+
+    elif shape_type == 'ramp':
+        ramp_up = max(1, min(int(shape.get('ramp_up') or 1), run_time))
+        stages.append(_stage('ramp', 0, ramp_up, user_count, user_count / ramp_up))
+        if ramp_up < run_time:
+            stages.append(_stage('hold', ramp_up, run_time, user_count, spawn_rate))
+
+    elif shape_type == 'spike':
+        base_users = int(shape.get('base_users') or max(1, user_count // 5))
+        spike_users = int(shape.get('spike_users') or user_count)
+        spike_start = int(shape.get('spike_start') or run_time // 3)
+        spike_duration = int(shape.get('spike_duration') or max(1, run_time // 6))
+        spike_end = min(spike_start + spike_duration, run_time)
+        stages.append(_stage('base', 0, spike_start, base_users, spawn_rate))
+        stages.append(_stage('spike', spike_start, spike_end, spike_users,
+                             shape.get('spike_spawn_rate') or spike_users))
+        if spike_end < run_time:
+            stages.append(_stage('recovery', spike_end, run_time, base_users, spike_users))
+
+    elif shape_type == 'custom':
+        start = 0
+        for index, item in enumerate(shape.get('stages') or [], start=1):
+            if start >= run_time:
+                break
+            end = min(start + int(item['duration']), run_time)
+            stages.append(_stage(item.get('name') or f'stage-{index}', start, end,
+                                 item['users'], item.get('spawn_rate') or spawn_rate))
+            start = end
+
+    return [s for s in stages if s['end'] > s['start']] or None
+
+
+def validate_load_shape(shape: Optional[Dict[str, Any]], limits: Dict[str, int]) -> Optional[str]:
+    """
+    校验负载模型配置
+
+    Args:
+        shape: config['load_shape']
+        limits: PERF_TEST_LIMITS
+
+    Returns:
+        错误信息，校验通过返回 None
+    """
+    if shape is None:
+        return None
+    if not isinstance(shape, dict):
+        return 'load_shape must be an object'
+    shape_type = shape.get('type')
+    if shape_type not in SHAPE_TYPES:
+        return f'load_shape.type must be one of {", ".join(SHAPE_TYPES)}'
+
+    def _check_users(value, field):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return f'{field} must be an integer'
+        if not limits['min_users'] <= value <= limits['max_users']:
+            return f'{field} must be between {limits["min_users"]} and {limits["max_users"]}'
+        return None
+
+    def _check_positive(value, field):
+        try:
+            if int(value) <= 0:
+                return f'{field} must be greater than 0'
+        except (TypeError, ValueError):
+            return f'{field} must be an integer'
+        return None
+
+    if shape_type == 'step':
+        for field in ('step_users', 'step_duration'):
+            if field in shape:
+                error = _check_positive(shape[field], f'load_shape.{field}')
+                if error:
+                    return error
+    elif shape_type == 'ramp':
+        if 'ramp_up' in shape:
+            return _check_positive(shape['ramp_up'], 'load_shape.ramp_up')
+    elif shape_type == 'spike':
+        for field in ('base_users', 'spike_users'):
+            if field in shape:
+                error = _check_users(shape[field], f'load_shape.{field}')
+                if error:
+                    return error
+        for field in ('spike_start', 'spike_duration'):
+            if field in shape:
+                error = _check_positive(shape[field], f'load_shape.{field}')
+                if error:
+                    return error
+    elif shape_type == 'custom':
+        stages = shape.get('stages')
+        if not isinstance(stages, list) or not stages:
+            return 'load_shape.stages must be a non-empty list'
+        total = 0
+        for index, item in enumerate(stages):
+            if not isinstance(item, dict):
+                return f'load_shape.stages[{index}] must be an object'
+            error = (_check_positive(item.get('duration'), f'load_shape.stages[{index}].duration')
+                     or _check_users(item.get('users'), f'load_shape.stages[{index}].users'))
+            if error:
+                return error
+            total += int(item['duration'])
+        if total > limits['max_duration']:
+            return f'load_shape total duration must not exceed {limits["max_duration"]} seconds'
+    return None
+
+
+def active_stage(stages: Optional[List[Dict[str, Any]]], elapsed: float) -> Optional[Dict[str, Any]]:
+    """获取 elapsed 秒时所处的阶段"""
+    for stage in stages or []:
+        if stage['start'] <= elapsed < stage['end']:
+            return stage
+    return None
+
+
+def render_shape_class(stages: List[Dict[str, Any]]) -> str:
+    """渲染 Locust LoadTestShape 代码，追加到 locustfile 末尾"""
+    stages_literal = json.dumps(
+        [{'end': s['end'], 'users': s['users'], 'spawn_rate': s['spawn_rate']} for s in stages]
+    )
+    return f'''
+
+# ==================== EasyTest 负载模型（自动生成） ====================
+from locust import LoadTestShape as _EasyTestLoadTestShape
+
+
+class EasyTestLoadShape(_EasyTestLoadTestShape):
+    stages = {stages_literal}
+
+    def tick(self):
+        run_time = self.get_run_time()
+        for stage in self.stages:
+            if run_time < stage["end"]:
+                return stage["users"], stage["spawn_rate"]
+        return None
+'''
+
+
+def summarize_stages(stages: Optional[List[Dict[str, Any]]], history: List[Dict[str, Any]],
+                     start_ts: float) -> List[Dict[str, Any]]:
+    """
+    按阶段汇总 stats_history 数据
+
+    Args:
+        stages: 负载阶段列表
+        history: stats_history.csv 的行（仅使用 Aggregated 行）
+        start_ts: 压测开始时间戳（秒）
+
+    Returns:
+        每个阶段的平均吞吐量、最大 P95、平均响应时间和错误率
+    """
+    if not stages:
+        return []
+
+    def _num(row, *keys):
+        for key in keys:
+            try:
+                return float(row.get(key))
+            except (TypeError, ValueError):
+                continue
+        return 0.0
+
+    def _totals(row):
+        """累计请求数、失败数与累计响应时间之和（ms）"""
+        if row is None:
+            return 0.0, 0.0, 0.0
+        count = _num(row, 'Total Request Count')
+        return count, _num(row, 'Total Failure Count'), count * _num(row, 'Total Average Response Time')
+
+    rows = [r for r in history if r.get('Name') in (None, '', 'Aggregated')]
+    summaries = []
+    for stage in stages:
+        before = [r for r in rows if _num(r, 'Timestamp') - start_ts < stage['start']]
+        in_stage = [r for r in rows
+                    if stage['start'] <= _num(r, 'Timestamp') - start_ts < stage['end']]
+        summary = dict(stage, samples=len(in_stage))
+        if in_stage:
+            last = in_stage[-1]
+            # 阶段内的请求 = 阶段末累计值 - 上一阶段末累计值（各列均为累计值）
+            base = _totals(before[-1] if before else None)
+            requests, failures, response_time = (end - start for end, start in zip(_totals(last), base))
+            summary.update({
+                'actual_users': int(_num(last, 'User Count')),
+                'avg_throughput': round(sum(_num(r, 'Requests/s') for r in in_stage) / len(in_stage), 3),
+                'max_p95_response_time': max(_num(r, '95%') for r in in_stage),
+                'avg_response_time': round(response_time / requests, 3) if requests > 0 else 0,
+                'error_rate': round(failures / requests * 100, 3) if requests > 0 else 0,
+            })
+        summaries.append(summary)
+    return summaries
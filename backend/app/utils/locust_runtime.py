@@ -0,0 +1,231 @@
+"""
+Locust 运行时扩展
+
+由 run_perf_test_task 复制到压测运行目录，并在 locustfile 末尾自动注入：
+
+    import locust_runtime
+    locust_runtime.install(globals(), "easytest_runtime.json")
+
+目前提供：
+- 开环负载：按目标到达速率为所有 User 设置 wait_time，
+  并按计划发送时间统计修正后的延迟（写入 <csv_prefix>_open_workload.json）
+- 数据文件：请求的 URL、请求头、查询参数和请求体中的 {{column}} 占位符按取数策略从数据文件取值，
+  脚本中也可以通过 self.feed(name) 直接读取当前行
+- 原始样本：把每个请求写入 <csv_prefix>_samples_<pid>.bin，供事后按窗口和接口重新统计
+
+本模块只依赖标准库和 Locust。
+"""
+
+import json
+import os
+import time
+
+import gevent
+from locust import User, events
+from locust.exception import StopUser
+
+try:
+    from .open_workload import ArrivalSchedule, OpenWorkloadStats
+    from .data_feeder import Feeder, FeederExhausted, fill_placeholders
+    from .raw_samples import SampleWriter, FLUSH_INTERVAL
+except ImportError:  # 作为独立脚本运行时
+    from open_workload import ArrivalSchedule, OpenWorkloadStats
+    from data_feeder import Feeder, FeederExhausted, fill_placeholders
+    from raw_samples import SampleWriter, FLUSH_INTERVAL
+
+
+DUMP_INTERVAL = 1.0
+
+
+class _OpenWorkload:
+    """将 Locust 的闭环用户改造为按计划到达时间发送的开环负载"""
+
+    def __init__(self, config):
+        self.output = f"{config['csv_prefix']}_open_workload.json"
+        self.target_rps = config.get('target_rps')
+        self.stages = config.get('arrival_stages')
+        self.schedule = None
+        self.stats = None
+        self.lags = {}
+
+    def start(self):
+        now = time.time()
+        self.schedule = ArrivalSchedule(now, self.target_rps, self.stages)
+        self.stats = OpenWorkloadStats(now, self.target_rps, self.stages)
+        gevent.spawn(self._dump_loop)
+
+    def wait_time(self, user):
+        """
+        替换 User.wait_time：领取下一个计划发送时间，并记录当前迭代的调度滞后
+
+        用户启动时（on_start 之后）也调用一次，第一个任务同样按计划时间发送
+        """
+        if self.schedule is None:
+            return 0
+        intended = self.schedule.claim()
+        self.stats.record_scheduled(intended)
+        now = time.time()
+        actual = max(now, intended)
+        self.stats.record_started(intended, actual)
+        self.lags[gevent.getcurrent()] = max(0.0, now - intended) * 1000
+        return max(0.0, intended - now)
+
+    def on_request(self, response_time=None, **kwargs):
+        if self.stats is None or response_time is None:
+            return
+        lag_ms = self.lags.get(gevent.getcurrent(), 0.0)
+        self.stats.record_response(float(response_time), lag_ms)
+
+    def dump(self):
+        if self.stats is None:
+            return
+        with open(self.output, 'w', encoding='utf-8') as f:
+            json.dump(self.stats.to_dict(), f)
+
+    def _dump_loop(self):
+        while True:
+            gevent.sleep(DUMP_INTERVAL)
+            try:
+                self.dump()
+            except Exception:
+                pass
+
+
+class _Feeders:
+    """为每个虚拟用户的 client.request 注入数据文件占位符替换"""
+
+    # 需要替换占位符的请求参数（name 保持不变，统计不会按取值拆分）
+    FIELDS = ('headers', 'params', 'json', 'data')
+
+    def __init__(self, config):
+        self.feeders = [
+            Feeder(item['name'], item['path'], item.get('policy', 'sequential'), config.get('cursor_dir'))
+            for item in config['feeders']
+        ]
+
+    def row(self, user, name=None):
+        """取一行数据；unique 策略的行绑定在用户上，数据用完时停止该用户"""
+        state = user.__dict__.setdefault('_easytest_feeder_rows', {})
+        feeder = self.feeders[0] if name is None else next(f for f in self.feeders if f.name == name)
+        try:
+            return feeder.next(state)
+        except FeederExhausted:
+            raise StopUser()
+
+    def lookup(self, user):
+        """返回本次请求的占位符取值函数：{{column}} 按数据文件顺序查找，{{name.column}} 指定数据文件"""
+        rows = {}
+
+        def _get(key):
+            feeder_name, _, column = key.rpartition('.')
+            for feeder in self.feeders:
+                if feeder_name and feeder.name != feeder_name:
+                    continue
+                if column not in feeder.columns:
+                    continue
+                if feeder.name not in rows:
+                    rows[feeder.name] = self.row(user, feeder.name)
+                return rows[feeder.name][column]
+            return None
+        return _get
+
+    def bind(self, user):
+        client = getattr(user, 'client', None)
+        if client is None or user.__dict__.get('_easytest_feeders_bound'):
+            return
+        user._easytest_feeders_bound = True
+        original = client.request
+
+        def request(method, url, *args, **kwargs):
+            lookup = self.lookup(user)
+            url = fill_placeholders(url, lookup)
+            for field in self.FIELDS:
+                if kwargs.get(field) is not None:
+                    kwargs[field] = fill_placeholders(kwargs[field], lookup)
+            return original(method, url, *args, **kwargs)
+
+        client.request = request
+
+
+class _RawSamples:
+    """通过 request 事件记录每个请求的原始样本"""
+
+    def __init__(self, config):
+        self.writer = SampleWriter(f"{config['csv_prefix']}_samples_{os.getpid()}.bin", source='locust')
+        gevent.spawn(self._flush_loop)
+
+    def on_request(self, request_type=None, name=None, response_time=None, response_length=None,
+                   response=None, exception=None, start_time=None, **kwargs):
+        if self.writer is None:
+            return
+        status = getattr(response, 'status_code', 0) or 0
+        self.writer.record(start_time or (time.time() - (response_time or 0) / 1000), request_type, name,
+                           response_time, status, response_length, exception is not None)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def _flush_loop(self):
+        while self.writer is not None:
+            gevent.sleep(FLUSH_INTERVAL)
+            try:
+                if self.writer is not None:
+                    self.writer.flush()
+            except Exception:
+                pass
+
+
+def _user_classes(namespace):
+    for value in list(namespace.values()):
+        if isinstance(value, type) and issubclass(value, User) and not getattr(value, 'abstract', False):
+            yield value
+
+
+def install(namespace, config_path):
+    """
+    安装运行时扩展
+
+    Args:
+        namespace: locustfile 的 globals()
+        config_path: 运行时配置文件路径（由 run_perf_test_task 写入）
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    if config.get('target_rps') or config.get('arrival_stages'):
+        workload = _OpenWorkload(config)
+        for user_class in _user_classes(namespace):
+            user_class.wait_time = lambda user, _w=workload: _w.wait_time(user)
+            original_on_start = user_class.on_start
+            if getattr(original_on_start, '_easytest_paced', False):
+                continue  # 继承自已处理的 User 类
+
+            def on_start(self, _on_start=original_on_start):
+                # Locust 在 on_start 之后立即执行第一个任务：先等到领取的计划时间，避免启动时所有用户同时发送
+                _on_start(self)
+                gevent.sleep(workload.wait_time(self))
+
+            on_start._easytest_paced = True
+            user_class.on_start = on_start
+        events.test_start.add_listener(lambda **kwargs: workload.start())
+        events.request.add_listener(workload.on_request)
+        events.quitting.add_listener(lambda **kwargs: workload.dump())
+
+    if config.get('raw_samples'):
+        samples = _RawSamples(config)
+        events.request.add_listener(samples.on_request)
+        events.quitting.add_listener(lambda **kwargs: samples.close())
+
+    if config.get('feeders'):
+        feeders = _Feeders(config)
+        for user_class in _user_classes(namespace):
+            original_init = user_class.__init__
+
+            def __init__(self, *args, _init=original_init, **kwargs):
+                _init(self, *args, **kwargs)
+                feeders.bind(self)
+
+            user_class.__init__ = __init__
+            user_class.feed = lambda self, name=None: feeders.row(self, name)
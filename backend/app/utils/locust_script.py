@@ -0,0 +1,267 @@
+"""
+Locust 脚本生成工具
+
+将一个或多个请求定义渲染为 Locust 脚本：
+- 每个请求对应一个带权重的 @task，并通过 name= 指定统计名称，Locust 按接口分别统计
+- 请求头、查询参数、请求体以 Python 字面量（repr）写入脚本，避免字符串拼接导致的转义问题
+- 支持从接口测试集合生成多接口混合场景（环境变量在生成时替换）
+- 支持生成基于 FastHttpUser（geventhttpclient）的脚本，单核吞吐量远高于 HttpUser（python-requests）
+"""
+
+import json
+import re
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse, urlencode
+
+
+# 用例优先级对应的默认权重：1-高 2-中 3-低
+PRIORITY_WEIGHTS = {1: 3, 2: 2, 3: 1}
+
+# 可携带请求体的方法
+BODY_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+_UNRESOLVED_PATTERN = re.compile(r'\{\{([^}]+)\}\}')
+
+# 压测用户类型：http（HttpUser / python-requests）、fasthttp（FastHttpUser / geventhttpclient）
+USER_CLASSES = ('http', 'fasthttp')
+
+# FastHttpUser 选项 -> 类型
+FASTHTTP_OPTIONS = {
+    'concurrency': int,           # 每个用户的最大并发连接数
+    'network_timeout': float,     # 读写超时（秒）
+    'connection_timeout': float,  # 建立连接超时（秒）
+    'max_retries': int,           # 失败重试次数
+    'insecure': bool,             # 是否跳过 HTTPS 证书校验
+    'keep_alive': bool,           # 是否复用连接，默认 True
+    'shared_pool_size': int,      # 所有用户共享的连接池大小，不配置时每个用户独立连接池
+}
+
+# FastHttpUser 不支持的 requests 专有用法：(正则, 说明)
+REQUESTS_ONLY_PATTERNS = (
+    (r'\bimport\s+requests\b|\bfrom\s+requests\b', '直接使用 requests 模块'),
+    (r'\b(timeout|verify|cert|proxies|files|cookies|hooks)\s*=', '请求参数 {0}= 仅 HttpUser 支持'),
+    (r'\.mount\(|HTTPAdapter', '自定义 requests Adapter'),
+    (r'\.elapsed\b', 'response.elapsed'),
+    (r'\.iter_content\(|\.iter_lines\(|\.raw\b', 'requests 流式响应 API'),
+    (r'\.cookies\.', 'requests 会话 Cookie API'),
+    (r'\bparams\s*=', '请求参数 params=（建议直接拼接到 URL）'),
+)
+
+
+def build_request_task(name: str, method: str, url: str, headers: Dict[str, Any] = None,
+                       params: Dict[str, Any] = None, body: Any = None, body_type: str = 'json',
+                       weight: int = 1, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    构建一个压测任务定义
+
+    Args:
+        name: 统计名称（Locust 报告中的 Name 列）
+        method: HTTP 方法
+        url: 请求地址，可以是完整 URL 或以 / 开头的路径
+        headers: 请求头
+        params: URL 查询参数
+        body: 请求体
+        body_type: 请求体类型 json/form/raw/binary
+        weight: 任务权重
+        timeout: 超时时间（秒）
+
+    Returns:
+        任务定义字典，供 render_locust_script 使用
+    """
+    return {
+        'name': name,
+        'method': (method or 'GET').upper(),
+        'url': url or '/',
+        'headers': {str(k): str(v) for k, v in (headers or {}).items()},
+        'params': dict(params or {}),
+        'body': body,
+        'body_type': body_type or 'json',
+        'weight': max(1, int(weight or 1)),
+        'timeout': timeout,
+    }
+
+
+def _request_args(task: Dict[str, Any], fast: bool = False) -> List[str]:
+    """
+    生成 self.client.request 的参数代码
+
+    FastHttpUser 不支持 params / timeout 等 requests 参数：
+    查询参数在生成时拼接到 URL，form 请求体编码为字符串，超时由用户类的 network_timeout 控制。
+    """
+    url = task['url']
+    headers = dict(task['headers'])
+    if fast and task['params']:
+        url += ('&' if '?' in url else '?') + urlencode(task['params'], doseq=True)
+
+    args = [repr(task['method']), repr(url), f"name={task['name']!r}"]
+    if not fast and task['params']:
+        args.append(f"params={task['params']!r}")
+
+    body = task['body']
+    data = None
+    if body is not None and task['method'] in BODY_METHODS:
+        body_type = task['body_type']
+        if body_type == 'json':
+            args.append(f'json={body!r}')
+        elif body_type == 'form' and isinstance(body, dict):
+            if fast:
+                data = urlencode(body, doseq=True).encode('utf-8')
+                headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+            else:
+                args.append(f'data={body!r}')
+        elif body_type in ('raw', 'form'):
+            text = body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)
+            data = text.encode('utf-8')
+        # binary 请求体无法内联到脚本中，生成时忽略
+    if data is not None:
+        args.append(f'data={data!r}')
+
+    if headers:
+        args.insert(3, f"headers={headers!r}")
+    if not fast and task.get('timeout'):
+        args.append(f"timeout={float(task['timeout'])!r}")
+    return args
+
+
+def _method_name(index: int, task: Dict[str, Any]) -> str:
+    slug = re.sub(r'\W+', '_', task['name'].encode('ascii', 'ignore').decode()).strip('_').lower()
+    return f'task_{index}_{slug[:40]}' if slug else f'task_{index}'
+
+
+def _fasthttp_attributes(options: Dict[str, Any]) -> List[str]:
+    lines = []
+    for key in ('concurrency', 'network_timeout', 'connection_timeout', 'max_retries', 'insecure'):
+        if options.get(key) is not None:
+            lines.append(f'    {key} = {FASTHTTP_OPTIONS[key](options[key])!r}')
+    if options.get('keep_alive') is False:
+        lines.append("    default_headers = {'Connection': 'close'}")
+    if options.get('shared_pool_size'):
+        lines.append(f"    client_pool = HTTPClientPool(concurrency={int(options['shared_pool_size'])})")
+    return lines
+
+
+def render_locust_script(tasks: List[Dict[str, Any]], wait_time: tuple = (1, 2),
+                         title: str = 'Locust 性能测试脚本（自动生成）',
+                         user_class: str = 'http', user_options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    渲染 Locust 脚本
+
+    Args:
+        tasks: build_request_task 返回的任务定义列表
+        wait_time: 每次任务之间的等待时间范围（秒）
+        title: 脚本文档字符串
+        user_class: http / fasthttp
+        user_options: FastHttpUser 选项（见 FASTHTTP_OPTIONS）
+
+    Returns:
+        str: 生成的 Locust 脚本内容
+    """
+    fast = user_class == 'fasthttp'
+    title = ' '.join(title.replace('\\', '/').replace('"', "'").split())
+    methods = []
+    for index, task in enumerate(tasks, start=1):
+        args = ',\n            '.join(_request_args(task, fast))
+        comment = ' '.join(task['name'].split())
+        methods.append(f'''
+    # {comment}
+    @task({task['weight']})
+    def {_method_name(index, task)}(self):
+        self.client.request(
+            {args}
+        )
+''')
+
+    if fast:
+        options = user_options or {}
+        imports = 'from locust import task, between\nfrom locust.contrib.fasthttp import FastHttpUser\n'
+        if options.get('shared_pool_size'):
+            imports += 'from geventhttpclient.client import HTTPClientPool\n'
+        base_class = 'FastHttpUser'
+        attributes = ''.join(f'{line}\n' for line in _fasthttp_attributes(options))
+    else:
+        imports = 'from locust import HttpUser, task, between\n'
+        base_class = 'HttpUser'
+        attributes = ''
+
+    return f'''"""
+{title}
+"""
+{imports}
+
+class TestUser({base_class}):
+    wait_time = between({wait_time[0]}, {wait_time[1]})
+{attributes}{''.join(methods)}'''
+
+
+def validate_user_class(config: Dict[str, Any]) -> Optional[str]:
+    """校验 config.user_class / config.fasthttp"""
+    user_class = config.get('user_class', 'http')
+    if user_class not in USER_CLASSES:
+        return f'config.user_class must be one of {", ".join(USER_CLASSES)}'
+
+    options = config.get('fasthttp')
+    if options is None:
+        return None
+    if not isinstance(options, dict):
+        return 'config.fasthttp must be an object'
+    for key, value in options.items():
+        if key not in FASTHTTP_OPTIONS:
+            return f'config.fasthttp has unknown key: {key}'
+        expected = FASTHTTP_OPTIONS[key]
+        if expected is bool:
+            if not isinstance(value, bool):
+                return f'config.fasthttp.{key} must be a boolean'
+            continue
+        try:
+            number = expected(value)
+        except (TypeError, ValueError):
+            return f'config.fasthttp.{key} must be a number'
+        if number < 0 or (key in ('concurrency', 'shared_pool_size') and number < 1):
+            return f'config.fasthttp.{key} is out of range'
+    return None
+
+
+def check_script_compat(script: str, user_class: str = 'http') -> List[str]:
+    """
+    检查自定义脚本与压测用户类型的兼容性
+
+    Returns:
+        警告信息列表（不阻止保存）
+    """
+    if not script:
+        return []
+    warnings = []
+    uses_fast = 'FastHttpUser' in script
+    if user_class == 'fasthttp' and not uses_fast and 'HttpUser' in script:
+        warnings.append('config.user_class=fasthttp 只影响自动生成的脚本，自定义脚本仍继承 HttpUser')
+    if uses_fast:
+        for pattern, message in REQUESTS_ONLY_PATTERNS:
+            for match in re.finditer(pattern, script):
+                line = script.count('\n', 0, match.start()) + 1
+                keyword = match.group(1) if match.groups() else ''
+                warnings.append(f'第 {line} 行: FastHttpUser 不支持 {message.format(keyword)}')
+    return warnings
+
+
+def unresolved_variables(task: Dict[str, Any]) -> List[str]:
+    """获取任务中未被替换的 {{variable}} 变量名"""
+    text = repr([task['url'], task['headers'], task['params'], task['body']])
+    return sorted({name.strip() for name in _UNRESOLVED_PATTERN.findall(text)})
+
+
+def split_task_url(url: str, base_host: str) -> str:
+    """与 base_host 同源的 URL 改写为路径（保持 Locust --host 生效），其他 URL 保持完整地址"""
+    parsed = urlparse(url)
+    if not parsed.scheme:
+        return url if url.startswith('/') else f'/{url}'
+    if f'{parsed.scheme}://{parsed.netloc}' != base_host:
+        return url
+    path = parsed.path or '/'
+    return f'{path}?{parsed.query}' if parsed.query else path
+
+
+def case_weight(case, weights: Optional[Dict[str, Any]] = None) -> int:
+    """用例权重：优先使用请求中指定的权重，否则按优先级映射"""
+    if weights and str(case.id) in weights:
+        return int(weights[str(case.id)])
+    return PRIORITY_WEIGHTS.get(case.priority or 2, 2)
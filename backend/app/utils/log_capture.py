@@ -0,0 +1,267 @@
+"""
+子进程输出捕获
+
+Web 脚本与压测子进程的 stdout / stderr 由读取线程持续消费（不会因管道写满而阻塞子进程）：
+- 内存中只保留开头 head_bytes 与末尾 tail_bytes（环形缓冲），执行结果中只保存这段摘录
+- 完整输出追加写入日志文件（最多 spill_max_bytes），执行期间 API 进程可按偏移量读取，实现实时查看
+
+日志目录：LOG_CAPTURE.folder/<名称>/{stdout,stderr}.log，每次执行覆盖同名目录。
+"""
+
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+STREAMS = ('stdout', 'stderr')
+READ_SIZE = 64 * 1024
+
+
+class BoundedLog:
+    """
+    保留开头与末尾的有界日志缓冲
+
+    Example:
+        log = BoundedLog(head_bytes=1024, tail_bytes=4096, spill_path='/tmp/out.log')
+        log.write(b'...')
+        log.close()
+        text = log.excerpt()
+    """
+
+    def __init__(self, head_bytes: int = 16 * 1024, tail_bytes: int = 64 * 1024,
+                 spill_path: Optional[str] = None, spill_max_bytes: Optional[int] = None):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = deque()
+        self.tail_size = 0
+        self.total_bytes = 0
+        self.lines = 0
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self.spilled_bytes = 0
+        self._spill = open(spill_path, 'wb') if spill_path else None
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        with self._lock:
+            self.total_bytes += len(data)
+            self.lines += data.count(b'\n')
+            self._write_spill(data)
+            if len(self.head) < self.head_bytes:
+                room = self.head_bytes - len(self.head)
+                self.head += data[:room]
+                data = data[room:]
+            if data:
+                self.tail.append(data)
+                self.tail_size += len(data)
+                while self.tail_size - len(self.tail[0]) >= self.tail_bytes:
+                    self.tail_size -= len(self.tail.popleft())
+
+    def _write_spill(self, data: bytes):
+        if not self._spill or self._spill.closed:
+            return
+        if self.spill_max_bytes is not None:
+            data = data[:max(0, int(self.spill_max_bytes) - self.spilled_bytes)]
+            if not data:
+                return
+        self._spill.write(data)
+        self._spill.flush()  # 写入后立即可被实时查看接口读取
+        self.spilled_bytes += len(data)
+
+    def excerpt(self) -> str:
+        """开头 + 省略说明 + 末尾（未超出上限时为完整输出）"""
+        with self._lock:
+            tail = b''.join(self.tail)
+            if len(tail) > self.tail_bytes:
+                tail = tail[-self.tail_bytes:]
+            omitted = self.total_bytes - len(self.head) - len(tail)
+            if omitted <= 0:
+                return (bytes(self.head) + tail).decode('utf-8', errors='replace')
+            marker = f'\n... [已省略 {omitted} 字节] ...\n'.encode('utf-8')
+            return (bytes(self.head) + marker + _skip_partial_char(tail)).decode('utf-8', errors='replace')
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > len(self.head) + self.tail_bytes
+
+    def close(self):
+        with self._lock:
+            if self._spill and not self._spill.closed:
+                self._spill.close()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'bytes': self.total_bytes,
+            'lines': self.lines,
+            'truncated': self.truncated,
+            'log_bytes': self.spilled_bytes if self.spill_path else None,
+        }
+
+
+def _skip_partial_char(data: bytes) -> bytes:
+    """去掉开头被截断的 UTF-8 多字节字符的后续字节"""
+    index = 0
+    while index < min(3, len(data)) and data[index] & 0xC0 == 0x80:
+        index += 1
+    return data[index:]
+
+
+def _trim_partial_char(data: bytes) -> bytes:
+    """去掉末尾不完整的 UTF-8 多字节字符（等下次读取时补全）"""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue
+        if byte & 0x80 == 0:
+            return data
+        width = 2 if byte & 0xE0 == 0xC0 else 3 if byte & 0xF0 == 0xE0 else 4
+        return data if back >= width else data[:-back]
+    return data
+
+
+class OutputCapture:
+    """
+    使用读取线程持续消费子进程的 stdout / stderr
+
+    Example:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        capture = OutputCapture(proc, log_dir, settings)
+        proc.wait()
+        capture.join()
+        stdout = capture.excerpt('stdout')
+    """
+
+    def __init__(self, proc, log_dir: Optional[str] = None, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.log_dir = log_dir
+        if log_dir:
+            shutil.rmtree(log_dir, ignore_errors=True)
+            os.makedirs(log_dir, exist_ok=True)
+        self.logs: Dict[str, BoundedLog] = {}
+        self._threads = []
+        for name in STREAMS:
+            pipe = getattr(proc, name)
+            if pipe is None:
+                continue
+            self.logs[name] = BoundedLog(
+                head_bytes=int(settings.get('head_bytes') or 16 * 1024),
+                tail_bytes=int(settings.get('tail_bytes') or 64 * 1024),
+                spill_path=os.path.join(log_dir, f'{name}.log') if log_dir else None,
+                spill_max_bytes=settings.get('spill_max_bytes'),
+            )
+            thread = threading.Thread(target=self._pump, args=(pipe, self.logs[name]),
+                                      name=f'output-{name}-{proc.pid}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @staticmethod
+    def _pump(pipe, log: BoundedLog):
+        read = getattr(pipe, 'read1', pipe.read)
+        try:
+            while True:
+                chunk = read(READ_SIZE)
+                if not chunk:
+                    break
+                log.write(chunk)
+        except (OSError, ValueError):
+            pass
+        finally:
+            log.close()
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def join(self, timeout: Optional[float] = 10):
+        """等待读取线程读完输出（子进程派生的后台进程仍持有管道时最多等待 timeout 秒）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+
+    def excerpt(self, name: str) -> str:
+        log = self.logs.get(name)
+        return log.excerpt() if log else ''
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict({name: log.to_dict() for name, log in self.logs.items()}, log_dir=self.log_dir)
+
+
+def log_dir_for(settings: Dict[str, Any], name: str) -> str:
+    return os.path.join(settings['folder'], name)
+
+
+def read_log_chunk(path: str, offset: Optional[int] = None, limit: int = 64 * 1024) -> Dict[str, Any]:
+    """
+    按字节偏移读取日志文件（实时查看）
+
+    Args:
+        offset: 起始偏移（上次返回的 next_offset）；None 时返回末尾 limit 字节
+        limit: 最多读取的字节数，next_offset 小于 size 时可继续读取
+
+    Returns:
+        {'offset', 'next_offset', 'size', 'data'}
+    """
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    start = max(0, size - limit) if offset is None else max(0, min(int(offset), size))
+    data = b''
+    if size > start:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read(min(limit, size - start))
+    if offset is None:
+        trimmed = _skip_partial_char(data)
+        start += len(data) - len(trimmed)
+        data = trimmed
+    data = _trim_partial_char(data)
+    return {
+        'offset': start,
+        'next_offset': start + len(data),
+        'size': size,
+        'data': data.decode('utf-8', errors='replace'),
+    }
+
+
+MAX_READ_LIMIT = 1024 * 1024
+
+
+def read_stream(log_dir: str, stream: str = 'stdout', offset=None, limit=None) -> Dict[str, Any]:
+    """
+    读取日志目录中某个输出流（实时查看接口使用）
+
+    Raises:
+        ValueError: stream / offset / limit 不合法
+    """
+    if stream not in STREAMS:
+        raise ValueError(f'stream 必须是 {" / ".join(STREAMS)}')
+    try:
+        offset = None if offset in (None, '') else int(offset)
+        limit = 64 * 1024 if limit in (None, '') else int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('offset 和 limit 必须是整数')
+    if offset is not None and offset < 0:
+        raise ValueError('offset 不能小于 0')
+    limit = max(1, min(limit, MAX_READ_LIMIT))
+    return dict(read_log_chunk(os.path.join(log_dir, f'{stream}.log'), offset, limit), stream=stream)
+
+
+def cleanup_logs(settings: Dict[str, Any]) -> int:
+    """删除超过 retention_days 天未写入的日志目录"""
+    folder = settings['folder']
+    if not os.path.isdir(folder):
+        return 0
+    cutoff = time.time() - float(settings.get('retention_days') or 14) * 86400
+    removed = 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if not os.path.isdir(path):
+            continue
+        mtimes = [os.path.getmtime(path)] + [os.path.getmtime(os.path.join(path, f)) for f in os.listdir(path)]
+        if max(mtimes) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,245 @@
+"""
+Web 测试网络路由配置
+
+脚本的 config.network 描述执行时对页面请求的处理，由 web_runtime 在每个浏览器上下文上注册路由后生效，
+脚本无需自己编写 page.route：
+
+    {
+        "profile": "fast",                                  // 预置配置，可与下面的字段叠加
+        "block_resource_types": ["image", "media", "font"], // 按资源类型拦截
+        "block_urls": ["*://*.google-analytics.com/*"],     // 按 URL 通配符拦截
+        "allow_urls": ["*://cdn.example.com/logo.png"],     // 例外：命中时不拦截
+        "cache_urls": ["*://cdn.example.com/*"],            // 命中的 GET 请求使用本地缓存应答
+        "cache_resource_types": ["script", "stylesheet"]
+    }
+
+缓存按用户与脚本分目录、目录内按 URL 保存状态码为 200 的响应，同一台机器上同一脚本的后续执行直接从缓存应答。
+携带 Authorization / Cookie 请求头的请求不使用缓存，响应头含 Cache-Control: private / no-store 或 Set-Cookie 的响应不保存。
+执行结束后各类请求的数量写入执行结果的 network 字段。
+
+本模块只依赖标准库，执行时会被复制到运行目录中使用。
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+# Playwright request.resource_type 的取值（document 为页面本身，不允许拦截）
+RESOURCE_TYPES = ('stylesheet', 'image', 'media', 'font', 'script', 'texttrack', 'xhr', 'fetch',
+                  'eventsource', 'websocket', 'manifest', 'other')
+
+TRACKER_URLS = [
+    '*://*.google-analytics.com/*',
+    '*://*.googletagmanager.com/*',
+    '*://*.doubleclick.net/*',
+    '*://connect.facebook.net/*',
+    '*://*.hotjar.com/*',
+    '*://*.segment.io/*',
+    '*://hm.baidu.com/*',
+    '*://*.cnzz.com/*',
+    '*://*.growingio.com/*',
+]
+
+PROFILES = {
+    'no_media': {'block_resource_types': ['image', 'media', 'font']},
+    'no_trackers': {'block_urls': TRACKER_URLS},
+    'fast': {'block_resource_types': ['image', 'media', 'font'], 'block_urls': TRACKER_URLS},
+}
+
+LIST_FIELDS = ('block_resource_types', 'block_urls', 'allow_urls', 'cache_urls', 'cache_resource_types')
+MAX_PATTERNS = 200
+
+# 携带这些请求头的请求可能返回用户相关的内容，不使用缓存
+CREDENTIAL_HEADERS = ('authorization', 'cookie', 'proxy-authorization')
+
+
+def validate_network_config(network: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    校验 config.network
+
+    Returns:
+        错误信息，校验通过返回 None
+    """
+    if network is None:
+        return None
+    if not isinstance(network, dict):
+        return 'config.network must be an object'
+
+    unknown = set(network) - set(LIST_FIELDS) - {'profile'}
+    if unknown:
+        return f'config.network has unknown keys: {", ".join(sorted(unknown))}'
+    profile = network.get('profile')
+    if profile is not None and profile not in PROFILES:
+        return f'config.network.profile must be one of {", ".join(PROFILES)}'
+
+    for field in LIST_FIELDS:
+        value = network.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, list) or not all(isinstance(v, str) and v for v in value):
+            return f'config.network.{field} must be a list of strings'
+        if len(value) > MAX_PATTERNS:
+            return f'config.network.{field} must not have more than {MAX_PATTERNS} items'
+        if field.endswith('resource_types'):
+            invalid = sorted(set(value) - set(RESOURCE_TYPES))
+            if invalid:
+                return f'config.network.{field} has invalid resource types: {", ".join(invalid)}'
+    return None
+
+
+def resolve_network_config(network: Optional[Dict[str, Any]]) -> Optional[Dict[str, List[str]]]:
+    """合并预置配置与脚本配置，未配置任何规则时返回 None"""
+    if not network:
+        return None
+    resolved = {field: list(PROFILES.get(network.get('profile'), {}).get(field, [])) for field in LIST_FIELDS}
+    for field in LIST_FIELDS:
+        for value in network.get(field) or []:
+            if value not in resolved[field]:
+                resolved[field].append(value)
+    if not any(resolved[field] for field in LIST_FIELDS if field != 'allow_urls'):
+        return None
+    resolved['profile'] = network.get('profile')
+    return resolved
+
+
+def cache_folder(folder: str, user_id, script_id) -> str:
+    """脚本的缓存目录：按用户与脚本隔离，不同用户、不同脚本之间不共享缓存的响应"""
+    return os.path.join(folder, f'user_{user_id}', f'script_{script_id}')
+
+
+def _compile(patterns: List[str]):
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{fnmatch.translate(p)})' for p in patterns))
+
+
+class NetworkRules:
+    """
+    按配置判断每个请求的处理方式，并统计数量
+
+    Example:
+        rules = NetworkRules(resolve_network_config(config['network']), cache_dir='/tmp/cache')
+        action = rules.decide(request.url, request.resource_type, request.method)  # block / cache / None
+    """
+
+    def __init__(self, network: Dict[str, List[str]], cache_dir: Optional[str] = None,
+                 max_entry_bytes: Optional[int] = None):
+        self.profile = network.get('profile')
+        self.block_types = set(network.get('block_resource_types') or [])
+        self.cache_types = set(network.get('cache_resource_types') or [])
+        self.block_urls = _compile(network.get('block_urls'))
+        self.allow_urls = _compile(network.get('allow_urls'))
+        self.cache_urls = _compile(network.get('cache_urls'))
+        self.cache_dir = cache_dir
+        self.max_entry_bytes = max_entry_bytes
+        self.counts = {'requests': 0, 'blocked': 0, 'cache_hits': 0, 'cache_misses': 0, 'cache_stored': 0,
+                       'cache_bypassed': 0, 'passed': 0, 'errors': 0}
+        self.blocked_by_type: Dict[str, int] = {}
+        self.bytes_from_cache = 0
+
+    def decide(self, url: str, resource_type: str, method: str = 'GET') -> Optional[str]:
+        self.counts['requests'] += 1
+        allowed = self.allow_urls is not None and self.allow_urls.match(url)
+        if not allowed and resource_type != 'document' and (
+                resource_type in self.block_types or (self.block_urls is not None and self.block_urls.match(url))):
+            self.counts['blocked'] += 1
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+            return 'block'
+        if self.cache_dir and method == 'GET' and (
+                resource_type in self.cache_types or (self.cache_urls is not None and self.cache_urls.match(url))):
+            return 'cache'
+        self.counts['passed'] += 1
+        return None
+
+    # ---------- 本地缓存 ----------
+
+    def bypass_cache(self, request_headers: Optional[Dict[str, str]]) -> bool:
+        """请求携带身份信息（Authorization / Cookie）时不读写缓存，直接发送"""
+        if any(k.lower() in CREDENTIAL_HEADERS for k in (request_headers or {})):
+            self.counts['cache_bypassed'] += 1
+            return True
+        return False
+
+    def _cache_path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest[2:])
+
+    def cache_get(self, url: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的响应 {'status', 'headers', 'body'}，未命中时返回 None"""
+        path = self._cache_path(url)
+        try:
+            with open(path + '.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(path + '.body', 'rb') as f:
+                body = f.read()
+            os.utime(path + '.json')  # 清理时保留最近使用的缓存
+        except (OSError, ValueError):
+            self.counts['cache_misses'] += 1
+            return None
+        if meta.get('url') != url:
+            self.counts['cache_misses'] += 1
+            return None
+        self.counts['cache_hits'] += 1
+        self.bytes_from_cache += len(body)
+        return {'status': meta['status'], 'headers': meta['headers'], 'body': body}
+
+    def cache_put(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> bool:
+        """保存响应（仅 200、未禁止共享缓存、不设置 Cookie 且大小未超过上限的响应）"""
+        lowered = {k.lower(): v for k, v in (headers or {}).items()}
+        cache_control = lowered.get('cache-control', '').lower()
+        if status != 200 or 'no-store' in cache_control or 'private' in cache_control or 'set-cookie' in lowered:
+            return False
+        if self.max_entry_bytes is not None and len(body) > self.max_entry_bytes:
+            return False
+        path = self._cache_path(url)
+        suffix = f'.{uuid.uuid4().hex}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.body' + suffix, 'wb') as f:
+                f.write(body)
+            with open(path + '.json' + suffix, 'w', encoding='utf-8') as f:
+                # 内容已解码，去掉与原始传输相关的响应头
+                json.dump({'url': url, 'status': status, 'stored_at': time.time(),
+                           'headers': {k: v for k, v in headers.items()
+                                       if k.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}},
+                          f, ensure_ascii=False)
+            os.replace(path + '.body' + suffix, path + '.body')
+            os.replace(path + '.json' + suffix, path + '.json')
+        except OSError:
+            for name in (path + '.body' + suffix, path + '.json' + suffix):
+                if os.path.exists(name):
+                    os.remove(name)
+            return False
+        self.counts['cache_stored'] += 1
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.counts, profile=self.profile, blocked_by_type=dict(self.blocked_by_type),
+                    bytes_from_cache=self.bytes_from_cache)
+
+
+def prune_cache(settings: Dict[str, Any]) -> int:
+    """删除超过 retention_days 天未使用的缓存响应（遍历各用户、脚本的缓存目录），并删除空目录"""
+    folder = settings['folder']
+    if not os.path.isdir(folder):
+        return 0
+    cutoff = time.time() - float(settings.get('retention_days') or 7) * 86400
+    removed = 0
+    for directory, _, filenames in os.walk(folder, topdown=False):
+        for filename in filenames:
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(directory, filename)
+            if os.path.getmtime(path) < cutoff:
+                for name in (path, path[:-len('.json')] + '.body'):
+                    if os.path.exists(name):
+                        os.remove(name)
+                removed += 1
+        if directory != folder and not os.listdir(directory):
+            os.rmdir(directory)
+    return removed
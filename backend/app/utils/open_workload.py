@@ -0,0 +1,195 @@
+"""
+开环负载（目标到达速率）工具
+
+开环模型按计划到达时间发送请求，不受目标响应变慢的影响。
+延迟同时按两种口径统计：
+- raw:       从实际发出请求开始计时（Locust / 闭环模型的口径）
+- corrected: 从计划发送时间开始计时，修正协调遗漏（coordinated omission）
+
+生成器本身跟不上目标速率时（实际发送滞后于计划时间、丢弃到达），
+按秒记录的时间线会标记出落后的区间，报告据此判断结果是否可信。
+
+本模块只依赖标准库，运行时复制到压测运行目录，供 Locust 脚本和 asyncio 引擎共用。
+"""
+
+try:
+    from .latency_histogram import LatencyHistogram
+except ImportError:  # 作为独立脚本运行时
+    from latency_histogram import LatencyHistogram
+
+
+# 平均调度滞后超过该值（毫秒）的秒视为生成器落后
+KEEP_UP_LAG_MS = 50.0
+
+# 实际发送数低于计划数的该比例视为生成器落后
+KEEP_UP_RATE_RATIO = 0.95
+
+
+def arrival_rate_at(elapsed, target_rps=None, stages=None):
+    """
+    获取 elapsed 秒时的目标到达速率
+
+    Args:
+        elapsed: 已运行秒数
+        target_rps: 固定目标速率
+        stages: 分阶段速率 [{"duration": 30, "rps": 100}, ...]，优先于 target_rps；
+                超出所有阶段后保持最后一个阶段的速率
+
+    Returns:
+        目标速率（请求/秒）
+    """
+    if stages:
+        start = 0.0
+        for stage in stages:
+            start += float(stage['duration'])
+            if elapsed < start:
+                return float(stage['rps'])
+        return float(stages[-1]['rps'])
+    return float(target_rps or 0)
+
+
+class ArrivalSchedule:
+    """按目标速率生成计划发送时间（时间基准由调用方提供）"""
+
+    def __init__(self, start, target_rps=None, stages=None, share=1.0):
+        self.start = start
+        self.target_rps = target_rps
+        self.stages = stages
+        self.share = share
+        self.next_at = start
+
+    def rate(self, now):
+        return arrival_rate_at(now - self.start, self.target_rps, self.stages) * self.share
+
+    def claim(self):
+        """领取下一个计划发送时间"""
+        intended = self.next_at
+        rate = self.rate(intended)
+        self.next_at = intended + (1.0 / rate if rate > 0 else 1.0)
+        return intended
+
+
+class OpenWorkloadStats:
+    """开环负载统计：raw / corrected 延迟直方图、调度滞后以及按秒时间线"""
+
+    def __init__(self, start, target_rps=None, stages=None):
+        self.start = start
+        self.target_rps = target_rps
+        self.stages = stages
+        self.raw = LatencyHistogram()
+        self.corrected = LatencyHistogram()
+        self.lag = LatencyHistogram()
+        self.scheduled = 0
+        self.started = 0
+        self.dropped = 0
+        self.timeline = {}
+
+    def _second(self, now):
+        second = int(now - self.start)
+        slot = self.timeline.get(second)
+        if slot is None:
+            slot = self.timeline[second] = [0, 0, 0.0, 0]  # scheduled, started, lag_sum_ms, dropped
+        return slot
+
+    def record_scheduled(self, intended):
+        self.scheduled += 1
+        self._second(intended)[0] += 1
+
+    def record_dropped(self, intended):
+        self.dropped += 1
+        self._second(intended)[3] += 1
+
+    def record_started(self, intended, actual):
+        lag_ms = max(0.0, (actual - intended) * 1000)
+        self.started += 1
+        self.lag.record(lag_ms)
+        slot = self._second(actual)
+        slot[1] += 1
+        slot[2] += lag_ms
+
+    def record_response(self, raw_ms, lag_ms):
+        self.raw.record(raw_ms)
+        self.corrected.record(raw_ms + max(0.0, lag_ms))
+
+    def to_dict(self):
+        """序列化（直方图可与其他进程的数据合并）"""
+        return {
+            'target_rps': self.target_rps,
+            'stages': self.stages,
+            'scheduled': self.scheduled,
+            'started': self.started,
+            'dropped': self.dropped,
+            'raw': self.raw.to_dict(),
+            'corrected': self.corrected.to_dict(),
+            'lag': self.lag.to_dict(),
+            'timeline': {str(k): v for k, v in self.timeline.items()},
+        }
+
+
+def summarize(items, duration=None):
+    """
+    汇总一个或多个进程的开环负载统计（OpenWorkloadStats.to_dict() 的结构）
+
+    Returns:
+        目标/实际速率、raw 与 corrected 分位数、调度滞后以及生成器落后的区间
+    """
+    items = [i for i in items if i]
+    if not items:
+        return None
+
+    raw, corrected, lag = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    timeline = {}
+    for item in items:
+        raw.merge(LatencyHistogram.from_dict(item['raw']))
+        corrected.merge(LatencyHistogram.from_dict(item['corrected']))
+        lag.merge(LatencyHistogram.from_dict(item['lag']))
+        for second, values in (item.get('timeline') or {}).items():
+            slot = timeline.setdefault(int(second), [0, 0, 0.0, 0])
+            for i, value in enumerate(values):
+                slot[i] += value
+
+    scheduled = sum(i['scheduled'] for i in items)
+    started = sum(i['started'] for i in items)
+    dropped = sum(i['dropped'] for i in items)
+    first = items[0]
+
+    seconds = []
+    behind = []
+    for second in sorted(timeline):
+        sched, start, lag_sum, drop = timeline[second]
+        avg_lag = lag_sum / start if start else 0.0
+        is_behind = drop > 0 or avg_lag > KEEP_UP_LAG_MS or (sched and start < sched * KEEP_UP_RATE_RATIO)
+        seconds.append({
+            'second': second,
+            'target_rps': round(arrival_rate_at(second, first.get('target_rps'), first.get('stages')), 3),
+            'scheduled': sched,
+            'started': start,
+            'dropped': drop,
+            'avg_lag_ms': round(avg_lag, 3),
+            'behind': bool(is_behind),
+        })
+        if is_behind:
+            if behind and behind[-1][1] == second:
+                behind[-1][1] = second + 1
+            else:
+                behind.append([second, second + 1])
+
+    # 最后一秒通常不完整，不参与落后判断
+    if behind and seconds and behind[-1] == [seconds[-1]['second'], seconds[-1]['second'] + 1]:
+        behind.pop()
+
+    elapsed = duration or (len(seconds) or 1)
+    return {
+        'target_rps': first.get('target_rps'),
+        'stages': first.get('stages'),
+        'scheduled': scheduled,
+        'started': started,
+        'dropped': dropped,
+        'achieved_rps': round(started / elapsed, 3) if elapsed else 0,
+        'raw': raw.summary(),
+        'corrected': corrected.summary(),
+        'lag': lag.summary(),
+        'keep_up': not behind,
+        'behind_intervals': behind,
+        'timeline': seconds,
+    }
@@ -0,0 +1,144 @@
+"""
+性能测试回归对比工具
+
+对比两次性能测试执行的汇总指标和各接口指标，超出容差的变化标记为回归
+"""
+
+from typing import Dict, Any, List, Optional
+
+
+# 默认容差：P95 / 吞吐量为相对变化百分比，错误率为绝对百分点
+DEFAULT_TOLERANCES = {
+    'p95_pct': 10.0,
+    'rps_pct': 10.0,
+    'error_rate_abs': 1.0,
+}
+
+
+def _pct_change(current: float, baseline: float) -> Optional[float]:
+    """计算相对变化百分比，基线为 0 时返回 None"""
+    if not baseline:
+        return None
+    return round((current - baseline) / baseline * 100, 2)
+
+
+def merge_tolerances(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """
+    合并容差配置
+
+    Args:
+        overrides: 覆盖的容差配置，无法转换为数字的值会被忽略
+
+    Returns:
+        完整的容差字典
+    """
+    tolerances = dict(DEFAULT_TOLERANCES)
+    for key, value in (overrides or {}).items():
+        if key not in tolerances or value is None:
+            continue
+        try:
+            tolerances[key] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return tolerances
+
+
+def compare_metrics(current: Dict[str, Any], baseline: Dict[str, Any],
+                    tolerances: Dict[str, float]) -> Dict[str, Any]:
+    """
+    对比一组指标
+
+    Args:
+        current: 当前指标，包含 p95_response_time / throughput / error_rate
+        baseline: 基线指标
+        tolerances: 容差配置
+
+    Returns:
+        各指标的对比结果及回归列表
+    """
+    cur_p95 = float(current.get('p95_response_time') or 0)
+    base_p95 = float(baseline.get('p95_response_time') or 0)
+    cur_rps = float(current.get('throughput') or 0)
+    base_rps = float(baseline.get('throughput') or 0)
+    cur_err = float(current.get('error_rate') or 0)
+    base_err = float(baseline.get('error_rate') or 0)
+
+    p95_change = _pct_change(cur_p95, base_p95)
+    rps_change = _pct_change(cur_rps, base_rps)
+    err_delta = round(cur_err - base_err, 2)
+
+    regressions = []
+    if p95_change is not None and p95_change > tolerances['p95_pct']:
+        regressions.append('p95_response_time')
+    if rps_change is not None and -rps_change > tolerances['rps_pct']:
+        regressions.append('throughput')
+    if err_delta > tolerances['error_rate_abs']:
+        regressions.append('error_rate')
+
+    return {
+        'p95_response_time': {
+            'current': cur_p95,
+            'baseline': base_p95,
+            'change_pct': p95_change,
+        },
+        'throughput': {
+            'current': cur_rps,
+            'baseline': base_rps,
+            'change_pct': rps_change,
+        },
+        'error_rate': {
+            'current': cur_err,
+            'baseline': base_err,
+            'delta': err_delta,
+        },
+        'regressions': regressions,
+    }
+
+
+def _endpoint_key(stat: Dict[str, Any]) -> tuple:
+    return (stat.get('method') or '', stat.get('name') or '')
+
+
+def compare_runs(current: Dict[str, Any], baseline: Dict[str, Any],
+                 tolerances: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    对比两次执行
+
+    Args:
+        current: 当前执行，包含 metrics 和 endpoint_stats（PerfTestRun.to_dict() 的结构）
+        baseline: 基线执行
+        tolerances: 容差覆盖配置
+
+    Returns:
+        汇总对比、各接口对比以及是否存在回归
+    """
+    tolerances = merge_tolerances(tolerances)
+
+    overall = compare_metrics(current.get('metrics') or {}, baseline.get('metrics') or {}, tolerances)
+
+    baseline_endpoints = {_endpoint_key(s): s for s in (baseline.get('endpoint_stats') or [])}
+    endpoints: List[Dict[str, Any]] = []
+    for stat in current.get('endpoint_stats') or []:
+        key = _endpoint_key(stat)
+        base_stat = baseline_endpoints.pop(key, None)
+        entry = {'method': key[0], 'name': key[1]}
+        if base_stat is None:
+            entry['status'] = 'new'
+        else:
+            entry.update(compare_metrics(stat, base_stat, tolerances))
+            entry['status'] = 'regressed' if entry['regressions'] else 'ok'
+        endpoints.append(entry)
+
+    for key in baseline_endpoints:
+        endpoints.append({'method': key[0], 'name': key[1], 'status': 'missing'})
+
+    regressed = bool(overall['regressions']) or any(e.get('status') == 'regressed' for e in endpoints)
+
+    return {
+        'current_run_id': current.get('id'),
+        'baseline_run_id': baseline.get('id'),
+        'tolerances': tolerances,
+        'overall': overall,
+        'endpoints': endpoints,
+        'regressed': regressed,
+    }
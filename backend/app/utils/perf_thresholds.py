@@ -0,0 +1,125 @@
+"""
+性能测试 SLO 阈值工具
+
+场景配置 config.thresholds 定义压测过程中的服务等级阈值：
+- max_error_rate: 错误率上限（%）
+- max_p95 / max_p99: P95 / P99 响应时间上限（ms）
+- min_rps: 吞吐量下限（请求/秒）
+- window: 违规需持续的秒数，默认 10
+- grace_period: 压测开始后不检查的秒数（预热/加压阶段），默认 30
+
+实时监控按 stats_history 最新一行（Locust 的当前窗口数据）检查阈值，
+持续违规超过 window 秒即提前终止压测，执行记录标记为 aborted_slo。
+"""
+
+from typing import Dict, Any, Optional
+
+
+# 规则 -> (指标, 比较方向, 单位)
+THRESHOLD_RULES = {
+    'max_error_rate': ('error_rate', 'max', '%'),
+    'max_p95': ('p95_response_time', 'max', 'ms'),
+    'max_p99': ('p99_response_time', 'max', 'ms'),
+    'min_rps': ('throughput', 'min', 'req/s'),
+}
+
+DEFAULT_WINDOW = 10
+DEFAULT_GRACE_PERIOD = 30
+
+ABORTED_STATUS = 'aborted_slo'
+
+
+def validate_thresholds(thresholds: Optional[Dict[str, Any]], max_duration: int) -> Optional[str]:
+    """
+    校验阈值配置
+
+    Returns:
+        错误信息，校验通过返回 None
+    """
+    if thresholds is None:
+        return None
+    if not isinstance(thresholds, dict):
+        return 'config.thresholds must be an object'
+
+    unknown = set(thresholds) - set(THRESHOLD_RULES) - {'window', 'grace_period'}
+    if unknown:
+        return f'config.thresholds has unknown keys: {", ".join(sorted(unknown))}'
+    if not any(thresholds.get(rule) is not None for rule in THRESHOLD_RULES):
+        return f'config.thresholds must define at least one of {", ".join(THRESHOLD_RULES)}'
+
+    for rule in THRESHOLD_RULES:
+        value = thresholds.get(rule)
+        if value is None:
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return f'config.thresholds.{rule} must be a number'
+        if value < 0 or (rule == 'max_error_rate' and value > 100):
+            return f'config.thresholds.{rule} is out of range'
+
+    for field in ('window', 'grace_period'):
+        if thresholds.get(field) is None:
+            continue
+        try:
+            value = int(thresholds[field])
+        except (TypeError, ValueError):
+            return f'config.thresholds.{field} must be an integer'
+        if not 0 <= value <= max_duration:
+            return f'config.thresholds.{field} must be between 0 and {max_duration}'
+    return None
+
+
+class ThresholdMonitor:
+    """
+    阈值检查器
+
+    每次 check 传入当前窗口指标，某条规则从首次违规起持续 window 秒仍违规时返回违规信息；
+    中途恢复则重新计时。
+    """
+
+    def __init__(self, thresholds: Dict[str, Any]):
+        self.rules = {rule: float(thresholds[rule]) for rule in THRESHOLD_RULES
+                      if thresholds.get(rule) is not None}
+        self.window = int(thresholds.get('window', DEFAULT_WINDOW) or 0)
+        self.grace_period = int(thresholds.get('grace_period', DEFAULT_GRACE_PERIOD) or 0)
+        self._breach_since = {}
+
+    def check(self, metrics: Dict[str, Any], elapsed: float) -> Optional[Dict[str, Any]]:
+        """
+        检查阈值
+
+        Args:
+            metrics: 当前窗口指标（error_rate / p95_response_time / p99_response_time / throughput）
+            elapsed: 压测已运行秒数
+
+        Returns:
+            违规信息，未违规返回 None
+        """
+        if elapsed < self.grace_period:
+            return None
+
+        for rule, threshold in self.rules.items():
+            metric, direction, unit = THRESHOLD_RULES[rule]
+            value = metrics.get(metric)
+            if value is None:
+                continue
+            breached = value > threshold if direction == 'max' else value < threshold
+            if not breached:
+                self._breach_since.pop(rule, None)
+                continue
+
+            since = self._breach_since.setdefault(rule, elapsed)
+            if elapsed - since >= self.window:
+                op = '>' if direction == 'max' else '<'
+                return {
+                    'rule': rule,
+                    'metric': metric,
+                    'threshold': threshold,
+                    'value': round(float(value), 3),
+                    'breached_at': round(since, 1),
+                    'aborted_at': round(elapsed, 1),
+                    'message': f'{metric} = {value:.2f}{unit} {op} {threshold:g}{unit}，'
+                               f'持续 {elapsed - since:.0f} 秒，已提前终止压测',
+                }
+        return None
@@ -0,0 +1,314 @@
+"""
+压测原始样本采集与分析
+
+Locust 的 CSV 只有预先聚合的百分位，无法事后按时间窗口（如剔除预热阶段）或单个接口重新计算。
+开启 config.raw_samples 后，压测进程把每个请求的（时间戳、接口、延迟、状态码、响应字节数、是否失败）
+按列写入紧凑的二进制文件，执行结束后随执行记录保存，分析接口按任意窗口和过滤条件重新统计。
+
+文件格式（每个压测进程一个文件，小端）：
+    MAGIC(8) | header_len(uint32) | header(JSON: start, source)
+    | 数据块 * N
+
+数据块：
+    b'RSBK' | rows(uint32) | names_len(uint32) | payload_len(uint32)
+    | names(JSON，本块新出现的接口 [[method, name], ...]，按出现顺序追加到接口表)
+    | zlib(列数据)
+
+列数据（每列连续存放）：
+    offset_ms uint32（相对 header.start）| endpoint uint16 | latency_ms float32
+    | status uint16（0 表示连接错误等无响应）| bytes uint32 | failed uint8
+
+写入部分只依赖标准库，压测时会被复制到运行目录中使用；分析部分需要 NumPy。
+"""
+
+import glob
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+MAGIC = b'EASYRS01'
+BLOCK_MAGIC = b'RSBK'
+BLOCK_HEADER = struct.Struct('<4sIII')
+BLOCK_ROWS = 65536
+FLUSH_INTERVAL = 1.0
+
+# (列名, array 类型码, NumPy dtype)
+COLUMNS = (
+    ('offset_ms', 'I', '<u4'),
+    ('endpoint', 'H', '<u2'),
+    ('latency_ms', 'f', '<f4'),
+    ('status', 'H', '<u2'),
+    ('bytes', 'I', '<u4'),
+    ('failed', 'B', 'u1'),
+)
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+MAX_BUCKETS = 2000
+
+
+class SampleWriter:
+    """
+    原始样本写入器
+
+    Example:
+        writer = SampleWriter('rt_samples_0.bin', source='locust')
+        writer.record(time.time(), 'GET', '/api', 12.5, 200, 512, False)
+        writer.close()
+    """
+
+    def __init__(self, path, source='locust', start=None, block_rows=BLOCK_ROWS):
+        self.path = path
+        self.start = start if start is not None else time.time()
+        self.block_rows = block_rows
+        self.endpoints = {}
+        self.new_endpoints = []
+        self.rows = 0
+        self.columns = [array(code) for _, code, _ in COLUMNS]
+        self._file = open(path, 'wb')
+        header = json.dumps({'start': self.start, 'source': source}).encode('utf-8')
+        self._file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self._file.flush()
+
+    def record(self, timestamp, method, name, latency_ms, status, size, failed):
+        key = (method or '', name or '')
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            endpoint = self.endpoints[key] = len(self.endpoints)
+            self.new_endpoints.append(list(key))
+        offset, endpoints, latency, statuses, sizes, failures = self.columns
+        offset.append(max(0, min(0xFFFFFFFF, int((timestamp - self.start) * 1000))))
+        endpoints.append(min(endpoint, 0xFFFF))
+        latency.append(float(latency_ms or 0))
+        statuses.append(max(0, min(0xFFFF, int(status or 0))))
+        sizes.append(max(0, min(0xFFFFFFFF, int(size or 0))))
+        failures.append(1 if failed else 0)
+        if len(offset) >= self.block_rows:
+            self.flush()
+
+    def flush(self):
+        """把缓冲的样本压缩为一个数据块写入文件"""
+        rows = len(self.columns[0])
+        if not rows:
+            return
+        parts = []
+        for column in self.columns:
+            if sys.byteorder == 'big':
+                column.byteswap()
+            parts.append(column.tobytes())
+        payload = zlib.compress(b''.join(parts), 1)
+        names = json.dumps(self.new_endpoints, ensure_ascii=False).encode('utf-8')
+        self._file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, rows, len(names), len(payload)))
+        self._file.write(names)
+        self._file.write(payload)
+        self._file.flush()
+        self.rows += rows
+        self.new_endpoints = []
+        self.columns = [array(code) for _, code, _ in COLUMNS]
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+def _iter_blocks(path):
+    """逐块读取文件，返回 (header, [(rows, names, payload), ...])；末尾不完整的块（进程被终止时）忽略"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{os.path.basename(path)} 不是原始样本文件')
+        (header_len,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+        blocks = []
+        while True:
+            raw = f.read(BLOCK_HEADER.size)
+            if len(raw) < BLOCK_HEADER.size:
+                break
+            magic, rows, names_len, payload_len = BLOCK_HEADER.unpack(raw)
+            if magic != BLOCK_MAGIC:
+                break
+            names = f.read(names_len)
+            payload = f.read(payload_len)
+            if len(payload) < payload_len:
+                break
+            blocks.append((rows, json.loads(names.decode('utf-8')), payload))
+    return header, blocks
+
+
+def run_samples_dir(report_folder, run_id):
+    """执行记录的原始样本目录"""
+    return os.path.join(report_folder, 'perf_samples', f'run_{run_id}')
+
+
+def sample_files(directory):
+    return sorted(glob.glob(os.path.join(directory, '*.bin')))
+
+
+def describe_samples(paths):
+    """统计样本文件的行数与大小（不解压数据）"""
+    rows = size = 0
+    for path in paths:
+        _, blocks = _iter_blocks(path)
+        rows += sum(block[0] for block in blocks)
+        size += os.path.getsize(path)
+    return {'files': len(paths), 'rows': rows, 'size': size,
+            'bytes_per_row': round(size / rows, 2) if rows else None}
+
+
+def load_samples(paths):
+    """
+    读取并合并多个样本文件（需要 NumPy）
+
+    Returns:
+        (columns, endpoints): columns 为 {列名: ndarray}，其中 timestamp 为 Unix 秒（float64），
+        endpoint 为合并后的接口表下标；endpoints 为 [[method, name], ...]
+    """
+    import numpy as np
+
+    endpoints, endpoint_index = [], {}
+    merged = {name: [] for name, _, _ in COLUMNS}
+    merged['timestamp'] = []
+    for path in paths:
+        header, blocks = _iter_blocks(path)
+        local = []
+        for rows, names, payload in blocks:
+            for method, name in names:
+                key = (method, name)
+                if key not in endpoint_index:
+                    endpoint_index[key] = len(endpoints)
+                    endpoints.append([method, name])
+                local.append(endpoint_index[key])
+            data = zlib.decompress(payload)
+            offset = 0
+            for name, _, dtype in COLUMNS:
+                width = np.dtype(dtype).itemsize * rows
+                merged[name].append(np.frombuffer(data, dtype=dtype, count=rows, offset=offset))
+                offset += width
+            mapping = np.asarray(local, dtype=np.int32)
+            merged['endpoint'][-1] = mapping[merged['endpoint'][-1]]
+            merged['timestamp'].append(header['start'] + merged['offset_ms'][-1] / 1000.0)
+
+    empty = {'timestamp': np.float64, 'endpoint': np.int32, 'latency_ms': np.float32,
+             'status': np.uint16, 'bytes': np.uint32, 'failed': np.uint8}
+    columns = {}
+    for name, dtype in empty.items():
+        parts = merged[name]
+        columns[name] = np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+    return columns, endpoints
+
+
+def _stats(np, latency, failed, sizes, duration, percentiles):
+    count = int(latency.size)
+    if not count:
+        return {'request_count': 0, 'failure_count': 0, 'error_rate': 0.0, 'throughput': 0.0,
+                'avg_response_time': None, 'min_response_time': None, 'max_response_time': None,
+                'percentiles': {}, 'avg_content_size': None}
+    failures = int(failed.sum())
+    values = np.percentile(latency, percentiles) if percentiles else []
+    return {
+        'request_count': count,
+        'failure_count': failures,
+        'error_rate': round(failures / count * 100, 4),
+        'throughput': round(count / duration, 4) if duration > 0 else None,
+        'avg_response_time': round(float(latency.mean()), 3),
+        'min_response_time': round(float(latency.min()), 3),
+        'max_response_time': round(float(latency.max()), 3),
+        'percentiles': {f'p{p:g}': round(float(v), 3) for p, v in zip(percentiles, values)},
+        'avg_content_size': round(float(sizes.mean()), 2),
+    }
+
+
+def analyze(columns, endpoints, start=None, end=None, endpoint_names=None, methods=None,
+            status=None, failed=None, percentiles=DEFAULT_PERCENTILES, interval=None):
+    """
+    按窗口和过滤条件重新计算统计
+
+    Args:
+        start / end: 相对压测开始（第一个样本）的秒数窗口，如 start=30 剔除前 30 秒预热
+        endpoint_names: 只统计这些接口名称
+        methods: 只统计这些 HTTP 方法
+        status: 只统计这些状态码
+        failed: True 只统计失败请求，False 只统计成功请求
+        percentiles: 需要计算的百分位
+        interval: 时间序列的分桶秒数，None 时不返回时间序列
+
+    Returns:
+        {'window', 'total', 'endpoints', 'timeline'}
+    """
+    import numpy as np
+
+    ts = columns['timestamp']
+    origin = float(ts.min()) if ts.size else 0.0
+    relative = ts - origin
+    mask = np.ones(ts.size, dtype=bool)
+    if start is not None:
+        mask &= relative >= start
+    if end is not None:
+        mask &= relative < end
+    if endpoint_names:
+        wanted = [i for i, (_, name) in enumerate(endpoints) if name in set(endpoint_names)]
+        mask &= np.isin(columns['endpoint'], wanted)
+    if methods:
+        wanted = [i for i, (method, _) in enumerate(endpoints) if method.upper() in {m.upper() for m in methods}]
+        mask &= np.isin(columns['endpoint'], wanted)
+    if status:
+        mask &= np.isin(columns['status'], list(status))
+    if failed is not None:
+        mask &= columns['failed'] == (1 if failed else 0)
+
+    rel = relative[mask]
+    latency = columns['latency_ms'][mask].astype(np.float64)
+    fails = columns['failed'][mask]
+    sizes = columns['bytes'][mask]
+    endpoint = columns['endpoint'][mask]
+
+    window_start = start if start is not None else 0.0
+    window_end = end if end is not None else (float(relative.max()) if relative.size else 0.0)
+    duration = max(window_end - window_start, 0.0)
+
+    percentiles = [float(p) for p in percentiles]
+    result = {
+        'window': {'start': window_start, 'end': round(window_end, 3), 'duration': round(duration, 3),
+                   'origin': origin},
+        'total': _stats(np, latency, fails, sizes, duration, percentiles),
+        'endpoints': [],
+        'timeline': None,
+    }
+
+    if endpoint.size:
+        order = np.argsort(endpoint, kind='stable')
+        ids, first = np.unique(endpoint[order], return_index=True)
+        bounds = list(first[1:]) + [order.size]
+        for index, lo, hi in zip(ids, first, bounds):
+            selected = order[lo:hi]
+            method, name = endpoints[int(index)]
+            result['endpoints'].append(dict(
+                method=method, name=name,
+                **_stats(np, latency[selected], fails[selected], sizes[selected], duration, percentiles)
+            ))
+
+    if interval and rel.size:
+        interval = max(float(interval), duration / MAX_BUCKETS, 0.001)
+        buckets = ((rel - window_start) // interval).astype(np.int64)
+        timeline = []
+        order = np.argsort(buckets, kind='stable')
+        ids, first = np.unique(buckets[order], return_index=True)
+        bounds = list(first[1:]) + [order.size]
+        for bucket, lo, hi in zip(ids, first, bounds):
+            selected = order[lo:hi]
+            values = latency[selected]
+            timeline.append({
+                'offset': round(window_start + int(bucket) * interval, 3),
+                'requests': int(values.size),
+                'throughput': round(values.size / interval, 3),
+                'error_rate': round(float(fails[selected].mean()) * 100, 3),
+                'avg_response_time': round(float(values.mean()), 3),
+                'percentiles': {f'p{p:g}': round(float(v), 3)
+                                for p, v in zip(percentiles, np.percentile(values, percentiles))},
+            })
+        result['timeline'] = {'interval': interval, 'points': timeline}
+    return result
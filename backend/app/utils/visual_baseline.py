@@ -0,0 +1,202 @@
+"""
+Web 测试视觉回归基线
+
+每个脚本的基线图保存在产物存储中（对象按内容寻址，与执行产物共用），清单 refs/script_<id>_baselines.json
+记录各步骤当前的基线：
+
+    {"run_key": "script_3_baselines", "script_id": 3, "user_id": 1, "pinned": true,
+     "artifacts": [{"name": "login", "sha256": "...", "size": 10240, "width": 1280, "height": 720,
+                    "phash": "1f1f1fe0e0e0e0e1", "source_run": "script_3_20261019...", "updated_at": 1792410000.0}]}
+
+清单标记 pinned，不受产物保留天数影响；删除脚本时随脚本的其它清单一起删除。
+没有基线的步骤以首次执行的截图作为基线，之后可通过接口把某次执行的截图设为新基线。
+基线图可通过产物下载接口 /web-test/artifacts/script_<id>_baselines/<步骤名> 获取。
+"""
+
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from .artifact_store import ArtifactStore
+from .visual_diff import (
+    VISUAL_DIR, DIFF_DIR, STEP_PATTERN, VisualDiffError, compare_images, decode_image, identical_result, phash,
+    step_settings
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def baseline_key(script_id) -> str:
+    return f'script_{script_id}_baselines'
+
+
+class BaselineStore:
+    """
+    一个脚本各步骤的基线图
+
+    Example:
+        baselines = BaselineStore(get_artifact_store(settings), script_id=3, user_id=1)
+        entry = baselines.get('login')
+        with baselines.open(entry) as f:
+            ...
+    """
+
+    def __init__(self, store: ArtifactStore, script_id: int, user_id: int):
+        self.store = store
+        self.script_id = script_id
+        self.user_id = user_id
+        self.run_key = baseline_key(script_id)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """{步骤名: 基线}"""
+        ref = self.store.load_ref(self.run_key) or {}
+        return {entry['name']: entry for entry in ref.get('artifacts', [])}
+
+    def get(self, step: str) -> Optional[Dict[str, Any]]:
+        return self.load().get(step)
+
+    def open(self, entry: Dict[str, Any]):
+        return self.store.open(entry)
+
+    @contextmanager
+    def _locked(self):
+        """并发执行与接口同时更新基线时串行读改写清单"""
+        os.makedirs(self.store.refs_dir, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.store.refs_dir, f'{self.run_key}.lock'), 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def update(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        更新步骤的基线，值为 None 时删除该步骤的基线
+
+        Returns:
+            更新后的全部基线
+        """
+        with self._locked():
+            entries = self.load()
+            for step, entry in changes.items():
+                if entry is None:
+                    entries.pop(step, None)
+                else:
+                    entries[step] = dict(entry, name=step, kind='screenshot', content_type='image/png',
+                                         updated_at=time.time())
+            self.store.save_ref({
+                'run_key': self.run_key,
+                'script_id': self.script_id,
+                'user_id': self.user_id,
+                'pinned': True,
+                'created_at': time.time(),
+                'artifacts': [entries[step] for step in sorted(entries)],
+            })
+        return entries
+
+    def put_file(self, path: str, image, source_run: Optional[str] = None) -> Dict[str, Any]:
+        """保存截图对象，返回可用于 update() 的基线（不写入清单）"""
+        info = self.store.put(path)
+        return dict(info, width=int(image.shape[1]), height=int(image.shape[0]), phash=phash(image),
+                    source_run=source_run)
+
+
+def find_steps(work_dir: str) -> List[Dict[str, str]]:
+    """脚本保存在 visual/ 下的截图：[{'step', 'path'}]，按步骤名排序"""
+    root = os.path.join(work_dir, VISUAL_DIR)
+    steps = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.png'):
+                path = os.path.join(dirpath, filename)
+                steps.append({'step': os.path.relpath(path, root)[:-len('.png')].replace(os.sep, '/'), 'path': path})
+    return sorted(steps, key=lambda s: s['step'])
+
+
+def run_visual_checks(work_dir: str, baselines: BaselineStore, visual: Optional[Dict[str, Any]],
+                      settings: Dict[str, Any], prefix: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    对比工作目录 visual/ 下的截图与基线，差异图写入工作目录 visual-diff/（随执行产物保存）
+
+    Args:
+        visual: 脚本配置 config.visual
+        settings: 配置 WEB_VISUAL（max_pixels、max_steps）
+        prefix: 基线步骤名前缀（矩阵执行时为组合名，各浏览器与视口的基线互相独立；
+                config.visual.steps 仍按不含前缀的步骤名匹配）
+
+    Returns:
+        {'steps': [...], 'passed', 'failed', 'new', 'errors', 'warnings'}，没有截图时返回 None
+    """
+    steps = find_steps(work_dir)
+    if not steps:
+        return None
+    warnings = []
+    if len(steps) > settings['max_steps']:
+        warnings.append(f'视觉对比步骤超过 {settings["max_steps"]} 个，其余 {len(steps) - settings["max_steps"]} 个未对比')
+        steps = steps[:settings['max_steps']]
+
+    existing = baselines.load()
+    results, created = [], {}
+    for item in steps:
+        name = item['step']
+        step = f'{prefix}/{name}' if prefix else name
+        params = step_settings(visual, name)
+        result = {'step': step, 'threshold': params['threshold'], 'actual': f'{VISUAL_DIR}/{name}.png'}
+        results.append(result)
+        if not STEP_PATTERN.match(name):
+            result.update(status='error', error='步骤名只能包含字母、数字、下划线、连字符与 /')
+            continue
+        try:
+            with open(item['path'], 'rb') as f:
+                data = f.read()
+            baseline = existing.get(step)
+            # 与基线文件内容相同（基线清单记录了 sha256）：不解码直接通过
+            if baseline and baseline.get('width') and hashlib.sha256(data).hexdigest() == baseline['sha256']:
+                result.update(identical_result(baseline['width'], baseline['height'], baseline.get('phash'), params),
+                              status='passed', baseline=baseline['sha256'])
+                continue
+            actual = decode_image(data)
+            if actual.shape[0] * actual.shape[1] > settings['max_pixels']:
+                raise VisualDiffError(f'截图像素数超过上限 {settings["max_pixels"]}')
+            expected = None
+            if baseline is not None:
+                try:
+                    with baselines.open(baseline) as f:
+                        expected = decode_image(f.read())
+                except FileNotFoundError:
+                    warnings.append(f'{step} 的基线图已被清理，以本次截图作为新基线')
+            if expected is None:
+                created[step] = baselines.put_file(item['path'], actual)
+                result.update(status='new', width=int(actual.shape[1]), height=int(actual.shape[0]),
+                              phash=created[step]['phash'])
+                continue
+
+            comparison = compare_images(expected, actual, params, baseline.get('phash'))
+            diff = comparison.pop('diff')
+            if diff:
+                diff_path = os.path.join(work_dir, DIFF_DIR, f'{name}.png')
+                os.makedirs(os.path.dirname(diff_path), exist_ok=True)
+                with open(diff_path, 'wb') as f:
+                    f.write(diff)
+                result['diff'] = f'{DIFF_DIR}/{name}.png'
+            failed = comparison['size_mismatch'] or comparison['mismatch_ratio'] > params['threshold']
+            result.update(comparison, status='failed' if failed else 'passed', baseline=baseline['sha256'])
+        except ImportError:
+            result.update(status='error', error='视觉对比需要安装 numpy')
+        except (VisualDiffError, OSError) as e:
+            result.update(status='error', error=str(e))
+
+    if created:
+        baselines.update(created)
+    counts = {status: sum(1 for r in results if r['status'] == status) for status in ('passed', 'failed', 'new')}
+    return dict(steps=results, errors=sum(1 for r in results if r['status'] == 'error'), warnings=warnings,
+                **counts)
@@ -0,0 +1,488 @@
+"""
+Web 测试视觉回归对比
+
+脚本把需要对比的截图保存到工作目录的 visual/ 下（如 page.screenshot(path='visual/login.png')），
+文件路径（相对 visual/，不含 .png）即步骤名。执行结束后每个步骤的截图与脚本该步骤的基线图逐像素对比：
+
+- 像素差异按 YIQ 色彩空间计算（与 pixelmatch 相同），色差超过 pixel_tolerance 的像素计为不同
+- anti_aliasing 为 true 时识别抗锯齿像素（邻域中同时存在更亮与更暗的像素，且对应邻居在两张图中都处于平坦区域），
+  不计入差异
+- ignore_regions 中的矩形区域不参与对比（时间、验证码、广告位等）
+- 差异像素占比超过 threshold 时该步骤失败，差异图保存为执行产物 visual-diff/<步骤名>.png
+- 截图与基线文件内容相同（sha256 一致，基线清单中已记录）时不解码直接通过；解码后像素完全相同时
+  跳过色差计算、抗锯齿识别与差异图生成。感知哈希（pHash）距离只作为结果中的参考信息
+
+配置（script.config.visual，steps 中按步骤覆盖，ignore_regions 与全局配置合并）：
+    {
+        "threshold": 0.001,
+        "pixel_tolerance": 0.1,
+        "anti_aliasing": true,
+        "ignore_regions": [{"x": 0, "y": 0, "width": 200, "height": 40}],
+        "steps": {"checkout/summary": {"threshold": 0.01}}
+    }
+
+对比需要 NumPy；PNG 编解码优先使用 Pillow，未安装时使用内置实现（zlib + NumPy，仅支持 8 位非隔行 PNG，
+Average / Paeth 过滤按反对角线向量化还原）。
+"""
+
+import io
+import re
+import struct
+import zlib
+from typing import Dict, Any, List, Optional
+
+VISUAL_DIR = 'visual'
+DIFF_DIR = 'visual-diff'
+STEP_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+(/[A-Za-z0-9_\-]+)*$')
+DEFAULTS = {'threshold': 0.0, 'pixel_tolerance': 0.1, 'anti_aliasing': True}
+REGION_FIELDS = ('x', 'y', 'width', 'height')
+MAX_REGIONS = 50
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# YIQ 色差的最大值（黑与白之间）
+MAX_YIQ_DELTA = 35215.0
+NEIGHBOURS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+class VisualDiffError(Exception):
+    """图片无法解码或对比"""
+
+
+# ==================== 配置 ====================
+
+def _validate_settings(settings, path: str) -> Optional[str]:
+    if not isinstance(settings, dict):
+        return f'{path} must be an object'
+    for key in ('threshold', 'pixel_tolerance'):
+        value = settings.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or not 0 <= value <= 1):
+            return f'{path}.{key} must be a number between 0 and 1'
+    if 'anti_aliasing' in settings and not isinstance(settings['anti_aliasing'], bool):
+        return f'{path}.anti_aliasing must be a boolean'
+    regions = settings.get('ignore_regions')
+    if regions is None:
+        return None
+    if not isinstance(regions, list) or len(regions) > MAX_REGIONS:
+        return f'{path}.ignore_regions must be a list of at most {MAX_REGIONS} regions'
+    for region in regions:
+        if not isinstance(region, dict) or set(region) != set(REGION_FIELDS) or not all(
+                isinstance(region[k], int) and not isinstance(region[k], bool) and region[k] >= 0
+                for k in REGION_FIELDS):
+            return f'{path}.ignore_regions items must be {{x, y, width, height}} with non-negative integers'
+    return None
+
+
+def validate_visual_config(visual: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    校验 config.visual
+
+    Returns:
+        错误信息，校验通过返回 None
+    """
+    if visual is None:
+        return None
+    if not isinstance(visual, dict):
+        return 'config.visual must be an object'
+    unknown = set(visual) - set(DEFAULTS) - {'ignore_regions', 'steps'}
+    if unknown:
+        return f'config.visual has unknown keys: {", ".join(sorted(unknown))}'
+    error = _validate_settings(visual, 'config.visual')
+    if error:
+        return error
+    steps = visual.get('steps')
+    if steps is None:
+        return None
+    if not isinstance(steps, dict):
+        return 'config.visual.steps must be an object'
+    for step, settings in steps.items():
+        if not STEP_PATTERN.match(step):
+            return f'config.visual.steps has invalid step name: {step}'
+        if isinstance(settings, dict):
+            unknown = set(settings) - set(DEFAULTS) - {'ignore_regions'}
+            if unknown:
+                return f'config.visual.steps.{step} has unknown keys: {", ".join(sorted(unknown))}'
+        error = _validate_settings(settings, f'config.visual.steps.{step}')
+        if error:
+            return error
+    return None
+
+
+def step_settings(visual: Optional[Dict[str, Any]], step: str) -> Dict[str, Any]:
+    """某个步骤生效的对比参数"""
+    visual = visual or {}
+    override = (visual.get('steps') or {}).get(step) or {}
+    settings = {key: override.get(key, visual.get(key, default)) for key, default in DEFAULTS.items()}
+    settings['ignore_regions'] = list(visual.get('ignore_regions') or []) + list(override.get('ignore_regions') or [])
+    return settings
+
+
+# ==================== PNG 编解码 ====================
+
+def _pil():
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def _unfilter_wavefront(filtered, filters):
+    """
+    按反对角线还原整张图（任意行过滤类型）
+
+    像素 (y, x) 只依赖左 (y, x-1)、上 (y-1, x)、左上 (y-1, x-1) 三个像素，同一条反对角线 y + x = d 上的像素
+    互不依赖，可以一次向量化计算；共 H + W - 1 次迭代，代替逐字节的 Python 循环。
+
+    Args:
+        filtered: (H, W, bpp) uint8 过滤后的数据
+        filters: (H,) 每行的过滤类型（0-4）
+    """
+    import numpy as np
+
+    height, width, bpp = filtered.shape
+    # 按反对角线错位存放：skewed[d, y] 为像素 (y, d - y)，每条反对角线及其左、上、左上邻居都是连续切片
+    ys, xs = np.indices((height, width))
+    raw = np.zeros((height + width - 1, height, bpp), dtype=np.int16)
+    raw[ys + xs, ys] = filtered
+    # out[d + 2, y + 1] 为还原后的像素 (y, d - y)；多出的前两条反对角线与第 0 列为越界邻居，值为 0
+    out = np.zeros((height + width + 1, height + 1, bpp), dtype=np.int16)
+    kinds = filters.astype(np.int8)[:, None]
+    for d in range(height + width - 1):
+        lo, hi = max(0, d - width + 1), min(height, d + 1)
+        a, b, c = out[d + 1, lo + 1:hi + 1], out[d + 1, lo:hi], out[d, lo:hi]
+        kind = kinds[lo:hi]
+        pa, pb, pc = np.abs(b - c), np.abs(a - c), np.abs(a + b - 2 * c)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+        predictor = np.select([kind == 1, kind == 2, kind == 3, kind == 4], [a, b, (a + b) >> 1, paeth], 0)
+        out[d + 2, lo + 1:hi + 1] = (raw[d, lo:hi] + predictor) & 0xFF
+    return out[ys + xs + 2, ys + 1].astype(np.uint8).reshape(height, width * bpp)
+
+
+def _decode_png(data: bytes):
+    """内置 PNG 解码：返回 (H, W, 4) uint8 RGBA；只有 None / Sub / Up 行时逐行向量化还原，否则按反对角线还原"""
+    import numpy as np
+
+    if data[:8] != PNG_SIGNATURE:
+        raise VisualDiffError('不是 PNG 图片')
+    pos, idat, header, palette, transparency = 8, [], None, None, None
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b'IHDR':
+            header = struct.unpack('>IIBBBBB', chunk)
+        elif chunk_type == b'PLTE':
+            palette = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, 3)
+        elif chunk_type == b'tRNS':
+            transparency = np.frombuffer(chunk, dtype=np.uint8)
+        elif chunk_type == b'IDAT':
+            idat.append(chunk)
+        elif chunk_type == b'IEND':
+            break
+    if header is None:
+        raise VisualDiffError('PNG 缺少 IHDR')
+    width, height, depth, color_type, _, _, interlace = header
+    if depth != 8 or interlace or color_type not in PNG_CHANNELS:
+        raise VisualDiffError('内置 PNG 解码仅支持 8 位非隔行图片，请安装 Pillow')
+
+    bpp = PNG_CHANNELS[color_type]
+    stride = width * bpp
+    try:
+        raw = zlib.decompress(b''.join(idat))
+        rows = np.frombuffer(raw, dtype=np.uint8, count=height * (stride + 1)).reshape(height, stride + 1)
+    except (zlib.error, ValueError) as e:
+        raise VisualDiffError(f'PNG 数据损坏: {e}')
+
+    filters = rows[:, 0]
+    if filters.size and filters.max() > 4:
+        raise VisualDiffError(f'PNG 行过滤类型非法: {filters.max()}')
+    if (filters >= 3).any():
+        pixels = _unfilter_wavefront(rows[:, 1:].reshape(height, width, bpp), filters)
+    else:
+        pixels = np.empty((height, stride), dtype=np.uint8)
+        prior = np.zeros(stride, dtype=np.uint8)
+        for y in range(height):
+            filter_type, line = filters[y], rows[y, 1:]
+            if filter_type == 0:
+                pixels[y] = line
+            elif filter_type == 1:
+                pixels[y] = (np.cumsum(line.reshape(width, bpp), axis=0, dtype=np.int64) & 0xFF).ravel()
+            else:
+                pixels[y] = line + prior
+            prior = pixels[y]
+
+    pixels = pixels.reshape(height, width, bpp)
+    rgba = np.full((height, width, 4), 255, dtype=np.uint8)
+    if color_type == 0:
+        rgba[..., :3] = pixels
+    elif color_type == 2:
+        rgba[..., :3] = pixels
+    elif color_type == 3:
+        if palette is None:
+            raise VisualDiffError('PNG 缺少调色板')
+        alpha = np.full(len(palette), 255, dtype=np.uint8)
+        if transparency is not None:
+            alpha[:len(transparency)] = transparency[:len(palette)]
+        index = np.minimum(pixels[..., 0], len(palette) - 1)
+        rgba[..., :3] = palette[index]
+        rgba[..., 3] = alpha[index]
+    elif color_type == 4:
+        rgba[..., :3] = pixels[..., :1]
+        rgba[..., 3] = pixels[..., 1]
+    else:
+        rgba[:] = pixels
+    return rgba
+
+
+def decode_image(data: bytes):
+    """解码图片为 (H, W, 4) uint8 RGBA 数组"""
+    import numpy as np
+
+    image = _pil()
+    if image is None:
+        return _decode_png(data)
+    try:
+        with image.open(io.BytesIO(data)) as img:
+            return np.asarray(img.convert('RGBA'))
+    except (OSError, ValueError) as e:
+        raise VisualDiffError(f'图片无法解码: {e}')
+
+
+def encode_png(rgba) -> bytes:
+    """把 (H, W, 4) uint8 RGBA 数组编码为 PNG"""
+    import numpy as np
+
+    image = _pil()
+    if image is not None:
+        buffer = io.BytesIO()
+        image.fromarray(rgba, 'RGBA').save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    height, width = rgba.shape[:2]
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)  # 每行过滤类型 0
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    def chunk(chunk_type, body):
+        return struct.pack('>I', len(body)) + chunk_type + body + struct.pack('>I', zlib.crc32(chunk_type + body))
+
+    return (PNG_SIGNATURE + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+# ==================== 对比 ====================
+
+def _blend(rgba):
+    """按 alpha 与白色背景混合，返回 float32 RGB"""
+    import numpy as np
+
+    rgb = rgba[..., :3].astype(np.float32)
+    alpha = rgba[..., 3:4].astype(np.float32) / 255
+    return 255 + (rgb - 255) * alpha
+
+
+def _luma(rgb):
+    return rgb[..., 0] * 0.29889531 + rgb[..., 1] * 0.58662247 + rgb[..., 2] * 0.11448223
+
+
+def _yiq_delta(a, b):
+    """逐像素 YIQ 色差（平方和加权，最大 MAX_YIQ_DELTA）"""
+    dr, dg, db = (a[..., k] - b[..., k] for k in range(3))
+    y = dr * 0.29889531 + dg * 0.58662247 + db * 0.11448223
+    i = dr * 0.59597799 - dg * 0.27417610 - db * 0.32180189
+    q = dr * 0.21147017 - dg * 0.52261711 + db * 0.31114694
+    return 0.5053 * y * y + 0.299 * i * i + 0.1957 * q * q
+
+
+def phash(rgba) -> str:
+    """64 位感知哈希（32x32 灰度缩略图的二维 DCT 低频 8x8 分量与中位数比较），返回 16 位十六进制"""
+    import numpy as np
+
+    gray = _luma(_blend(rgba))
+    height, width = gray.shape
+    # 按块均值缩放到 32x32（图片小于 32 像素的边按最近邻放大）
+    rows = np.minimum((np.arange(32) * height) // 32, height - 1)
+    cols = np.minimum((np.arange(32) * width) // 32, width - 1)
+    small = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+    counts = np.outer(np.diff(np.append(rows, height)).clip(min=1), np.diff(np.append(cols, width)).clip(min=1))
+    small = small / counts
+
+    n = np.arange(32)
+    dct = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / 64)
+    coefficients = (dct @ small @ dct.T)[:8, :8].ravel()[1:]
+    bits = coefficients > np.median(coefficients)
+    return f'{int("".join("1" if b else "0" for b in bits), 2):016x}'
+
+
+def hamming(a: Optional[str], b: Optional[str]) -> Optional[int]:
+    if not a or not b:
+        return None
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def _shift(array, dy, dx, fill):
+    """out[y, x] = array[y + dy, x + dx]，越界处为 fill"""
+    import numpy as np
+
+    out = np.full_like(array, fill)
+    height, width = array.shape[:2]
+    out[max(-dy, 0):height - max(dy, 0), max(-dx, 0):width - max(dx, 0)] = \
+        array[max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)]
+    return out
+
+
+def _many_siblings(packed, border):
+    """像素在同一张图中有 3 个以上颜色完全相同的相邻像素（位于平坦区域）"""
+    import numpy as np
+
+    valid = np.ones(packed.shape, dtype=bool)
+    count = border.astype(np.int8)
+    for dy, dx in NEIGHBOURS:
+        count += (_shift(packed, dy, dx, 0) == packed) & _shift(valid, dy, dx, False)
+    return count > 2
+
+
+def _antialiased(luma, many_self, many_other, border):
+    """pixelmatch 抗锯齿判定的向量化实现"""
+    import numpy as np
+
+    valid = np.ones(luma.shape, dtype=bool)
+    zeros = border.astype(np.int8)
+    low = np.zeros_like(luma)
+    high = np.zeros_like(luma)
+    low_index = np.full(luma.shape, -1, dtype=np.int8)
+    high_index = np.full(luma.shape, -1, dtype=np.int8)
+    for k, (dy, dx) in enumerate(NEIGHBOURS):
+        inside = _shift(valid, dy, dx, False)
+        delta = np.where(inside, luma - _shift(luma, dy, dx, 0), 0)
+        zeros += (delta == 0) & inside
+        darker, brighter = inside & (delta < low), inside & (delta > high)
+        low, low_index = np.where(darker, delta, low), np.where(darker, k, low_index)
+        high, high_index = np.where(brighter, delta, high), np.where(brighter, k, high_index)
+
+    flat_low = np.zeros(luma.shape, dtype=bool)
+    flat_high = np.zeros(luma.shape, dtype=bool)
+    for k, (dy, dx) in enumerate(NEIGHBOURS):
+        flat = _shift(many_self & many_other, dy, dx, False)
+        flat_low |= (low_index == k) & flat
+        flat_high |= (high_index == k) & flat
+    return (zeros <= 2) & (low != 0) & (high != 0) & (flat_low | flat_high)
+
+
+def _ignore_mask(shape, regions):
+    import numpy as np
+
+    mask = np.zeros(shape, dtype=bool)
+    for region in regions or []:
+        mask[region['y']:region['y'] + region['height'], region['x']:region['x'] + region['width']] = True
+    return mask
+
+
+def identical_result(width: int, height: int, image_hash: Optional[str], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """截图与基线文件内容完全相同时的对比结果（不解码图片），字段与 compare_images() 一致（不含 diff）"""
+    ignored = int(_ignore_mask((height, width), settings.get('ignore_regions')).sum())
+    return {
+        'width': width, 'height': height, 'phash': image_hash, 'phash_distance': 0 if image_hash else None,
+        'size_mismatch': False, 'full_diff': False, 'identical': True, 'anti_aliased_pixels': 0,
+        'compared_pixels': width * height - ignored, 'ignored_pixels': ignored,
+        'mismatched_pixels': 0, 'mismatch_ratio': 0.0,
+    }
+
+
+def compare_images(expected, actual, settings: Dict[str, Any], expected_hash: Optional[str] = None,
+                   diff_image: bool = True) -> Dict[str, Any]:
+    """
+    对比基线与本次截图（RGBA 数组）
+
+    Returns:
+        {'width', 'height', 'compared_pixels', 'ignored_pixels', 'mismatched_pixels', 'anti_aliased_pixels',
+         'mismatch_ratio', 'phash', 'phash_distance', 'full_diff', 'size_mismatch', 'identical', 'diff'}，
+        diff 为差异图 PNG（无差异像素或 diff_image 为 False 时为 None）
+    """
+    import numpy as np
+
+    actual_hash = phash(actual)
+    result = {
+        'width': int(actual.shape[1]),
+        'height': int(actual.shape[0]),
+        'phash': actual_hash,
+        'phash_distance': hamming(expected_hash or phash(expected), actual_hash),
+        'size_mismatch': expected.shape != actual.shape,
+        'full_diff': False,
+        'identical': False,
+        'anti_aliased_pixels': 0,
+        'diff': None,
+    }
+    if result['size_mismatch']:
+        total = int(actual.shape[0] * actual.shape[1])
+        result.update(compared_pixels=total, ignored_pixels=0, mismatched_pixels=total, mismatch_ratio=1.0,
+                      expected_size=[int(expected.shape[1]), int(expected.shape[0])])
+        return result
+
+    ignored = _ignore_mask(actual.shape[:2], settings.get('ignore_regions'))
+    compared = int(ignored.size - ignored.sum())
+    result.update(compared_pixels=compared, ignored_pixels=int(ignored.sum()))
+    # 像素完全相同（如编码参数不同的同一张截图）：跳过色差计算、抗锯齿识别与差异图
+    if np.array_equal(expected, actual):
+        result.update(identical=True, mismatched_pixels=0, mismatch_ratio=0.0)
+        return result
+
+    blended_expected, blended_actual = _blend(expected), _blend(actual)
+    max_delta = MAX_YIQ_DELTA * settings['pixel_tolerance'] ** 2
+    different = (_yiq_delta(blended_expected, blended_actual) > max_delta) & ~ignored
+
+    result['full_diff'] = True
+    anti_aliased = np.zeros_like(different)
+    if settings.get('anti_aliasing') and different.any():
+        # 只在差异像素所在区域（外扩 2 像素，覆盖邻居的邻居）计算
+        ys, xs = np.nonzero(different)
+        height, width = different.shape
+        y0, y1 = max(int(ys.min()) - 2, 0), min(int(ys.max()) + 3, height)
+        x0, x1 = max(int(xs.min()) - 2, 0), min(int(xs.max()) + 3, width)
+        gy, gx = np.arange(y0, y1)[:, None], np.arange(x0, x1)[None, :]
+        border = (gy == 0) | (gy == height - 1) | (gx == 0) | (gx == width - 1)
+        window = (slice(y0, y1), slice(x0, x1))
+        packed_expected = np.ascontiguousarray(expected[window]).view(np.uint32)[..., 0]
+        packed_actual = np.ascontiguousarray(actual[window]).view(np.uint32)[..., 0]
+        many_expected = _many_siblings(packed_expected, border)
+        many_actual = _many_siblings(packed_actual, border)
+        anti_aliased[window] = different[window] & (
+            _antialiased(_luma(blended_expected[window]), many_expected, many_actual, border)
+            | _antialiased(_luma(blended_actual[window]), many_actual, many_expected, border))
+
+    mismatched = different & ~anti_aliased
+    mismatched_pixels = int(mismatched.sum())
+    result.update(
+        mismatched_pixels=mismatched_pixels,
+        anti_aliased_pixels=int(anti_aliased.sum()),
+        mismatch_ratio=round(mismatched_pixels / compared, 6) if compared else 0.0,
+    )
+    if diff_image and mismatched_pixels:
+        # 差异图：本次截图淡化为灰度背景，差异像素红色、抗锯齿像素黄色、忽略区域蓝色
+        gray = 255 + (_luma(blended_actual) - 255) * 0.1
+        diff = np.empty(actual.shape, dtype=np.uint8)
+        diff[..., :3] = gray[..., None].astype(np.uint8)
+        diff[..., 3] = 255
+        tint = gray[ignored]
+        diff[ignored] = np.stack([tint * 0.8, tint * 0.85, tint, np.full_like(tint, 255)], axis=1).astype(np.uint8)
+        diff[anti_aliased] = (255, 255, 0, 255)
+        diff[mismatched] = (255, 0, 0, 255)
+        result['diff'] = encode_png(diff)
+    return result
+
+
+def describe_failures(steps: List[Dict[str, Any]], limit: int = 3) -> str:
+    failed = [s for s in steps if s['status'] in ('failed', 'error')]
+    parts = []
+    for step in failed[:limit]:
+        if step['status'] == 'error':
+            parts.append(f'{step["step"]} {step["error"]}')
+        elif step.get('size_mismatch'):
+            parts.append(f'{step["step"]} 尺寸 {step["width"]}x{step["height"]} 与基线 '
+                         f'{step["expected_size"][0]}x{step["expected_size"][1]} 不一致')
+        else:
+            parts.append(f'{step["step"]} 差异 {step["mismatch_ratio"] * 100:.2f}% > {step["threshold"] * 100:.2f}%')
+    if len(failed) > limit:
+        parts.append(f'等 {len(failed)} 个步骤')
+    return '视觉回归: ' + '; '.join(parts)
@@ -0,0 +1,120 @@
+"""
+Web 测试矩阵执行
+
+同一个脚本按「浏览器 × 视口」的组合并行执行，脚本配置 config.matrix：
+
+    {"browsers": ["chromium", "firefox", "webkit"],
+     "viewports": [{"width": 1280, "height": 720}, {"width": 375, "height": 812}],
+     "slots": 3}
+
+browsers 缺省为脚本的 browser，viewports 缺省为脚本的 viewport_width / viewport_height。
+每个组合（cell，如 chromium-1280x720）独立执行，同一浏览器的组合共用浏览器池中的同一个浏览器服务
+（各自新建上下文），全部组合汇总为一条执行记录。
+"""
+
+from typing import Dict, Any, List, Optional
+
+from .browser_pool import BROWSERS
+
+MAX_VIEWPORT_SIZE = 10000
+
+
+def cell_name(browser: str, width: int, height: int) -> str:
+    """组合名，同时作为视觉回归基线的步骤前缀与日志子目录名"""
+    return f'{browser}-{width}x{height}'
+
+
+def validate_matrix_config(matrix: Optional[Dict[str, Any]], max_cells: Optional[int] = None,
+                           max_slots: Optional[int] = None) -> Optional[str]:
+    """校验 config.matrix，返回错误信息或 None"""
+    if matrix is None:
+        return None
+    if not isinstance(matrix, dict):
+        return 'matrix must be an object'
+    unknown = set(matrix) - {'browsers', 'viewports', 'slots'}
+    if unknown:
+        return f'matrix has unknown fields: {", ".join(sorted(unknown))}'
+
+    browsers = matrix.get('browsers')
+    if browsers is not None:
+        if not isinstance(browsers, list) or not browsers:
+            return 'matrix.browsers must be a non-empty list'
+        invalid = [b for b in browsers if b not in BROWSERS]
+        if invalid:
+            return f'matrix.browsers must be chosen from {", ".join(BROWSERS)}'
+        if len(set(browsers)) != len(browsers):
+            return 'matrix.browsers must not contain duplicates'
+
+    viewports = matrix.get('viewports')
+    if viewports is not None:
+        if not isinstance(viewports, list) or not viewports:
+            return 'matrix.viewports must be a non-empty list'
+        for i, viewport in enumerate(viewports):
+            if not isinstance(viewport, dict) or set(viewport) != {'width', 'height'}:
+                return f'matrix.viewports[{i}] must be an object with width and height'
+            for field in ('width', 'height'):
+                value = viewport[field]
+                if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= MAX_VIEWPORT_SIZE:
+                    return f'matrix.viewports[{i}].{field} must be an integer between 1 and {MAX_VIEWPORT_SIZE}'
+        if len({(v['width'], v['height']) for v in viewports}) != len(viewports):
+            return 'matrix.viewports must not contain duplicates'
+
+    slots = matrix.get('slots')
+    if slots is not None:
+        if isinstance(slots, bool) or not isinstance(slots, int) or slots < 1:
+            return 'matrix.slots must be a positive integer'
+        if max_slots is not None and slots > max_slots:
+            return f'matrix.slots must not exceed {max_slots}'
+
+    if max_cells is not None and browsers and viewports and len(browsers) * len(viewports) > max_cells:
+        return f'matrix must not exceed {max_cells} browser/viewport combinations'
+    return None
+
+
+def resolve_matrix(matrix: Optional[Dict[str, Any]], browser: str, viewport_width: int,
+                   viewport_height: int, default_slots: int) -> Dict[str, Any]:
+    """补全缺省值：{'browsers', 'viewports', 'slots'}"""
+    matrix = matrix or {}
+    return {
+        'browsers': list(matrix.get('browsers') or [browser]),
+        'viewports': [dict(v) for v in matrix.get('viewports') or [{'width': viewport_width,
+                                                                     'height': viewport_height}]],
+        'slots': int(matrix.get('slots') or default_slots),
+    }
+
+
+def build_cells(matrix: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    展开为各个组合，按视口优先排列：相邻执行的组合使用不同浏览器，
+    槽位数小于组合数时各浏览器服务的负载更均匀
+    """
+    return [
+        {'cell': cell_name(browser, v['width'], v['height']), 'browser': browser,
+         'viewport_width': v['width'], 'viewport_height': v['height']}
+        for v in matrix['viewports'] for browser in matrix['browsers']
+    ]
+
+
+def summarize_cells(cells: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    汇总各组合结果
+
+    Returns:
+        {'status', 'passed', 'failed', 'flaky', 'error'（失败说明或 None）}，
+        没有失败但有重试后才通过的组合时 status 为 flaky
+    """
+    failed = [c for c in cells if c['status'] not in ('success', 'flaky')]
+    flaky = sum(1 for c in cells if c['status'] == 'flaky')
+    if not failed:
+        return {'status': 'flaky' if flaky else 'success', 'passed': len(cells), 'failed': 0, 'flaky': flaky,
+                'error': None}
+    parts = [f'{c["cell"]} {(c.get("error") or c["status"])[:200]}' for c in failed[:3]]
+    if len(failed) > 3:
+        parts.append(f'等 {len(failed)} 个组合')
+    return {
+        'status': 'failed',
+        'passed': len(cells) - len(failed),
+        'failed': len(failed),
+        'flaky': flaky,
+        'error': f'矩阵执行 {len(failed)}/{len(cells)} 个组合失败: ' + '; '.join(parts),
+    }
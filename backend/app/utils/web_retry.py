@@ -0,0 +1,97 @@
+"""
+Web 测试失败重试
+
+首次执行不开启 Trace 与录屏以保持执行速度；脚本执行失败（返回码非 0）或超时时重试，
+重试时开启 Playwright Trace 与录屏（由 web_runtime 注入，脚本无需修改），用于诊断失败原因。
+脚本配置 config.retry 覆盖全局默认值（配置 WEB_RETRY）：
+
+    {"retries": 2, "trace": true, "video": false}
+
+结果分为三类：首次通过（success）、重试后通过（flaky）、全部失败（failed / timeout）。
+性能预算超出与视觉回归失败是确定性的判定，不重试。Trace 与录屏会拖慢页面，重试时不采集前端性能，
+最后一次执行是重试时结果中 performance_unchecked 为 true（性能预算未检查）。
+重试执行超时时先发送 SIGTERM，等待 WEB_RETRY.terminate_grace 秒让脚本保存 Trace 与录屏，再强制结束。
+"""
+
+from typing import Dict, Any, List, Optional
+
+DIAGNOSTICS_DIR = 'diagnostics'
+RETRY_FIELDS = {'retries', 'trace', 'video'}
+
+
+def validate_retry_config(retry: Optional[Dict[str, Any]], max_retries: Optional[int] = None) -> Optional[str]:
+    """校验 config.retry，返回错误信息或 None"""
+    if retry is None:
+        return None
+    if not isinstance(retry, dict):
+        return 'retry must be an object'
+    unknown = set(retry) - RETRY_FIELDS
+    if unknown:
+        return f'retry has unknown fields: {", ".join(sorted(unknown))}'
+    retries = retry.get('retries')
+    if retries is not None:
+        if isinstance(retries, bool) or not isinstance(retries, int) or retries < 0:
+            return 'retry.retries must be a non-negative integer'
+        if max_retries is not None and retries > max_retries:
+            return f'retry.retries must not exceed {max_retries}'
+    for field in ('trace', 'video'):
+        if field in retry and not isinstance(retry[field], bool):
+            return f'retry.{field} must be a boolean'
+    return None
+
+
+def resolve_retry_policy(retry: Optional[Dict[str, Any]], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """合并脚本配置与全局默认值：{'retries', 'trace', 'video'}"""
+    retry = retry or {}
+    retries = retry.get('retries', settings['retries'])
+    return {
+        'retries': max(0, min(int(retries), int(settings['max_retries']))),
+        'trace': bool(retry.get('trace', settings['trace'])),
+        'video': bool(retry.get('video', settings['video'])),
+    }
+
+
+def should_retry(outcome: Dict[str, Any]) -> bool:
+    """脚本本身执行失败或超时时重试（预算超出、视觉回归等判定失败时返回码为 0，不重试）"""
+    if outcome['status'] == 'timeout':
+        return True
+    return outcome['status'] == 'failed' and outcome.get('return_code') not in (None, 0)
+
+
+def summarize_attempts(attempts: List[Dict[str, Any]], policy: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    汇总各次执行
+
+    Args:
+        attempts: 各次执行结果（execute 返回的 outcome，按执行顺序）
+
+    Returns:
+        {'result'（passed / flaky / failed）, 'attempts', 'retries', 'retry_time', 'first_attempt_time',
+         'performance_unchecked'（最后一次执行开启了诊断，未采集前端性能、未检查性能预算）, 'history'}
+    """
+    durations = [a.get('duration') or 0 for a in attempts]
+    final = attempts[-1]
+    if final['status'] != 'success':
+        result = 'failed'
+    else:
+        result = 'flaky' if len(attempts) > 1 else 'passed'
+    return {
+        'result': result,
+        'attempts': len(attempts),
+        'retries': policy['retries'],
+        'first_attempt_time': round(durations[0], 3),
+        'retry_time': round(sum(durations[1:]), 3),
+        'performance_unchecked': bool(final.get('performance_unchecked')),
+        'history': [
+            {
+                'attempt': i + 1,
+                'status': a['status'],
+                'duration': round(a['duration'], 3) if a.get('duration') is not None else None,
+                'return_code': a.get('return_code'),
+                'error': a.get('error') or (a.get('stderr') or '')[-500:] or None,
+                'diagnostics': a.get('diagnostics'),
+                'artifact_run': a.get('artifact_run'),
+            }
+            for i, a in enumerate(attempts)
+        ],
+    }
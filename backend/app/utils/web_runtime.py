@@ -0,0 +1,634 @@
+"""
+Web 测试脚本运行时
+
+Web 测试脚本通过本模块启动：python web_runtime.py <runtime.json> <script.py>
+
+启用浏览器池时，脚本中的 p.chromium.launch(...) 等调用被替换为连接 Worker 上已启动的浏览器服务
+（BrowserType.connect），脚本无需修改；每次连接的上下文彼此隔离，断开连接时由浏览器服务自动关闭。
+launch() 传入了浏览器服务无法满足的参数（如 executable_path、args、proxy）或连接失败时回退为本地启动。
+新建的每个浏览器上下文（new_context、new_page、launch_persistent_context）都按脚本的 config.network
+注册路由，拦截图片、字体、统计脚本等请求或从本地缓存应答，规则见 network_profile.py；
+同时注入前端性能采集脚本，记录每个页面导航的 Navigation Timing 与 Web Vitals，见 web_vitals.py。
+矩阵执行（runtime.json 的 cell）时 p.chromium / p.firefox / p.webkit 都指向组合的浏览器，脚本中写死的浏览器
+（launch、connect、launch_persistent_context）按组合执行；新建上下文未指定视口时使用组合的视口，
+脚本指定了其它视口或 no_viewport 时记录为不一致（执行结果为失败）。
+失败重试时（runtime.json 的 diagnostics）新建的上下文自动开启录屏与 Trace，上下文关闭前
+（包括脚本异常退出 sync_playwright() / async_playwright() 时）把 Trace 保存到工作目录的 diagnostics/ 下；
+执行超时时任务先发送 SIGTERM，脚本以 SystemExit 退出，关闭上下文并保存 Trace 与录屏后再结束。
+
+脚本也可以直接使用本模块提供的辅助函数：
+
+    from web_runtime import page
+
+    with page() as p:
+        p.goto('https://example.com')
+
+runtime.json 字段：
+    browser / headless: 脚本配置的浏览器与无头模式
+    ws_endpoint: 浏览器服务地址，None 表示未启用浏览器池
+    viewport: 新建上下文的默认视口 {'width', 'height'}
+    cell: 矩阵执行的组合名（如 firefox-375x812），None 表示不是矩阵执行
+    connect_timeout: 连接浏览器服务的超时秒数
+    network: 网络路由规则（network_profile.resolve_network_config 的结果），None 表示不拦截
+    network_cache: 本地响应缓存 {'folder', 'max_entry_bytes'}
+    performance: 前端性能采集 {'enabled', 'max_pages'}
+    diagnostics: 失败重试时的诊断 {'trace', 'video', 'dir'}，None 表示不开启
+    stats_file: 退出时写入的统计（上下文数、连接耗时、回退原因、网络请求数、各页面性能数据、
+                矩阵组合被替换的浏览器与不一致之处）
+
+本模块只依赖标准库与 Playwright，执行时会与 network_profile.py、web_vitals.py 一起被复制到运行目录中使用。
+"""
+
+import atexit
+import json
+import os
+import runpy
+import signal
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    from .network_profile import NetworkRules
+    from .web_vitals import VITALS_SCRIPT, REPORT_BINDING, SNAPSHOT_EXPRESSION
+except ImportError:  # 作为独立脚本运行时
+    from network_profile import NetworkRules
+    from web_vitals import VITALS_SCRIPT, REPORT_BINDING, SNAPSHOT_EXPRESSION
+
+# launch() 中这些参数只能在本地启动浏览器时生效
+LOCAL_ONLY_OPTIONS = ('executable_path', 'channel', 'args', 'ignore_default_args', 'proxy',
+                      'downloads_path', 'chromium_sandbox', 'firefox_user_prefs', 'env', 'devtools')
+BROWSER_NAMES = ('chromium', 'firefox', 'webkit')
+
+_config = {}
+_stats = {'connected': 0, 'contexts': 0, 'connect_ms': [], 'fallback': None, 'connect_error': None}
+_network = {'rules': None}
+_performance = {'pages': {}, 'dropped': 0}
+# 诊断：tracing 为自动开启的 Trace {id(tracing): (tracing, 保存路径)}，owned 为 new_page 隐式创建的上下文
+_diagnostics = {'tracing': {}, 'owned': {}, 'contexts': [], 'traces': [], 'errors': []}
+
+
+def _performance_enabled():
+    return bool((_config.get('performance') or {}).get('enabled'))
+
+
+def _record_page(data):
+    """记录一个页面导航的性能数据（同一文档多次上报时保留最后一次）"""
+    if not isinstance(data, dict) or not data.get('id'):
+        return
+    pages = _performance['pages']
+    if data['id'] in pages or len(pages) < int((_config.get('performance') or {}).get('max_pages') or 50):
+        pages[data['id']] = data
+    else:
+        _performance['dropped'] += 1
+
+
+def _diagnostics_config():
+    return _config.get('diagnostics') or {}
+
+
+def _diagnostic_kwargs(kwargs):
+    """开启录屏（脚本自己指定了 record_video_dir 时保留脚本的设置）"""
+    config = _diagnostics_config()
+    if config.get('video') and not kwargs.get('record_video_dir'):
+        kwargs['record_video_dir'] = os.path.join(config['dir'], 'videos')
+    return kwargs
+
+
+def _next_trace_path():
+    count = len(_diagnostics['tracing']) + len(_diagnostics['traces']) + 1
+    return os.path.join(_diagnostics_config()['dir'], f'trace-{count}.zip')
+
+
+def _pin_browser(playwright_class):
+    """矩阵执行时 p.chromium / p.firefox / p.webkit 都返回组合的浏览器，记录被替换的浏览器"""
+    target = _config['browser']
+    pinned = getattr(playwright_class, target)
+
+    def redirect(name):
+        def get(self):
+            if name not in _stats['matrix']['redirected']:
+                _stats['matrix']['redirected'].append(name)
+            return pinned.fget(self)
+        return property(get)
+
+    for name in BROWSER_NAMES:
+        if name != target:
+            setattr(playwright_class, name, redirect(name))
+
+
+def _record_mismatch(message):
+    if message not in _stats['matrix']['mismatches']:
+        _stats['matrix']['mismatches'].append(message)
+
+
+def _cell_viewport(kwargs):
+    """矩阵执行时新建的上下文使用组合的视口；脚本指定了其它视口时保留脚本的设置并记录为不一致"""
+    viewport = _config['viewport']
+    expected = f'{viewport["width"]}x{viewport["height"]}'
+    if kwargs.get('no_viewport'):
+        _record_mismatch(f'脚本使用了 no_viewport，未使用组合的视口 {expected}')
+    elif kwargs.get('viewport') is None:
+        kwargs['viewport'] = dict(viewport)
+    elif (kwargs['viewport'].get('width'), kwargs['viewport'].get('height')) != (viewport['width'],
+                                                                                 viewport['height']):
+        actual = f'{kwargs["viewport"].get("width")}x{kwargs["viewport"].get("height")}'
+        _record_mismatch(f'脚本指定的视口 {actual} 与组合的视口 {expected} 不一致')
+    return kwargs
+
+
+def _pooled(browser_type, kwargs):
+    """判断本次 launch() 是否可以使用浏览器池，返回不能使用的原因"""
+    if not _config.get('ws_endpoint'):
+        return '未启用浏览器池'
+    if browser_type.name != _config.get('browser'):
+        return f'脚本启动的浏览器 {browser_type.name} 与配置的 {_config.get("browser")} 不一致'
+    if 'headless' in kwargs and kwargs['headless'] is not None \
+            and bool(kwargs['headless']) != bool(_config.get('headless', True)):
+        return 'launch() 的 headless 与脚本配置不一致'
+    options = sorted(k for k in LOCAL_ONLY_OPTIONS if kwargs.get(k) is not None)
+    if options:
+        return f'launch() 使用了浏览器服务不支持的参数: {", ".join(options)}'
+    return None
+
+
+def _connect_kwargs(kwargs):
+    options = {'timeout': float(_config.get('connect_timeout') or 10) * 1000}
+    if kwargs.get('slow_mo') is not None:
+        options['slow_mo'] = kwargs['slow_mo']
+    return options
+
+
+def _record_connect(started):
+    _stats['connected'] += 1
+    _stats['connect_ms'].append(round((time.perf_counter() - started) * 1000, 2))
+
+
+def _patch_sync():
+    from playwright import sync_api
+    from playwright.sync_api import Browser, BrowserContext, BrowserType, Error, Page, Playwright, Tracing
+
+    if _config.get('cell'):
+        _pin_browser(Playwright)
+    original_launch = BrowserType.launch
+
+    def launch(self, *args, **kwargs):
+        reason = _pooled(self, kwargs) if not args else 'launch() 使用了位置参数'
+        if reason is None:
+            started = time.perf_counter()
+            try:
+                browser = self.connect(_config['ws_endpoint'], **_connect_kwargs(kwargs))
+                _record_connect(started)
+                return browser
+            except Error as e:
+                _stats['connect_error'] = reason = f'连接浏览器服务失败: {e}'
+        _stats['fallback'] = _stats['fallback'] or reason
+        return original_launch(self, *args, **kwargs)
+
+    BrowserType.launch = launch
+
+    def route(route, request):
+        rules = _network['rules']
+        action = rules.decide(request.url, request.resource_type, request.method)
+        if action == 'block':
+            route.abort('blockedbyclient')
+            return
+        if action == 'cache' and rules.bypass_cache(request.all_headers()):
+            action = None
+        if action == 'cache':
+            cached = rules.cache_get(request.url)
+            if cached:
+                route.fulfill(status=cached['status'], headers=cached['headers'], body=cached['body'])
+                return
+            try:
+                response = route.fetch()
+                body = response.body()
+            except Error:
+                rules.counts['errors'] += 1
+                route.fallback()
+                return
+            rules.cache_put(request.url, response.status, response.headers, body)
+            route.fulfill(response=response, body=body)
+            return
+        route.fallback()
+
+    def instrument(owner, name, counted):
+        original = getattr(owner, name)
+
+        def wrapper(self, *args, **kwargs):
+            if counted:
+                _stats['contexts'] += 1
+            if _config.get('cell'):
+                kwargs = _cell_viewport(kwargs)
+            if _diagnostics_config():
+                kwargs = _diagnostic_kwargs(kwargs)
+            result = original(self, *args, **kwargs)
+            context = result.context if isinstance(result, Page) else result
+            if _network['rules'] is not None:
+                context.route('**/*', route)
+            if _performance_enabled():
+                context.add_init_script(script=VITALS_SCRIPT)
+                context.expose_binding(REPORT_BINDING, lambda source, data: _record_page(data))
+            if _diagnostics_config():
+                _diagnostics['contexts'].append(context)
+                if isinstance(result, Page):
+                    _diagnostics['owned'][id(result)] = context
+                if _diagnostics_config().get('trace'):
+                    path = _next_trace_path()
+                    try:
+                        context.tracing.start(screenshots=True, snapshots=True, sources=True)
+                        _diagnostics['tracing'][id(context.tracing)] = (context.tracing, path)
+                    except Error as e:
+                        _diagnostics['errors'].append(f'开启 Trace 失败: {e}')
+            return result
+
+        setattr(owner, name, wrapper)
+
+    def collect_before_close(owner, pages_of):
+        original = owner.close
+
+        def close(self, *args, **kwargs):
+            if _performance_enabled():
+                for page in pages_of(self):
+                    try:
+                        _record_page(page.evaluate(SNAPSHOT_EXPRESSION))
+                    except Error:
+                        pass
+            return original(self, *args, **kwargs)
+
+        owner.close = close
+
+    def save_before_close(owner, contexts_of):
+        original = owner.close
+
+        def close(self, *args, **kwargs):
+            for context in contexts_of(self):
+                tracing, path = _diagnostics['tracing'].pop(id(context.tracing), (None, None))
+                if tracing is not None:
+                    try:
+                        tracing.stop(path=path)
+                        _diagnostics['traces'].append(path)
+                    except Error as e:
+                        _diagnostics['errors'].append(f'保存 Trace 失败: {e}')
+            return original(self, *args, **kwargs)
+
+        owner.close = close
+
+    _instrument(Browser, BrowserType, instrument)
+    _collect_on_close(Browser, BrowserContext, Page, collect_before_close)
+    if _diagnostics_config():
+        _patch_tracing(Tracing)
+        _save_on_close(Browser, BrowserContext, Page, save_before_close)
+        _close_on_exit(sync_api, 'sync_playwright', _close_contexts_sync(Error, BrowserContext))
+        # 脚本用 sync_playwright().start() 且未调用 stop() 时，在进程退出（先于写出统计）时关闭
+        atexit.register(_close_contexts_sync(Exception, BrowserContext))
+
+
+def _patch_async():
+    from playwright import async_api
+    from playwright.async_api import Browser, BrowserContext, BrowserType, Error, Page, Playwright, Tracing
+
+    if _config.get('cell'):
+        _pin_browser(Playwright)
+    original_launch = BrowserType.launch
+
+    async def launch(self, *args, **kwargs):
+        reason = _pooled(self, kwargs) if not args else 'launch() 使用了位置参数'
+        if reason is None:
+            started = time.perf_counter()
+            try:
+                browser = await self.connect(_config['ws_endpoint'], **_connect_kwargs(kwargs))
+                _record_connect(started)
+                return browser
+            except Error as e:
+                _stats['connect_error'] = reason = f'连接浏览器服务失败: {e}'
+        _stats['fallback'] = _stats['fallback'] or reason
+        return await original_launch(self, *args, **kwargs)
+
+    BrowserType.launch = launch
+
+    async def route(route, request):
+        rules = _network['rules']
+        action = rules.decide(request.url, request.resource_type, request.method)
+        if action == 'block':
+            await route.abort('blockedbyclient')
+            return
+        if action == 'cache' and rules.bypass_cache(await request.all_headers()):
+            action = None
+        if action == 'cache':
+            cached = rules.cache_get(request.url)
+            if cached:
+                await route.fulfill(status=cached['status'], headers=cached['headers'], body=cached['body'])
+                return
+            try:
+                response = await route.fetch()
+                body = await response.body()
+            except Error:
+                rules.counts['errors'] += 1
+                await route.fallback()
+                return
+            rules.cache_put(request.url, response.status, response.headers, body)
+            await route.fulfill(response=response, body=body)
+            return
+        await route.fallback()
+
+    def instrument(owner, name, counted):
+        original = getattr(owner, name)
+
+        async def wrapper(self, *args, **kwargs):
+            if counted:
+                _stats['contexts'] += 1
+            if _config.get('cell'):
+                kwargs = _cell_viewport(kwargs)
+            if _diagnostics_config():
+                kwargs = _diagnostic_kwargs(kwargs)
+            result = await original(self, *args, **kwargs)
+            context = result.context if isinstance(result, Page) else result
+            if _network['rules'] is not None:
+                await context.route('**/*', route)
+            if _performance_enabled():
+                await context.add_init_script(script=VITALS_SCRIPT)
+                await context.expose_binding(REPORT_BINDING, lambda source, data: _record_page(data))
+            if _diagnostics_config():
+                _diagnostics['contexts'].append(context)
+                if isinstance(result, Page):
+                    _diagnostics['owned'][id(result)] = context
+                if _diagnostics_config().get('trace'):
+                    path = _next_trace_path()
+                    try:
+                        await context.tracing.start(screenshots=True, snapshots=True, sources=True)
+                        _diagnostics['tracing'][id(context.tracing)] = (context.tracing, path)
+                    except Error as e:
+                        _diagnostics['errors'].append(f'开启 Trace 失败: {e}')
+            return result
+
+        setattr(owner, name, wrapper)
+
+    def collect_before_close(owner, pages_of):
+        original = owner.close
+
+        async def close(self, *args, **kwargs):
+            if _performance_enabled():
+                for page in pages_of(self):
+                    try:
+                        _record_page(await page.evaluate(SNAPSHOT_EXPRESSION))
+                    except Error:
+                        pass
+            return await original(self, *args, **kwargs)
+
+        owner.close = close
+
+    def save_before_close(owner, contexts_of):
+        original = owner.close
+
+        async def close(self, *args, **kwargs):
+            for context in contexts_of(self):
+                tracing, path = _diagnostics['tracing'].pop(id(context.tracing), (None, None))
+                if tracing is not None:
+                    try:
+                        await tracing.stop(path=path)
+                        _diagnostics['traces'].append(path)
+                    except Error as e:
+                        _diagnostics['errors'].append(f'保存 Trace 失败: {e}')
+            return await original(self, *args, **kwargs)
+
+        owner.close = close
+
+    _instrument(Browser, BrowserType, instrument)
+    _collect_on_close(Browser, BrowserContext, Page, collect_before_close)
+    if _diagnostics_config():
+        _patch_tracing(Tracing, is_async=True)
+        _save_on_close(Browser, BrowserContext, Page, save_before_close)
+        _close_on_exit(async_api, 'async_playwright', _close_contexts_async(Error, BrowserContext))
+
+
+def _instrument(browser_class, browser_type_class, instrument):
+    """
+    包装新建上下文的方法：统计脚本创建的上下文数（new_page 会隐式创建一个上下文，用于浏览器服务的回收），
+    并在新上下文上注册网络路由（launch_persistent_context 不使用浏览器池，只注册路由）
+    """
+    instrument(browser_class, 'new_context', True)
+    instrument(browser_class, 'new_page', True)
+    instrument(browser_type_class, 'launch_persistent_context', False)
+
+
+def _collect_on_close(browser_class, context_class, page_class, collect_before_close):
+    """关闭页面、上下文或浏览器前采集其中各页面的性能数据（页面离开时的上报之外的补充）"""
+    collect_before_close(page_class, lambda page: [] if page.is_closed() else [page])
+    collect_before_close(context_class, lambda context: [p for p in context.pages if not p.is_closed()])
+    collect_before_close(browser_class, lambda browser: [p for c in browser.contexts for p in c.pages
+                                                         if not p.is_closed()])
+
+
+def _patch_tracing(tracing_class, is_async=False):
+    """
+    脚本自己调用 tracing.start() 时 Trace 已由运行时开启：忽略（不报 "already started"）；
+    脚本调用 tracing.stop(path=...) 时按脚本的路径保存，运行时不再重复保存
+    """
+    original_start, original_stop = tracing_class.start, tracing_class.stop
+
+    if is_async:
+        async def start(self, *args, **kwargs):
+            if id(self) in _diagnostics['tracing']:
+                return None
+            return await original_start(self, *args, **kwargs)
+
+        async def stop(self, *args, **kwargs):
+            _diagnostics['tracing'].pop(id(self), None)
+            return await original_stop(self, *args, **kwargs)
+    else:
+        def start(self, *args, **kwargs):
+            if id(self) in _diagnostics['tracing']:
+                return None
+            return original_start(self, *args, **kwargs)
+
+        def stop(self, *args, **kwargs):
+            _diagnostics['tracing'].pop(id(self), None)
+            return original_stop(self, *args, **kwargs)
+
+    tracing_class.start = start
+    tracing_class.stop = stop
+
+
+def _save_on_close(browser_class, context_class, page_class, save_before_close):
+    """关闭上下文（或关闭浏览器、关闭 new_page 创建的页面）前保存其中的 Trace"""
+    save_before_close(page_class, lambda page: [c for c in [_diagnostics['owned'].pop(id(page), None)] if c])
+    save_before_close(context_class, lambda context: [context])
+    save_before_close(browser_class, lambda browser: list(browser.contexts))
+
+
+class _ClosingManager:
+    """
+    包装 sync_playwright() / async_playwright() 返回的上下文管理器：退出 with 前先关闭脚本的上下文，
+    保存 Trace 与录屏（退出后驱动已停止，无法再关闭）；start() / stop() 等其余用法原样转发
+    """
+
+    def __init__(self, manager, close_contexts):
+        self._manager = manager
+        self._close_contexts = close_contexts
+
+    def __getattr__(self, name):
+        return getattr(self._manager, name)
+
+    def __enter__(self):
+        return self._manager.__enter__()
+
+    def __exit__(self, *args):
+        self._close_contexts()
+        return self._manager.__exit__(*args)
+
+    async def __aenter__(self):
+        return await self._manager.__aenter__()
+
+    async def __aexit__(self, *args):
+        await self._close_contexts()
+        return await self._manager.__aexit__(*args)
+
+
+def _close_on_exit(module, name, close_contexts):
+    """替换 Playwright 公开的入口函数（脚本在 install() 之后导入，取到的是替换后的函数）"""
+    original = getattr(module, name)
+
+    def entry(*args, **kwargs):
+        return _ClosingManager(original(*args, **kwargs), close_contexts)
+
+    setattr(module, name, entry)
+
+
+def _close_contexts_sync(error_class, context_class):
+    def close_contexts():
+        contexts = [c for c in _diagnostics['contexts'] if isinstance(c, context_class)]
+        for context in reversed(contexts):
+            _diagnostics['contexts'].remove(context)
+            try:
+                context.close()
+            except error_class:
+                pass
+    return close_contexts
+
+
+def _close_contexts_async(error_class, context_class):
+    async def close_contexts():
+        contexts = [c for c in _diagnostics['contexts'] if isinstance(c, context_class)]
+        for context in reversed(contexts):
+            _diagnostics['contexts'].remove(context)
+            try:
+                await context.close()
+            except error_class:
+                pass
+    return close_contexts
+
+
+def _on_terminate(signum, frame):
+    """
+    执行超时被终止：在脚本中抛出 SystemExit，使脚本退出 with sync_playwright() / async_playwright()，
+    关闭上下文并保存 Trace 与录屏
+
+    同步 API 等待 Playwright 响应时，信号处理函数运行在事件循环所在的 greenlet 中，直接抛出会中断事件循环、
+    之后无法再关闭上下文；此时切换到脚本所在的主 greenlet 抛出，事件循环在关闭上下文时继续运行。
+    asyncio.run() 运行的异步脚本按 Ctrl+C 处理（取消主任务，async with 正常退出）。
+    """
+    try:
+        import greenlet
+    except ImportError:
+        greenlet = None
+    if greenlet is not None:
+        current = root = greenlet.getcurrent()
+        while root.parent is not None:
+            root = root.parent
+        if current is not root:
+            root.throw(SystemExit('执行超时，已终止'))
+            return
+    interrupt = signal.getsignal(signal.SIGINT)
+    if callable(interrupt) and interrupt is not signal.default_int_handler:
+        interrupt(signal.SIGINT, frame)
+        return
+    raise SystemExit('执行超时，已终止')
+
+
+def _write_stats():
+    path = _config.get('stats_file')
+    if not path:
+        return
+    if _network['rules'] is not None:
+        _stats['network'] = _network['rules'].to_dict()
+    if _performance_enabled():
+        _stats['performance'] = {'pages': list(_performance['pages'].values()),
+                                 'dropped': _performance['dropped']}
+    if _diagnostics_config():
+        _stats['diagnostics'] = {'traces': _diagnostics['traces'], 'errors': _diagnostics['errors']}
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(_stats, f, ensure_ascii=False)
+    except OSError:
+        pass
+
+
+def install(config_path):
+    """读取运行时配置并替换 Playwright 的 launch()"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        _config.update(json.load(f))
+    if _config.get('cell'):
+        _stats['matrix'] = {'cell': _config['cell'], 'redirected': [], 'mismatches': []}
+    if _config.get('network'):
+        cache = _config.get('network_cache') or {}
+        _network['rules'] = NetworkRules(_config['network'], cache_dir=cache.get('folder'),
+                                         max_entry_bytes=cache.get('max_entry_bytes'))
+    atexit.register(_write_stats)
+    if _diagnostics_config():
+        signal.signal(signal.SIGTERM, _on_terminate)
+    try:
+        _patch_sync()
+        _patch_async()
+    except ImportError:
+        # 未安装 Playwright：脚本自身导入时会报出原始错误
+        pass
+
+
+def connect(playwright, browser=None):
+    """
+    获取脚本配置的浏览器（启用浏览器池时为已启动的浏览器服务）
+
+    Args:
+        playwright: sync_playwright() 返回的 Playwright 实例
+        browser: 浏览器类型，默认使用脚本配置
+    """
+    browser_type = getattr(playwright, browser or _config.get('browser') or 'chromium')
+    return browser_type.launch(headless=_config.get('headless', True))
+
+
+def new_context(browser, **kwargs):
+    """新建隔离的浏览器上下文，默认使用脚本配置的视口"""
+    if _config.get('viewport') and 'viewport' not in kwargs and not kwargs.get('no_viewport'):
+        kwargs['viewport'] = _config['viewport']
+    return browser.new_context(**kwargs)
+
+
+@contextmanager
+def page(**context_options):
+    """提供一个位于独立上下文中的页面，退出时关闭上下文并断开浏览器"""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = connect(p)
+        context = new_context(browser, **context_options)
+        try:
+            yield context.new_page()
+        finally:
+            context.close()
+            browser.close()
+
+
+def main(argv=None):
+    config_path, script_path = (argv or sys.argv[1:])[:2]
+    install(config_path)
+    script_path = os.path.abspath(script_path)
+    sys.argv = [script_path]
+    sys.path.insert(0, os.path.dirname(script_path))
+    runpy.run_path(script_path, run_name='__main__')
+
+
+if __name__ == '__main__':
+    # 脚本中 import web_runtime 时使用同一个模块实例（共享已加载的配置）
+    sys.modules['web_runtime'] = sys.modules[__name__]
+    main()
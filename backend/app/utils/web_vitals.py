@@ -0,0 +1,208 @@
+"""
+Web 测试前端性能指标
+
+web_runtime 在脚本新建的每个浏览器上下文中注入 VITALS_SCRIPT，每个页面导航（文档）记录：
+
+    ttfb                 首字节时间（Navigation Timing responseStart，ms）
+    fcp                  首次内容绘制（Paint Timing，ms）
+    lcp                  最大内容绘制（Largest Contentful Paint，ms，WebKit 不支持时为 null）
+    cls                  累计布局偏移（按 1s 间隔 / 5s 上限的会话窗口取最大值）
+    dom_content_loaded   DOMContentLoaded 结束时间（ms）
+    load                 load 事件结束时间（ms）
+    transfer_bytes       页面与子资源的传输字节数（跨域资源未设置 Timing-Allow-Origin 时计为 0）
+    long_tasks           长任务（>50ms）次数，long_task_ms 为其总耗时
+
+页面离开（pagehide）时通过绑定函数上报，关闭页面、上下文或浏览器前再主动采集一次。
+脚本配置 config.performance.budgets 为各指标的上限，任一页面超出时执行结果为失败。
+
+本模块只依赖标准库，执行时会被复制到运行目录中使用。
+"""
+
+import statistics
+from typing import Dict, Any, List, Optional
+
+METRICS = ('ttfb', 'fcp', 'lcp', 'cls', 'dom_content_loaded', 'load', 'transfer_bytes', 'long_tasks',
+           'long_task_ms')
+TIMING_FIELDS = ('dns', 'connect', 'tls', 'request', 'response', 'dom_interactive', 'dom_complete')
+UNITS = {'cls': '', 'transfer_bytes': ' 字节', 'long_tasks': ' 次'}
+
+REPORT_BINDING = '__easytestReportPerf'
+SNAPSHOT_EXPRESSION = '() => window.__easytestPerf ? window.__easytestPerf() : null'
+
+VITALS_SCRIPT = r'''
+(() => {
+  if (window !== window.top || window.__easytestPerf) return;
+  const state = {id: Math.random().toString(36).slice(2) + Date.now().toString(36),
+                 lcp: null, cls: 0, longTasks: 0, longTaskMs: 0};
+  const observe = (type, callback) => {
+    try {
+      new PerformanceObserver(list => list.getEntries().forEach(callback)).observe({type, buffered: true});
+    } catch (e) {}
+  };
+  let session = [], sessionValue = 0;
+  observe('largest-contentful-paint', e => { state.lcp = e.renderTime || e.loadTime || e.startTime; });
+  observe('layout-shift', e => {
+    if (e.hadRecentInput) return;
+    const first = session[0], last = session[session.length - 1];
+    if (last && e.startTime - last.startTime < 1000 && e.startTime - first.startTime < 5000) {
+      session.push(e);
+      sessionValue += e.value;
+    } else {
+      session = [e];
+      sessionValue = e.value;
+    }
+    state.cls = Math.max(state.cls, sessionValue);
+  });
+  observe('longtask', e => { state.longTasks += 1; state.longTaskMs += e.duration; });
+
+  const snapshot = () => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    const positive = value => (value > 0 ? value : null);
+    const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+    const resources = performance.getEntriesByType('resource');
+    let transfer = nav ? nav.transferSize || 0 : 0;
+    resources.forEach(r => { transfer += r.transferSize || 0; });
+    return {
+      id: state.id,
+      url: location.href,
+      ttfb: nav ? positive(nav.responseStart) : null,
+      fcp: fcp ? fcp.startTime : null,
+      lcp: state.lcp,
+      cls: state.cls,
+      dom_content_loaded: nav ? positive(nav.domContentLoadedEventEnd) : null,
+      load: nav ? positive(nav.loadEventEnd) : null,
+      transfer_bytes: transfer,
+      resources: resources.length,
+      long_tasks: state.longTasks,
+      long_task_ms: state.longTaskMs,
+      timing: nav ? {
+        dns: nav.domainLookupEnd - nav.domainLookupStart,
+        connect: nav.connectEnd - nav.connectStart,
+        tls: nav.secureConnectionStart > 0 ? nav.connectEnd - nav.secureConnectionStart : 0,
+        request: nav.responseStart - nav.requestStart,
+        response: nav.responseEnd - nav.responseStart,
+        dom_interactive: nav.domInteractive,
+        dom_complete: nav.domComplete,
+      } : null,
+    };
+  };
+  Object.defineProperty(window, '__easytestPerf', {value: snapshot});
+  addEventListener('pagehide', () => {
+    try { window.__easytestReportPerf && window.__easytestReportPerf(snapshot()); } catch (e) {}
+  });
+})();
+'''
+
+
+def _round(value, digits=1):
+    return round(float(value), digits) if isinstance(value, (int, float)) else None
+
+
+def normalize_page(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """整理页面上报的原始数据，空白页返回 None"""
+    if not isinstance(raw, dict) or not str(raw.get('url') or '').startswith(('http:', 'https:', 'file:')):
+        return None
+    page = {'url': raw['url']}
+    for metric in METRICS:
+        page[metric] = _round(raw.get(metric), 4 if metric == 'cls' else 1)
+    for metric in ('transfer_bytes', 'long_tasks'):
+        if page[metric] is not None:
+            page[metric] = int(page[metric])
+    page['resources'] = raw.get('resources')
+    timing = raw.get('timing')
+    page['timing'] = {k: _round(timing.get(k)) for k in TIMING_FIELDS} if isinstance(timing, dict) else None
+    return page
+
+
+def validate_performance_config(performance: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    校验 config.performance
+
+    Returns:
+        错误信息，校验通过返回 None
+    """
+    if performance is None:
+        return None
+    if not isinstance(performance, dict):
+        return 'config.performance must be an object'
+    unknown = set(performance) - {'enabled', 'budgets'}
+    if unknown:
+        return f'config.performance has unknown keys: {", ".join(sorted(unknown))}'
+    if 'enabled' in performance and not isinstance(performance['enabled'], bool):
+        return 'config.performance.enabled must be a boolean'
+    budgets = performance.get('budgets')
+    if budgets is None:
+        return None
+    if not isinstance(budgets, dict):
+        return 'config.performance.budgets must be an object'
+    unknown = set(budgets) - set(METRICS)
+    if unknown:
+        return f'config.performance.budgets has unknown metrics: {", ".join(sorted(unknown))}'
+    for metric, value in budgets.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            return f'config.performance.budgets.{metric} must be a non-negative number'
+    return None
+
+
+def summarize_pages(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """各指标在所有页面中的最差值（最大值）"""
+    summary = {'pages': len(pages)}
+    for metric in METRICS:
+        values = [p[metric] for p in pages if p.get(metric) is not None]
+        summary[metric] = max(values) if values else None
+    return summary
+
+
+def check_budgets(pages: List[Dict[str, Any]], budgets: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """返回超出预算的页面指标"""
+    violations = []
+    for metric, budget in (budgets or {}).items():
+        for page in pages:
+            value = page.get(metric)
+            if value is not None and value > budget:
+                violations.append({'metric': metric, 'url': page['url'], 'value': value, 'budget': budget})
+    return violations
+
+
+def describe_violations(violations: List[Dict[str, Any]], limit: int = 3) -> str:
+    parts = [f'{v["metric"]} {v["value"]:g}{UNITS.get(v["metric"], "ms")} > {v["budget"]:g}'
+             f'{UNITS.get(v["metric"], "ms")} ({v["url"]})' for v in violations[:limit]]
+    if len(violations) > limit:
+        parts.append(f'等 {len(violations)} 项')
+    return '性能预算超出: ' + '; '.join(parts)
+
+
+def build_performance(raw_pages: List[Dict[str, Any]], budgets: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """由脚本端采集的页面数据生成执行结果中的 performance 字段"""
+    pages = [p for p in (normalize_page(raw) for raw in raw_pages or []) if p]
+    return {
+        'pages': pages,
+        'summary': summarize_pages(pages),
+        'budgets': budgets or {},
+        'violations': check_budgets(pages, budgets),
+    }
+
+
+def trend_stats(points: List[Dict[str, Any]], metrics=METRICS) -> Dict[str, Any]:
+    """
+    按执行先后（旧 -> 新）的指标计算趋势
+
+    Returns:
+        {metric: {'latest', 'median', 'min', 'max', 'change_pct'}}，
+        change_pct 为最近一次相对之前各次中位数的变化百分比
+    """
+    stats = {}
+    for metric in metrics:
+        values = [p[metric] for p in points if p.get(metric) is not None]
+        if not values:
+            continue
+        previous = values[:-1]
+        baseline = statistics.median(previous) if previous else None
+        stats[metric] = {
+            'latest': values[-1],
+            'median': round(statistics.median(values), 4),
+            'min': min(values),
+            'max': max(values),
+            'change_pct': round((values[-1] - baseline) / baseline * 100, 2) if baseline else None,
+        }
+    return stats
@@ -0,0 +1,58 @@
+"""add perf_test_runs table
+
+Revision ID: 7b1d2c9e4f10
+Revises: 3e962718dc61
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1d2c9e4f10'
+down_revision = '3e962718dc61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('perf_test_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scenario_id', sa.Integer(), nullable=False, comment='场景 ID'),
+        sa.Column('project_id', sa.Integer(), nullable=True, comment='项目 ID'),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='用户 ID'),
+        sa.Column('test_run_id', sa.Integer(), nullable=True, comment='关联的测试执行记录 ID'),
+        sa.Column('status', sa.String(length=20), nullable=True, comment='状态: running/completed/failed/stopped'),
+        sa.Column('config', sa.JSON(), nullable=True, comment='执行配置（用户数、生成速率、持续时间等）'),
+        sa.Column('request_count', sa.Integer(), nullable=True, comment='总请求数'),
+        sa.Column('failure_count', sa.Integer(), nullable=True, comment='失败请求数'),
+        sa.Column('error_rate', sa.Float(), nullable=True, comment='错误率 (%)'),
+        sa.Column('avg_response_time', sa.Float(), nullable=True, comment='平均响应时间 (ms)'),
+        sa.Column('min_response_time', sa.Float(), nullable=True, comment='最小响应时间 (ms)'),
+        sa.Column('max_response_time', sa.Float(), nullable=True, comment='最大响应时间 (ms)'),
+        sa.Column('p50_response_time', sa.Float(), nullable=True, comment='P50 响应时间 (ms)'),
+        sa.Column('p90_response_time', sa.Float(), nullable=True, comment='P90 响应时间 (ms)'),
+        sa.Column('p95_response_time', sa.Float(), nullable=True, comment='P95 响应时间 (ms)'),
+        sa.Column('p99_response_time', sa.Float(), nullable=True, comment='P99 响应时间 (ms)'),
+        sa.Column('throughput', sa.Float(), nullable=True, comment='吞吐量 (req/s)'),
+        sa.Column('endpoint_stats', sa.JSON(), nullable=True, comment='各接口统计'),
+        sa.Column('result', sa.JSON(), nullable=True, comment='执行结果详情（历史曲线、输出等）'),
+        sa.Column('error_message', sa.Text(), nullable=True, comment='错误信息'),
+        sa.Column('is_baseline', sa.Boolean(), nullable=True, comment='是否为对比基线'),
+        sa.Column('started_at', sa.DateTime(), nullable=True, comment='开始时间'),
+        sa.Column('finished_at', sa.DateTime(), nullable=True, comment='结束时间'),
+        sa.Column('duration', sa.Float(), nullable=True, comment='执行耗时(秒)'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.ForeignKeyConstraint(['scenario_id'], ['perf_test_scenarios.id'], ),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['test_run_id'], ['test_runs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_perf_test_runs_scenario_id', 'perf_test_runs', ['scenario_id'])
+
+
+def downgrade():
+    op.drop_index('ix_perf_test_runs_scenario_id', table_name='perf_test_runs')
+    op.drop_table('perf_test_runs')
@@ -0,0 +1,26 @@
+"""add config to perf_test_scenarios
+
+Revision ID: 9c4e6a1f2b33
+Revises: 7b1d2c9e4f10
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e6a1f2b33'
+down_revision = '7b1d2c9e4f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('perf_test_scenarios', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('config', sa.JSON(), nullable=True, comment='其他配置'))
+
+
+def downgrade():
+    with op.batch_alter_table('perf_test_scenarios', schema=None) as batch_op:
+        batch_op.drop_column('config')
@@ -0,0 +1,26 @@
+"""add data_feeders to perf_test_scenarios
+
+Revision ID: b2d7f3a8c415
+Revises: 9c4e6a1f2b33
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d7f3a8c415'
+down_revision = '9c4e6a1f2b33'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('perf_test_scenarios', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_feeders', sa.JSON(), nullable=True, comment='压测数据文件'))
+
+
+def downgrade():
+    with op.batch_alter_table('perf_test_scenarios', schema=None) as batch_op:
+        batch_op.drop_column('data_feeders')
@@ -0,0 +1,46 @@
+"""add web_test_runs table
+
+Revision ID: c6e1f4a9d2b7
+Revises: b2d7f3a8c415
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e1f4a9d2b7'
+down_revision = 'b2d7f3a8c415'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('web_test_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('script_id', sa.Integer(), nullable=False, comment='脚本 ID'),
+        sa.Column('project_id', sa.Integer(), nullable=True, comment='项目 ID'),
+        sa.Column('user_id', sa.Integer(), nullable=False, comment='用户 ID'),
+        sa.Column('test_run_id', sa.Integer(), nullable=True, comment='所属套件的测试执行记录 ID'),
+        sa.Column('status', sa.String(length=20), nullable=True, comment='状态: success/failed/timeout/error'),
+        sa.Column('browser', sa.String(length=20), nullable=True, comment='浏览器'),
+        sa.Column('viewport', sa.String(length=20), nullable=True, comment='视口（宽x高）'),
+        sa.Column('duration', sa.Float(), nullable=True, comment='执行耗时(秒)'),
+        sa.Column('error_message', sa.Text(), nullable=True, comment='错误信息'),
+        sa.Column('metrics', sa.JSON(), nullable=True, comment='各性能指标在所有页面中的最差值'),
+        sa.Column('performance', sa.JSON(), nullable=True, comment='各页面性能数据、预算与超出项'),
+        sa.Column('artifact_run', sa.String(length=100), nullable=True, comment='产物标识'),
+        sa.Column('created_at', sa.DateTime(), nullable=True, comment='创建时间'),
+        sa.ForeignKeyConstraint(['script_id'], ['web_test_scripts.id'], ),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['test_run_id'], ['test_runs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_web_test_runs_script_id', 'web_test_runs', ['script_id'])
+
+
+def downgrade():
+    op.drop_index('ix_web_test_runs_script_id', table_name='web_test_runs')
+    op.drop_table('web_test_runs')
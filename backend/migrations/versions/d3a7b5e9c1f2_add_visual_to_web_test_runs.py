@@ -0,0 +1,26 @@
+"""add visual column to web_test_runs
+
+Revision ID: d3a7b5e9c1f2
+Revises: c6e1f4a9d2b7
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7b5e9c1f2'
+down_revision = 'c6e1f4a9d2b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('web_test_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('visual', sa.JSON(), nullable=True, comment='视觉回归各步骤的对比结果'))
+
+
+def downgrade():
+    with op.batch_alter_table('web_test_runs', schema=None) as batch_op:
+        batch_op.drop_column('visual')
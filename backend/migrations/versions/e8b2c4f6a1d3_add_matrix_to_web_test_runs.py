@@ -0,0 +1,26 @@
+"""add matrix column to web_test_runs
+
+Revision ID: e8b2c4f6a1d3
+Revises: d3a7b5e9c1f2
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b2c4f6a1d3'
+down_revision = 'd3a7b5e9c1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('web_test_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('matrix', sa.JSON(), nullable=True, comment='矩阵执行的浏览器、视口与各组合结果'))
+
+
+def downgrade():
+    with op.batch_alter_table('web_test_runs', schema=None) as batch_op:
+        batch_op.drop_column('matrix')
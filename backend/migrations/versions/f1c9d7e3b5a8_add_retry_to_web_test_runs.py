@@ -0,0 +1,26 @@
+"""add retry column to web_test_runs
+
+Revision ID: f1c9d7e3b5a8
+Revises: e8b2c4f6a1d3
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c9d7e3b5a8'
+down_revision = 'e8b2c4f6a1d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('web_test_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('retry', sa.JSON(), nullable=True, comment='失败重试的各次执行与重试耗时'))
+
+
+def downgrade():
+    with op.batch_alter_table('web_test_runs', schema=None) as batch_op:
+        batch_op.drop_column('retry')
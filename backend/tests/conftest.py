@@ -45,3 +45,21 @@ def app():
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture()
+def auth_headers(client):
+    import uuid
+
+    username = f"user_{uuid.uuid4().hex[:8]}"
+    password = "Passw0rd!"
+    client.post(
+        "/api/v1/auth/register",
+        json={"username": username, "email": f"{username}@example.com", "password": password},
+    )
+    login_resp = client.post(
+        "/api/v1/auth/login",
+        json={"username": username, "password": password},
+    )
+    access_token = login_resp.get_json()["data"]["access_token"]
+    return {"Authorization": f"Bearer {access_token}"}
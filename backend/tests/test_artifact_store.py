@@ -0,0 +1,75 @@
+import json
+import os
+
+from app.utils.artifact_store import ArtifactStore
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_collect_dedups_and_compresses(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    har = b'{"log": {"entries": []}}' * 200
+    for run in ("a", "b"):
+        _write(str(tmp_path / run / "screenshot.png"), b"\x89PNG" + b"\x00" * 100)
+        _write(str(tmp_path / run / "trace" / "network.har"), har)
+
+    first, _ = store.collect(str(tmp_path / "a"), "script_1_a", {"user_id": 1})
+    second, _ = store.collect(str(tmp_path / "b"), "script_1_b", {"user_id": 1})
+
+    by_name = {a["name"]: a for a in first}
+    assert by_name["trace/network.har"]["kind"] == "har"
+    assert by_name["trace/network.har"]["compressed"]
+    assert by_name["trace/network.har"]["stored_size"] < len(har)
+    assert not by_name["screenshot.png"]["compressed"]
+    assert all(a["deduplicated"] for a in second)
+
+    with store.open(by_name["trace/network.har"]) as f:
+        assert f.read() == har
+    objects = [f for _, _, files in os.walk(store.objects_dir) for f in files]
+    assert len(objects) == 2
+
+
+def test_retention_removes_unreferenced_objects(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    _write(str(tmp_path / "old" / "a.png"), b"old")
+    _write(str(tmp_path / "new" / "b.png"), b"new")
+    store.collect(str(tmp_path / "old"), "script_1_old", {"user_id": 1})
+    store.collect(str(tmp_path / "new"), "script_2_new", {"user_id": 1})
+
+    ref_path = store._ref_path("script_1_old")
+    with open(ref_path) as f:
+        ref = json.load(f)
+    with open(ref_path, "w") as f:
+        json.dump(dict(ref, created_at=ref["created_at"] - 8 * 86400), f)
+
+    result = store.apply_retention(7, grace_seconds=0)
+    assert result["refs_removed"] == 1
+    assert result["objects_removed"] == 1
+    assert store.load_ref("script_1_old") is None
+    assert store.load_ref("script_2_new") is not None
+
+    assert store.remove_refs("script_2_") == 1
+    assert store.gc(grace_seconds=0)["objects_removed"] == 1
+
+
+def test_download_supports_range(app, client, auth_headers, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "WEB_ARTIFACTS", {"folder": str(tmp_path / "artifacts")})
+    user_id = client.get("/api/v1/auth/me", headers=auth_headers).get_json()["data"]["id"]
+    body = b"0123456789" * 1000
+    _write(str(tmp_path / "work" / "log.txt"), body)
+    ArtifactStore(str(tmp_path / "artifacts")).collect(str(tmp_path / "work"), "script_9_x", {"user_id": user_id})
+
+    resp = client.get("/api/v1/web-test/artifacts/script_9_x/log.txt",
+                      headers=dict(auth_headers, Range="bytes=5000-5009"))
+    assert resp.status_code == 206
+    assert resp.data == body[5000:5010]
+    assert resp.headers["Content-Range"] == f"bytes 5000-5009/{len(body)}"
+
+    resp = client.get("/api/v1/web-test/artifacts/script_9_x/log.txt", headers=auth_headers)
+    assert resp.status_code == 200 and resp.data == body
+    assert client.get("/api/v1/web-test/artifacts/script_9_x/missing.txt", headers=auth_headers).status_code == 404
+    assert client.get("/api/v1/web-test/artifacts/..%2Fx/log.txt", headers=auth_headers).status_code == 404
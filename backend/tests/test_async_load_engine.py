@@ -0,0 +1,157 @@
+import csv
+import json
+import os
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import tasks
+from app.utils import async_load_engine
+from app.utils.async_load_engine import HISTORY_HEADERS, STATS_HEADERS, _Aggregator, _WorkerStats, worker_users
+from app.utils.latency_histogram import LatencyHistogram
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = b"fail" if self.path.startswith("/fail") else b"ok"
+        self.send_response(500 if self.path.startswith("/fail") else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    _Handler.delay = 0.0
+
+
+def _run(tmp_path, server, path="/items", **config):
+    prefix = str(tmp_path / "rt")
+    config = dict({"url": f"http://127.0.0.1:{server.server_port}{path}", "method": "GET", "duration": 1,
+                   "concurrency": 2, "processes": 1, "timeout": 5, "csv_prefix": prefix}, **config)
+    handler = signal.getsignal(signal.SIGTERM)
+    try:
+        return async_load_engine.run(config), prefix
+    finally:
+        signal.signal(signal.SIGTERM, handler)  # run() 安装了 SIGTERM 处理函数
+
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_output_matches_locust_columns(tmp_path, server):
+    code, prefix = _run(tmp_path, server, processes=2)
+    assert code == 0
+
+    stats = _rows(f"{prefix}_stats.csv")
+    history = _rows(f"{prefix}_stats_history.csv")
+    assert stats[0] == STATS_HEADERS and [r[1] for r in stats[1:]] == ["/items", "Aggregated"]
+    assert history[0] == HISTORY_HEADERS
+    assert all(len(r) == len(HISTORY_HEADERS) for r in history[1:])
+
+    # 与 Locust 结果共用解析逻辑
+    results = tasks._parse_locust_results(prefix)
+    summary = tasks._summarize_stats_row(results["aggregated"])
+    assert summary["request_count"] > 0 and summary["failure_count"] == 0
+    assert results["endpoint_stats"][0]["name"] == "/items"
+    assert results["history"][-1]["Total Request Count"] == str(summary["request_count"])
+
+    with open(f"{prefix}_engine.json", encoding="utf-8") as f:
+        engine = json.load(f)
+    assert engine["processes"] == 2
+    assert LatencyHistogram.from_dict(engine["histogram"]).count == summary["request_count"]
+
+
+def test_failed_requests_are_grouped_and_exit_non_zero(tmp_path, server):
+    code, prefix = _run(tmp_path, server, path="/fail", duration=0.5)
+    assert code == 1
+    failures = tasks._group_failures(tasks._read_csv_rows(f"{prefix}_failures.csv"))
+    assert failures[0]["error"] == "HTTP 500"
+
+
+def test_merged_histogram_percentiles_match_single_histogram():
+    aggregator = _Aggregator({"url": "http://localhost/items"})
+    expected = LatencyHistogram()
+    for index, latencies in enumerate([range(1, 101), range(101, 201)]):
+        stats = _WorkerStats()
+        for latency in latencies:
+            stats.record(float(latency), 2)
+            expected.record(float(latency))
+        aggregator.update(stats.report(index, done=True))
+
+    totals = aggregator.totals()
+    merged = totals["histogram"]
+    assert (totals["requests"], merged.count) == (200, 200)
+    assert merged.percentiles() == expected.percentiles()
+    assert merged.percentile(50) == pytest.approx(100, rel=0.01)
+    assert merged.percentile(99) == pytest.approx(198, rel=0.01)
+    assert (merged.min, merged.max) == (expected.min, expected.max)
+
+
+def test_open_loop_keeps_target_rate_when_responses_are_slow(tmp_path, server):
+    # 响应 100ms：开环按计划时间发送，不等待前一个响应，实际速率仍为目标的 40 rps
+    _Handler.delay = 0.1
+    code, prefix = _run(tmp_path, server, duration=2, concurrency=8, target_rps=40)
+    assert code == 0
+
+    summary = tasks._summarize_stats_row(tasks._parse_locust_results(prefix)["aggregated"])
+    open_workload = tasks._read_open_workload(prefix, 2)
+    assert open_workload["scheduled"] == 80 and open_workload["dropped"] == 0
+    assert 76 <= summary["request_count"] <= 80
+    assert open_workload["achieved_rps"] == pytest.approx(40, rel=0.05)
+    assert open_workload["raw"]["p50"] >= 100
+
+
+def test_users_are_split_across_processes_without_loss():
+    assert [worker_users(10, 3, i) for i in range(3)] == [4, 3, 3]
+    assert [worker_users(8, 4, i) for i in range(4)] == [2, 2, 2, 2]
+    assert sum(worker_users(7, 5, i) for i in range(5)) == 7
+
+
+def test_processes_are_capped_at_concurrency(tmp_path, server):
+    code, prefix = _run(tmp_path, server, duration=0.5, concurrency=2, processes=4)
+    assert code == 0
+    with open(f"{prefix}_engine.json", encoding="utf-8") as f:
+        assert json.load(f)["processes"] == 2
+
+
+def test_sigterm_stops_workers_and_keeps_their_final_reports(tmp_path, server, monkeypatch):
+    # 关闭周期上报：结果中的请求只能来自各进程收到停止后的最终上报
+    monkeypatch.setattr(async_load_engine, "REPORT_INTERVAL", 60)
+    _Handler.delay = 0.05
+    timer = threading.Timer(1.0, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    started = time.time()
+    try:
+        code, prefix = _run(tmp_path, server, duration=30, concurrency=4, processes=2)
+    finally:
+        timer.cancel()
+    assert code == 0
+    assert time.time() - started < 10
+
+    results = tasks._parse_locust_results(prefix)
+    summary = tasks._summarize_stats_row(results["aggregated"])
+    assert summary["request_count"] > 0
+    assert results["history"][-1]["Total Request Count"] == str(summary["request_count"])
+    with open(f"{prefix}_engine.json", encoding="utf-8") as f:
+        engine = json.load(f)
+    assert LatencyHistogram.from_dict(engine["histogram"]).count == summary["request_count"]
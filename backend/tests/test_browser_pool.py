@@ -0,0 +1,112 @@
+import os
+import signal
+import sys
+import threading
+import time
+
+import pytest
+
+from app.utils.browser_pool import BrowserPool, BrowserPoolError, BrowserServer
+
+
+FAKE_SERVER = 'import os, time; print("ws://127.0.0.1:1/" + str(os.getpid()), flush=True); time.sleep(60)'
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(BrowserServer, '_command', lambda self: [sys.executable, '-c', FAKE_SERVER])
+    pool = BrowserPool({'max_contexts': 3, 'launch_timeout': 10})
+    yield pool
+    pool.shutdown()
+
+
+def test_servers_are_reused_and_recycled_after_max_contexts(pool):
+    first = pool.acquire('chromium')
+    assert not first.warm
+    assert first.ws_endpoint.endswith(str(first.server.process.pid))
+    first.release(contexts=2)
+
+    second = pool.acquire('chromium')
+    assert second.warm
+    assert second.server is first.server
+    second.release(contexts=1)
+
+    # 累计 3 个上下文后回收，下一次执行启动新的浏览器服务
+    assert not first.server.alive()
+    third = pool.acquire('chromium')
+    assert not third.warm
+    assert third.server is not first.server
+    third.release()
+    assert pool.stats()['counters'] == {'launches': 2, 'reuses': 1, 'recycles': 1, 'crashes': 0}
+
+
+def test_crashed_server_is_replaced(pool):
+    lease = pool.acquire('firefox', headless=True)
+    lease.release()
+    os.kill(lease.server.process.pid, signal.SIGKILL)
+    lease.server.process.wait()
+
+    replacement = pool.acquire('firefox', headless=True)
+    assert replacement.server is not lease.server
+    assert replacement.server.alive()
+    replacement.release(crashed=True)
+    assert not replacement.server.alive()
+    assert pool.stats()['counters']['crashes'] == 2
+
+
+def test_launch_failure_raises(monkeypatch):
+    monkeypatch.setattr(BrowserServer, '_command',
+                        lambda self: [sys.executable, '-c', 'import sys; sys.exit("no browser")'])
+    with pytest.raises(BrowserPoolError, match='no browser'):
+        BrowserPool().acquire('webkit')
+    with pytest.raises(BrowserPoolError):
+        BrowserPool().acquire('opera')
+
+
+def test_slow_launch_does_not_block_other_leases(monkeypatch):
+    # 第二个浏览器服务启动需 1 秒：期间其他执行仍可获取、归还已启动的服务
+    slow = ('import os, sys, time; time.sleep(float(sys.argv[1])); '
+            'print("ws://127.0.0.1:1/" + str(os.getpid()), flush=True); time.sleep(60)')
+    delays = iter(['0', '1'])
+    monkeypatch.setattr(BrowserServer, '_command', lambda self: [sys.executable, '-c', slow, next(delays)])
+    pool = BrowserPool({'servers_per_browser': 2, 'launch_timeout': 10})
+    try:
+        first = pool.acquire('chromium')
+        launched = []
+        thread = threading.Thread(target=lambda: launched.append(pool.acquire('chromium')))
+        thread.start()
+        deadline = time.monotonic() + 5
+        while pool.stats()['launching'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        assert pool.stats()['launching'] == 1
+        first.release()
+        again = pool.acquire('chromium')
+        assert again.server is first.server
+        assert time.monotonic() - started < 0.5
+        again.release()
+
+        thread.join(timeout=10)
+        assert launched[0].server is not first.server and not launched[0].warm
+        launched[0].release()
+        assert pool.stats()['counters']['launches'] == 2 and pool.stats()['launching'] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_waiting_acquire_uses_the_server_being_launched(monkeypatch):
+    slow = 'import os, time; time.sleep(0.5); ' + FAKE_SERVER.split('; ', 1)[1]
+    monkeypatch.setattr(BrowserServer, '_command', lambda self: [sys.executable, '-c', slow])
+    pool = BrowserPool({'launch_timeout': 10})
+    try:
+        leases = []
+        threads = [threading.Thread(target=lambda: leases.append(pool.acquire('chromium'))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        assert len(leases) == 2 and leases[0].server is leases[1].server
+        assert pool.stats()['counters']['launches'] == 1
+    finally:
+        pool.shutdown()
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from app.utils import cpu_affinity
+from app.utils.cpu_affinity import CoreRegistry, parse_core_list, prepare_isolation, validate_cpu_config
+
+
+pytestmark = pytest.mark.skipif(not cpu_affinity.supported(), reason='仅 Linux 支持绑核')
+
+
+def _registry(tmp_path, monkeypatch, cores=range(8)):
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(cores))
+    return CoreRegistry(str(tmp_path / 'cpu.json'), reserved_cores='0')
+
+
+def test_concurrent_runs_get_disjoint_cores(tmp_path, monkeypatch):
+    registry = _registry(tmp_path, monkeypatch)
+
+    first = registry.reserve('perf_run_1', 3)
+    second = registry.reserve('perf_run_2', 3)
+
+    assert first == [1, 2, 3]
+    assert second == [4, 5, 6]
+    assert registry.reserve('perf_run_3', 2) is None
+
+    registry.release('perf_run_1')
+    assert registry.reserve('perf_run_3', 2) == [1, 2]
+
+
+def test_stale_reservations_are_pruned(tmp_path, monkeypatch):
+    registry = _registry(tmp_path, monkeypatch, cores=range(3))
+    registry.reserve('perf_run_1', 2)
+    monkeypatch.setattr(cpu_affinity, '_pid_alive', lambda pid: False)
+
+    assert registry.reserve('perf_run_2', 2) == [1, 2]
+
+
+def test_prepare_isolation_falls_back_with_warning(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: {0, 1})
+    settings = {'state_file': str(tmp_path / 'cpu.json'), 'reserved_cores': '0'}
+
+    isolation = prepare_isolation({'cores': 2}, 'perf_run_1', settings)
+
+    assert isolation.cores == []
+    assert isolation.limits_request() == {}
+    assert isolation.warnings
+    assert prepare_isolation(None, 'perf_run_2', settings).warnings == []
+
+
+def test_parse_and_validate():
+    assert parse_core_list('0,2-4') == [0, 2, 3, 4]
+    assert validate_cpu_config({'cores': 2, 'memory_limit_mb': 512}, 4) is None
+    assert 'between 1 and 4' in validate_cpu_config({'cores': 8}, 4)
+    assert 'unknown keys' in validate_cpu_config({'cpuset': '1'}, 4)
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+from app.utils.data_feeder import Feeder, FeederError, FeederExhausted, build_feeder, fill_placeholders
+
+
+def _build(tmp_path, text, fmt="csv"):
+    path = str(tmp_path / f"users.{fmt}.feed")
+    info = build_feeder(io.BytesIO(text.encode("utf-8")), path, fmt)
+    return path, info
+
+
+def test_build_and_read_rows(tmp_path):
+    path, info = _build(tmp_path, 'user_id,name\n1,"Li, Lei"\n2,韩梅梅\n')
+    assert info["columns"] == ["user_id", "name"]
+    assert info["rows"] == 2
+
+    feeder = Feeder("users", path, "random", cursor_dir=str(tmp_path))
+    assert feeder.file.row(0) == {"user_id": "1", "name": "Li, Lei"}
+    assert feeder.file.row(1)["name"] == "韩梅梅"
+    feeder.close()
+
+    path, info = _build(tmp_path, '{"id": 7, "tags": ["a"]}\n\n{"id": 8}\n', "jsonl")
+    feeder = Feeder("items", path, "random", cursor_dir=str(tmp_path))
+    assert feeder.file.row(0) == {"id": 7, "tags": ["a"]}
+    assert feeder.file.row(1) == {"id": 8, "tags": None}
+    feeder.close()
+
+    with pytest.raises(FeederError):
+        _build(tmp_path, "a,b\n1\n")
+
+
+def test_cursor_is_shared_between_processes(tmp_path):
+    path, _ = _build(tmp_path, "n\n" + "".join(f"{i}\n" for i in range(200)))
+    first = Feeder("numbers", path, "sequential", cursor_dir=str(tmp_path))
+    second = Feeder("numbers", path, "sequential", cursor_dir=str(tmp_path))
+
+    seen = [first.next()["n"] for _ in range(10)] + [second.next()["n"] for _ in range(10)]
+    assert len(set(seen)) == 20
+
+    unique = Feeder("pair", _build(tmp_path, "n\n1\n2\n")[0], "unique", cursor_dir=str(tmp_path))
+    user_a, user_b = {}, {}
+    assert unique.next(user_a) == unique.next(user_a)
+    assert unique.next(user_a) != unique.next(user_b)
+    with pytest.raises(FeederExhausted):
+        unique.next({})
+
+
+def test_fill_placeholders():
+    row = {"user_id": 42, "name": "a b"}
+    filled = fill_placeholders(
+        {"url": "/users/{{user_id}}", "form": b"name=%7B%7Bname%7D%7D", "keep": "{{missing}}"},
+        row.get,
+    )
+    assert filled == {"url": "/users/42", "form": b"name=a%20b", "keep": "{{missing}}"}
+
+
+def test_upload_feeder(client, auth_headers, app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path))
+    scenario = client.post(
+        "/api/v1/perf-test/scenarios",
+        json={"name": "feed", "target_url": "http://api.local/users/{{user_id}}"},
+        headers=auth_headers,
+    ).get_json()["data"]
+
+    resp = client.post(
+        f"/api/v1/perf-test/scenarios/{scenario['id']}/feeders",
+        data={"file": (io.BytesIO(b"user_id\n1\n2\n"), "accounts.csv"), "policy": "unique"},
+        headers=auth_headers,
+    )
+    data = resp.get_json()["data"]
+    assert resp.status_code == 200
+    assert data["name"] == "accounts"
+    assert data["rows"] == 2
+    assert data["preview"][0] == {"user_id": "1"}
+    assert data["warnings"] == []
+
+    resp = client.delete(f"/api/v1/perf-test/scenarios/{scenario['id']}/feeders/accounts", headers=auth_headers)
+    assert resp.status_code == 200
+    assert client.get(f"/api/v1/perf-test/scenarios/{scenario['id']}/feeders",
+                      headers=auth_headers).get_json()["data"]["feeders"] == []
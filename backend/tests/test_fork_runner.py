@@ -0,0 +1,144 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.utils.fork_runner import ForkRunner, ForkedProcess, limited_command, parse_command, supported
+
+pytestmark = pytest.mark.skipif(not supported(), reason='需要 POSIX 平台')
+
+SCRIPT = '''
+import os, resource, sys
+print('argv', sys.argv[1:], os.getcwd(), os.environ.get('EASYTEST_FORK'))
+print('core', resource.getrlimit(resource.RLIMIT_CORE)[0], file=sys.stderr)
+sys.exit(int(sys.argv[1]))
+'''
+
+
+@pytest.fixture
+def runner():
+    runner = ForkRunner({'enabled': True, 'profiles': {'plain': ['json']}, 'rlimits': {'core': 0}})
+    yield runner
+    runner.shutdown()
+
+
+def _run(runner, cmd, cwd, **kwargs):
+    proc, info = runner.popen(cmd, 'plain', cwd=str(cwd), env={'EASYTEST_FORK': 'yes'}, **kwargs)
+    stdout, stderr = proc.stdout.read().decode(), proc.stderr.read().decode()
+    return proc, info, stdout, stderr, proc.wait(timeout=10)
+
+
+def test_parse_command():
+    assert parse_command([sys.executable, 'a.py', '1']) == {'script': 'a.py', 'argv': ['1']}
+    assert parse_command([sys.executable, '-m', 'locust', '-f', 'x.py']) == {'module': 'locust',
+                                                                            'argv': ['-f', 'x.py']}
+    assert parse_command([sys.executable, '-c', 'print(1)']) is None
+    assert parse_command(['node', 'a.js']) is None
+
+
+def test_forked_script_gets_own_cwd_env_and_limits(runner, tmp_path):
+    script = tmp_path / 'script.py'
+    script.write_text(SCRIPT)
+    work = tmp_path / 'work'
+    work.mkdir()
+
+    for cold_start in (True, False):
+        proc, info, stdout, stderr, code = _run(runner, [sys.executable, str(script), '3'], work)
+        assert isinstance(proc, ForkedProcess)
+        assert (info['mode'], info['cold_start']) == ('fork', cold_start)
+        assert code == 3
+        assert stdout == f"argv ['3'] {work} yes\n"
+        assert stderr == 'core 0\n'
+    assert runner.stats()['servers'][0]['runs'] == 2
+
+
+def test_timeout_and_kill(runner, tmp_path):
+    script = tmp_path / 'sleep.py'
+    script.write_text('import time\ntime.sleep(30)\n')
+
+    proc, info = runner.popen([sys.executable, str(script)], 'plain', cwd=str(tmp_path))
+    with pytest.raises(subprocess.TimeoutExpired):
+        proc.wait(timeout=0.2)
+    proc.kill()
+    assert proc.wait(timeout=10) == -9
+
+    # 预加载服务在调用方超时后再等待 KILL_GRACE 秒兜底结束子进程
+    server, _ = runner._server('plain')
+    proc = server.spawn(parse_command([sys.executable, str(script)]), [str(script)], cwd=str(tmp_path), timeout=0.2)
+    assert proc.wait(timeout=10) == -9
+    assert proc.timed_out
+
+
+def test_falls_back_to_subprocess(runner, tmp_path):
+    script = tmp_path / 'script.py'
+    script.write_text(SCRIPT)
+
+    proc, info, stdout, _, code = _run(runner, [sys.executable, '-c', 'print("inline")'], tmp_path)
+    assert isinstance(proc, subprocess.Popen)
+    assert info['mode'] == 'subprocess' and info['fallback']
+    assert (stdout, code) == ('inline\n', 0)
+
+    disabled = ForkRunner({'enabled': False, 'profiles': {'plain': []}, 'rlimits': {'core': 0}})
+    proc, info, stdout, stderr, code = _run(disabled, [sys.executable, str(script), '0'], tmp_path)
+    assert info == {'mode': 'subprocess', 'profile': 'plain', 'spawn_ms': info['spawn_ms'], 'cold_start': False,
+                    'fallback': None}
+    assert (stdout, stderr, code) == (f"argv ['0'] {tmp_path} yes\n", 'core 0\n', 0)
+
+    # 预加载服务退出后重新启动
+    runner._server('plain')[0].stop()
+    _, info, _, _, code = _run(runner, [sys.executable, str(script), '0'], tmp_path)
+    assert (info['mode'], info['cold_start'], code) == ('fork', True, 0)
+
+
+class _Isolation:
+    def __init__(self, **limits):
+        self.cores = limits.get('affinity') or []
+        self.cgroup = limits.get('cgroup')
+        self._limits = limits
+
+    def limits_request(self):
+        return dict(self._limits)
+
+
+def test_subprocess_limits_are_applied_without_preexec_fn(tmp_path, monkeypatch):
+    """回退启动子进程时不使用 preexec_fn：由包装进程设置限制后 exec，进程号不变且在新会话中"""
+    popen_kwargs = []
+    original_popen = subprocess.Popen
+
+    def _popen(*args, **kwargs):
+        popen_kwargs.append(kwargs)
+        return original_popen(*args, **kwargs)
+
+    monkeypatch.setattr(subprocess, 'Popen', _popen)
+    core = sorted(os.sched_getaffinity(0))[-1]
+    script = tmp_path / 'limits.py'
+    script.write_text(
+        'import os, resource\n'
+        'print(os.getpid(), os.getsid(0), sorted(os.sched_getaffinity(0)), '
+        'resource.getrlimit(resource.RLIMIT_NOFILE)[0])\n'
+    )
+    disabled = ForkRunner({'enabled': False, 'profiles': {}, 'rlimits': {'nofile': 256}})
+    proc, info = disabled.popen([sys.executable, str(script)], 'plain', cwd=str(tmp_path),
+                                isolation=_Isolation(affinity=[core]))
+    stdout = proc.stdout.read().decode()
+    assert proc.wait(timeout=10) == 0
+    assert popen_kwargs[0].get('preexec_fn') is None and popen_kwargs[0]['start_new_session']
+    assert stdout == f'{proc.pid} {proc.pid} [{core}] 256\n'
+
+    # 限制无法设置时脚本不执行，错误写入 stderr
+    proc, _ = disabled.popen([sys.executable, str(script)], 'plain', cwd=str(tmp_path),
+                             isolation=_Isolation(cgroup=str(tmp_path / 'missing')))
+    assert proc.wait(timeout=10) == 126
+    assert proc.stdout.read() == b''
+    assert '设置进程限制失败' in proc.stderr.read().decode()
+
+
+def test_limited_command_only_wraps_when_needed():
+    cmd = [sys.executable, 'script.py']
+    assert limited_command(cmd) == cmd
+    assert limited_command(cmd, isolation=_Isolation()) == cmd
+    wrapped = limited_command(cmd, {'core': 0}, _Isolation(affinity=[1]))
+    assert wrapped[2] == '--exec' and wrapped[-2:] == cmd
+    assert json.loads(wrapped[3]) == {'affinity': [1], 'rlimits': {'core': 0}}
@@ -0,0 +1,76 @@
+import io
+import json
+
+from app.utils.har_import import HarImporter, iter_har_entries, template_path
+
+
+def _entry(method, url, started, time_ms=100, resource_type="xhr", mime="application/json", body=None):
+    request = {"method": method, "url": url,
+               "headers": [{"name": "Accept", "value": "application/json"},
+                           {"name": "Cookie", "value": "sid=1"}, {"name": ":authority", "value": "x"}]}
+    if body is not None:
+        request["postData"] = {"mimeType": "application/json", "text": json.dumps(body)}
+    return {"startedDateTime": f"2026-10-19T10:00:{started:06.3f}Z", "time": time_ms, "request": request,
+            "response": {"status": 200, "content": {"mimeType": mime, "text": "x" * 500}},
+            "_resourceType": resource_type}
+
+
+HAR = {
+    "log": {
+        "version": "1.2",
+        "pages": [{"title": "\"entries\": [] 测试页"}],
+        "entries": [
+            _entry("GET", "https://shop.local/app.js", 0.0, resource_type="script", mime="text/javascript"),
+            _entry("GET", "https://shop.local/api/orders/101", 0.0),
+            _entry("GET", "https://shop.local/api/orders/102?expand=1", 2.1),
+            _entry("GET", "https://shop.local/api/orders/103", 4.2),
+            _entry("POST", "https://shop.local/api/orders", 6.3, body={"sku": "A-1"}),
+            _entry("GET", "https://cdn.local/logo.png", 6.3, resource_type="image", mime="image/png"),
+            _entry("GET", "https://auth.local/api/users/3f2504e0-4f89-11d3-9a0c-0305e82c3301", 8.4),
+        ],
+    }
+}
+
+
+def test_template_path():
+    assert template_path("/api/orders/123/items") == "/api/orders/{id}/items"
+    assert template_path("/u/3f2504e0-4f89-11d3-9a0c-0305e82c3301") == "/u/{uuid}"
+    assert template_path("/files/9f86d081884c7d659a2feaa0c55ad015") == "/files/{hash}"
+    assert template_path("/api/v2/orders") == "/api/v2/orders"
+
+
+def test_streaming_import_groups_endpoints():
+    raw = json.dumps(HAR, ensure_ascii=False).encode("utf-8")
+    entries = list(iter_har_entries(io.BytesIO(raw), chunk_size=7))
+    assert len(entries) == 7
+
+    importer = HarImporter()
+    for entry in entries:
+        importer.add(entry)
+    result = importer.result()
+
+    assert result["base_host"] == "https://shop.local"
+    assert result["stats"]["skipped"]["static"] == 2
+    by_name = {t["name"]: t for t in result["tasks"]}
+    assert by_name["GET /api/orders/{id}"]["weight"] == 3
+    assert by_name["GET /api/orders/{id}"]["url"] == "/api/orders/101"
+    assert by_name["POST /api/orders"]["body"] == {"sku": "A-1"}
+    assert by_name["GET /api/orders/{id}"]["headers"] == {"Accept": "application/json"}
+    assert "GET https://auth.local/api/users/{uuid}" in by_name
+    assert result["wait_time"] == (2.0, 2.0)
+
+
+def test_create_scenario_from_har(client, auth_headers):
+    resp = client.post(
+        "/api/v1/perf-test/scenarios/from-har?filename=shop.har&hosts=shop.local&user_count=5",
+        data=json.dumps(HAR),
+        content_type="application/json",
+        headers=auth_headers,
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    assert data["target_url"] == "https://shop.local/api/orders/101"
+    assert data["generation"]["stats"]["skipped"]["host"] == 2
+    assert "name='GET /api/orders/{id}'" in data["script_content"]
+    assert "between(2.0, 2.0)" in data["script_content"]
+    compile(data["script_content"], "locustfile.py", "exec")
@@ -0,0 +1,98 @@
+import os
+import socket
+import time
+
+import pytest
+
+from app.utils import host_monitor
+from app.utils.host_monitor import HostMonitor
+
+SAMPLE_KEYS = {"timestamp", "process_count", "process_cpu", "max_process_cpu", "process_rss_mb", "sockets",
+               "host_cpu", "host_memory", "net_sent_kbps", "net_recv_kbps", "saturated_streak"}
+
+
+class _ScriptedSampler:
+    """按给定序列返回压测进程 CPU"""
+
+    def __init__(self, cpus):
+        self.cpus = list(cpus)
+
+    def sample(self, now):
+        cpu = self.cpus.pop(0)
+        host = {"cpu": cpu / 4, "memory": 40.0, "net_sent_kbps": 1.0, "net_recv_kbps": 2.0}
+        return [{"pid": 1, "cpu": cpu, "rss_mb": 50.0, "sockets": 3}], host
+
+
+def _monitor(cpus, **kwargs):
+    monitor = HostMonitor(1, cpu_warn_pct=90, cpu_warn_samples=3, **kwargs)
+    monitor._sampler = _ScriptedSampler(cpus)
+    for i in range(len(cpus)):
+        monitor._record(1000.0 + i)
+    return monitor
+
+
+def _burn(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+@pytest.mark.parametrize("sampler_class", [
+    pytest.param(host_monitor._ProcSampler, id="proc",
+                 marks=pytest.mark.skipif(not os.path.exists("/proc/stat"), reason="需要 /proc")),
+    pytest.param(getattr(host_monitor, "_PsutilSampler", None), id="psutil",
+                 marks=pytest.mark.skipif(host_monitor.psutil is None, reason="需要 psutil")),
+])
+def test_samples_process_cpu_memory_and_sockets(sampler_class):
+    monitor = HostMonitor(os.getpid())
+    monitor._sampler = sampler_class(os.getpid())
+    monitor._sampler.sample(time.time())
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        _burn(0.3)
+        monitor._record(time.time())
+
+    sample = monitor.latest()
+    assert set(sample) == SAMPLE_KEYS
+    assert sample["process_count"] >= 1
+    assert sample["max_process_cpu"] > 20
+    assert sample["process_rss_mb"] > 0
+    assert sample["sockets"] >= 1
+    assert 0 <= sample["host_memory"] <= 100
+
+
+def test_consecutive_saturation_is_required():
+    # 4 个饱和采样点，但从未连续 3 个：不告警
+    monitor = _monitor([95, 95, 50, 95, 95, 50])
+    summary = monitor.summary()
+    assert (summary["saturated_samples"], summary["longest_saturated_streak"]) == (4, 2)
+    assert summary["trustworthy"] and summary["warnings"] == []
+    assert "warning" not in monitor.latest()
+
+    monitor = _monitor([50, 92, 99, 95, 96, 40, 91])
+    summary = monitor.summary()
+    assert (summary["saturated_samples"], summary["longest_saturated_streak"]) == (5, 4)
+    assert summary["overloaded_since"] == 1001.0
+    assert summary["trustworthy"] is False
+    assert summary["warnings"][0].startswith("压测进程 CPU 连续 4 个采样点达到 90% 以上（峰值 99%）")
+    assert [s["saturated_streak"] for s in summary["samples"]] == [0, 1, 2, 3, 4, 0, 1]
+
+
+def test_overload_warning_is_available_while_running():
+    monitor = HostMonitor(1, cpu_warn_pct=90, cpu_warn_samples=3)
+    monitor._sampler = _ScriptedSampler([95, 95, 95, 20])
+    monitor._record(1000.0)
+    monitor._record(1001.0)
+    assert "warning" not in monitor.latest()
+    monitor._record(1002.0)
+    assert "连续 3 个采样点" in monitor.latest()["warning"]
+    # 告警保持到压测结束，即使 CPU 回落
+    monitor._record(1003.0)
+    assert monitor.latest()["saturated_streak"] == 0 and monitor.latest()["warning"]
+
+
+def test_streak_survives_sample_thinning():
+    monitor = _monitor([95] * 6, max_samples=4)
+    summary = monitor.summary()
+    assert len(summary["samples"]) < 6
+    assert (summary["saturated_samples"], summary["longest_saturated_streak"]) == (6, 6)
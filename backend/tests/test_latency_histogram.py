@@ -0,0 +1,64 @@
+import random
+
+from app.tasks import RealtimeStatsCollector
+from app.utils.latency_histogram import LatencyHistogram, WindowedHistogram, merge_serialized
+
+
+def test_percentiles_within_relative_error():
+    rng = random.Random(42)
+    values = [rng.expovariate(1 / 80.0) for _ in range(20000)]
+    hist = LatencyHistogram()
+    for v in values:
+        hist.record(v)
+
+    values.sort()
+    for pct in (50, 90, 95, 99, 99.9):
+        exact = values[int(len(values) * pct / 100) - 1]
+        assert abs(hist.percentile(pct) - exact) <= exact * 0.02 + 0.01
+
+    assert hist.count == len(values)
+    assert abs(hist.mean - sum(values) / len(values)) < 0.01
+    assert len(hist.counts) == len(LatencyHistogram().counts)
+
+
+def test_merge_serialized_is_exact():
+    a, b, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i in range(1, 500):
+        a.record(i * 0.7)
+        combined.record(i * 0.7)
+    for i in range(1, 300):
+        b.record(i * 3.1)
+        combined.record(i * 3.1)
+
+    merged = merge_serialized([a.to_dict(), b.to_dict(), None])
+    assert merged.counts == combined.counts
+    assert merged.summary() == combined.summary()
+
+
+def test_windowed_view_drops_old_slots():
+    now = [1000.0]
+    window = WindowedHistogram(window_seconds=5, clock=lambda: now[0])
+    window.record(10, success=False)
+    now[0] += 3
+    window.record(20)
+    hist, failures = window.snapshot()
+    assert (hist.count, failures) == (2, 1)
+
+    now[0] += 4
+    hist, failures = window.snapshot()
+    assert (hist.count, failures) == (1, 0)
+
+
+def test_realtime_collector_stats():
+    collector = RealtimeStatsCollector()
+    for i in range(100):
+        collector.record_request(i + 1, success=i % 10 != 0)
+
+    other = RealtimeStatsCollector()
+    other.merge_serialized(collector.to_serialized())
+    stats = other.get_stats()
+    assert stats['request_count'] == 100
+    assert stats['failure_count'] == 10
+    assert stats['error_rate'] == 10
+    assert 49 <= stats['percentiles']['p50'] <= 51
+    assert collector.get_stats()['window']['request_count'] == 100
@@ -0,0 +1,47 @@
+from app.utils.load_shapes import (
+    active_stage, build_stages, resolve_load_shape, summarize_stages, validate_load_shape
+)
+
+LIMITS = {'min_users': 1, 'max_users': 200, 'min_duration': 10, 'max_duration': 3600}
+
+
+def test_step_fields_map_to_stages():
+    shape = resolve_load_shape({'step_load_enabled': True, 'step_users': 10, 'step_duration': 30})
+    stages = build_stages(shape, user_count=25, spawn_rate=5, run_time=120)
+    assert [(s['start'], s['end'], s['users']) for s in stages] == [
+        (0, 30, 10), (30, 60, 20), (60, 120, 25)
+    ]
+    assert active_stage(stages, 45)['name'] == 'step-2'
+    assert active_stage(stages, 120) is None
+
+
+def test_custom_stages_truncated_to_run_time():
+    shape = {'type': 'custom', 'stages': [{'duration': 20, 'users': 5}, {'duration': 60, 'users': 50}]}
+    assert validate_load_shape(shape, LIMITS) is None
+    stages = build_stages(shape, user_count=10, spawn_rate=2, run_time=50)
+    assert [(s['end'], s['users']) for s in stages] == [(20, 5), (50, 50)]
+    assert validate_load_shape({'type': 'custom', 'stages': [{'duration': 5, 'users': 500}]}, LIMITS)
+
+
+def test_summarize_stages_uses_aggregated_history():
+    stages = build_stages({'type': 'ramp', 'ramp_up': 10}, user_count=10, spawn_rate=1, run_time=20)
+    history = [
+        {'Timestamp': '1002', 'Name': 'Aggregated', 'User Count': '4', 'Requests/s': '10',
+         '95%': '50', 'Total Request Count': '10', 'Total Failure Count': '0',
+         'Total Average Response Time': '20'},
+        {'Timestamp': '1002', 'Name': '/items', 'User Count': '4', 'Requests/s': '10', '95%': '999'},
+        {'Timestamp': '1015', 'Name': 'Aggregated', 'User Count': '10', 'Requests/s': '20',
+         '95%': '80', 'Total Request Count': '100', 'Total Failure Count': '0',
+         'Total Average Response Time': '38'},
+        {'Timestamp': '1019', 'Name': 'Aggregated', 'User Count': '10', 'Requests/s': '30',
+         '95%': '120', 'Total Request Count': '210', 'Total Failure Count': '20',
+         'Total Average Response Time': '40'},
+    ]
+    ramp, hold = summarize_stages(stages, history, start_ts=1000)
+    assert ramp['samples'] == 1 and ramp['max_p95_response_time'] == 50
+    assert ramp['avg_response_time'] == 20
+    assert hold['max_p95_response_time'] == 120
+    assert hold['avg_throughput'] == 25
+    # 阶段内 200 个请求（210 - 10），平均响应时间 (210*40 - 10*20) / 200，不是累计平均值 40
+    assert hold['error_rate'] == 10
+    assert hold['avg_response_time'] == 41
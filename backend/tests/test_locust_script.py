@@ -0,0 +1,32 @@
+from app.utils.locust_script import (
+    build_request_task, check_script_compat, render_locust_script, validate_user_class
+)
+
+
+def test_fasthttp_script_inlines_params_and_form_body():
+    task = build_request_task('search', 'POST', '/search', params={'q': 'a b'},
+                              body={'k': 'v'}, body_type='form', timeout=5)
+    script = render_locust_script([task], user_class='fasthttp',
+                                  user_options={'concurrency': 4, 'keep_alive': False})
+    compile(script, 'locustfile.py', 'exec')
+    assert 'class TestUser(FastHttpUser)' in script
+    assert 'concurrency = 4' in script and "'Connection': 'close'" in script
+    assert "'/search?q=a+b'" in script and "data=b'k=v'" in script
+    assert 'params=' not in script and 'timeout=' not in script
+    assert check_script_compat(script, 'fasthttp') == []
+
+
+def test_custom_script_compat_warnings():
+    script = '''from locust.contrib.fasthttp import FastHttpUser
+import requests
+
+class U(FastHttpUser):
+    def t(self):
+        self.client.get("/", timeout=3, verify=False)
+'''
+    warnings = check_script_compat(script, 'fasthttp')
+    assert len(warnings) == 3
+    assert any('timeout=' in w for w in warnings)
+    assert check_script_compat('class U(HttpUser): pass', 'fasthttp')
+    assert validate_user_class({'user_class': 'fasthttp', 'fasthttp': {'concurrency': 0}})
+    assert validate_user_class({'user_class': 'fasthttp', 'fasthttp': {'keep_alive': True}}) is None
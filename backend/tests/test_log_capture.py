@@ -0,0 +1,47 @@
+import subprocess
+import sys
+
+from app.utils.log_capture import BoundedLog, OutputCapture, read_log_chunk, read_stream
+
+
+def test_bounded_log_keeps_head_and_tail(tmp_path):
+    log = BoundedLog(head_bytes=10, tail_bytes=20, spill_path=str(tmp_path / "out.log"), spill_max_bytes=150)
+    for i in range(100):
+        log.write(f"{i:03d}\n".encode())
+    log.close()
+
+    excerpt = log.excerpt()
+    assert excerpt.startswith("000\n001\n00")
+    assert excerpt.endswith("095\n096\n097\n098\n099\n")
+    assert "已省略 370 字节" in excerpt
+    assert log.to_dict() == {"bytes": 400, "lines": 100, "truncated": True, "log_bytes": 150}
+    assert (tmp_path / "out.log").read_bytes() == b"".join(f"{i:03d}\n".encode() for i in range(100))[:150]
+
+
+def test_chatty_process_does_not_block(tmp_path):
+    # 远超管道缓冲（64KB）的输出：读取线程持续消费，子进程不会阻塞
+    code = "import sys\nfor i in range(200000): print('line', i)\nprint('err', file=sys.stderr)"
+    proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    capture = OutputCapture(proc, str(tmp_path / "logs"), {"head_bytes": 64, "tail_bytes": 64})
+    proc.wait(timeout=30)
+    capture.join()
+
+    assert capture.excerpt("stdout").endswith("line 199999\n")
+    assert capture.excerpt("stderr") == "err\n"
+    assert capture.to_dict()["stdout"]["lines"] == 200000
+
+    first = read_stream(str(tmp_path / "logs"), "stdout", offset=0, limit=100)
+    assert first["data"].startswith("line 0\n") and first["next_offset"] == 100
+    tail = read_stream(str(tmp_path / "logs"), "stdout", limit=12)
+    assert tail["data"] == "line 199999\n" and tail["next_offset"] == tail["size"]
+
+
+def test_read_log_chunk_respects_utf8_boundaries(tmp_path):
+    path = tmp_path / "out.log"
+    path.write_bytes("压测完成".encode())
+
+    chunk = read_log_chunk(str(path), offset=0, limit=4)
+    assert chunk["data"] == "压" and chunk["next_offset"] == 3
+    rest = read_log_chunk(str(path), offset=chunk["next_offset"], limit=100)
+    assert rest["data"] == "测完成"
+    assert read_log_chunk(str(path), limit=5)["data"] == "成"
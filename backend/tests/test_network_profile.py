@@ -0,0 +1,95 @@
+import os
+
+from app.utils.network_profile import (
+    NetworkRules, cache_folder, prune_cache, resolve_network_config, validate_network_config, TRACKER_URLS
+)
+
+
+def test_validate_network_config():
+    assert validate_network_config(None) is None
+    assert validate_network_config({'profile': 'fast', 'block_urls': ['*.png']}) is None
+    assert 'profile' in validate_network_config({'profile': 'turbo'})
+    assert 'unknown keys' in validate_network_config({'block': ['image']})
+    assert 'list of strings' in validate_network_config({'block_urls': '*.png'})
+    # 拦截 document 会导致页面本身无法加载
+    assert 'document' in validate_network_config({'block_resource_types': ['image', 'document']})
+
+
+def test_profile_and_rules_are_merged():
+    network = resolve_network_config({'profile': 'no_media', 'block_urls': ['*/ads/*']})
+    assert network['block_resource_types'] == ['image', 'media', 'font']
+    assert network['block_urls'] == ['*/ads/*']
+    assert resolve_network_config({'allow_urls': ['*']}) is None
+    assert resolve_network_config({'profile': 'fast'})['block_urls'] == TRACKER_URLS
+
+
+def test_decide_counts_requests():
+    rules = NetworkRules(resolve_network_config({
+        'profile': 'fast',
+        'allow_urls': ['https://example.com/logo.png'],
+        'cache_urls': ['https://cdn.example.com/*'],
+    }), cache_dir='/nonexistent')
+
+    assert rules.decide('https://example.com/', 'document') is None
+    assert rules.decide('https://example.com/a.jpg', 'image') == 'block'
+    assert rules.decide('https://example.com/logo.png', 'image') is None
+    assert rules.decide('https://www.google-analytics.com/collect?v=1', 'xhr') == 'block'
+    assert rules.decide('https://cdn.example.com/app.js', 'script') == 'cache'
+    assert rules.decide('https://cdn.example.com/app.js', 'script', 'POST') is None
+
+    stats = rules.to_dict()
+    assert stats['requests'] == 6
+    assert stats['blocked'] == 2
+    assert stats['blocked_by_type'] == {'image': 1, 'xhr': 1}
+    assert stats['passed'] == 3
+    assert stats['profile'] == 'fast'
+
+
+def test_cache_round_trip(tmp_path):
+    rules = NetworkRules(resolve_network_config({'cache_resource_types': ['script']}),
+                         cache_dir=str(tmp_path), max_entry_bytes=1024)
+    url = 'https://cdn.example.com/app.js'
+    assert rules.cache_get(url) is None
+    assert rules.cache_put(url, 200, {'content-type': 'text/javascript', 'content-encoding': 'gzip'}, b'var a;')
+    assert not rules.cache_put(url + '?big', 200, {}, b'x' * 2048)
+    assert not rules.cache_put(url + '?nostore', 200, {'Cache-Control': 'no-store'}, b'x')
+    assert not rules.cache_put(url + '?missing', 404, {}, b'')
+
+    cached = NetworkRules(resolve_network_config({'cache_resource_types': ['script']}),
+                          cache_dir=str(tmp_path)).cache_get(url)
+    assert cached == {'status': 200, 'headers': {'content-type': 'text/javascript'}, 'body': b'var a;'}
+    stats = rules.to_dict()
+    assert (stats['cache_misses'], stats['cache_stored']) == (1, 1)
+
+
+def test_cache_is_isolated_per_user_and_script_and_skips_private_responses(tmp_path):
+    network = resolve_network_config({'cache_urls': ['https://cdn.example.com/*']})
+    url = 'https://cdn.example.com/profile.json'
+    alice = NetworkRules(network, cache_dir=cache_folder(str(tmp_path), 1, 10))
+    bob = NetworkRules(network, cache_dir=cache_folder(str(tmp_path), 2, 20))
+    assert alice.cache_put(url, 200, {'content-type': 'application/json'}, b'{"name": "alice"}')
+    assert bob.cache_get(url) is None
+    assert NetworkRules(network, cache_dir=cache_folder(str(tmp_path), 1, 11)).cache_get(url) is None
+    assert alice.cache_get(url)['body'] == b'{"name": "alice"}'
+
+    # 携带身份信息的请求不读写缓存；用户相关的响应不保存
+    assert alice.bypass_cache({'Cookie': 'session=1'}) and alice.bypass_cache({'authorization': 'Bearer x'})
+    assert not alice.bypass_cache({'accept': '*/*'})
+    assert alice.to_dict()['cache_bypassed'] == 2
+    assert not alice.cache_put(url + '?p', 200, {'Cache-Control': 'private, max-age=60'}, b'x')
+    assert not alice.cache_put(url + '?c', 200, {'Set-Cookie': 'session=2'}, b'x')
+    assert alice.cache_put(url + '?pub', 200, {'Cache-Control': 'public, max-age=60'}, b'x')
+
+
+def test_prune_cache_walks_namespaced_directories(tmp_path):
+    network = resolve_network_config({'cache_urls': ['*']})
+    rules = NetworkRules(network, cache_dir=cache_folder(str(tmp_path), 1, 10))
+    rules.cache_put('https://cdn.example.com/old.js', 200, {}, b'old')
+    NetworkRules(network, cache_dir=cache_folder(str(tmp_path), 2, 20)).cache_put(
+        'https://cdn.example.com/new.js', 200, {}, b'new')
+    old = rules._cache_path('https://cdn.example.com/old.js') + '.json'
+    os.utime(old, (0, 0))
+
+    assert prune_cache({'folder': str(tmp_path), 'retention_days': 7}) == 1
+    assert not os.path.exists(os.path.join(str(tmp_path), 'user_1'))
+    assert os.listdir(cache_folder(str(tmp_path), 2, 20))
@@ -0,0 +1,91 @@
+from app.utils.open_workload import ArrivalSchedule, OpenWorkloadStats, arrival_rate_at, summarize
+
+
+def test_arrival_schedule_follows_stages():
+    stages = [{'duration': 2, 'rps': 10}, {'duration': 2, 'rps': 100}]
+    assert arrival_rate_at(1, stages=stages) == 10
+    assert arrival_rate_at(3, stages=stages) == 100
+    assert arrival_rate_at(10, stages=stages) == 100
+
+    schedule = ArrivalSchedule(0.0, stages=stages, share=0.5)
+    times = [schedule.claim() for _ in range(14)]
+    assert abs((times[1] - times[0]) - 0.2) < 1e-9
+    # 前 2 秒每进程 5 rps，之后 50 rps
+    assert abs((times[13] - times[12]) - 0.02) < 1e-9
+
+
+def test_corrected_latency_includes_schedule_lag():
+    stats = OpenWorkloadStats(0.0, target_rps=10)
+    for i in range(40):
+        intended = i * 0.1
+        # 第 2 秒生成器卡顿：实际发送滞后 200ms
+        actual = intended + (0.2 if 2 <= intended < 3 else 0)
+        stats.record_scheduled(intended)
+        stats.record_started(intended, actual)
+        stats.record_response(5.0, (actual - intended) * 1000)
+
+    result = summarize([stats.to_dict()], duration=4)
+    assert result['raw']['max'] == 5.0
+    assert result['corrected']['max'] > 200
+    assert result['keep_up'] is False
+    assert result['behind_intervals'][0][0] == 2
+    assert result['achieved_rps'] == 10
+
+
+def test_locust_users_pace_their_first_task(tmp_path):
+    """20 个用户同时启动、目标 10 rps：第一个任务也按计划时间发送，不会在启动时集中发出"""
+    import json
+    import subprocess
+    import sys
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from app import tasks
+
+    arrivals = []
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            arrivals.append(time.time())
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        config_file = tmp_path / "easytest_runtime.json"
+        config_file.write_text(json.dumps({"csv_prefix": str(tmp_path / "rt"), "target_rps": 10}))
+        tasks._stage_support_modules(str(tmp_path), ["latency_histogram", "open_workload", "data_feeder",
+                                                     "raw_samples", "locust_runtime"])
+        locustfile = tmp_path / "locustfile.py"
+        locustfile.write_text(
+            "from locust import HttpUser, task\n\n\n"
+            "class Visitor(HttpUser):\n"
+            "    @task\n"
+            "    def index(self):\n"
+            "        self.client.get('/')\n"
+            + tasks._render_runtime_footer(str(config_file))
+        )
+        subprocess.run(
+            [sys.executable, "-m", "locust", "-f", str(locustfile), "--host", f"http://127.0.0.1:{httpd.server_port}",
+             "--users", "20", "--spawn-rate", "100", "--run-time", "3s", "--headless", "--only-summary",
+             "--loglevel", "ERROR"],
+            cwd=tmp_path, capture_output=True, timeout=60,
+        )
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    assert len(arrivals) >= 20
+    first = arrivals[0]
+    assert sum(1 for t in arrivals if t - first < 0.5) <= 7
+    assert sum(1 for t in arrivals if t - first < 2.0) <= 22
@@ -0,0 +1,55 @@
+from app.extensions import db
+from app.models.api_test_case import ApiTestCase, ApiTestCollection
+from app.models.environment import Environment
+from app.models.project import Project
+from app.models.user import User
+
+
+def _setup_collection(app, username):
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        project = Project(name="perf-mix", owner_id=user.id)
+        db.session.add(project)
+        db.session.flush()
+        env = Environment(project_id=project.id, name="test", base_url="http://api.local",
+                          variables={"host": "http://api.local", "token": "abc"},
+                          headers={"X-Env": "test"})
+        collection = ApiTestCollection(name="orders", user_id=user.id, project_id=project.id)
+        db.session.add_all([env, collection])
+        db.session.flush()
+        db.session.add_all([
+            ApiTestCase(collection_id=collection.id, user_id=user.id, environment_id=env.id, name="list orders",
+                        method="GET", url="{{host}}/orders", params={"page": "1"},
+                        headers={"Authorization": "Bearer {{token}}"}, priority=1),
+            ApiTestCase(collection_id=collection.id, user_id=user.id, environment_id=env.id, name="create order",
+                        method="POST", url="{{host}}/orders", body={"sku": "it's \"quoted\""},
+                        body_type="json", priority=3, post_script="assert True"),
+            ApiTestCase(collection_id=collection.id, user_id=user.id, name="disabled", method="GET",
+                        url="http://api.local/x", is_enabled=False),
+        ])
+        db.session.commit()
+        return collection.id
+
+
+def test_create_scenario_from_collection(app, client, auth_headers):
+    username = client.get("/api/v1/auth/me", headers=auth_headers).get_json()["data"]["username"]
+    collection_id = _setup_collection(app, username)
+
+    resp = client.post(
+        "/api/v1/perf-test/scenarios/from-collection",
+        json={"collection_id": collection_id, "user_count": 5, "duration": 30},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    assert data["target_url"] == "http://api.local/orders"
+    assert [(t["name"], t["weight"]) for t in data["generation"]["tasks"]] == [
+        ("list orders", 3), ("create order", 1)
+    ]
+    assert any("create order" in w for w in data["generation"]["warnings"])
+
+    script = data["script_content"]
+    compile(script, "locustfile.py", "exec")
+    assert "@task(3)" in script and "@task(1)" in script
+    assert "'Bearer abc'" in script and "'X-Env': 'test'" in script
+    assert "name='list orders'" in script and "'/orders'" in script
@@ -0,0 +1,36 @@
+from app.tasks import _parse_locust_results
+
+STATS = '''Type,Name,Request Count,Failure Count,Median Response Time,Average Response Time,Min Response Time,Max Response Time,Average Content Size,Requests/s,Failures/s,50%,66%,75%,80%,90%,95%,98%,99%,99.9%,99.99%,100%
+GET,"/search?q=a,b",10,2,4,5.5,2.1,36.6,466.0,3.2,0.6,4,4,4,4,6,6,37,37,37,37,37
+POST,/orders,5,0,8,9.0,7.0,12.0,10.0,1.5,0.0,8,9,9,10,11,12,12,12,12,12,12
+,Aggregated,15,2,5,6.6,2.1,36.6,300.0,4.7,0.6,5,6,8,8,10,12,37,37,37,37,37
+'''
+
+FAILURES = '''Method,Name,Error,Occurrences
+GET,"/search?q=a,b","HTTPError('500 Server Error: boom, again')",2
+POST,/orders,"HTTPError('500 Server Error: boom, again')",1
+GET,/health,ConnectionResetError,1
+'''
+
+
+def test_parse_locust_results_with_quoted_fields(tmp_path):
+    prefix = str(tmp_path / 'rt')
+    (tmp_path / 'rt_stats.csv').write_text(STATS, encoding='utf-8')
+    (tmp_path / 'rt_failures.csv').write_text(FAILURES, encoding='utf-8')
+
+    results = _parse_locust_results(prefix)
+    assert 'parse_error' not in results
+    assert results['aggregated']['Request Count'] == '15'
+
+    search, orders = results['endpoint_stats']
+    assert search['name'] == '/search?q=a,b'
+    assert search['request_count'] == 10 and search['failure_count'] == 2
+    assert search['percentiles']['100%'] == 37.0
+    assert orders['p95_response_time'] == 12.0
+
+    first, second = results['failures']
+    assert first['error'] == "HTTPError('500 Server Error: boom, again')"
+    assert first['occurrences'] == 3
+    assert [e['name'] for e in first['endpoints']] == ['/search?q=a,b', '/orders']
+    assert second['occurrences'] == 1
+    assert results['exceptions'] == []
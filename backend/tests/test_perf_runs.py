@@ -0,0 +1,150 @@
+import subprocess
+import sys
+
+from app.extensions import db
+from app.models.perf_test_run import PerfTestRun
+
+
+def _create_scenario(client, auth_headers):
+    resp = client.post(
+        "/api/v1/perf-test/scenarios",
+        json={"name": "history", "target_url": "http://localhost:8080/api/items"},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 200
+    return resp.get_json()["data"]
+
+
+def _add_run(app, scenario, p95, throughput, error_rate, endpoint_p95):
+    with app.app_context():
+        run = PerfTestRun(
+            scenario_id=scenario["id"],
+            user_id=scenario["user_id"],
+            status="completed",
+            request_count=1000,
+            failure_count=int(error_rate * 10),
+            error_rate=error_rate,
+            p95_response_time=p95,
+            throughput=throughput,
+            endpoint_stats=[{
+                "method": "GET",
+                "name": "/api/items",
+                "p95_response_time": endpoint_p95,
+                "throughput": throughput,
+                "error_rate": error_rate,
+            }],
+        )
+        db.session.add(run)
+        db.session.commit()
+        return run.id
+
+
+def test_compare_against_pinned_baseline(app, client, auth_headers):
+    scenario = _create_scenario(client, auth_headers)
+    baseline_id = _add_run(app, scenario, p95=100, throughput=200, error_rate=0.0, endpoint_p95=100)
+    current_id = _add_run(app, scenario, p95=130, throughput=195, error_rate=0.5, endpoint_p95=130)
+
+    resp = client.get(f"/api/v1/perf-test/runs/{current_id}/compare", headers=auth_headers)
+    assert resp.status_code == 400
+
+    resp = client.post(f"/api/v1/perf-test/runs/{baseline_id}/baseline", headers=auth_headers)
+    assert resp.status_code == 200
+
+    resp = client.get(f"/api/v1/perf-test/runs/{current_id}/compare", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    assert data["baseline_run_id"] == baseline_id
+    assert data["regressed"] is True
+    assert data["overall"]["regressions"] == ["p95_response_time"]
+    assert data["endpoints"][0]["status"] == "regressed"
+
+    resp = client.get(
+        f"/api/v1/perf-test/runs/{current_id}/compare?p95_pct=50",
+        headers=auth_headers,
+    )
+    assert resp.get_json()["data"]["regressed"] is False
+
+    resp = client.get(f"/api/v1/perf-test/scenarios/{scenario['id']}/runs", headers=auth_headers)
+    assert resp.get_json()["data"]["pagination"]["total"] == 2
+
+
+def test_compare_rejects_baseline_from_another_scenario(app, client, auth_headers):
+    scenario = _create_scenario(client, auth_headers)
+    other = _create_scenario(client, auth_headers)
+    current_id = _add_run(app, scenario, p95=100, throughput=200, error_rate=0.0, endpoint_p95=100)
+    other_id = _add_run(app, other, p95=100, throughput=200, error_rate=0.0, endpoint_p95=100)
+
+    resp = client.get(f"/api/v1/perf-test/runs/{current_id}/compare?baseline_run_id={other_id}",
+                      headers=auth_headers)
+    assert resp.status_code == 400
+
+
+def test_stop_keeps_status_and_finishing_twice_writes_one_report(app, client, auth_headers, monkeypatch):
+    from app import tasks
+    from app.api import perf_test
+    from app.models.perf_test_scenario import PerfTestScenario
+    from app.models.test_report import TestReport
+    from app.models.test_run import TestRun
+
+    revoked = []
+    monkeypatch.setattr(perf_test.celery.control, "revoke", lambda task_id, **kwargs: revoked.append(kwargs))
+    project = client.post("/api/v1/projects", json={"name": "perf-stop"}, headers=auth_headers).get_json()["data"]
+    scenario = _create_scenario(client, auth_headers)
+    with app.app_context():
+        test_run = TestRun(project_id=project["id"], test_type="performance", status="running", total_cases=1)
+        db.session.add(test_run)
+        db.session.flush()
+        run = PerfTestRun(scenario_id=scenario["id"], user_id=scenario["user_id"], test_run_id=test_run.id,
+                          status="running")
+        db.session.add(run)
+        db.session.get(PerfTestScenario, scenario["id"]).status = "running"
+        db.session.commit()
+        run_id, test_run_id = run.id, test_run.id
+
+    resp = client.post(f"/api/v1/perf-test/scenarios/{scenario['id']}/stop", headers=auth_headers)
+    assert resp.status_code == 200 and revoked == [{}]
+
+    with app.app_context():
+        run = db.session.get(PerfTestRun, run_id)
+        assert run.status == "stopped" and TestReport.query.filter_by(test_run_id=test_run_id).count() == 0
+        # 任务退出时写入最终结果：保留 stopped 状态，重复调用只更新同一份报告
+        tasks._finish_perf_run(run, status="completed", summary={"request_count": 42})
+        tasks._finish_perf_run(run, status="completed", summary={"request_count": 50})
+        db.session.commit()
+        assert (run.status, run.error_message, run.request_count) == ("stopped", "用户手动停止", 50)
+        reports = TestReport.query.filter_by(test_run_id=test_run_id).all()
+        assert len(reports) == 1 and reports[0].summary["metrics"]["request_count"] == 50
+        assert db.session.get(TestRun, test_run_id).status == "failed"
+
+
+def test_failure_after_start_stops_the_load_generator(app, client, auth_headers, monkeypatch):
+    from app import tasks
+    from app.models.perf_test_scenario import PerfTestScenario
+
+    class _Runner:
+        proc = None
+
+        def popen(self, cmd, profile, **kwargs):
+            self.proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"],
+                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            return self.proc, {"mode": "subprocess"}
+
+    def _broken_monitor(*args, **kwargs):
+        raise RuntimeError("psutil unavailable")
+
+    runner = _Runner()
+    monkeypatch.setattr(tasks, "get_fork_runner", lambda settings: runner)
+    monkeypatch.setattr(tasks, "HostMonitor", _broken_monitor)
+    monkeypatch.setattr(tasks, "_get_flask_app", lambda: app)
+    scenario = _create_scenario(client, auth_headers)
+    with app.app_context():
+        db.session.get(PerfTestScenario, scenario["id"]).script_content = "from locust import HttpUser"
+        db.session.commit()
+
+    result = tasks.run_perf_test_task.run(scenario["id"], 1, 1, 5)
+    assert result == {"success": False, "error": "psutil unavailable"}
+    # 启动压测进程后出错：压测进程已结束，不在后台继续运行
+    assert runner.proc.poll() is not None
+    with app.app_context():
+        run = PerfTestRun.query.filter_by(scenario_id=scenario["id"]).one()
+        assert (run.status, run.error_message) == ("failed", "psutil unavailable")
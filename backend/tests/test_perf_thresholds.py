@@ -0,0 +1,25 @@
+from app.utils.perf_thresholds import ThresholdMonitor, validate_thresholds
+
+
+def test_breach_must_be_sustained_after_grace_period():
+    monitor = ThresholdMonitor({'max_error_rate': 10, 'min_rps': 5, 'window': 6, 'grace_period': 10})
+    bad = {'error_rate': 80, 'throughput': 100}
+    ok = {'error_rate': 0, 'throughput': 100}
+
+    assert monitor.check(bad, 4) is None          # 预热期内不检查
+    assert monitor.check(bad, 10) is None
+    assert monitor.check(ok, 12) is None          # 恢复后重新计时
+    assert monitor.check(bad, 14) is None
+    violation = monitor.check(bad, 20)
+    assert violation['rule'] == 'max_error_rate'
+    assert violation['breached_at'] == 14
+
+    assert ThresholdMonitor({'min_rps': 50, 'window': 0, 'grace_period': 0}).check(
+        {'throughput': 10}, 1)['rule'] == 'min_rps'
+
+
+def test_validate_thresholds():
+    assert validate_thresholds({'max_p95': 500, 'window': 10}, 3600) is None
+    assert validate_thresholds({'window': 10}, 3600)
+    assert validate_thresholds({'max_error_rate': 150}, 3600)
+    assert validate_thresholds({'max_p90': 100}, 3600)
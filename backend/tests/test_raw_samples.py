@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from app.utils.raw_samples import SampleWriter, analyze, describe_samples, load_samples
+
+np = pytest.importorskip("numpy")
+
+
+def _write(path, start, rows, block_rows=50):
+    writer = SampleWriter(str(path), start=start, block_rows=block_rows)
+    for t, method, name, latency, status, failed in rows:
+        writer.record(start + t, method, name, latency, status, 100, failed)
+    writer.close()
+    return str(path)
+
+
+def test_windowed_analysis_over_merged_files(tmp_path):
+    start = 1_700_000_000.0
+    # 前 10 秒为预热：延迟 500ms；之后稳定在 10ms，/b 每 10 个请求失败 1 个
+    first = _write(tmp_path / "0.bin", start, [
+        (i / 10, "GET", "/a", 500.0 if i < 100 else 10.0, 200, False) for i in range(300)
+    ])
+    second = _write(tmp_path / "1.bin", start + 0.05, [
+        (i / 10, "POST", "/b", 20.0, 500 if i % 10 == 0 else 201, i % 10 == 0) for i in range(300)
+    ])
+
+    info = describe_samples([first, second])
+    assert info["rows"] == 600
+    assert info["bytes_per_row"] < 17
+
+    columns, endpoints = load_samples([first, second])
+    assert sorted(endpoints) == [["GET", "/a"], ["POST", "/b"]]
+
+    full = analyze(columns, endpoints)
+    assert full["total"]["request_count"] == 600
+    assert full["total"]["max_response_time"] == 500.0
+
+    steady = analyze(columns, endpoints, start=10, endpoint_names=["/a"], percentiles=[99], interval=5)
+    assert steady["total"]["request_count"] == 200
+    assert steady["total"]["percentiles"]["p99"] == 10.0
+    assert steady["total"]["throughput"] == pytest.approx(10, rel=0.05)
+    assert len(steady["timeline"]["points"]) == 4
+
+    errors = analyze(columns, endpoints, status=[500])
+    assert errors["total"]["request_count"] == 30
+    assert errors["endpoints"][0]["name"] == "/b"
+    assert errors["total"]["error_rate"] == 100.0
+
+
+def test_truncated_block_is_ignored(tmp_path):
+    path = _write(tmp_path / "0.bin", 0.0, [(i, "GET", "/a", 1.0, 200, False) for i in range(120)])
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    assert describe_samples([path])["rows"] == 100
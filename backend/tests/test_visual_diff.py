@@ -0,0 +1,176 @@
+import numpy as np
+
+from app.extensions import db
+from app.models.web_test_script import WebTestScript
+from app.tasks import _apply_visual, _apply_web_outcome, _collect_web_artifacts, _run_visual_checks
+from app.utils import visual_baseline, visual_diff
+from app.utils.visual_diff import _decode_png, compare_images, encode_png, validate_visual_config
+
+SETTINGS = {"threshold": 0, "pixel_tolerance": 0.1, "anti_aliasing": True, "ignore_regions": []}
+
+
+def _page(width=120, height=80):
+    image = np.full((height, width, 4), 255, dtype=np.uint8)
+    image[10:30, 10:110, :3] = (30, 60, 200)  # 按钮
+    image[50:70, 20:60, :3] = 0  # 文本块
+    return image
+
+
+def test_png_roundtrip_and_filters():
+    rng = np.random.default_rng(7)
+    image = rng.integers(0, 256, (37, 53, 4), dtype=np.uint8)
+    assert np.array_equal(_decode_png(encode_png(image)), image)
+
+    # 各种过滤方式（None/Sub/Up/Average/Paeth）逐行编码
+    import struct
+    import zlib
+    rows = []
+    for y in range(image.shape[0]):
+        kind = y % 5
+        line = image[y].reshape(-1).astype(np.int32)
+        prior = image[y - 1].reshape(-1).astype(np.int32) if y else np.zeros_like(line)
+        left = np.concatenate([np.zeros(4, np.int32), line[:-4]])
+        up_left = np.concatenate([np.zeros(4, np.int32), prior[:-4]])
+        if kind == 1:
+            line = line - left
+        elif kind == 2:
+            line = line - prior
+        elif kind == 3:
+            line = line - (left + prior) // 2
+        elif kind == 4:
+            p = left + prior - up_left
+            pa, pb, pc = abs(p - left), abs(p - prior), abs(p - up_left)
+            line = line - np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, prior, up_left))
+        rows.append(bytes([kind]) + (line % 256).astype(np.uint8).tobytes())
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    png = (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', 53, 37, 8, 6, 0, 0, 0))
+           + chunk(b'IDAT', zlib.compress(b''.join(rows))) + chunk(b'IEND', b''))
+    assert np.array_equal(_decode_png(png), image)
+
+
+def test_wavefront_unfilter_matches_row_by_row_decoding():
+    rng = np.random.default_rng(11)
+    filtered = rng.integers(0, 256, (23, 41, 3), dtype=np.uint8)
+    filters = rng.integers(0, 5, 23)
+    expected = np.zeros((23, 41 * 3), dtype=np.int32)
+    for y in range(23):
+        line, prior = filtered[y].reshape(-1).astype(np.int32), expected[y - 1] if y else np.zeros(41 * 3, np.int32)
+        for i in range(41 * 3):
+            a, b = expected[y, i - 3] if i >= 3 else 0, prior[i]
+            c = prior[i - 3] if i >= 3 else 0
+            pa, pb, pc = abs(b - c), abs(a - c), abs(a + b - 2 * c)
+            paeth = a if pa <= pb and pa <= pc else b if pb <= pc else c
+            expected[y, i] = (line[i] + (0, a, b, (a + b) // 2, paeth)[filters[y]]) % 256
+    assert np.array_equal(visual_diff._unfilter_wavefront(filtered, filters), expected)
+
+
+def test_compare_identical_changed_and_ignored(monkeypatch):
+    expected = _page()
+    with monkeypatch.context() as patch:
+        # 像素完全相同：不计算色差
+        patch.setattr(visual_diff, "_yiq_delta", None)
+        result = compare_images(expected, expected.copy(), SETTINGS)
+    assert (result["phash_distance"], result["full_diff"], result["mismatched_pixels"]) == (0, False, 0)
+    assert result["identical"] and result["diff"] is None
+
+    actual = expected.copy()
+    actual[50:70, 70:100, :3] = 0  # 新增的文本块
+    result = compare_images(expected, actual, SETTINGS)
+    assert result["full_diff"] and result["mismatched_pixels"] == 600
+    assert result["mismatch_ratio"] == round(600 / (120 * 80), 6)
+    diff = _decode_png(result["diff"])
+    assert tuple(diff[60, 80]) == (255, 0, 0, 255)
+
+    region = {"x": 65, "y": 45, "width": 40, "height": 30}
+    result = compare_images(expected, actual, dict(SETTINGS, ignore_regions=[region]))
+    assert result["mismatched_pixels"] == 0 and result["ignored_pixels"] == 1200
+
+    resized = compare_images(expected, _page(width=100), SETTINGS)
+    assert resized["size_mismatch"] and resized["expected_size"] == [120, 80]
+
+
+def test_anti_aliased_edges_are_tolerated():
+    expected = _page()
+    actual = expected.copy()
+    actual[30, 10:110, :3] = (140, 155, 225)  # 按钮下边缘的渲染差异（介于按钮与背景之间）
+    result = compare_images(expected, actual, SETTINGS)
+    assert result["anti_aliased_pixels"] > 90 and result["mismatched_pixels"] < 10
+    strict = compare_images(expected, actual, dict(SETTINGS, anti_aliasing=False))
+    assert strict["mismatched_pixels"] == 100
+
+
+def test_validate_visual_config():
+    assert validate_visual_config(None) is None
+    assert validate_visual_config({"threshold": 0.01, "steps": {"login": {"pixel_tolerance": 0.2}}}) is None
+    assert validate_visual_config({"threshold": 2}) is not None
+    assert validate_visual_config({"ignore_regions": [{"x": 0, "y": 0}]}) is not None
+    assert validate_visual_config({"steps": {"../x": {}}}) is not None
+
+
+def test_new_baseline_regression_and_approval(app, client, auth_headers, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "WEB_ARTIFACTS", dict(app.config["WEB_ARTIFACTS"], folder=str(tmp_path / "store")))
+    resp = client.post(
+        "/api/v1/web-test/scripts",
+        json={"name": "visual", "script_content": "print(1)", "config": {"visual": {"threshold": 0.01}}},
+        headers=auth_headers,
+    )
+    script_id = resp.get_json()["data"]["id"]
+    assert client.put(f"/api/v1/web-test/scripts/{script_id}", json={"config": {"visual": {"threshold": -1}}},
+                      headers=auth_headers).status_code == 400
+
+    changed = _page()
+    changed[40:80, 0:120, :3] = (250, 200, 0)
+
+    def execute(image):
+        work_dir = tmp_path / f"work_{len(list(tmp_path.iterdir()))}"
+        (work_dir / "visual").mkdir(parents=True)
+        (work_dir / "visual" / "home.png").write_bytes(encode_png(image))
+        with app.app_context():
+            script = db.session.get(WebTestScript, script_id)
+            spec = {"id": script.id, "user_id": script.user_id, "visual": script.config["visual"]}
+            settings = {"artifacts": app.config["WEB_ARTIFACTS"], "visual": app.config["WEB_VISUAL"]}
+            outcome = {"status": "success", "success": True, "duration": 1.0}
+            _apply_visual(outcome, _run_visual_checks(str(work_dir), spec, settings, outcome))
+            run_key, artifacts, _ = _collect_web_artifacts(str(work_dir), spec, settings["artifacts"])
+            outcome.update(artifact_run=run_key, artifacts=artifacts)
+            _apply_web_outcome(script, outcome)
+            db.session.commit()
+        return outcome
+
+    first = execute(_page())
+    assert first["status"] == "success" and first["visual"]["new"] == 1
+    with monkeypatch.context() as patch:
+        # 与基线文件内容相同：不解码直接通过
+        patch.setattr(visual_baseline, "decode_image", None)
+        same = execute(_page())["visual"]
+    assert same["passed"] == 1 and same["steps"][0]["identical"]
+    assert (same["steps"][0]["width"], same["steps"][0]["compared_pixels"]) == (120, 120 * 80)
+
+    failed = execute(changed)
+    step = failed["visual"]["steps"][0]
+    assert failed["status"] == "failed" and failed["error"].startswith("视觉回归: home 差异")
+    assert step["diff"] == "visual-diff/home.png"
+    assert "visual-diff/home.png" in [a["name"] for a in failed["artifacts"]]
+
+    runs = client.get(f"/api/v1/web-test/scripts/{script_id}/runs", headers=auth_headers).get_json()["data"]["items"]
+    assert [r["visual_failures"] for r in runs] == [1, 0, 0]
+
+    resp = client.post(f"/api/v1/web-test/scripts/{script_id}/visual/baselines",
+                       json={"run_key": failed["artifact_run"], "steps": ["missing"]}, headers=auth_headers)
+    assert resp.status_code == 400
+    resp = client.post(f"/api/v1/web-test/scripts/{script_id}/visual/baselines",
+                       json={"run_key": failed["artifact_run"]}, headers=auth_headers)
+    data = resp.get_json()["data"]
+    assert data["updated"] == ["home"] and data["baselines"][0]["source_run"] == failed["artifact_run"]
+    assert execute(changed)["status"] == "success"
+
+    resp = client.get(f"/api/v1/web-test/artifacts/{data['run_key']}/home", headers=auth_headers)
+    assert resp.status_code == 200 and np.array_equal(_decode_png(resp.get_data()), changed)
+
+    assert client.delete(f"/api/v1/web-test/scripts/{script_id}/visual/baselines/home",
+                         headers=auth_headers).status_code == 200
+    assert client.get(f"/api/v1/web-test/scripts/{script_id}/visual/baselines",
+                      headers=auth_headers).get_json()["data"]["baselines"] == []
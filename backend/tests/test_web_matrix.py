@@ -0,0 +1,183 @@
+import importlib.util
+import threading
+import time
+
+import pytest
+
+from app import tasks
+from app.api import web_test
+from app.extensions import db
+from app.models.web_test_script import WebTestScript
+from app.utils import web_runtime
+from app.utils.web_matrix import build_cells, resolve_matrix, validate_matrix_config
+
+SETTINGS = {"pool": {}, "visual": {"enabled": False}}
+
+
+def test_validate_and_resolve_matrix():
+    assert validate_matrix_config({"browsers": ["chromium", "webkit"], "viewports": [{"width": 375, "height": 812}]}) is None
+    assert "chosen from" in validate_matrix_config({"browsers": ["edge"]})
+    assert "duplicates" in validate_matrix_config({"browsers": ["firefox", "firefox"]})
+    assert "width and height" in validate_matrix_config({"viewports": [{"width": 375}]})
+    assert "exceed 2" in validate_matrix_config({"slots": 3}, max_slots=2)
+    assert "4 browser/viewport" in validate_matrix_config(
+        {"browsers": ["chromium", "firefox", "webkit"], "viewports": [{"width": 1, "height": 1}, {"width": 2, "height": 2}]},
+        max_cells=4)
+
+    matrix = resolve_matrix({"browsers": ["chromium", "firefox"]}, "webkit", 1280, 720, 3)
+    assert matrix == {"browsers": ["chromium", "firefox"], "viewports": [{"width": 1280, "height": 720}], "slots": 3}
+    matrix["viewports"].append({"width": 375, "height": 812})
+    assert [c["cell"] for c in build_cells(matrix)] == [
+        "chromium-1280x720", "firefox-1280x720", "chromium-375x812", "firefox-375x812"]
+
+
+def test_matrix_runs_cells_in_parallel_and_collapses_into_one_run(app, client, auth_headers, monkeypatch):
+    resp = client.post("/api/v1/web-test/scripts", json={"name": "matrix", "script_content": "print(1)"},
+                       headers=auth_headers)
+    script_id = resp.get_json()["data"]["id"]
+
+    lock, active, peak, servers = threading.Lock(), [0], [0], {}
+
+    def _fake_execute(spec, settings):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            pid = servers.setdefault(spec["browser"], 1000 + len(servers))
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        failed = spec["browser"] == "webkit" and spec["viewport_width"] == 375
+        return {
+            "status": "failed" if failed else "success", "success": not failed, "duration": 0.05,
+            "stdout": f"{spec['cell']} {spec['viewport_width']}x{spec['viewport_height']}",
+            "stderr": "AssertionError: menu hidden" if failed else "", "return_code": 1 if failed else 0,
+            "browser_pool": {"used": True, "warm": True, "server_pid": pid},
+            "artifact_run": f"script_{spec['id']}_{spec['cell']}", "artifacts": [],
+        }
+
+    monkeypatch.setattr(tasks, "_execute_web_script", _fake_execute)
+    matrix = {"browsers": ["chromium", "webkit"],
+              "viewports": [{"width": 1280, "height": 720}, {"width": 375, "height": 812}], "slots": 4}
+    progress = []
+    with app.app_context():
+        script = db.session.get(WebTestScript, script_id)
+        outcome = tasks._execute_web_matrix(tasks._web_script_spec(script), matrix, SETTINGS, 100,
+                                            lambda done, total: progress.append((done, total)))
+        tasks._apply_web_outcome(script, outcome)
+        db.session.commit()
+
+    assert peak[0] == 4 and progress[-1] == (4, 4)
+    assert outcome["status"] == "failed"
+    assert outcome["error"].startswith("矩阵执行 1/4 个组合失败: webkit-375x812 AssertionError")
+    cells = outcome["matrix"]["cells"]
+    assert [c["cell"] for c in cells] == ["chromium-1280x720", "webkit-1280x720", "chromium-375x812", "webkit-375x812"]
+    assert cells[2]["stdout"] == "chromium-375x812 375x812"
+    assert outcome["matrix"]["browser_servers"] == 2
+    assert outcome["matrix"]["parallel_speedup"] > 1
+
+    runs = client.get(f"/api/v1/web-test/scripts/{script_id}/runs", headers=auth_headers).get_json()["data"]["items"]
+    assert len(runs) == 1
+    assert (runs[0]["browser"], runs[0]["viewport"], runs[0]["matrix_cells"]) == ("matrix", None, 4)
+    detail = client.get(f"/api/v1/web-test/runs/{runs[0]['id']}", headers=auth_headers).get_json()["data"]
+    assert detail["matrix"]["failed"] == 1
+
+
+def test_run_matrix_endpoint_merges_script_defaults(client, auth_headers, monkeypatch):
+    resp = client.post(
+        "/api/v1/web-test/scripts",
+        json={"name": "matrix-api", "script_content": "print(1)", "browser": "firefox",
+              "config": {"matrix": {"viewports": [{"width": 375, "height": 812}, {"width": 1280, "height": 720}]}}},
+        headers=auth_headers,
+    )
+    script_id = resp.get_json()["data"]["id"]
+    assert client.put(f"/api/v1/web-test/scripts/{script_id}", json={"config": {"matrix": {"browsers": ["ie"]}}},
+                      headers=auth_headers).status_code == 400
+
+    submitted = {}
+
+    class _Result:
+        id = "matrix-task"
+
+    def _apply_async(args, task_id):
+        submitted.update(args=args, task_id=task_id)
+        return _Result()
+
+    monkeypatch.setattr(web_test.run_web_matrix_task, "apply_async", _apply_async)
+    resp = client.post(f"/api/v1/web-test/scripts/{script_id}/matrix/run", json={"slots": 2}, headers=auth_headers)
+    data = resp.get_json()["data"]
+    assert data["cells"] == ["firefox-375x812", "firefox-1280x720"]
+    assert submitted["args"][2] == {"browsers": ["firefox"], "slots": 2,
+                                    "viewports": [{"width": 375, "height": 812}, {"width": 1280, "height": 720}]}
+
+    resp = client.post(f"/api/v1/web-test/scripts/{script_id}/matrix/run",
+                       json={"browsers": ["chromium", "firefox", "webkit"],
+                             "viewports": [{"width": w, "height": 600} for w in range(400, 900, 100)]},
+                       headers=auth_headers)
+    assert resp.status_code == 400
+    assert client.get(f"/api/v1/web-test/scripts/{script_id}/logs?cell=../x", headers=auth_headers).status_code == 400
+
+
+def test_runtime_pins_cell_browser_and_viewport(monkeypatch):
+    class _Playwright:
+        chromium = property(lambda self: "chromium-type")
+        firefox = property(lambda self: "firefox-type")
+        webkit = property(lambda self: "webkit-type")
+
+    monkeypatch.setattr(web_runtime, "_config", {"browser": "firefox", "cell": "firefox-375x812",
+                                                 "viewport": {"width": 375, "height": 812}})
+    monkeypatch.setattr(web_runtime, "_stats", {"matrix": {"cell": "firefox-375x812", "redirected": [],
+                                                           "mismatches": []}})
+    web_runtime._pin_browser(_Playwright)
+    p = _Playwright()
+    # 脚本写死的 chromium / webkit 都按组合的 firefox 启动
+    assert (p.chromium, p.firefox, p.webkit) == ("firefox-type",) * 3
+    assert web_runtime._stats["matrix"]["redirected"] == ["chromium", "webkit"]
+
+    assert web_runtime._cell_viewport({}) == {"viewport": {"width": 375, "height": 812}}
+    assert web_runtime._cell_viewport({"viewport": None})["viewport"] == {"width": 375, "height": 812}
+    assert web_runtime._cell_viewport({"viewport": {"width": 375, "height": 812}})
+    assert web_runtime._stats["matrix"]["mismatches"] == []
+    assert web_runtime._cell_viewport({"viewport": {"width": 1280, "height": 720}})["viewport"]["width"] == 1280
+    web_runtime._cell_viewport({"no_viewport": True})
+    assert web_runtime._stats["matrix"]["mismatches"] == [
+        "脚本指定的视口 1280x720 与组合的视口 375x812 不一致", "脚本使用了 no_viewport，未使用组合的视口 375x812"]
+
+
+def test_cell_mismatch_fails_the_cell_without_retry():
+    spec = {"browser": "firefox", "cell": "firefox-375x812"}
+    outcome = {"status": "success", "success": True, "return_code": 0}
+    tasks._apply_cell_check(outcome, spec, {"redirected": ["chromium"],
+                                            "mismatches": ["脚本指定的视口 1280x720 与组合的视口 375x812 不一致"]})
+    assert outcome["status"] == "failed" and not tasks.should_retry(outcome)
+    assert outcome["error"] == "组合 firefox-375x812 未按配置执行: 脚本指定的视口 1280x720 与组合的视口 375x812 不一致"
+    assert outcome["warnings"] == ["脚本使用的 chromium 已按组合替换为 firefox"]
+
+    cell = tasks._matrix_cell_result(dict(spec, viewport_width=375, viewport_height=812), outcome, 0, 100)
+    assert cell["mismatches"] == outcome["mismatches"] and cell["error"] == outcome["error"]
+
+
+@pytest.mark.skipif(importlib.util.find_spec("playwright") is None, reason="需要 Playwright")
+def test_chromium_only_script_runs_in_firefox_cell_and_reports_viewport(app):
+    script = """
+from playwright.sync_api import sync_playwright
+
+with sync_playwright() as p:
+    browser = p.chromium.launch()
+    default = browser.new_page()
+    print('default', default.viewport_size)
+    browser.new_context(viewport={'width': 1280, 'height': 720}).new_page()
+    print('engine', browser.browser_type.name)
+    browser.close()
+"""
+    with app.app_context():
+        settings = dict(tasks._web_run_settings(), pool={"enabled": False})
+        spec = {"id": 1, "user_id": 1, "name": "cell", "script_content": script, "browser": "firefox",
+                "headless": True, "timeout": 60000, "viewport_width": 375, "viewport_height": 812,
+                "network": None, "performance": {"enabled": False}, "visual": None, "cell": "firefox-375x812"}
+        outcome = tasks._execute_web_script(spec, dict(settings, visual={"enabled": False}))
+
+    assert outcome["return_code"] == 0, outcome["stderr"]
+    assert "engine firefox" in outcome["stdout"]
+    assert "default {'width': 375, 'height': 812}" in outcome["stdout"]
+    assert outcome["status"] == "failed" and "1280x720" in outcome["error"]
+    assert "脚本使用的 chromium 已按组合替换为 firefox" in outcome["warnings"]
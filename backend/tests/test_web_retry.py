@@ -0,0 +1,251 @@
+import signal
+import types
+
+import greenlet
+
+from app import tasks
+from app.extensions import db
+from app.models.test_run import TestRun
+from app.models.web_test_script import WebTestScript
+from app.utils import web_runtime
+from app.utils.web_retry import resolve_retry_policy, should_retry, validate_retry_config
+
+DEFAULTS = {"retries": 1, "max_retries": 3, "trace": True, "video": True}
+
+
+def _script_outcomes(statuses):
+    """依次返回给定状态的执行结果，记录每次执行的诊断配置"""
+    calls = []
+
+    def _execute(spec, settings):
+        status, return_code = statuses[len(calls)]
+        calls.append(spec.get("diagnostics"))
+        return {"status": status, "success": status == "success", "duration": 1.0 + len(calls),
+                "return_code": return_code, "stderr": "Timeout 5000ms exceeded" if status == "failed" else "",
+                "artifact_run": f"run_{len(calls)}"}
+
+    return calls, _execute
+
+
+def test_retry_policy():
+    assert validate_retry_config({"retries": 2, "trace": True, "video": False}) is None
+    assert "non-negative" in validate_retry_config({"retries": -1})
+    assert "exceed 3" in validate_retry_config({"retries": 5}, max_retries=3)
+    assert "boolean" in validate_retry_config({"video": "yes"})
+    assert resolve_retry_policy({"retries": 9, "video": False}, DEFAULTS) == {"retries": 3, "trace": True, "video": False}
+
+    assert should_retry({"status": "failed", "return_code": 1})
+    assert should_retry({"status": "timeout"})
+    # 性能预算、视觉回归判定失败时脚本本身成功，不重试
+    assert not should_retry({"status": "failed", "return_code": 0})
+    assert not should_retry({"status": "error"})
+
+
+def test_retries_with_diagnostics_and_reports_flaky(monkeypatch):
+    spec = {"id": 1, "retry": resolve_retry_policy({"retries": 2}, DEFAULTS)}
+
+    calls, execute = _script_outcomes([("success", 0)])
+    monkeypatch.setattr(tasks, "_execute_web_script", execute)
+    outcome = tasks._execute_web_with_retry(spec, {})
+    assert (outcome["status"], calls, "retry" in outcome) == ("success", [None], False)
+
+    calls, execute = _script_outcomes([("failed", 1), ("success", 0)])
+    monkeypatch.setattr(tasks, "_execute_web_script", execute)
+    outcome = tasks._execute_web_with_retry(spec, {})
+    assert outcome["status"] == "flaky" and outcome["success"]
+    assert calls == [None, {"trace": True, "video": True, "dir": "diagnostics"}]
+    assert outcome["duration"] == 5.0
+    assert outcome["retry"]["result"] == "flaky"
+    assert (outcome["retry"]["first_attempt_time"], outcome["retry"]["retry_time"]) == (2.0, 3.0)
+    assert outcome["retry"]["history"][0]["error"] == "Timeout 5000ms exceeded"
+    assert outcome["artifact_run"] == "run_2"
+
+    calls, execute = _script_outcomes([("failed", 1), ("timeout", None), ("failed", 1)])
+    monkeypatch.setattr(tasks, "_execute_web_script", execute)
+    outcome = tasks._execute_web_with_retry(spec, {})
+    assert outcome["status"] == "failed" and outcome["retry"]["result"] == "failed"
+    assert [h["status"] for h in outcome["retry"]["history"]] == ["failed", "timeout", "failed"]
+    assert outcome["retry"]["retry_time"] == 7.0
+
+
+def test_flaky_runs_are_recorded_and_count_as_passed(app, client, auth_headers, monkeypatch):
+    project = client.post("/api/v1/projects", json={"name": "web-retry"}, headers=auth_headers).get_json()["data"]
+    resp = client.post("/api/v1/web-test/scripts",
+                       json={"name": "retry", "script_content": "print(1)", "config": {"retry": {"retries": 1}}},
+                       headers=auth_headers)
+    script_id = resp.get_json()["data"]["id"]
+    assert client.put(f"/api/v1/web-test/scripts/{script_id}", json={"config": {"retry": {"retries": 10}}},
+                      headers=auth_headers).status_code == 400
+
+    calls, execute = _script_outcomes([("failed", 1), ("success", 0)])
+    monkeypatch.setattr(tasks, "_execute_web_script", execute)
+    with app.app_context():
+        script = db.session.get(WebTestScript, script_id)
+        spec = tasks._web_script_spec(script)
+        outcome = tasks._execute_web_with_retry(spec, {})
+        tasks._apply_web_outcome(script, outcome)
+        case = tasks._suite_case_result(dict(spec, browser="chromium"), outcome, 0, 100)
+
+        test_run = TestRun(project_id=project["id"], test_type="web", status="running", total_cases=1)
+        db.session.add(test_run)
+        db.session.flush()
+        report = tasks._finish_web_suite(test_run, [case])
+        db.session.commit()
+        assert script.status == "flaky"
+        assert (test_run.status, test_run.passed) == ("success", 1)
+        assert (report.summary["flaky"], report.summary["retried"], report.summary["retry_time"]) == (1, 1, 3.0)
+
+    run = client.get(f"/api/v1/web-test/scripts/{script_id}/runs", headers=auth_headers).get_json()["data"]["items"][0]
+    assert (run["status"], run["attempts"], run["retry_time"]) == ("flaky", 2, 3.0)
+
+
+class _Tracing:
+    def __init__(self, log):
+        self.log = log
+
+    def start(self, **kwargs):
+        self.log.append(("start", kwargs.get("title")))
+
+    def stop(self, path=None):
+        self.log.append(("stop", path))
+
+
+def test_runtime_diagnostics_video_and_script_tracing(monkeypatch):
+    monkeypatch.setitem(web_runtime._config, "diagnostics", {"trace": True, "video": True, "dir": "diagnostics"})
+    monkeypatch.setattr(web_runtime, "_diagnostics", {"tracing": {}, "owned": {}, "contexts": [], "traces": [],
+                                                      "errors": []})
+    assert web_runtime._diagnostic_kwargs({}) == {"record_video_dir": "diagnostics/videos"}
+    assert web_runtime._diagnostic_kwargs({"record_video_dir": "mine"}) == {"record_video_dir": "mine"}
+
+    monkeypatch.setattr(_Tracing, "start", _Tracing.start)
+    monkeypatch.setattr(_Tracing, "stop", _Tracing.stop)
+    web_runtime._patch_tracing(_Tracing)
+    log = []
+    auto, other = _Tracing(log), _Tracing(log)
+    web_runtime._diagnostics["tracing"][id(auto)] = (auto, web_runtime._next_trace_path())
+    assert web_runtime._diagnostics["tracing"][id(auto)][1] == "diagnostics/trace-1.zip"
+
+    auto.start(title="script")  # Trace 已由运行时开启：忽略脚本的 start()
+    other.start(title="script")
+    auto.stop(path="mine.zip")  # 脚本按自己的路径保存后，运行时不再重复保存
+    assert log == [("start", "script"), ("stop", "mine.zip")]
+    assert web_runtime._diagnostics["tracing"] == {}
+
+
+def test_sigterm_raises_in_script_greenlet_and_keeps_dispatcher_alive():
+    # 同步 API 等待时信号到达事件循环所在的 greenlet：异常抛给脚本，事件循环之后仍可继续运行
+    log = []
+
+    def dispatcher():
+        web_runtime._on_terminate(signal.SIGTERM, None)
+        log.append("loop resumed")
+
+    loop = greenlet.greenlet(dispatcher)
+    try:
+        loop.switch()
+    except SystemExit as e:
+        log.append(str(e))
+    loop.switch()  # 脚本退出 with sync_playwright() 时关闭上下文
+    assert log == ["执行超时，已终止", "loop resumed"] and loop.dead
+
+
+class _Context:
+    def __init__(self, log, name):
+        self.log, self.name = log, name
+
+    def close(self):
+        self.log.append(f"close {self.name}")
+
+
+class _Manager:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        self.log.append("enter")
+        return "playwright"
+
+    def __exit__(self, *args):
+        self.log.append("driver stopped")
+
+    def start(self):
+        return "started"
+
+
+def test_script_contexts_are_closed_before_playwright_exits(monkeypatch):
+    # 只替换公开的 sync_playwright()：退出 with（包括异常退出）时先关闭上下文，再停止驱动
+    monkeypatch.setattr(web_runtime, "_diagnostics", {"tracing": {}, "owned": {}, "contexts": [], "traces": [],
+                                                      "errors": []})
+    log = []
+    module = types.SimpleNamespace(sync_playwright=lambda: _Manager(log))
+    web_runtime._close_on_exit(module, "sync_playwright", web_runtime._close_contexts_sync(RuntimeError, _Context))
+    web_runtime._diagnostics["contexts"].extend([_Context(log, "a"), "other", _Context(log, "b")])
+
+    try:
+        with module.sync_playwright() as p:
+            assert p == "playwright"
+            raise SystemExit("执行超时，已终止")
+    except SystemExit:
+        pass
+    assert log == ["enter", "close b", "close a", "driver stopped"]
+    assert web_runtime._diagnostics["contexts"] == ["other"]  # 只关闭同步 API 的上下文
+    assert module.sync_playwright().start() == "started"
+
+
+def _web_spec(app, script_content, **fields):
+    """真实执行脚本所需的 spec 与 settings（不使用浏览器池）"""
+    with app.app_context():
+        script = WebTestScript(name="real", script_content=script_content, user_id=1,
+                               config={"performance": {"enabled": True, "budgets": {"lcp": 2500}},
+                                       "retry": {"retries": 1}})
+        db.session.add(script)
+        db.session.commit()
+        spec = dict(tasks._web_script_spec(script), **fields)
+        settings = dict(tasks._web_run_settings(), pool={"enabled": False},
+                        retry=dict(app.config["WEB_RETRY"], terminate_grace=10))
+    return spec, settings
+
+
+def test_timed_out_retry_is_terminated_gracefully(app):
+    # 开启诊断的执行超时：先 SIGTERM，脚本的 finally（关闭上下文、保存 Trace）得以执行
+    script = """
+import os, time
+try:
+    print('started', flush=True)
+    time.sleep(30)
+finally:
+    os.makedirs('diagnostics', exist_ok=True)
+    with open('diagnostics/trace-1.zip', 'w') as f:
+        f.write('trace')
+"""
+    spec, settings = _web_spec(app, script, timeout=1500,
+                               diagnostics={"trace": True, "video": False, "dir": "diagnostics"})
+    with app.app_context():
+        outcome = tasks._execute_web_script(spec, settings)
+    assert outcome["status"] == "timeout"
+    assert "diagnostics/trace-1.zip" in [a["name"] for a in outcome["artifacts"]]
+    assert outcome["diagnostics"]["errors"] == []  # 运行时正常退出并写入了统计
+    assert outcome["performance_unchecked"] and "未检查性能预算" in outcome["warnings"][0]
+
+    with app.app_context():
+        outcome = tasks._execute_web_script(dict(spec, diagnostics=None), settings)
+    assert outcome["status"] == "timeout" and outcome["artifacts"] == []
+    assert "performance_unchecked" not in outcome
+
+
+def test_flaky_retry_records_unchecked_budget(app, tmp_path):
+    counter = tmp_path / "attempts"
+    # 首次执行失败，重试（开启诊断）时通过
+    script = f"""
+import os, sys
+path = {str(counter)!r}
+first = not os.path.exists(path)
+open(path, 'a').close()
+sys.exit(1 if first else 0)
+"""
+    spec, settings = _web_spec(app, script, timeout=10000)
+    with app.app_context():
+        outcome = tasks._execute_web_with_retry(spec, settings)
+    assert outcome["status"] == "flaky"
+    assert [h["diagnostics"] is None for h in outcome["retry"]["history"]] == [True, False]
+    assert outcome["retry"]["performance_unchecked"] is True
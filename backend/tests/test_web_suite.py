@@ -0,0 +1,88 @@
+from app.api import web_test
+from app.extensions import db
+from app.models.test_report import TestReport
+from app.models.test_run import TestRun
+from app.tasks import _finish_web_suite, split_shards
+
+
+def _create_project(client, auth_headers, name="web-suite"):
+    resp = client.post("/api/v1/projects", json={"name": name}, headers=auth_headers)
+    return resp.get_json()["data"]
+
+
+def _create_script(client, auth_headers, project_id, name, tags):
+    resp = client.post(
+        "/api/v1/web-test/scripts",
+        json={"name": name, "project_id": project_id, "tags": tags, "script_content": "print(1)"},
+        headers=auth_headers,
+    )
+    return resp.get_json()["data"]
+
+
+def test_run_suite_selects_scripts_by_tag(client, auth_headers, monkeypatch):
+    project = _create_project(client, auth_headers)
+    smoke = _create_script(client, auth_headers, project["id"], "login", ["smoke"])
+    _create_script(client, auth_headers, project["id"], "checkout", ["regression"])
+    both = _create_script(client, auth_headers, project["id"], "search", ["smoke", "regression"])
+
+    dispatched = {}
+
+    class _Result:
+        id = "suite-task"
+
+    def _dispatch(test_run_id, script_ids, slots, shards, suite):
+        dispatched.update(test_run_id=test_run_id, script_ids=script_ids, slots=slots, shards=shards)
+        return _Result()
+
+    monkeypatch.setattr(web_test, "dispatch_web_suite", _dispatch)
+    resp = client.post(
+        "/api/v1/web-test/suites/run",
+        json={"project_id": project["id"], "tags": ["smoke"], "slots": 3, "shards": 2},
+        headers=auth_headers,
+    )
+
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    assert dispatched["script_ids"] == [smoke["id"], both["id"]]
+    assert (dispatched["slots"], dispatched["shards"]) == (3, 2)
+    assert data["test_run_id"] == dispatched["test_run_id"]
+
+    resp = client.get(f"/api/v1/test-runs/{data['test_run_id']}", headers=auth_headers)
+    run = resp.get_json()["data"]
+    assert run["test_type"] == "web"
+    assert run["status"] == "running"
+    assert run["total_cases"] == 2
+
+    resp = client.post(
+        "/api/v1/web-test/suites/run",
+        json={"project_id": project["id"], "slots": 99},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 400
+
+
+def test_finish_web_suite_aggregates_results(app, client, auth_headers):
+    project = _create_project(client, auth_headers, name="web-suite-finish")
+    results = [
+        {"script_id": 1, "name": "a", "status": "success", "passed": True, "duration": 2.0},
+        {"script_id": 2, "name": "b", "status": "failed", "passed": False, "duration": 3.0},
+        {"script_id": 3, "name": "c", "status": "timeout", "passed": False, "duration": 5.0},
+    ]
+    with app.app_context():
+        test_run = TestRun(project_id=project["id"], test_type="web", status="running", total_cases=3)
+        db.session.add(test_run)
+        db.session.flush()
+        report = _finish_web_suite(test_run, results, {"slots": 3})
+        db.session.commit()
+
+        assert (test_run.status, test_run.passed, test_run.failed, test_run.error) == ("failed", 1, 1, 1)
+        stored = db.session.get(TestReport, report.id)
+        assert stored.test_type == "web"
+        assert stored.summary["script_time"] == 10.0
+        assert stored.summary["max_duration"] == 5.0
+        assert len(stored.report_data["results"]) == 3
+
+
+def test_split_shards_round_robin():
+    assert split_shards([1, 2, 3, 4, 5], 2) == [[1, 3, 5], [2, 4]]
+    assert split_shards([1, 2], 8) == [[1], [2]]
@@ -0,0 +1,112 @@
+from app.extensions import db
+from app.models.web_test_script import WebTestScript
+from app.tasks import _apply_performance, _apply_web_outcome
+from app.utils.web_vitals import build_performance, trend_stats, validate_performance_config
+
+
+def _page(url, **metrics):
+    raw = {"id": url, "url": url, "ttfb": 120.04, "fcp": 400.0, "lcp": 900.0, "cls": 0.012345,
+           "load": 1500.0, "transfer_bytes": 204800.0, "long_tasks": 1, "long_task_ms": 80.0,
+           "timing": {"dns": 1.0, "connect": 2.0, "tls": 0, "request": 100.0, "response": 5.0}}
+    raw.update(metrics)
+    return raw
+
+
+def test_build_performance_takes_worst_page_and_checks_budgets():
+    performance = build_performance(
+        [_page("about:blank"), _page("https://a.test/"), _page("https://a.test/list", lcp=3200.0, cls=0.3)],
+        {"lcp": 2500, "cls": 0.1},
+    )
+    assert [p["url"] for p in performance["pages"]] == ["https://a.test/", "https://a.test/list"]
+    assert performance["pages"][0]["ttfb"] == 120.0
+    assert performance["pages"][0]["cls"] == 0.0123
+    assert performance["pages"][0]["transfer_bytes"] == 204800
+    assert performance["summary"]["pages"] == 2
+    assert performance["summary"]["lcp"] == 3200.0
+    assert {v["metric"] for v in performance["violations"]} == {"lcp", "cls"}
+
+
+def test_validate_performance_config():
+    assert validate_performance_config({"enabled": True, "budgets": {"lcp": 2500, "cls": 0.1}}) is None
+    assert "unknown metrics" in validate_performance_config({"budgets": {"speed_index": 1}})
+    assert "non-negative" in validate_performance_config({"budgets": {"lcp": -1}})
+    assert "boolean" in validate_performance_config({"enabled": "yes"})
+
+
+def test_trend_stats_compares_latest_with_previous_median():
+    stats = trend_stats([{"lcp": 1000}, {"lcp": 1200}, {"lcp": None}, {"lcp": 1650}])
+    assert stats["lcp"]["latest"] == 1650
+    assert stats["lcp"]["change_pct"] == 50.0
+    assert "fcp" not in stats
+
+
+def test_budget_failure_is_recorded_and_exposed_as_trend(app, client, auth_headers):
+    resp = client.post(
+        "/api/v1/web-test/scripts",
+        json={"name": "vitals", "script_content": "print(1)",
+              "config": {"performance": {"budgets": {"lcp": 2500}}}},
+        headers=auth_headers,
+    )
+    script_id = resp.get_json()["data"]["id"]
+    assert client.put(f"/api/v1/web-test/scripts/{script_id}", json={"config": {"performance": {"budgets": []}}},
+                      headers=auth_headers).status_code == 400
+
+    with app.app_context():
+        script = db.session.get(WebTestScript, script_id)
+        for lcp in (1000.0, 1100.0, 3000.0):
+            outcome = {"status": "success", "success": True, "duration": 1.0, "artifact_run": None}
+            _apply_performance(outcome, {"pages": [_page("https://a.test/", lcp=lcp)]}, {"lcp": 2500})
+            _apply_web_outcome(script, outcome)
+        db.session.commit()
+        assert script.status == "failed"
+        assert script.last_result["error"].startswith("性能预算超出: lcp 3000ms > 2500ms")
+
+    resp = client.get(f"/api/v1/web-test/scripts/{script_id}/performance/trend?limit=2", headers=auth_headers)
+    trend = resp.get_json()["data"]
+    assert [p["lcp"] for p in trend["points"]] == [1100.0, 3000.0]
+    assert trend["stats"]["lcp"]["change_pct"] == 172.73
+    assert trend["budgets"] == {"lcp": 2500}
+
+    resp = client.get(f"/api/v1/web-test/scripts/{script_id}/runs", headers=auth_headers)
+    runs = resp.get_json()["data"]["items"]
+    assert [r["status"] for r in runs] == ["failed", "success", "success"]
+    assert runs[0]["budget_violations"] == 1
+
+
+def test_trend_compares_runs_with_the_same_browser_and_viewport(app, client, auth_headers):
+    resp = client.post("/api/v1/web-test/scripts", json={"name": "trend", "script_content": "print(1)"},
+                       headers=auth_headers)
+    script_id = resp.get_json()["data"]["id"]
+
+    def _outcome(lcp):
+        outcome = {"status": "success", "success": True, "duration": 1.0, "artifact_run": None}
+        _apply_performance(outcome, {"pages": [_page("https://a.test/", lcp=lcp)]}, {})
+        return outcome
+
+    with app.app_context():
+        script = db.session.get(WebTestScript, script_id)
+        _apply_web_outcome(script, _outcome(1000.0))
+        script.viewport_width, script.viewport_height = 375, 667
+        _apply_web_outcome(script, _outcome(4000.0))
+        script.browser, script.viewport_width, script.viewport_height = "chromium", 1280, 720
+        cells = [{"cell": f"{browser}-1280x720", "browser": browser, "viewport": "1280x720", "status": "success",
+                  "performance": {"summary": _outcome(lcp)["performance"]["summary"], "violations": []}}
+                 for browser, lcp in (("chromium", 1200.0), ("firefox", 5000.0))]
+        _apply_web_outcome(script, {"status": "success", "success": True, "duration": 2.0,
+                                    "matrix": {"viewports": ["1280x720"], "cells": cells}})
+        _apply_web_outcome(script, _outcome(1100.0))
+        db.session.commit()
+
+    url = f"/api/v1/web-test/scripts/{script_id}/performance/trend"
+    trend = client.get(url, headers=auth_headers).get_json()["data"]
+    assert (trend["browser"], trend["viewport"]) == ("chromium", "1280x720")
+    assert [p["lcp"] for p in trend["points"]] == [1000.0, 1100.0]
+
+    trend = client.get(f"{url}?include_matrix=true", headers=auth_headers).get_json()["data"]
+    assert [(p["lcp"], p.get("cell")) for p in trend["points"]] == [
+        (1000.0, None), (1200.0, "chromium-1280x720"), (1100.0, None)]
+
+    trend = client.get(f"{url}?viewport=375x667", headers=auth_headers).get_json()["data"]
+    assert [p["lcp"] for p in trend["points"]] == [4000.0]
+    trend = client.get(f"{url}?browser=firefox&include_matrix=1", headers=auth_headers).get_json()["data"]
+    assert [p["lcp"] for p in trend["points"]] == [5000.0]
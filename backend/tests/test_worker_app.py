@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+from celery import Celery
+from sqlalchemy import text
+
+from app import celery_app
+from app.extensions import db
+
+
+def _engine(app):
+    with app.app_context():
+        return db.engine
+
+
+def _in_child(fn):
+    """在 fork 出的子进程中执行 fn，返回其结果（JSON）"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = fn()
+        except BaseException as e:
+            result = {'error': repr(e)}
+        with os.fdopen(write_fd, 'w') as f:
+            json.dump(result, f)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        data = json.load(f)
+    os.waitpid(pid, 0)
+    return data
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='需要 fork')
+def test_forked_workers_reuse_app_with_their_own_connections(app, monkeypatch):
+    monkeypatch.setattr(celery_app, '_worker_state', dict(celery_app._worker_state, app=app, pid=os.getpid(),
+                                                         forks=0, requests=0))
+    assert celery_app.get_worker_app() is app
+    assert celery_app._worker_state['forks'] == 0
+
+    engine = _engine(app)
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+    parent_pool = engine.pool
+    parent_connections = parent_pool.checkedin()
+    assert parent_connections >= 1
+
+    def _child():
+        worker_app = celery_app.get_worker_app()
+        child_engine = _engine(worker_app)
+        # 继承的连接池已被丢弃：子进程的第一个连接是新建的
+        fresh = child_engine.pool is not parent_pool and child_engine.pool.checkedin() == 0
+        with child_engine.connect() as conn:
+            value = conn.execute(text('SELECT 1')).scalar()
+        return {
+            'pid': os.getpid(),
+            'same_app': worker_app is app,
+            'fresh_pool': fresh,
+            'pool_id': id(child_engine.pool),
+            'value': value,
+            'forks': celery_app._worker_state['forks'],
+            'state_pid': celery_app._worker_state['pid'],
+        }
+
+    first, second = _in_child(_child), _in_child(_child)
+    for child in (first, second):
+        assert 'error' not in child, child
+        assert child['same_app'] and child['fresh_pool'] and child['value'] == 1
+        assert (child['forks'], child['state_pid']) == (1, child['pid'])
+    assert first['pid'] != second['pid']
+
+    # 父进程不受影响：dispose(close=False) 不会关闭父进程仍在使用的连接
+    assert engine.pool is parent_pool and parent_pool.checkedin() == parent_connections
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT 1')).scalar() == 1
+    assert celery_app._worker_state['forks'] == 0
+
+
+def test_worker_process_init_disposes_inherited_engines(app, monkeypatch):
+    monkeypatch.setattr(celery_app, '_worker_state', dict(celery_app._worker_state, app=app, pid=-1, forks=0))
+    disposed = []
+    engine = _engine(app)
+    monkeypatch.setattr(type(engine), 'dispose', lambda self, close=True: disposed.append(close))
+
+    celery_app._on_worker_process_init()
+    assert disposed == [False]
+    assert (celery_app._worker_state['pid'], celery_app._worker_state['forks']) == (os.getpid(), 1)
+
+    celery_app._on_worker_process_init()
+    assert disposed == [False]
+
+
+def test_init_celery_app_is_the_only_worker_app(app, monkeypatch):
+    import app as app_package
+
+    monkeypatch.setattr(celery_app, '_worker_state', dict(celery_app._worker_state, app=None, pid=None, forks=0))
+    monkeypatch.setattr(app_package, 'create_app', lambda *args, **kwargs: pytest.fail('不应再创建应用'))
+    worker = celery_app.init_celery(Celery('test'), app)
+    assert celery_app.get_worker_app() is app
+
+    # 任务基类在同一个应用中执行
+    @worker.task
+    def current():
+        from flask import current_app
+        return current_app._get_current_object()
+
+    assert current() is app
+
+    # prefork 子进程丢弃的正是该应用（ContextTask 使用的应用）的连接池
+    disposed = []
+    monkeypatch.setattr(type(_engine(app)), 'dispose', lambda self, close=True: disposed.append(close))
+    monkeypatch.setitem(celery_app._worker_state, 'pid', -1)
+    celery_app._on_worker_process_init()
+    assert disposed == [False] and celery_app.get_worker_app() is app
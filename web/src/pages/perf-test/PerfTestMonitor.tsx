@@ -10,6 +10,7 @@ import {
   Tag,
   Empty,
   Button,
+  Alert,
 } from 'antd'
 import {
   DashboardOutlined,
@@ -36,6 +37,7 @@ interface RunningTest {
   avg_response_time: number
   throughput: number
   error_rate: number
+  host_warning?: string
 }
 
 const PerfTestMonitor = () => {
@@ -95,6 +97,8 @@ const PerfTestMonitor = () => {
             avg_response_time: statusData.avg_response_time || lastResult?.avg_response_time || 0,
             throughput: statusData.throughput || lastResult?.throughput || 0,
             error_rate: statusData.error_rate || lastResult?.error_rate || 0,
+            // 压测机持续饱和时压测过程中即提示
+            host_warning: realtimeStats?.host?.warning,
           })
         }
 
@@ -343,6 +347,16 @@ const PerfTestMonitor = () => {
 
           {selectedTest && (
             <>
+              {selectedTest.host_warning && (
+                <Alert
+                  type="warning"
+                  showIcon
+                  message="压测机资源不足"
+                  description={selectedTest.host_warning}
+                  style={{ marginBottom: 24 }}
+                />
+              )}
+
               {/* 实时统计 */}
               <Row gutter={16} style={{ marginBottom: 24 }}>
                 <Col span={6}>
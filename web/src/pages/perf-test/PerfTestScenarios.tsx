@@ -65,6 +65,7 @@ const statusConfig: Record<string, { color: string; text: string }> = {
   failed: { color: 'error', text: '失败' },
   pending: { color: 'default', text: '未执行' },
   running: { color: 'processing', text: '执行中' },
+  aborted_slo: { color: 'warning', text: 'SLO 中止' },
 }
 
 const PerfTestScenarios = () => {